@@ -2,11 +2,17 @@
 Provide utilities that communicate with the backend.
 """
 
+import asyncio
+import contextlib
 import getpass
-from typing import Dict, List, Optional, Union
+import importlib.util
+import math
+import time
+from typing import Any, AsyncGenerator, Dict, List, NamedTuple, Optional, Type, TypeVar, Union
 
 import httpx
 import jwt
+from pydantic import BaseModel
 
 from lm_agent.config import settings
 from lm_agent.exceptions import (
@@ -15,9 +21,10 @@ from lm_agent.exceptions import (
     LicenseManagerParseError,
 )
 from lm_agent.logs import log_error, logger
+from lm_agent.metrics import BACKEND_CONNECTIONS, observe_backend_request, start_backend_request_timer
 from lm_agent.models import (
     ConfigurationSchema,
-    FeatureSchema,
+    JobChangesSchema,
     JobSchema,
     LicenseBookingRequest,
 )
@@ -25,15 +32,32 @@ from lm_agent.models import (
 USER_NAME = getpass.getuser()
 TOKEN_FILE_NAME = f"{USER_NAME}.token"
 
+ModelT = TypeVar("ModelT", bound=BaseModel)
 
-def _load_token_from_cache() -> Union[str, None]:
+
+def _get_token_expiration(token: str) -> Optional[float]:
+    """
+    Return the expiration timestamp of the token.
+
+    Returns None if the token has no expiration or if it can't be decoded.
+    """
+    try:
+        claims = jwt.decode(token, options=dict(verify_signature=False, verify_exp=False))
+    except jwt.InvalidTokenError:
+        return None
+
+    expiration = claims.get("exp")
+    return float(expiration) if expiration is not None else None
+
+
+def _load_token_from_cache(expiry_margin: int = 10) -> Union[str, None]:
     """
     Looks for and returns a token from a cache file (if it exists).
 
     Returns None if::
     * The token does not exist
     * Can't read the token
-    * The token is expired (or will expire within 10 seconds)
+    * The token is expired (or will expire within ``expiry_margin`` seconds)
     """
     token_path = settings.CACHE_DIR / TOKEN_FILE_NAME
     if not token_path.exists():
@@ -46,7 +70,7 @@ def _load_token_from_cache() -> Union[str, None]:
         return None
 
     try:
-        jwt.decode(token, options=dict(verify_signature=False, verify_exp=True), leeway=-10)
+        jwt.decode(token, options=dict(verify_signature=False, verify_exp=True), leeway=-expiry_margin)
     except jwt.ExpiredSignatureError:
         logger.warning("Cached token is expired. Will acquire a new one.")
         return None
@@ -73,12 +97,14 @@ def _write_token_to_cache(token: str):
         logger.warning(f"Couldn't save token to {token_path}: {err}")
 
 
-def acquire_token() -> str:
+async def acquire_token(expiry_margin: int = 10) -> str:
     """
     Retrieves a token from OIDC based on the app settings.
+
+    The cached token is used unless it expires within ``expiry_margin`` seconds.
     """
     logger.debug("Attempting to use cached token")
-    token = _load_token_from_cache()
+    token = _load_token_from_cache(expiry_margin)
 
     if token is None:
         logger.debug("Attempting to acquire token from OIDC")
@@ -90,7 +116,8 @@ def acquire_token() -> str:
         protocol = "https" if settings.OIDC_USE_HTTPS else "http"
         oidc_url = f"{protocol}://{settings.OIDC_DOMAIN}/protocol/openid-connect/token"
         logger.debug(f"Posting OIDC request to {oidc_url}")
-        response = httpx.post(oidc_url, data=oidc_body)
+        async with httpx.AsyncClient() as oidc_client:
+            response = await oidc_client.post(oidc_url, data=oidc_body)
         LicenseManagerAuthTokenError.require_condition(
             response.status_code == 200, f"Failed to get auth token from OIDC: {response.text}"
         )
@@ -103,25 +130,243 @@ def acquire_token() -> str:
     return token
 
 
-class AsyncBackendClient(httpx.AsyncClient):
+class TokenManager:
     """
-    Extends the httpx.AsyncClient class with automatic token acquisition for requests.
-    The token is acquired lazily on the first httpx request issued.
+    Hold the auth token in memory for the whole process.
 
-    This client should be used for most agent actions.
+    The token is acquired on the first request and refreshed in the background once it's about
+    to expire within ``TOKEN_REFRESH_MARGIN`` seconds, so requests don't wait for OIDC. Concurrent
+    refreshes are collapsed into a single one. The file cache is only used to share the token
+    with other processes, such as the prolog and epilog scripts.
     """
 
     _token: Optional[str]
+    _expiration: Optional[float]
+    _lock: asyncio.Lock
+    _refresh_task: Optional[asyncio.Task]
 
     def __init__(self):
         self._token = None
-        super().__init__(base_url=str(settings.BACKEND_BASE_URL), auth=self._inject_token, timeout=None)
+        self._expiration = None
+        self._lock = asyncio.Lock()
+        self._refresh_task = None
+
+    def _seconds_to_expire(self) -> float:
+        if self._expiration is None:
+            return math.inf
+        return self._expiration - time.time()
+
+    def _needs_token(self) -> bool:
+        return self._token is None or self._seconds_to_expire() <= 10
+
+    def _needs_refresh(self) -> bool:
+        return self._needs_token() or self._seconds_to_expire() <= settings.TOKEN_REFRESH_MARGIN
+
+    async def get_token(self) -> str:
+        """
+        Return the token, acquiring it if there is no valid token in memory.
+
+        If the token is about to expire, it's returned anyway and a refresh is started in the background.
+        """
+        if self._needs_token():
+            return await self.refresh()
+
+        if self._needs_refresh() and self._refresh_task is None:
+            logger.debug("Auth token is about to expire. Refreshing it in the background")
+            self._refresh_task = asyncio.create_task(self._background_refresh())
+
+        assert self._token is not None
+        return self._token
+
+    async def refresh(self, rejected_token: Optional[str] = None) -> str:
+        """
+        Acquire a new token, unless another refresh already got one while waiting for the lock.
+
+        If the token was rejected by the backend, a new one is acquired even if it's not about to expire,
+        unless it was already replaced, so concurrent requests rejected with the same token share one refresh.
+        """
+        async with self._lock:
+            rejected = rejected_token is not None and rejected_token == self._token
+            if rejected or self._needs_refresh():
+                if rejected:
+                    self._token = None
+                    _clear_token_cache()
+                self._token = await acquire_token(expiry_margin=settings.TOKEN_REFRESH_MARGIN)
+                self._expiration = _get_token_expiration(self._token)
+
+            assert self._token is not None
+            return self._token
+
+    async def _background_refresh(self):
+        try:
+            await self.refresh()
+        except Exception as err:
+            logger.warning(f"Couldn't refresh the auth token in the background: {err}")
+        finally:
+            self._refresh_task = None
+
+    async def close(self):
+        """
+        Cancel the background refresh, if any.
+        """
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._refresh_task
+            self._refresh_task = None
+
+
+def _clear_token_cache():
+    """
+    Remove the cached token, so it's not reused after being rejected by the backend.
+    """
+    token_path = settings.CACHE_DIR / TOKEN_FILE_NAME
+    with contextlib.suppress(FileNotFoundError):
+        token_path.unlink()
+
+
+token_manager = TokenManager()
+
+
+class TokenAuth(httpx.Auth):
+    """
+    Inject the token from the token manager in the requests.
+
+    If the backend rejects the token, a new one is acquired and the request is sent once more.
+    """
+
+    def __init__(self, manager: TokenManager):
+        self.manager = manager
+
+    async def async_auth_flow(self, request: httpx.Request) -> AsyncGenerator[httpx.Request, httpx.Response]:
+        token = await self.manager.get_token()
+        request.headers["authorization"] = f"Bearer {token}"
+        response = yield request
+
+        if response.status_code == 401:
+            logger.debug("Auth token was rejected by the backend. Acquiring a new one")
+            token = await self.manager.refresh(rejected_token=token)
+            request.headers["authorization"] = f"Bearer {token}"
+            yield request
+
+
+def _use_http2() -> bool:
+    """
+    Check if HTTP/2 should be used to talk to the backend.
+
+    HTTP/2 is only used if enabled in the settings and the ``h2`` package is installed.
+    """
+    if not settings.BACKEND_HTTP2:
+        return False
+
+    if importlib.util.find_spec("h2") is None:
+        logger.warning("HTTP/2 is enabled but the h2 package is not installed. Falling back to HTTP/1.1.")
+        return False
+
+    return True
+
+
+class AsyncBackendClient(httpx.AsyncClient):
+    """
+    Extends the httpx.AsyncClient class with automatic token acquisition for requests.
+    The token is provided by the ``token_manager`` shared by the whole process, which
+    acquires it lazily on the first httpx request issued and refreshes it before it expires.
+
+    The connections are pooled and kept alive to be reused by the following requests,
+    so this client is meant to be shared by the whole process through ``get_backend_client``.
+    """
+
+    _requests_sent: int
+
+    def __init__(self):
+        self._requests_sent = 0
+        super().__init__(
+            base_url=str(settings.BACKEND_BASE_URL),
+            auth=TokenAuth(token_manager),
+            timeout=None,
+            http2=_use_http2(),
+            limits=httpx.Limits(
+                max_connections=settings.BACKEND_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.BACKEND_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=settings.BACKEND_KEEPALIVE_EXPIRY,
+            ),
+            event_hooks={
+                "request": [self._count_request, start_backend_request_timer],
+                "response": [observe_backend_request],
+            },
+        )
+
+    async def _count_request(self, request: httpx.Request):
+        self._requests_sent += 1
+
+    def get_pool_statistics(self) -> Dict[str, Any]:
+        """
+        Return statistics about the connection pool, for debugging purposes.
+        """
+        pool = getattr(self._transport, "_pool", None)
+        connections = list(getattr(pool, "connections", []))
+
+        return {
+            "requests_sent": self._requests_sent,
+            "http2": _use_http2(),
+            "max_connections": settings.BACKEND_MAX_CONNECTIONS,
+            "max_keepalive_connections": settings.BACKEND_MAX_KEEPALIVE_CONNECTIONS,
+            "connections": len(connections),
+            "idle_connections": sum(1 for connection in connections if connection.is_idle()),
+            "active_connections": sum(
+                1 for connection in connections if not connection.is_idle() and not connection.is_closed()
+            ),
+        }
+
+
+_backend_client: Optional[AsyncBackendClient] = None
+
+
+def get_backend_client() -> AsyncBackendClient:
+    """
+    Return the backend client shared by the whole process, creating it if needed.
+    """
+    global _backend_client
+
+    if _backend_client is None or _backend_client.is_closed:
+        logger.debug("Creating the backend client")
+        _backend_client = AsyncBackendClient()
 
-    def _inject_token(self, request: httpx.Request) -> httpx.Request:
-        if self._token is None:
-            self._token = acquire_token()
-        request.headers["authorization"] = f"Bearer {self._token}"
-        return request
+    return _backend_client
+
+
+async def close_backend_client():
+    """
+    Close the backend client shared by the whole process, releasing its pooled connections.
+    """
+    global _backend_client
+
+    if _backend_client is None:
+        return
+
+    logger.debug(f"Closing the backend client. Pool statistics: {_backend_client.get_pool_statistics()}")
+    await token_manager.close()
+    await _backend_client.aclose()
+    _backend_client = None
+
+
+def get_backend_client_pool_statistics() -> Dict[str, Any]:
+    """
+    Return the connection pool statistics of the backend client shared by the whole process.
+    """
+    if _backend_client is None or _backend_client.is_closed:
+        return {}
+
+    return _backend_client.get_pool_statistics()
+
+
+def observe_backend_client_pool():
+    """
+    Record the connections in the pool of the backend client shared by the whole process.
+    """
+    pool_statistics = get_backend_client_pool_statistics()
+    for state in ("idle", "active"):
+        BACKEND_CONNECTIONS.labels(state=state).set(pool_statistics.get(f"{state}_connections", 0))
 
 
 async def check_backend_health():
@@ -129,8 +374,8 @@ async def check_backend_health():
     Hit the API's health-check endpoint to make sure the API is available.
     """
     logger.debug("Checking backend health")
-    async with AsyncBackendClient() as backend_client:
-        resp = await backend_client.get("/lm/health")
+    backend_client = get_backend_client()
+    resp = await backend_client.get("/lm/health")
     if resp.status_code != 204:
         logger.error(f"Backend health-check request failed with status code: {resp.status_code}")
         raise LicenseManagerBackendConnectionError("Could not connect to the backend health-check endpoint")
@@ -142,8 +387,8 @@ async def report_cluster_status():
     Report the cluster status to the backend.
     """
     logger.debug("Reporting cluster status")
-    async with AsyncBackendClient() as backend_client:
-        resp = await backend_client.put("/lm/cluster_statuses", params={"interval": settings.STAT_INTERVAL})
+    backend_client = get_backend_client()
+    resp = await backend_client.put("/lm/cluster_statuses", params={"interval": settings.STAT_INTERVAL})
 
     LicenseManagerBackendConnectionError.require_condition(
         resp.status_code == 202, f"Failed to report cluster status: {resp.text}"
@@ -151,74 +396,174 @@ async def report_cluster_status():
     logger.debug("Cluster status reported successfully")
 
 
-async def get_cluster_jobs_from_backend() -> List[JobSchema]:
+class _LocalCopy(NamedTuple):
     """
-    Get all jobs for the cluster with its bookings from the backend.
+    The last version of a resource returned by the backend, identified by its ETag.
     """
-    async with AsyncBackendClient() as backend_client:
-        resp = await backend_client.get("/lm/jobs/by_client_id")
 
-        LicenseManagerBackendConnectionError.require_condition(
-            resp.status_code == 200, f"Could not get job data from the backend: {resp.text}"
-        )
+    etag: str
+    items: List[Any]
+
+
+_local_copies: Dict[str, _LocalCopy] = {}
+
+
+async def _get_with_local_copy(path: str, resource_name: str, schema: Type[ModelT]) -> List[ModelT]:
+    """
+    Get a list of resources from the backend, reusing the local copy if it hasn't changed.
+
+    The ETag of the local copy is sent in the ``If-None-Match`` header, so the backend
+    answers ``304 Not Modified`` without a body if the resources didn't change, and
+    the local copy is returned without parsing and validating the data again.
+
+    The ETag may be weak and leave out fields that change constantly, in which case those fields
+    are stale in the local copy and must not be read from it: the usage counters of the features
+    (``total``, ``used`` and ``booked_total``) of the configurations.
+    """
+    backend_client = get_backend_client()
+    local_copy = _local_copies.get(path)
+    headers = {"If-None-Match": local_copy.etag} if local_copy is not None else {}
+    resp = await backend_client.get(path, headers=headers)
+
+    if resp.status_code == 304 and local_copy is not None:
+        logger.debug(f"The {resource_name} data didn't change in the backend, using the local copy")
+        return list(local_copy.items)
+
+    LicenseManagerBackendConnectionError.require_condition(
+        resp.status_code == 200, f"Could not get {resource_name} data from the backend: {resp.text}"
+    )
 
     parsed_resp: List = resp.json()
 
     with LicenseManagerParseError.handle_errors(
-        "Could not parse job data returned from the backend", do_except=log_error
+        f"Could not parse {resource_name} data returned from the backend", do_except=log_error
     ):
-        jobs = [JobSchema.model_validate(job) for job in parsed_resp]
+        items = [schema.model_validate(item) for item in parsed_resp]
 
-    return jobs
+    etag = resp.headers.get("ETag")
+    if etag is not None:
+        _local_copies[path] = _LocalCopy(etag=etag, items=items)
+    else:
+        _local_copies.pop(path, None)
 
+    return list(items)
 
-async def get_cluster_configs_from_backend() -> List[ConfigurationSchema]:
+
+class JobIndex:
     """
-    Get all configs from the backend for the cluster.
+    Local index of the jobs of the cluster, kept up to date with the job change feed of the backend.
+
+    The first sync requests all jobs from the backend. The following ones request only the jobs
+    created, changed or deleted since the cursor returned by the previous sync, and patch the index.
+    All jobs are requested again once JOB_INDEX_FULL_SYNC_INTERVAL has passed since the last full sync.
     """
-    async with AsyncBackendClient() as backend_client:
-        resp = await backend_client.get("/lm/configurations/by_client_id")
 
-        LicenseManagerBackendConnectionError.require_condition(
-            resp.status_code == 200, f"Could not get configuration data from the backend: {resp.text}"
-        )
+    jobs: Dict[int, JobSchema]
+    cursor: Optional[int]
+    full_synced_at: float
+    _lock: asyncio.Lock
 
-    parsed_resp: List = resp.json()
+    def __init__(self):
+        self.jobs = {}
+        self.cursor = None
+        self.full_synced_at = 0.0
+        self._lock = asyncio.Lock()
 
-    with LicenseManagerParseError.handle_errors(
-        "Could not parse configuration data returned from the backend", do_except=log_error
-    ):
-        configurations = [ConfigurationSchema.model_validate(configuration) for configuration in parsed_resp]
+    def needs_full_sync(self) -> bool:
+        """Check if all jobs must be requested instead of the changes since the cursor."""
+        if self.cursor is None:
+            return True
+        return time.monotonic() - self.full_synced_at >= settings.JOB_INDEX_FULL_SYNC_INTERVAL
+
+    async def sync(self) -> List[JobSchema]:
+        """
+        Apply the changes of the jobs since the last sync and return all jobs in the index.
+
+        If the changes can't be requested or parsed, the index is left untouched.
+        """
+        async with self._lock:
+            full_sync = self.needs_full_sync()
+            params = {"since": self.cursor} if not full_sync else {}
+
+            backend_client = get_backend_client()
+            resp = await backend_client.get("/lm/jobs/by_client_id/changes", params=params)
+
+            LicenseManagerBackendConnectionError.require_condition(
+                resp.status_code == 200, f"Could not get job data from the backend: {resp.text}"
+            )
+
+            with LicenseManagerParseError.handle_errors(
+                "Could not parse job data returned from the backend", do_except=log_error
+            ):
+                changes = JobChangesSchema.model_validate(resp.json())
+
+            if full_sync:
+                self.jobs = {}
+                self.full_synced_at = time.monotonic()
+
+            for job in changes.jobs:
+                self.jobs[job.id] = job
+
+            # Job ids are never reused, so a deleted job can't be changed again afterwards
+            for deleted_job in changes.deleted_jobs:
+                self.jobs.pop(deleted_job.job_id, None)
+
+            logger.debug(
+                f"Job index synced: {len(changes.jobs)} jobs changed, "
+                f"{len(changes.deleted_jobs)} jobs deleted, {len(self.jobs)} jobs in the index"
+            )
+            self.cursor = changes.cursor
+
+            return list(self.jobs.values())
+
+
+job_index = JobIndex()
+
+
+async def get_cluster_jobs_from_backend() -> List[JobSchema]:
+    """
+    Get all jobs for the cluster with its bookings from the backend.
+
+    Only the changes since the last request are transferred, and they are applied to the local job index.
+    """
+    return await job_index.sync()
+
+
+async def get_cluster_configs_from_backend() -> List[ConfigurationSchema]:
+    """
+    Get all configs from the backend for the cluster.
 
-    return configurations
+    The usage counters of the features may be stale, so only the structure of the configurations is used.
+    """
+    return await _get_with_local_copy("/lm/configurations/by_client_id", "configuration", ConfigurationSchema)
 
 
 async def make_feature_update(features_to_update: List[Dict]):
     """
     Update the feature with its current counters.
     """
-    async with AsyncBackendClient() as backend_client:
-        features_response = await backend_client.put(
-            "/lm/features/bulk",
-            json=features_to_update,
-        )
-        LicenseManagerBackendConnectionError.require_condition(
-            features_response.status_code == 200, f"Failed to update feature: {features_response.text}"
-        )
+    backend_client = get_backend_client()
+    features_response = await backend_client.put(
+        "/lm/features/bulk",
+        json=features_to_update,
+    )
+    LicenseManagerBackendConnectionError.require_condition(
+        features_response.status_code == 200, f"Failed to update feature: {features_response.text}"
+    )
 
 
 async def make_booking_request(lbr: LicenseBookingRequest) -> bool:
     """
     Create a job and its bookings on the backend for each license booked.
     """
-    async with AsyncBackendClient() as backend_client:
-        job_response = await backend_client.post(
-            "/lm/jobs",
-            json=lbr.model_dump(),
-        )
-        if job_response.status_code != 201:
-            logger.error(f"Failed to create booking: {job_response.text}")
-            return False
+    backend_client = get_backend_client()
+    job_response = await backend_client.post(
+        "/lm/jobs",
+        json=lbr.model_dump(),
+    )
+    if job_response.status_code != 201:
+        logger.error(f"Failed to create booking: {job_response.text}")
+        return False
 
     logger.debug(f"##### Job {lbr.slurm_job_id} created successfully #####")
     return True
@@ -230,50 +575,58 @@ async def remove_job_by_slurm_job_id(slurm_job_id: str):
 
     If the job doesn't exist, the request will be ignored.
     """
-    async with AsyncBackendClient() as backend_client:
-        resp = await backend_client.delete(f"lm/jobs/slurm_job_id/{slurm_job_id}")
+    backend_client = get_backend_client()
+    resp = await backend_client.delete(f"lm/jobs/slurm_job_id/{slurm_job_id}")
 
-        LicenseManagerBackendConnectionError.require_condition(
-            resp.status_code in [200, 404], f"Failed to remove job: {resp.text}"
-        )
+    LicenseManagerBackendConnectionError.require_condition(
+        resp.status_code in [200, 404], f"Failed to remove job: {resp.text}"
+    )
 
     logger.debug(f"##### Job {slurm_job_id} removed successfully #####")
 
 
-async def remove_booking(booking_id: int):
+async def remove_jobs_by_slurm_job_ids(slurm_job_ids: List[str]) -> List[str]:
     """
-    Remove the booking with the given id.
+    Remove the jobs with their bookings for the given slurm_job_ids in the cluster with a single request.
+
+    Jobs that don't exist are ignored. Return the slurm_job_ids of the removed jobs.
     """
-    async with AsyncBackendClient() as backend_client:
-        resp = await backend_client.delete(f"lm/bookings/{booking_id}")
+    backend_client = get_backend_client()
+    resp = await backend_client.request("DELETE", "lm/jobs/bulk", json=slurm_job_ids)
 
     LicenseManagerBackendConnectionError.require_condition(
-        resp.status_code == 200, f"Failed to remove booking: {resp.text}"
+        resp.status_code == 200, f"Failed to remove jobs: {resp.text}"
     )
 
-    logger.debug(f"##### Booking {booking_id} removed successfully")
+    with LicenseManagerParseError.handle_errors(
+        "Could not parse removed jobs returned from the backend", do_except=log_error
+    ):
+        removed_slurm_job_ids: List[str] = resp.json()["deleted_slurm_job_ids"]
 
+    logger.debug(f"##### Jobs {removed_slurm_job_ids} removed successfully #####")
+    return removed_slurm_job_ids
 
-async def get_all_features_from_backend() -> List[FeatureSchema]:
-    """
-    Return the job with its bookings for the given job_id in the cluster.
+
+async def remove_bookings(booking_ids: List[int]) -> List[int]:
     """
-    async with AsyncBackendClient() as backend_client:
-        feature_response = await backend_client.get("/lm/features")
+    Remove the bookings with the given ids with a single request.
 
-        LicenseManagerBackendConnectionError.require_condition(
-            feature_response.status_code == 200, f"Failed to get features: {feature_response.text}"
-        )
+    Bookings that don't exist are ignored. Return the ids of the removed bookings.
+    """
+    backend_client = get_backend_client()
+    resp = await backend_client.request("DELETE", "lm/bookings/bulk", json=booking_ids)
 
-        with LicenseManagerParseError.handle_errors(""):
-            parsed_resp: List = feature_response.json()
+    LicenseManagerBackendConnectionError.require_condition(
+        resp.status_code == 200, f"Failed to remove bookings: {resp.text}"
+    )
 
     with LicenseManagerParseError.handle_errors(
-        "Could not parse feature data returned from the backend", do_except=log_error
+        "Could not parse removed bookings returned from the backend", do_except=log_error
     ):
-        features = [FeatureSchema.model_validate(feature) for feature in parsed_resp]
+        removed_booking_ids: List[int] = resp.json()["deleted_booking_ids"]
 
-    return features
+    logger.debug(f"##### Bookings {removed_booking_ids} removed successfully")
+    return removed_booking_ids
 
 
 async def get_all_features_bookings_sum() -> Dict[str, int]:
@@ -284,19 +637,20 @@ async def get_all_features_bookings_sum() -> Dict[str, int]:
     having the same name but different configurations.
 
     The booking sum is the sum of all bookings for a license in all clusters.
+    It's computed by the backend only for the licenses configured in this cluster.
     """
-    # get all features
-    features = await get_all_features_from_backend()
-    all_product_features = [f"{feature.product.name}.{feature.name}" for feature in features]
+    backend_client = get_backend_client()
+    resp = await backend_client.get("/lm/features/bookings_sum", params={"cluster_features_only": True})
 
-    # sum bookings for each feature with the same name
-    bookings_sum = {
-        product_feature: sum(
-            feature.booked_total
-            for feature in features
-            if f"{feature.product.name}.{feature.name}" == product_feature
-        )
-        for product_feature in all_product_features
-    }
+    LicenseManagerBackendConnectionError.require_condition(
+        resp.status_code == 200, f"Failed to get bookings sum: {resp.text}"
+    )
+
+    with LicenseManagerParseError.handle_errors(
+        "Could not parse bookings sum returned from the backend", do_except=log_error
+    ):
+        bookings_sum = {
+            product_feature: int(booked_total) for product_feature, booked_total in resp.json().items()
+        }
 
     return bookings_sum
@@ -1,13 +1,13 @@
 import logging
 import sys
 from pathlib import Path
-from typing import Annotated, Optional
+from typing import Annotated, Dict, Optional
 
 from pydantic import AnyHttpUrl, confloat
 from pydantic_core import ValidationError
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
-from lm_agent.constants import LogLevelEnum
+from lm_agent.constants import DEFAULT_RECONCILE_LOCK_DIR, DEFAULT_RPC_SOCKET_PATH, LogLevelEnum
 
 DEFAULT_CACHE_DIR = Path.home() / Path(".cache/license-manager")
 DEFAULT_LOG_DIR = Path("/var/log/license-manager-agent")
@@ -47,6 +47,16 @@ class Settings(BaseSettings):
     # Base URL of the License Manager API
     BACKEND_BASE_URL: AnyHttpUrl = AnyHttpUrl(url="http://127.0.0.1:8000")
 
+    # Connection pool settings for the License Manager API client
+    # Max connections: max number of concurrent connections to the API
+    # Max keepalive connections: max number of idle connections kept open for reuse
+    # Keepalive expiry: seconds an idle connection is kept open
+    # HTTP2: use HTTP/2 to talk to the API (requires the `h2` package)
+    BACKEND_MAX_CONNECTIONS: int = 20
+    BACKEND_MAX_KEEPALIVE_CONNECTIONS: int = 10
+    BACKEND_KEEPALIVE_EXPIRY: float = 30.0  # seconds
+    BACKEND_HTTP2: bool = False
+
     # Location of the log directory
     LOG_BASE_DIR: Optional[Path] = DEFAULT_LOG_DIR
 
@@ -61,6 +71,10 @@ class Settings(BaseSettings):
     # Path to the binary for lmutil (needed for FlexLM licenses)
     LMUTIL_PATH: Path = DEFAULT_BIN_PATH / "lmutil"
 
+    # If set to `True`, FlexLM servers are queried once for all features (`lmstat -a`).
+    # Set to `False` to query each feature individually (`lmstat -f <feature>`).
+    FLEXLM_BATCH_QUERY: bool = True
+
     # Path to the binary for rlmutil (needed for RLM licenses)
     RLMUTIL_PATH: Path = DEFAULT_BIN_PATH / "rlmutil"
 
@@ -82,6 +96,13 @@ class Settings(BaseSettings):
     # License Manager user name to create reservations
     LM_USER: str = "license-manager"
 
+    # The reservation is only updated when its licenses change or when it expires within this margin
+    RESERVATION_RENEWAL_MARGIN: int = 300  # seconds
+
+    # The job index is rebuilt from all the jobs of the cluster at least this often, instead of only
+    # applying the changes since the last sync, so it can't drift from the backend indefinitely
+    JOB_INDEX_FULL_SYNC_INTERVAL: int = 3600  # seconds
+
     # Sentry specific settings
     SENTRY_DSN: Optional[str] = None
     SENTRY_TRACES_SAMPLE_RATE: Annotated[float, confloat(gt=0, le=1.0)] = 0.01
@@ -94,15 +115,71 @@ class Settings(BaseSettings):
     OIDC_CLIENT_SECRET: str
     OIDC_USE_HTTPS: bool = True
 
+    # The token is refreshed in the background when it's about to expire within this margin
+    TOKEN_REFRESH_MARGIN: int = 60  # seconds
+
     # If set to `True`, reconcile will be triggered by Prolog/Epilog. Set to `False` to disable this.
     USE_RECONCILE_IN_PROLOG_EPILOG: bool = True
 
+    # Concurrent reconciliations, from the agent or the Prolog/Epilog, are collapsed into a single one.
+    # A reconciliation requested within this window after another one finished reuses its result.
+    # Set to 0 to only reuse the reconciliation in flight.
+    RECONCILE_FRESHNESS_WINDOW: int = 5  # seconds
+
+    # Directory of the lock and the last result used to collapse the reconciliations.
+    # It must be the same for the agent and the Prolog/Epilog, even if they run as different users
+    # with different cache directories.
+    # When created by License Manager, the directory and its files are writable by the group,
+    # so the SlurmUser should share the group with the agent.
+    RECONCILE_LOCK_DIR: Path = Path(DEFAULT_RECONCILE_LOCK_DIR)
+
+    # If set to `True`, the agent serves the Prolog/Epilog requests on a local Unix socket,
+    # so they don't need to start the agent on their own. Set to `False` to disable this.
+    # The Prolog/Epilog read the socket path from the `LM_AGENT_RPC_SOCKET_PATH` environment variable,
+    # so it must be set in the Slurm environment too if the default path is changed.
+    USE_RPC_SERVER: bool = True
+    RPC_SOCKET_PATH: Path = Path(DEFAULT_RPC_SOCKET_PATH)
+
+    # Time the agent spends processing a Prolog/Epilog request before failing it. It must be lower than
+    # the time the Prolog/Epilog wait for the agent (`LM_AGENT_RPC_TIMEOUT` environment variable, 300 seconds
+    # by default), so the agent gives up and cleans up the job before the Prolog/Epilog fail on their own.
+    RPC_PROCESSING_TIMEOUT: int = 240  # seconds
+
+    # If set, the agent serves its Prometheus metrics over HTTP on this address and port.
+    # The `prometheus_client` package must be installed (`metrics` extra).
+    METRICS_PORT: Optional[int] = None
+    METRICS_ADDRESS: str = "127.0.0.1"
+
     # Stat interval used to report the cluster status to the API
     STAT_INTERVAL: int = 60
 
-    # Timeout for the license server binaries
+    # Timeout for the license server binaries and the Slurm commands
     TOOL_TIMEOUT: int = 6  # seconds
 
+    # Timeout for each tool, overriding `TOOL_TIMEOUT`.
+    # The tools are the license server types (flexlm, rlm, lmx, lsdyna, olicense, dsls) and slurm,
+    # e.g. LM_AGENT_TOOL_TIMEOUTS='{"flexlm": 10, "slurm": 30}'
+    TOOL_TIMEOUTS: Dict[str, float] = {}
+
+    # Max number of commands running at the same time, in total and for each tool
+    TOOL_MAX_CONCURRENCY: int = 16
+    TOOL_MAX_CONCURRENCY_PER_TOOL: int = 4
+
+    # If the license servers of a feature can't be queried, its last good report is used instead,
+    # as long as it's not older than this. Set to 0 to report the feature as unavailable (total 0)
+    # as soon as the query fails, which prevents jobs using the feature from running.
+    LICENSE_REPORT_MAX_STALENESS: int = 300  # seconds
+
+    # If set, the license report doesn't wait longer than this for the license servers of features
+    # with a report within `LICENSE_REPORT_MAX_STALENESS`. The last report is used and the query
+    # finishes in the background, updating the report for the next cycles. Set to 0 to always wait.
+    LICENSE_REPORT_REFRESH_DEADLINE: float = 0  # seconds
+
+    # License servers are queried in order, starting from the last one that answered.
+    # If set, the next license server is also queried when the current one didn't answer within this delay,
+    # and the first answer is used. Set to 0 to only query the next license server if the current one fails.
+    LICENSE_SERVER_HEDGE_DELAY: float = 0  # seconds
+
     # Encoding used for decoding the output of the license server binaries
     ENCODING: str = "utf-8"
 
@@ -27,3 +27,15 @@ class LicenseServerType(str, Enum):
 
 
 PRODUCT_FEATURE_RX = r"^.+?\..+$"
+
+# Default location of the socket used by the prolog and epilog to call the agent
+DEFAULT_RPC_SOCKET_PATH = "/var/run/license-manager-agent/agent.sock"
+
+# Default location of the lock shared by the agent and the prolog and epilog to collapse reconciliations
+DEFAULT_RECONCILE_LOCK_DIR = "/var/run/license-manager-agent"
+
+# Default time in seconds the prolog and epilog wait for the agent to process their request
+DEFAULT_RPC_TIMEOUT = 300
+
+# Name of the tool used to select the timeout and the concurrency limit of the Slurm commands
+SLURM_TOOL = "slurm"
@@ -4,11 +4,18 @@ import logging
 import sentry_sdk
 from sentry_sdk.integrations.logging import LoggingIntegration
 
-from lm_agent.backend_utils.utils import check_backend_health, report_cluster_status
+from lm_agent.backend_utils.utils import (
+    check_backend_health,
+    close_backend_client,
+    observe_backend_client_pool,
+    report_cluster_status,
+)
 from lm_agent.config import settings
 from lm_agent.logs import init_logging, logger
+from lm_agent.metrics import start_metrics_server
 from lm_agent.scheduler import scheduler
-from lm_agent.services.reconciliation import reconcile
+from lm_agent.services.reconciliation import shared_reconcile
+from lm_agent.workload_managers.slurm.rpc_server import start_rpc_server, stop_rpc_server
 
 if settings.SENTRY_DSN:
     sentry_sdk.init(
@@ -32,7 +39,8 @@ async def scheduled_tasks():
     """
     await check_backend_health()
     await report_cluster_status()
-    await reconcile()
+    await shared_reconcile()
+    observe_backend_client_pool()
 
 
 def main():
@@ -42,14 +50,25 @@ def main():
     init_logging("license-manager-agent")
     logger.info("Starting License Manager Agent")
 
+    start_metrics_server()
+
     scheduler.start()
     scheduler.add_job(scheduled_tasks)
 
+    loop = asyncio.get_event_loop()
+
+    rpc_server = None
+    if settings.USE_RPC_SERVER:
+        rpc_server = loop.run_until_complete(start_rpc_server())
+
     try:
-        asyncio.get_event_loop().run_forever()
+        loop.run_forever()
     except KeyboardInterrupt:
         logger.info("Stopping License Manager Agent")
         scheduler.stop()
+        if rpc_server is not None:
+            loop.run_until_complete(stop_rpc_server(rpc_server))
+        loop.run_until_complete(close_backend_client())
 
 
 if __name__ == "__main__":
@@ -0,0 +1,168 @@
+"""
+Optional Prometheus metrics of the agent.
+
+The metrics are collected if the ``prometheus_client`` package is installed (``metrics`` extra),
+and served over HTTP if ``METRICS_PORT`` is set. Otherwise, the metrics below do nothing.
+"""
+
+import contextlib
+import re
+import time
+import typing
+
+import httpx
+
+from lm_agent.config import settings
+from lm_agent.logs import logger
+
+try:
+    import prometheus_client
+except ImportError:
+    prometheus_client = None  # type: ignore[assignment]
+
+
+class _NoopMetric:
+    """
+    Stand-in for the metrics when ``prometheus_client`` isn't installed.
+    """
+
+    def labels(self, *args, **kwargs) -> "_NoopMetric":
+        return self
+
+    def observe(self, amount: float):
+        pass
+
+    def inc(self, amount: float = 1):
+        pass
+
+    def set(self, value: float):
+        pass
+
+    def clear(self):
+        pass
+
+    def time(self) -> contextlib.AbstractContextManager:
+        return contextlib.nullcontext()
+
+
+def _histogram(name: str, documentation: str, labelnames: typing.Sequence[str]) -> typing.Any:
+    if prometheus_client is None:
+        return _NoopMetric()
+    return prometheus_client.Histogram(name, documentation, labelnames)
+
+
+def _counter(name: str, documentation: str, labelnames: typing.Sequence[str]) -> typing.Any:
+    if prometheus_client is None:
+        return _NoopMetric()
+    return prometheus_client.Counter(name, documentation, labelnames)
+
+
+def _gauge(name: str, documentation: str, labelnames: typing.Sequence[str]) -> typing.Any:
+    if prometheus_client is None:
+        return _NoopMetric()
+    return prometheus_client.Gauge(name, documentation, labelnames)
+
+
+RECONCILE_PHASE_SECONDS = _histogram(
+    "license_manager_agent_reconcile_phase_seconds",
+    "Time spent in each phase of the reconciliation.",
+    ["phase"],
+)
+LICENSE_TOOL_SECONDS = _histogram(
+    "license_manager_agent_license_tool_seconds",
+    "Time spent running the license server binaries.",
+    ["server_type", "host", "outcome"],
+)
+BACKEND_REQUEST_SECONDS = _histogram(
+    "license_manager_agent_backend_request_seconds",
+    "Time until the response headers of each request to the License Manager API are received.",
+    ["method", "path", "status_code"],
+)
+PARSE_SECONDS = _histogram(
+    "license_manager_agent_parse_seconds",
+    "Time spent parsing the output of the license server binaries.",
+    ["parser"],
+)
+CLEANED_UP_TOTAL = _counter(
+    "license_manager_agent_cleaned_up_total",
+    "Jobs and bookings removed from the License Manager API by the clean up.",
+    ["reason"],
+)
+LICENSE_REPORT_ITEMS_TOTAL = _counter(
+    "license_manager_agent_license_report_items_total",
+    "Features reported from their license servers (reported), from their last good report (stale)"
+    " or as unavailable (failed).",
+    ["status"],
+)
+RESERVATIONS_TOTAL = _counter(
+    "license_manager_agent_reservations_total",
+    "Reservation changes applied to the cluster with scontrol (applied) or skipped because the reservation"
+    " didn't change (skipped).",
+    ["outcome"],
+)
+BACKEND_CONNECTIONS = _gauge(
+    "license_manager_agent_backend_connections",
+    "Connections in the pool of the backend client, by state (idle or active).",
+    ["state"],
+)
+RESERVATION_TOKENS = _gauge(
+    "license_manager_agent_reservation_tokens",
+    "Licenses reserved in the cluster for each feature.",
+    ["product_feature"],
+)
+
+_ID_IN_PATH_RX = re.compile(r"/\d+(?=/|$)")
+
+
+def _get_path_label(request: httpx.Request) -> str:
+    """Return the path of the request with the ids replaced, so each endpoint is a single label value."""
+    return _ID_IN_PATH_RX.sub("/{id}", request.url.path)
+
+
+async def start_backend_request_timer(request: httpx.Request):
+    """Event hook for the backend client to record when the request was sent."""
+    request.extensions["lm_agent_sent_at"] = time.perf_counter()
+
+
+async def observe_backend_request(response: httpx.Response):
+    """Event hook for the backend client to record the time the request took."""
+    sent_at = response.request.extensions.get("lm_agent_sent_at")
+    if sent_at is None:
+        return
+
+    BACKEND_REQUEST_SECONDS.labels(
+        method=response.request.method,
+        path=_get_path_label(response.request),
+        status_code=response.status_code,
+    ).observe(time.perf_counter() - sent_at)
+
+
+def get_parser_label(parser: typing.Callable) -> str:
+    """Return the label of the parser, e.g. ``flexlm.parse_features``."""
+    module_name = getattr(parser, "__module__", None) or ""
+    return f"{module_name.rsplit('.', 1)[-1]}.{getattr(parser, '__name__', type(parser).__name__)}"
+
+
+def start_metrics_server() -> bool:
+    """
+    Serve the metrics over HTTP on ``METRICS_ADDRESS``:``METRICS_PORT``, in a background thread.
+
+    Return whether the metrics are served.
+    """
+    if settings.METRICS_PORT is None:
+        return False
+
+    if prometheus_client is None:
+        logger.warning("Metrics are enabled but the prometheus_client package is not installed.")
+        return False
+
+    try:
+        prometheus_client.start_http_server(settings.METRICS_PORT, addr=settings.METRICS_ADDRESS)
+    except OSError as e:
+        logger.warning(
+            f"Couldn't serve the metrics on {settings.METRICS_ADDRESS}:{settings.METRICS_PORT}: {e}"
+        )
+        return False
+
+    logger.info(f"Serving metrics on {settings.METRICS_ADDRESS}:{settings.METRICS_PORT}")
+    return True
@@ -1,6 +1,6 @@
-from typing import List
+from typing import Dict, List, Literal, Tuple
 
-from pydantic import BaseModel, Field, PositiveInt
+from pydantic import BaseModel, ConfigDict, Field, PositiveInt
 
 from lm_agent.constants import PRODUCT_FEATURE_RX, LicenseServerType
 
@@ -27,6 +27,15 @@ class LicenseReportItem(BaseModel):
     uses: List[LicenseUsesItem] = []
 
 
+class CachedLicenseReportItem(BaseModel):
+    """
+    The last good report item of a feature, with the time it was reported.
+    """
+
+    item: LicenseReportItem
+    reported_at: float
+
+
 class ParsedFeatureItem(BaseModel):
     """
     A report of the parsed license server output.
@@ -155,3 +164,56 @@ class JobSchema(BaseModel):
     lead_host: str
 
     bookings: List[BookingSchema] = []
+
+
+class JobTombstoneSchema(BaseModel):
+    """
+    Represents a job deleted from the cluster.
+    """
+
+    job_id: int
+    slurm_job_id: str
+
+
+class JobChangesSchema(BaseModel):
+    """
+    Represents the changes of the jobs in the cluster since a given cursor.
+    """
+
+    cursor: int
+    jobs: List[JobSchema] = []
+    deleted_jobs: List[JobTombstoneSchema] = []
+
+
+class ClusterSnapshot(BaseModel):
+    """
+    Represents the state of the cluster collected once per reconciliation cycle.
+
+    The snapshot is shared by the license report, the jobs and bookings clean up
+    and the reservation calculation, so the backend and Slurm are queried only once.
+    """
+
+    model_config = ConfigDict(frozen=True)
+
+    configurations: Tuple[ConfigurationSchema, ...] = ()
+    jobs: Tuple[JobSchema, ...] = ()
+    cluster_product_features: Tuple[str, ...] = ()
+    cluster_license_values: Dict[str, Dict[str, int]] = {}
+    squeue_result: Tuple[Dict, ...] = ()
+
+
+class AgentRPCRequest(BaseModel):
+    """
+    Represents a request sent by the Prolog/Epilog to the agent through the local Unix socket.
+    """
+
+    command: Literal["prolog", "epilog"]
+    environment: Dict[str, str] = {}
+
+
+class AgentRPCResponse(BaseModel):
+    """
+    Represents the response sent by the agent to the Prolog/Epilog through the local Unix socket.
+    """
+
+    exit_status: int
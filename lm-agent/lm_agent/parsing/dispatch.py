@@ -0,0 +1,86 @@
+"""
+Line dispatch shared by the parsers of the license server outputs.
+
+The output is consumed line by line, either as a string or as chunks of text as they are read.
+Each line is classified with cheap string checks (a prefix and/or a keyword) before the line parser
+of its kind runs, so the regexes only run on the lines that can match them:
+
+    dispatcher = LineDispatcher(
+        LineRule("feature", parse_feature_line, prefix="Users of "),
+        LineRule("usage", parse_usage_line, keyword="), start "),
+    )
+    for kind, parsed in dispatcher.dispatch(server_output):
+        ...
+
+The rules are checked in order. If the line parser of a rule returns ``None``, the line is checked
+against the next rules, so a rule only needs to be more specific than the ones after it.
+Empty lines are skipped.
+"""
+
+from typing import Any, Callable, Iterable, Iterator, NamedTuple, Optional, Tuple, Union
+
+
+class LineRule(NamedTuple):
+    """
+    Kind of line in the output of a license server.
+
+    The line matches the rule if it starts with ``prefix``, contains ``keyword`` and ``parse_line``
+    doesn't return ``None`` for it. Without ``parse_line``, the line itself is the parsed value.
+    """
+
+    kind: str
+    parse_line: Optional[Callable[[str], Any]] = None
+    prefix: str = ""
+    keyword: str = ""
+
+
+def iter_lines(server_output: Union[str, Iterable[str]]) -> Iterator[str]:
+    """
+    Iterate over the lines of the output, without the line breaks.
+
+    The output can be the whole string or chunks of it, e.g. as they are read from the process.
+    Lines split among chunks are joined before they are yielded.
+    """
+    if isinstance(server_output, str):
+        yield from server_output.splitlines()
+        return
+
+    pending = ""
+    for chunk in server_output:
+        lines = (pending + chunk).splitlines(keepends=True)
+        # The last line may continue in the next chunk, and so may a "\r\n" line break
+        pending = lines.pop() if lines and lines[-1][-1] not in "\n" else ""
+        for line in lines:
+            yield line.splitlines()[0]
+
+    if pending:
+        yield from pending.splitlines()
+
+
+class LineDispatcher:
+    """
+    Classify the lines of an output with a list of rules, and parse them with the first rule they match.
+    """
+
+    def __init__(self, *rules: LineRule):
+        self.rules: Tuple[LineRule, ...] = rules
+
+    def dispatch(self, server_output: Union[str, Iterable[str]]) -> Iterator[Tuple[str, Any]]:
+        """
+        Yield the kind and the parsed value of each line matching one of the rules.
+        """
+        rules = self.rules
+        for line in iter_lines(server_output):
+            if not line:
+                continue
+
+            for kind, parse_line, prefix, keyword in rules:
+                if prefix and not line.startswith(prefix):
+                    continue
+                if keyword and keyword not in line:
+                    continue
+
+                parsed = line if parse_line is None else parse_line(line)
+                if parsed is not None:
+                    yield kind, parsed
+                    break
@@ -3,9 +3,11 @@ Parser for DSLS.
 """
 
 import csv
-from typing import Optional
+import itertools
+from typing import Iterable, Optional, Union
 
 from lm_agent.models import LicenseUsesItem, ParsedFeatureItem
+from lm_agent.parsing.dispatch import iter_lines
 
 
 def parse_feature_dict(feature_dict: dict[str, str]) -> Optional[ParsedFeatureItem]:
@@ -47,7 +49,7 @@ def parse_usage_dict(usage_dict: dict[str, str]) -> Optional[LicenseUsesItem]:
     )
 
 
-def parse(server_output: str) -> dict[str, ParsedFeatureItem]:
+def parse(server_output: Union[str, Iterable[str]]) -> dict[str, ParsedFeatureItem]:
     """
     Parse the output from the DSLS server.
     Data we need:
@@ -62,12 +64,16 @@ def parse(server_output: str) -> dict[str, ParsedFeatureItem]:
     parsed_data: dict = {}
 
     # Ignore the lines that contain information about the DSLS license server
-    if "Warning" in server_output:  # Remove warning line with the information lines
-        offset = 7
-    else:
-        offset = 6
+    lines = iter_lines(server_output)
+    for _ in itertools.islice(lines, 6):
+        pass
 
-    csv_data = csv.DictReader(server_output.splitlines()[offset:])
+    # Remove warning line with the information lines
+    next_line = next(lines, None)
+    if next_line is not None and "Warning" not in next_line:
+        lines = itertools.chain([next_line], lines)
+
+    csv_data = csv.DictReader(lines)
 
     for row in csv_data:
         parsed_feature = parse_feature_dict(row)
@@ -3,9 +3,10 @@ Parser for FlexLM.
 """
 
 import re
-from typing import Dict, Optional
+from typing import Dict, Iterable, Optional, Union
 
 from lm_agent.models import LicenseUsesItem
+from lm_agent.parsing.dispatch import LineDispatcher, LineRule
 
 HOSTWORD = r"[a-zA-Z0-9-]+"
 HOSTNAME = rf"{HOSTWORD}(\.{HOSTWORD})*"
@@ -42,7 +43,7 @@ USAGE_LINE_1 = (
     rf"(?P<date>{MMDD}) "
     rf"(?P<time>{HHMM}), "
     rf"(?P<tokens>{INT}) "
-    r"licenses$"
+    r"license(?:s)?$"
 )
 
 USAGE_LINE_2 = (
@@ -61,7 +62,7 @@ USAGE_LINE_2 = (
     rf"(?P<date>{MMDD}) "
     rf"(?P<time>{HHMM}), "
     rf"(?P<tokens>{INT}) "
-    r"licenses$"
+    r"license(?:s)?$"
 )
 
 
@@ -95,7 +96,7 @@ USAGE_LINE_4 = (
     rf"(?P<date>{MMDD}) "
     rf"(?P<time>{HHMM}), "
     rf"(?P<tokens>{INT}) "
-    r"licenses$"
+    r"license(?:s)?$"
 )
 
 USAGE_LINE_5 = (
@@ -114,7 +115,19 @@ USAGE_LINE_5 = (
     rf"(?P<time>{HHMM})$"
 )
 
+VENDOR_LINE = (
+    r"^\s*"
+    rf'"(?P<feature>{FEATURE_NAME})" '
+    rf"v(?P<version>{NONWS}), "
+    r"vendor: "
+    r"(?P<vendor>[^\s,]+)"
+)
+
+VENDOR_HEADER_LINE = r"^Users of features served by (?P<vendor>[^\s:]+):\s*$"
+
 RX_FEATURE = re.compile(FEATURE_LINE)
+RX_VENDOR = re.compile(VENDOR_LINE)
+RX_VENDOR_HEADER = re.compile(VENDOR_HEADER_LINE)
 RX_USAGE_LINE_1 = re.compile(USAGE_LINE_1)
 RX_USAGE_LINE_2 = re.compile(USAGE_LINE_2)
 RX_USAGE_LINE_3 = re.compile(USAGE_LINE_3)
@@ -143,6 +156,38 @@ def parse_feature_line(line: str) -> Optional[Dict]:
     }
 
 
+def parse_vendor_line(line: str) -> Optional[str]:
+    """
+    Parse the vendor line in the FlexLM output.
+    Data we need:
+    - ``vendor``: name of the vendor daemon serving the feature
+
+    Obs: this line is only present in the detailed output of ``lmstat``,
+    right after the feature line of the feature it refers to.
+    """
+    parsed_vendor = RX_VENDOR.match(line)
+    if parsed_vendor is None:
+        return None
+
+    return parsed_vendor.groupdict()["vendor"].lower()
+
+
+def parse_vendor_header_line(line: str) -> Optional[str]:
+    """
+    Parse the vendor header line in the FlexLM output.
+    Data we need:
+    - ``vendor``: name of the vendor daemon serving the features listed after it
+
+    Obs: this line is only present in the output for all features (``lmstat -a``),
+    before the feature lines of each vendor daemon.
+    """
+    parsed_vendor = RX_VENDOR_HEADER.match(line)
+    if parsed_vendor is None:
+        return None
+
+    return parsed_vendor.groupdict()["vendor"].lower()
+
+
 def parse_usage_line(line: str) -> Optional[LicenseUsesItem]:
     """
     Parse the usage line in the FlexLM output.
@@ -161,16 +206,32 @@ def parse_usage_line(line: str) -> Optional[LicenseUsesItem]:
     if parsed_data is None:
         return None
 
-    data = parsed_data.groupdict()
+    # Some formats don't include the number of licenses, which is then 1
+    has_tokens = "tokens" in parsed_data.re.groupindex
 
     return LicenseUsesItem(
-        username=data["user"].lower(),
-        lead_host=data["user_host"],
-        booked=int(data.get("tokens", 1)),
+        username=parsed_data["user"].lower(),
+        lead_host=parsed_data["user_host"],
+        booked=int(parsed_data["tokens"]) if has_tokens else 1,
     )
 
 
-def parse(server_output: str) -> Dict:
+VENDOR_HEADER_RULE = LineRule(
+    "vendor_header", parse_vendor_header_line, prefix="Users of features served by "
+)
+FEATURE_RULE = LineRule("feature", parse_feature_line, prefix="Users of ")
+# Feature lines without counters (e.g. uncounted licenses)
+UNCOUNTED_FEATURE_RULE = LineRule("uncounted_feature", prefix="Users of ")
+VENDOR_RULE = LineRule("vendor", parse_vendor_line, keyword=", vendor: ")
+USAGE_RULE = LineRule("usage", parse_usage_line, keyword="), start ")
+
+FEATURE_DISPATCHER = LineDispatcher(FEATURE_RULE, USAGE_RULE)
+FEATURES_DISPATCHER = LineDispatcher(
+    VENDOR_HEADER_RULE, FEATURE_RULE, UNCOUNTED_FEATURE_RULE, VENDOR_RULE, USAGE_RULE
+)
+
+
+def parse(server_output: Union[str, Iterable[str]]) -> Dict:
     """
     Parse the FlexLM Output, using regext to match the lines we need:
     - ``feature line``: info about the license
@@ -179,19 +240,65 @@ def parse(server_output: str) -> Dict:
     parsed_data: dict = {}
     uses = []
 
-    for line in server_output.splitlines():
-        parsed_feature = parse_feature_line(line)
+    for kind, parsed in FEATURE_DISPATCHER.dispatch(server_output):
+        if kind == "feature":
+            parsed_data = parsed
+        else:
+            uses.append(parsed)
 
-        if parsed_feature:
-            parsed_data = parsed_feature
-            continue
+    if parsed_data:
+        parsed_data["uses"] = uses
 
-        parsed_data_line = parse_usage_line(line)
+    return parsed_data
 
-        if parsed_data_line:
-            uses.append(parsed_data_line)
 
-    if parsed_data:
-        parsed_data["uses"] = uses
+def parse_features(server_output: Union[str, Iterable[str]]) -> Dict[str, Dict[str, Dict]]:
+    """
+    Parse the FlexLM output for all features in the server (``lmstat -a``).
+
+    The features of each vendor daemon are listed after a vendor header line, and each feature line
+    is followed by the vendor lines and the usage lines of that feature.
+    The usage lines don't include the feature name, so they belong to the last
+    feature line parsed before them.
+
+    Since the same feature name can be served by more than one vendor daemon,
+    the features are mapped by name and then by vendor daemon:
+
+        {"testfeature": {"vendor_a": {"total": 10, "used": 2, "uses": [...]}}}
+
+    The vendor daemon is taken from the vendor header line, so it's known even for the features
+    without usage lines, and otherwise from the vendor lines of the feature.
+    If the vendor daemon can't be found in the output, an empty string is used as the vendor name.
+    """
+    parsed_blocks: list = []
+    current_block: Optional[Dict] = None
+    current_vendor = ""
+
+    for kind, parsed in FEATURES_DISPATCHER.dispatch(server_output):
+        if kind == "vendor_header":
+            current_vendor = parsed
+            current_block = None
+        elif kind == "feature":
+            current_block = {**parsed, "vendor": current_vendor, "uses": []}
+            parsed_blocks.append(current_block)
+        elif kind == "uncounted_feature":
+            current_block = None
+        elif current_block is None:
+            continue
+        elif kind == "vendor":
+            if not current_block["vendor"]:
+                current_block["vendor"] = parsed
+        else:
+            current_block["uses"].append(parsed)
+
+    parsed_data: Dict[str, Dict[str, Dict]] = {}
+
+    for block in parsed_blocks:
+        vendor_items = parsed_data.setdefault(block["feature"], {})
+        vendor_items[block["vendor"]] = {
+            "total": block["total"],
+            "used": block["used"],
+            "uses": block["uses"],
+        }
 
     return parsed_data
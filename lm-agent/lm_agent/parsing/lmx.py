@@ -3,9 +3,10 @@ Parser for LM-X.
 """
 
 import re
-from typing import Optional
+from typing import Iterable, Optional, Union
 
 from lm_agent.models import LicenseUsesItem
+from lm_agent.parsing.dispatch import LineDispatcher, LineRule
 
 HOSTWORD = r"[a-zA-Z0-9-]+"
 HOSTNAME = rf"{HOSTWORD}(\.{HOSTWORD})*"
@@ -94,7 +95,14 @@ def parse_usage_line(line: str) -> Optional[LicenseUsesItem]:
     )
 
 
-def parse(server_output: str) -> dict:
+DISPATCHER = LineDispatcher(
+    LineRule("usage", parse_usage_line, keyword=" used by "),
+    LineRule("in_use", parse_in_use_line, keyword=" license(s) used"),
+    LineRule("feature", parse_feature_line, prefix="Feature: "),
+)
+
+
+def parse(server_output: Union[str, Iterable[str]]) -> dict:
     """
     Parse the LM-X output using regex to match the lines we need:
     -``feature line``: info about each license
@@ -108,26 +116,21 @@ def parse(server_output: str) -> dict:
     parsed_data: dict = {}
     feature_list: list = []
 
-    for line in server_output.splitlines():
-        parsed_feature = parse_feature_line(line)
-        parsed_in_use = parse_in_use_line(line)
-        parsed_usage = parse_usage_line(line)
-
-        if parsed_feature:
-            parsed_data[parsed_feature] = {}
-            feature_list.append(parsed_feature)
+    for kind, parsed in DISPATCHER.dispatch(server_output):
+        if kind == "feature":
+            parsed_data[parsed] = {}
+            feature_list.append(parsed)
 
-        elif parsed_in_use:
+        elif kind == "in_use":
             feature = feature_list[-1]
             parsed_data[feature] = {
-                "used": parsed_in_use["used"],
-                "total": parsed_in_use["total"],
+                "used": parsed["used"],
+                "total": parsed["total"],
                 "uses": [],
             }
-        elif parsed_usage:
-            feature = feature_list[-1]
-            parsed_data[feature]["uses"].append(parsed_usage)
+
         else:
-            continue
+            feature = feature_list[-1]
+            parsed_data[feature]["uses"].append(parsed)
 
     return parsed_data
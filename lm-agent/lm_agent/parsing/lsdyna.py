@@ -3,8 +3,10 @@ Parser for LS-Dyna.
 """
 
 import re
+from typing import Iterable, Union
 
 from lm_agent.models import LicenseUsesItem
+from lm_agent.parsing.dispatch import LineDispatcher, LineRule
 
 HOSTWORD = r"[a-zA-Z0-9-]+"
 HOSTNAME = rf"{HOSTWORD}(\.{HOSTWORD})*"
@@ -106,7 +108,14 @@ def parse_total_line(line: str):
     return int(total_data["used"])
 
 
-def parse(s: str):
+DISPATCHER = LineDispatcher(
+    LineRule("usage", parse_usage_line, keyword="@"),
+    LineRule("total", parse_total_line, keyword="LICENSE GROUP"),
+    LineRule("program", parse_program_line, keyword="|"),
+)
+
+
+def parse(s: Union[str, Iterable[str]]):
     """
     Parse the LS-Dyna output, using regex to match the lines we need:
     - ``program line``: info about each license
@@ -126,24 +135,20 @@ def parse(s: str):
     program_list: list = []
     group_used: int = 0
 
-    for line in s.splitlines():
-        parsed_program = parse_program_line(line)
-        parsed_usage = parse_usage_line(line)
-        parsed_total = parse_total_line(line)
-
-        if parsed_program:
-            parsed_data[parsed_program["program"]] = {
-                "total": int(parsed_program["total"]),
+    for kind, parsed in DISPATCHER.dispatch(s):
+        if kind == "program":
+            parsed_data[parsed["program"]] = {
+                "total": int(parsed["total"]),
                 "uses": [],
             }
-            program_list.append(parsed_program["program"])
+            program_list.append(parsed["program"])
 
-        elif parsed_usage:
+        elif kind == "usage":
             program = program_list[-1]
-            parsed_data[program]["uses"].append(parsed_usage)
+            parsed_data[program]["uses"].append(parsed)
 
-        elif parsed_total:
-            group_used = parsed_total
+        else:
+            group_used = parsed
             break
 
     for program in parsed_data.keys():
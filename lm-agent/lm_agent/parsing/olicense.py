@@ -3,9 +3,10 @@ Parser for OLicense.
 """
 
 import re
-from typing import Optional
+from typing import Iterable, Optional, Union
 
 from lm_agent.models import LicenseUsesItem
+from lm_agent.parsing.dispatch import LineDispatcher, LineRule
 
 HOSTWORD = r"[a-zA-Z0-9-]+"
 HOSTNAME = rf"{HOSTWORD}(\.{HOSTWORD})*"
@@ -96,7 +97,14 @@ def parse_usage_line(line: str) -> Optional[LicenseUsesItem]:
     )
 
 
-def parse(server_output: str) -> dict:
+DISPATCHER = LineDispatcher(
+    LineRule("usage", parse_usage_line, keyword="#"),
+    LineRule("in_use", parse_in_use_line, keyword="FloatsLockedBy"),
+    LineRule("feature", parse_feature_line, keyword=";"),
+)
+
+
+def parse(server_output: Union[str, Iterable[str]]) -> dict:
     """
     Parse the OLicense output using regex to match the lines we need:
     -``feature line``: info about each license
@@ -126,27 +134,22 @@ def parse(server_output: str) -> dict:
     parsed_data: dict = {}
     feature_list: list = []
 
-    for line in server_output.splitlines():
-        parsed_feature = parse_feature_line(line)
-        if parsed_feature:
-            feature = parsed_feature["feature"]
-            total = parsed_feature["total"]
-            if feature not in feature_list:
+    for kind, parsed in DISPATCHER.dispatch(server_output):
+        if kind == "feature":
+            feature = parsed["feature"]
+            total = parsed["total"]
+            if feature not in parsed_data:
                 feature_list.append(feature)
                 parsed_data[feature] = {"used": 0, "total": total, "uses": []}
             else:
                 parsed_data[feature]["total"] += total
-            continue
 
-        parsed_in_use = parse_in_use_line(line)
-        if parsed_in_use:
+        elif kind == "in_use":
             feature = feature_list[-1]
-            parsed_data[feature]["used"] += parsed_in_use
-            continue
+            parsed_data[feature]["used"] += parsed
 
-        parsed_usage = parse_usage_line(line)
-        if parsed_usage:
+        else:
             feature = feature_list[-1]
-            parsed_data[feature]["uses"].append(parsed_usage)
+            parsed_data[feature]["uses"].append(parsed)
 
     return parsed_data
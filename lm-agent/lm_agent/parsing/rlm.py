@@ -3,9 +3,10 @@ Parser for RLM.
 """
 
 import re
-from typing import Optional
+from typing import Iterable, Optional, Union
 
 from lm_agent.models import LicenseUsesItem
+from lm_agent.parsing.dispatch import LineDispatcher, LineRule
 
 INT = r"\d+"
 VERSION = rf"v{INT}\.{INT}"
@@ -81,7 +82,14 @@ def parse_usage_line(line: str) -> Optional[dict]:
     }
 
 
-def parse(server_output: str) -> dict:
+DISPATCHER = LineDispatcher(
+    LineRule("usage", parse_usage_line, keyword="@"),
+    LineRule("count", parse_count_line, keyword="count: "),
+    LineRule("feature", parse_feature_line, keyword=" v"),
+)
+
+
+def parse(server_output: Union[str, Iterable[str]]) -> dict:
     """
     Parse the output from the RLM server.
     Data we need:
@@ -92,31 +100,20 @@ def parse(server_output: str) -> dict:
     parsed_data: dict = {}
     feature_list: list = []
 
-    for line in server_output.splitlines():
-        feature = parse_feature_line(line)
-        if feature:
-            feature_list.append(feature)
-            parsed_data[feature] = {"uses": [], "total": []}
-            continue
+    for kind, parsed in DISPATCHER.dispatch(server_output):
+        if kind == "feature":
+            feature_list.append(parsed)
+            parsed_data[parsed] = {"uses": [], "total": []}
 
-        count = parse_count_line(line)
-        if count:
+        elif kind == "count":
             feature = feature_list[-1]
             parsed_data[feature] = {
-                "used": count["in_use"],
-                "total": count["count"],
+                "used": parsed["in_use"],
+                "total": parsed["count"],
                 "uses": [],
             }
-            continue
-
-        usage = parse_usage_line(line)
-        if usage:
-            feature = usage["license_feature"]
-            del usage["license_feature"]
-            parsed_data[feature]["uses"].append(usage["use"])
-            continue
 
         else:
-            continue
+            parsed_data[parsed["license_feature"]]["uses"].append(parsed["use"])
 
     return parsed_data
@@ -7,20 +7,32 @@ import typing
 from buzz import check_expressions
 
 from lm_agent.config import settings
-from lm_agent.exceptions import CommandFailedToExecute, LicenseManagerBadServerOutput
-from lm_agent.logs import logger
+from lm_agent.constants import LicenseServerType
+from lm_agent.exceptions import LicenseManagerBadServerOutput
 from lm_agent.models import LicenseReportItem, LicenseServerSchema
 from lm_agent.parsing import flexlm
-from lm_agent.server_interfaces.license_server_interface import LicenseServerInterface
+from lm_agent.server_interfaces.license_server_interface import (
+    FullReportLicenseServerInterface,
+    LicenseServerInterface,
+    ReportItemResult,
+)
 from lm_agent.utils import run_command
 
 
-class FlexLMLicenseServer(LicenseServerInterface):
-    """Extract license information from FlexLM license server."""
+class FlexLMLicenseServer(FullReportLicenseServerInterface):
+    """
+    Extract license information from FlexLM license server.
+
+    By default, the license server is queried once for all features (``lmstat -a``).
+    If ``FLEXLM_BATCH_QUERY`` is disabled, each feature is queried individually (``lmstat -f``).
+    """
+
+    server_type = LicenseServerType.FLEXLM
 
     def __init__(self, license_servers: typing.List[LicenseServerSchema]):
         self.license_servers = license_servers
         self.parser = flexlm.parse
+        self.batch_parser = flexlm.parse_features
 
     def get_commands_list(self) -> typing.List[typing.List[str]]:
         """Generate a list of commands with the available license server hosts."""
@@ -37,34 +49,56 @@ class FlexLMLicenseServer(LicenseServerInterface):
             commands_to_run.append(command_line)
         return commands_to_run
 
-    async def get_output_from_server(self, product_feature: str):
-        """Override abstract method to get output from FlexLM license server."""
+    def get_batch_commands_list(self) -> typing.List[typing.List[str]]:
+        """Generate a list of commands to query all features with the available license server hosts."""
+
+        commands_to_run = []
+        for license_server in self.license_servers:
+            command_line = [
+                f"{settings.LMUTIL_PATH}",
+                "lmstat",
+                "-c",
+                f"{license_server.port}@{license_server.host}",
+                "-a",
+            ]
+            commands_to_run.append(command_line)
+        return commands_to_run
+
+    async def _run_commands(self, commands_to_run: typing.List[typing.List[str]]) -> str:
+        """Run the command for each license server until one succeeds."""
+        return await self.query_license_servers(
+            commands_to_run, lambda cmd: run_command(cmd, tool=LicenseServerType.FLEXLM), "FlexLM"
+        )
+
+    async def get_output_from_server(self, product_feature: typing.Optional[str] = None):
+        """
+        Override abstract method to get output from FlexLM license server.
+
+        If no feature is indicated, the output includes all features in the license server.
+        """
+
+        if product_feature is None:
+            return await self._run_commands(self.get_batch_commands_list())
 
         # get the list of commands for each license server host
         commands_to_run = self.get_commands_list()
 
-        # run each command in the list, one at a time, until one succeds
+        (_, feature) = product_feature.split(".")
         for cmd in commands_to_run:
-            (_, feature) = product_feature.split(".")
             cmd.append(feature)
-            try:
-                output = await run_command(cmd)
-            except CommandFailedToExecute as e:
-                logger.debug(f"Command {cmd} failed to execute: {e}")
-                continue
 
-            # try the next server if the previous didn't return the expected data
-            if not output:
-                continue
-            return output
+        return await self._run_commands(commands_to_run)
 
-        raise RuntimeError("None of the checks for FlexLM succeeded!")
+    async def get_parsed_output(self) -> dict:
+        """Override method to parse the output for all features from FlexLM license server."""
+        server_output = await self.get_output_from_server()
+        return self.parse_output(self.batch_parser, server_output)
 
     async def get_report_item(self, feature_id: int, product_feature: str):
         """Override abstract method to parse FlexLM license server output into License Report Item."""
 
         server_output = await self.get_output_from_server(product_feature)
-        parsed_output = self.parser(server_output)
+        parsed_output = self.parse_output(self.parser, server_output)
 
         # raise exception if parser didn't output license information
         with check_expressions(
@@ -84,3 +118,46 @@ class FlexLMLicenseServer(LicenseServerInterface):
         )
 
         return report_item
+
+    def build_report_item(self, parsed_output: dict, feature_id: int, product_feature: str):
+        """
+        Override abstract method to build the License Report Item from the parsed FlexLM output.
+
+        If the feature is served by more than one vendor daemon, the product name is used
+        to find the vendor daemon serving the feature.
+        """
+        (product, feature) = product_feature.split(".")
+
+        vendor_items = LicenseManagerBadServerOutput.enforce_defined(
+            parsed_output.get(feature.lower()),
+            "Invalid data returned from parser.",
+        )
+
+        if len(vendor_items) == 1:
+            current_feature_item = next(iter(vendor_items.values()))
+        else:
+            current_feature_item = LicenseManagerBadServerOutput.enforce_defined(
+                vendor_items.get(product.lower()),
+                (
+                    f"Feature {feature} is served by multiple vendor daemons ({', '.join(vendor_items)}), "
+                    "use the vendor daemon name as the product name to select one of them."
+                ),
+            )
+
+        report_item = LicenseReportItem(
+            feature_id=feature_id,
+            product_feature=product_feature,
+            used=current_feature_item["used"],
+            total=current_feature_item["total"],
+            uses=current_feature_item["uses"],
+        )
+
+        return report_item
+
+    async def get_report_items(
+        self, features_to_check: typing.List[typing.Tuple[int, str]]
+    ) -> typing.List[ReportItemResult]:
+        """Override method to query each feature individually if the batch query is disabled."""
+        if not settings.FLEXLM_BATCH_QUERY:
+            return await LicenseServerInterface.get_report_items(self, features_to_check)
+        return await super().get_report_items(features_to_check)
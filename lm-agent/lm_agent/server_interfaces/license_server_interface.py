@@ -1,5 +1,21 @@
 """Module for license server interface abstract base class."""
 
+import asyncio
+import time
+import typing
+
+from lm_agent.config import settings
+from lm_agent.constants import LicenseServerType
+from lm_agent.exceptions import CommandFailedToExecute
+from lm_agent.logs import logger
+from lm_agent.metrics import LICENSE_TOOL_SECONDS, PARSE_SECONDS, get_parser_label
+from lm_agent.models import LicenseReportItem, LicenseServerSchema
+
+ReportItemResult = typing.Union[LicenseReportItem, BaseException]
+
+# Position of the license server that answered last, for each list of license servers
+_last_healthy_servers: typing.Dict[typing.Tuple[typing.Tuple[str, int], ...], int] = {}
+
 
 class LicenseServerInterface:
     """
@@ -28,6 +44,145 @@ class LicenseServerInterface:
             or NotImplemented
         )
 
+    server_type: LicenseServerType
+    license_servers: typing.List[LicenseServerSchema]
+
+    def _get_servers_key(self) -> typing.Tuple[typing.Tuple[str, int], ...]:
+        """Identify the list of license servers of the configuration."""
+        return tuple((license_server.host, license_server.port) for license_server in self.license_servers)
+
+    async def query_license_servers(
+        self,
+        commands_to_run: typing.List[typing.Any],
+        run: typing.Callable[[typing.Any], typing.Awaitable[str]],
+        server_name: str,
+    ) -> str:
+        """
+        Run the command for each license server until one of them answers, and return its output.
+
+        The commands must be in the same order as the license servers. The license server that answered
+        last is tried first, so a server that is down doesn't delay every query until it times out.
+
+        If ``LICENSE_SERVER_HEDGE_DELAY`` is set, the command for the next license server is started
+        if the current one didn't answer within the delay, and the first answer is used.
+        """
+        servers_key = self._get_servers_key()
+        first = _last_healthy_servers.get(servers_key, 0) % max(len(commands_to_run), 1)
+        order = [*range(first, len(commands_to_run)), *range(first)]
+
+        def run_server(index: int) -> typing.Awaitable[str]:
+            host = self.license_servers[index].host if index < len(self.license_servers) else "unknown"
+            return self._observe_license_tool(run(commands_to_run[index]), host)
+
+        if settings.LICENSE_SERVER_HEDGE_DELAY > 0:
+            result = await self._run_hedged(commands_to_run, order, run_server)
+        else:
+            result = await self._run_sequentially(commands_to_run, order, run_server)
+
+        if result is None:
+            raise RuntimeError(f"None of the checks for {server_name} succeeded!")
+
+        index, output = result
+        if index != first:
+            logger.debug(f"Command {commands_to_run[index]} succeeded, its server will be tried first")
+        _last_healthy_servers[servers_key] = index
+        return output
+
+    async def _observe_license_tool(self, output_awaitable: typing.Awaitable[str], host: str) -> str:
+        """Record the time the license server binary took to answer, and whether it succeeded."""
+        outcome = "failure"
+        started_at = time.perf_counter()
+        try:
+            output = await output_awaitable
+            outcome = "success" if output else "empty"
+            return output
+        except asyncio.CancelledError:
+            outcome = "cancelled"
+            raise
+        finally:
+            LICENSE_TOOL_SECONDS.labels(
+                server_type=self.server_type.value, host=host, outcome=outcome
+            ).observe(time.perf_counter() - started_at)
+
+    @staticmethod
+    def parse_output(parser: typing.Callable[[str], dict], server_output: str) -> dict:
+        """Parse the output of the license server binary, recording the time the parser took."""
+        with PARSE_SECONDS.labels(parser=get_parser_label(parser)).time():
+            return parser(server_output)
+
+    @staticmethod
+    async def _run_sequentially(
+        commands_to_run: typing.List[typing.Any],
+        order: typing.List[int],
+        run_server: typing.Callable[[int], typing.Awaitable[str]],
+    ) -> typing.Optional[typing.Tuple[int, str]]:
+        """Run the command of each license server in order, one at a time, until one succeeds."""
+        for index in order:
+            try:
+                output = await run_server(index)
+            except CommandFailedToExecute as e:
+                logger.debug(f"Command {commands_to_run[index]} failed to execute: {e}")
+                continue
+
+            # try the next server if the previous didn't return the expected data
+            if not output:
+                continue
+            return index, output
+
+        return None
+
+    @staticmethod
+    async def _run_hedged(
+        commands_to_run: typing.List[typing.Any],
+        order: typing.List[int],
+        run_server: typing.Callable[[int], typing.Awaitable[str]],
+    ) -> typing.Optional[typing.Tuple[int, str]]:
+        """
+        Run the command of each license server in order, starting the next one when the previous ones
+        are slow or fail.
+
+        The commands still running once one of them succeeds are cancelled.
+        """
+        remaining = list(order)
+        running: typing.Dict[asyncio.Future, int] = {}
+
+        def start_next():
+            index = remaining.pop(0)
+            running[asyncio.ensure_future(run_server(index))] = index
+
+        try:
+            while remaining or running:
+                if not running:
+                    start_next()
+
+                done, _ = await asyncio.wait(
+                    running,
+                    timeout=settings.LICENSE_SERVER_HEDGE_DELAY if remaining else None,
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+
+                if not done:
+                    start_next()
+                    continue
+
+                for task in done:
+                    index = running.pop(task)
+                    try:
+                        output = task.result()
+                    except CommandFailedToExecute as e:
+                        logger.debug(f"Command {commands_to_run[index]} failed to execute: {e}")
+                        continue
+
+                    # try the next server if the previous didn't return the expected data
+                    if output:
+                        return index, output
+        finally:
+            for task in running:
+                task.cancel()
+            await asyncio.gather(*running, return_exceptions=True)
+
+        return None
+
     def get_output_from_server(self, product_feature: str):
         """Return output from license server for the indicated features."""
         raise NotImplementedError("get_output_from_server not implemented")
@@ -35,3 +190,71 @@ class LicenseServerInterface:
     def get_report_item(self, feature_id: int, product_feature: str):
         """Parse license server output into a report item for the indicated feature."""
         raise NotImplementedError("get_report_item not implemented")
+
+    async def get_report_items(
+        self, features_to_check: typing.List[typing.Tuple[int, str]]
+    ) -> typing.List[ReportItemResult]:
+        """
+        Return a report item for each (feature_id, product_feature) pair, in the same order.
+
+        By default, each feature is queried individually. If the report for a feature fails,
+        the exception is returned in its place instead of being raised.
+        """
+        return await asyncio.gather(
+            *[
+                self.get_report_item(feature_id, product_feature)
+                for feature_id, product_feature in features_to_check
+            ],
+            return_exceptions=True,
+        )
+
+
+class FullReportLicenseServerInterface(LicenseServerInterface):
+    """
+    Base class for license servers whose output includes every feature in the server.
+
+    The output is requested and parsed only once in ``get_report_items``, and the report item
+    for each feature is extracted from the parsed output in the ``build_report_item`` method.
+    """
+
+    parser: typing.Callable[[str], dict]
+
+    def get_output_from_server(self):
+        """Return output from license server for all features."""
+        raise NotImplementedError("get_output_from_server not implemented")
+
+    def build_report_item(self, parsed_output: dict, feature_id: int, product_feature: str):
+        """Extract the report item for the indicated feature from the parsed license server output."""
+        raise NotImplementedError("build_report_item not implemented")
+
+    async def get_parsed_output(self) -> dict:
+        """Get the output from the license server and parse it."""
+        server_output = await self.get_output_from_server()
+        return self.parse_output(self.parser, server_output)
+
+    async def get_report_item(self, feature_id: int, product_feature: str) -> LicenseReportItem:
+        """Parse license server output into a report item for the indicated feature."""
+        parsed_output = await self.get_parsed_output()
+        return self.build_report_item(parsed_output, feature_id, product_feature)
+
+    async def get_report_items(
+        self, features_to_check: typing.List[typing.Tuple[int, str]]
+    ) -> typing.List[ReportItemResult]:
+        """
+        Query the license server once and build the report items for all indicated features.
+
+        If the license server can't be queried, the exception is returned for every feature.
+        """
+        try:
+            parsed_output = await self.get_parsed_output()
+        except Exception as e:
+            return [e for _ in features_to_check]
+
+        report_items: typing.List[ReportItemResult] = []
+        for feature_id, product_feature in features_to_check:
+            try:
+                report_items.append(self.build_report_item(parsed_output, feature_id, product_feature))
+            except Exception as e:
+                report_items.append(e)
+
+        return report_items
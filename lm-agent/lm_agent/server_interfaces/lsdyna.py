@@ -5,17 +5,19 @@ LS-Dyna license server interface.
 import typing
 
 from lm_agent.config import settings
-from lm_agent.exceptions import CommandFailedToExecute, LicenseManagerBadServerOutput
-from lm_agent.logs import logger
+from lm_agent.constants import LicenseServerType
+from lm_agent.exceptions import LicenseManagerBadServerOutput
 from lm_agent.models import LicenseReportItem, LicenseServerSchema
 from lm_agent.parsing import lsdyna
-from lm_agent.server_interfaces.license_server_interface import LicenseServerInterface
+from lm_agent.server_interfaces.license_server_interface import FullReportLicenseServerInterface
 from lm_agent.utils import run_command
 
 
-class LSDynaLicenseServer(LicenseServerInterface):
+class LSDynaLicenseServer(FullReportLicenseServerInterface):
     """Extract license information from LS-Dyna license server."""
 
+    server_type = LicenseServerType.LSDYNA
+
     def __init__(self, license_servers: typing.List[LicenseServerSchema]):
         """Initialize the license server instance with the license server host and parser."""
         self.license_servers = license_servers
@@ -41,26 +43,12 @@ class LSDynaLicenseServer(LicenseServerInterface):
         # get the list of commands for each license server host
         commands_to_run = self.get_commands_list()
 
-        # run each command in the list, one at a time, until one succeds
-        for cmd in commands_to_run:
-            try:
-                output = await run_command(cmd)
-            except CommandFailedToExecute as e:
-                logger.debug(f"Command {cmd} failed to execute: {e}")
-                continue
-
-            # try the next server if the previous didn't return the expected data
-            if not output:
-                continue
-            return output
-
-        raise RuntimeError("None of the checks for LS-Dyna succeeded!")
-
-    async def get_report_item(self, feature_id: int, product_feature: str):
-        """Override abstract method to parse LS-Dyna license server output into License Report Item."""
+        return await self.query_license_servers(
+            commands_to_run, lambda cmd: run_command(cmd, tool=LicenseServerType.LSDYNA), "LS-Dyna"
+        )
 
-        server_output = await self.get_output_from_server()
-        parsed_output = self.parser(server_output)
+    def build_report_item(self, parsed_output: dict, feature_id: int, product_feature: str):
+        """Override abstract method to build the License Report Item from the parsed LS-Dyna output."""
 
         (_, feature) = product_feature.split(".")
 
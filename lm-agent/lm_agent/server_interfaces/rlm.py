@@ -5,17 +5,19 @@ RLM license server interface.
 import typing
 
 from lm_agent.config import settings
-from lm_agent.exceptions import CommandFailedToExecute, LicenseManagerBadServerOutput
-from lm_agent.logs import logger
+from lm_agent.constants import LicenseServerType
+from lm_agent.exceptions import LicenseManagerBadServerOutput
 from lm_agent.models import LicenseReportItem, LicenseServerSchema
 from lm_agent.parsing import rlm
-from lm_agent.server_interfaces.license_server_interface import LicenseServerInterface
+from lm_agent.server_interfaces.license_server_interface import FullReportLicenseServerInterface
 from lm_agent.utils import run_command
 
 
-class RLMLicenseServer(LicenseServerInterface):
+class RLMLicenseServer(FullReportLicenseServerInterface):
     """Extract license information from RLM license server."""
 
+    server_type = LicenseServerType.RLM
+
     def __init__(self, license_servers: typing.List[LicenseServerSchema]):
         self.license_servers = license_servers
         self.parser = rlm.parse
@@ -42,26 +44,12 @@ class RLMLicenseServer(LicenseServerInterface):
         # get the list of commands for each license server host
         commands_to_run = self.get_commands_list()
 
-        # run each command in the list, one at a time, until one succeds
-        for cmd in commands_to_run:
-            try:
-                output = await run_command(cmd)
-            except CommandFailedToExecute as e:
-                logger.debug(f"Command {cmd} failed to execute: {e}")
-                continue
-
-            # try the next server if the previous didn't return the expected data
-            if not output:
-                continue
-            return output
-
-        raise RuntimeError("None of the checks for RLM succeeded!")
-
-    async def get_report_item(self, feature_id: int, product_feature: str):
-        """Override abstract method to parse RLM license server output into License Report Item."""
+        return await self.query_license_servers(
+            commands_to_run, lambda cmd: run_command(cmd, tool=LicenseServerType.RLM), "RLM"
+        )
 
-        server_output = await self.get_output_from_server()
-        parsed_output = self.parser(server_output)
+    def build_report_item(self, parsed_output: dict, feature_id: int, product_feature: str):
+        """Override abstract method to build the License Report Item from the parsed RLM output."""
 
         (_, feature) = product_feature.split(".")
 
@@ -2,15 +2,15 @@
 Service to clean jobs and bookings that are no longer needed.
 """
 
-import asyncio
 from collections import defaultdict
 from typing import Dict, List, Tuple
 
 from lm_agent.backend_utils.utils import (
-    remove_booking,
-    remove_job_by_slurm_job_id,
+    remove_bookings,
+    remove_jobs_by_slurm_job_ids,
 )
 from lm_agent.logs import logger
+from lm_agent.metrics import CLEANED_UP_TOTAL
 from lm_agent.models import (
     BookingSchema,
     ConfigurationSchema,
@@ -137,7 +137,8 @@ async def clean_jobs_without_bookings(cluster_jobs: List[JobSchema]) -> List[Job
         logger.debug("##### No jobs without bookings to clean")
         return cluster_jobs
 
-    await asyncio.gather(*[remove_job_by_slurm_job_id(job_id) for job_id in jobs_to_delete])
+    await remove_jobs_by_slurm_job_ids(jobs_to_delete)
+    CLEANED_UP_TOTAL.labels(reason="jobs_without_bookings").inc(len(jobs_to_delete))
 
     logger.debug(f"##### Jobs cleaned: {jobs_to_delete}")
     logger.debug("##### Cleaned jobs without bookings")
@@ -167,7 +168,8 @@ async def clean_jobs_no_longer_running(
         logger.debug("##### No need to clean jobs that are no longer running")
         return cluster_jobs
 
-    await asyncio.gather(*[remove_job_by_slurm_job_id(job_id) for job_id in jobs_to_delete])
+    await remove_jobs_by_slurm_job_ids(jobs_to_delete)
+    CLEANED_UP_TOTAL.labels(reason="jobs_no_longer_running").inc(len(jobs_to_delete))
 
     logger.debug(f"##### Jobs cleaned: {jobs_to_delete}")
     logger.debug("##### Cleaned jobs that are no longer running")
@@ -203,7 +205,8 @@ async def clean_jobs_by_grace_time(
         logger.debug("##### No jobs to clean by grace time")
         return cluster_jobs
 
-    await asyncio.gather(*[remove_job_by_slurm_job_id(job_id) for job_id in jobs_to_delete])
+    await remove_jobs_by_slurm_job_ids(jobs_to_delete)
+    CLEANED_UP_TOTAL.labels(reason="jobs_by_grace_time").inc(len(jobs_to_delete))
 
     logger.debug(f"##### Jobs cleaned: {jobs_to_delete}")
     logger.debug("##### Cleaned jobs by grace time")
@@ -252,7 +255,8 @@ async def clean_bookings_by_usage(cluster_jobs: List[JobSchema], license_report:
         logger.debug("##### No bookings to clean by matching")
         return
 
-    await asyncio.gather(*[remove_booking(booking_id) for booking_id in bookings_to_delete])
+    await remove_bookings(bookings_to_delete)
+    CLEANED_UP_TOTAL.labels(reason="bookings_by_usage").inc(len(bookings_to_delete))
     logger.debug(f"##### Bookings cleaned: {bookings_to_delete}")
     logger.debug("##### Cleaned bookings by matching")
 
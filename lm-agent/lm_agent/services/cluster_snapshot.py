@@ -0,0 +1,62 @@
+"""
+Collect the state of the cluster used by a reconciliation cycle.
+"""
+
+import asyncio
+from typing import List, Tuple
+
+from lm_agent.backend_utils.utils import get_cluster_configs_from_backend, get_cluster_jobs_from_backend
+from lm_agent.logs import logger
+from lm_agent.models import ClusterSnapshot, JobSchema
+from lm_agent.workload_managers.slurm.cmd_utils import (
+    parse_all_features_cluster_values,
+    parse_all_product_features_from_cluster,
+    return_formatted_squeue_out,
+    scontrol_show_lic,
+    squeue_parser,
+)
+
+
+async def get_jobs_then_queue() -> Tuple[List[JobSchema], str]:
+    """
+    Request the jobs from the backend, and then the jobs in the queue from Slurm.
+
+    The order matters: the bookings of the jobs that are no longer in the queue are deleted,
+    so a job booked after the queue was read would be seen as not running if the jobs were
+    read afterwards.
+    """
+    jobs = await get_cluster_jobs_from_backend()
+    squeue_output = await return_formatted_squeue_out()
+    return jobs, squeue_output
+
+
+async def get_cluster_snapshot() -> ClusterSnapshot:
+    """
+    Build the snapshot of the cluster for the current reconciliation cycle.
+
+    The configurations and jobs are requested from the backend, and the license
+    counters and jobs in the queue are requested from Slurm, only once.
+    The configurations and the license counters are requested concurrently with the jobs,
+    which are always requested before the queue.
+    """
+    logger.debug("#### Collecting cluster snapshot ####")
+
+    configurations, show_lic_output, (jobs, squeue_output) = await asyncio.gather(
+        get_cluster_configs_from_backend(),
+        scontrol_show_lic(),
+        get_jobs_then_queue(),
+    )
+
+    cluster_snapshot = ClusterSnapshot(
+        configurations=tuple(configurations),
+        jobs=tuple(jobs),
+        cluster_product_features=tuple(parse_all_product_features_from_cluster(show_lic_output)),
+        cluster_license_values=parse_all_features_cluster_values(show_lic_output),
+        squeue_result=tuple(squeue_parser(squeue_output)),
+    )
+
+    logger.debug(
+        f"#### Cluster snapshot collected: {len(cluster_snapshot.configurations)} configurations, "
+        f"{len(cluster_snapshot.jobs)} jobs, {len(cluster_snapshot.squeue_result)} jobs in the queue ####"
+    )
+    return cluster_snapshot
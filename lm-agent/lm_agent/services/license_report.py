@@ -3,20 +3,121 @@ Invoke license stat tools to build a view of license token counts.
 """
 
 import asyncio
+import os
+import time
 import typing
 
+from pydantic import TypeAdapter
+
 from lm_agent.backend_utils.utils import get_cluster_configs_from_backend, make_feature_update
+from lm_agent.config import settings
 from lm_agent.exceptions import LicenseManagerEmptyReportError, LicenseManagerNonSupportedServerTypeError
 from lm_agent.logs import logger
-from lm_agent.models import ConfigurationSchema, LicenseReportItem
+from lm_agent.metrics import LICENSE_REPORT_ITEMS_TOTAL
+from lm_agent.models import (
+    CachedLicenseReportItem,
+    ClusterSnapshot,
+    ConfigurationSchema,
+    LicenseReportItem,
+    LicenseServerSchema,
+)
 from lm_agent.server_interfaces.dsls import DSLSLicenseServer
 from lm_agent.server_interfaces.flexlm import FlexLMLicenseServer
+from lm_agent.server_interfaces.license_server_interface import LicenseServerInterface, ReportItemResult
 from lm_agent.server_interfaces.lmx import LMXLicenseServer
 from lm_agent.server_interfaces.lsdyna import LSDynaLicenseServer
 from lm_agent.server_interfaces.olicense import OLicenseLicenseServer
 from lm_agent.server_interfaces.rlm import RLMLicenseServer
 from lm_agent.workload_managers.slurm.cmd_utils import get_all_product_features_from_cluster
 
+FeatureInfo = typing.Tuple[int, str]
+ServerGroupKey = typing.Tuple[str, typing.Tuple[typing.Tuple[str, int], ...]]
+
+SERVER_TYPE_MAP = dict(
+    flexlm=FlexLMLicenseServer,
+    rlm=RLMLicenseServer,
+    lsdyna=LSDynaLicenseServer,
+    lmx=LMXLicenseServer,
+    olicense=OLicenseLicenseServer,
+    dsls=DSLSLicenseServer,
+)
+
+
+LICENSE_REPORT_CACHE_FILE_NAME = "license-report.json"
+
+
+class LicenseReportCache:
+    """
+    Last good report item of each feature, kept in memory and in the cache directory.
+
+    The cache file is read the first time the cache is used, so the last reports survive a restart
+    of the agent and are available to the Prolog/Epilog when they run on their own.
+    """
+
+    items: typing.Dict[str, CachedLicenseReportItem]
+    _loaded: bool
+    _adapter = TypeAdapter(typing.Dict[str, CachedLicenseReportItem])
+
+    def __init__(self):
+        self.items = {}
+        self._loaded = False
+
+    def _load(self):
+        """Read the cached report items from the cache directory, if they weren't read yet."""
+        if self._loaded:
+            return
+        self._loaded = True
+
+        try:
+            cached_items = self._adapter.validate_json(
+                (settings.CACHE_DIR / LICENSE_REPORT_CACHE_FILE_NAME).read_bytes()
+            )
+        except (OSError, ValueError):
+            return
+        self.items = {**cached_items, **self.items}
+
+    def _save(self):
+        """Replace the cached report items in the cache directory, if it exists."""
+        cache_path = settings.CACHE_DIR / LICENSE_REPORT_CACHE_FILE_NAME
+        if not settings.CACHE_DIR.exists():
+            return
+
+        try:
+            tmp_path = cache_path.with_suffix(f".{os.getpid()}.tmp")
+            tmp_path.write_bytes(self._adapter.dump_json(self.items))
+            tmp_path.replace(cache_path)
+        except OSError as err:
+            logger.warning(f"Couldn't save the license report to {cache_path}: {err}")
+
+    def store(self, report_items: typing.List[LicenseReportItem]):
+        """Record the report items as the last good report of their features."""
+        if not report_items:
+            return
+
+        self._load()
+        reported_at = time.time()
+        for report_item in report_items:
+            self.items[report_item.product_feature] = CachedLicenseReportItem(
+                item=report_item, reported_at=reported_at
+            )
+        self._save()
+
+    def get(self, product_feature: str) -> typing.Optional[CachedLicenseReportItem]:
+        """Return the last good report of the feature if it's within ``LICENSE_REPORT_MAX_STALENESS``."""
+        self._load()
+        cached_item = self.items.get(product_feature)
+        if cached_item is None:
+            return None
+        if time.time() - cached_item.reported_at > settings.LICENSE_REPORT_MAX_STALENESS:
+            return None
+        return cached_item
+
+
+license_report_cache = LicenseReportCache()
+
+# Queries of the license servers in flight, so a slow query left in the background isn't started again
+_refresh_tasks: typing.Dict[typing.Tuple[ServerGroupKey, typing.Tuple[FeatureInfo, ...]], asyncio.Task] = {}
+
 
 def get_local_license_configurations(
     license_configurations: typing.List[ConfigurationSchema], local_licenses: typing.List[str]
@@ -36,26 +137,112 @@ def get_local_license_configurations(
     return filtered_entries
 
 
-async def report() -> typing.List[LicenseReportItem]:
+def group_features_by_license_server(
+    license_configurations: typing.List[ConfigurationSchema],
+) -> typing.Dict[ServerGroupKey, typing.Tuple[typing.List[LicenseServerSchema], typing.List[FeatureInfo]]]:
+    """
+    Group the features of the configurations by license server type and license server set.
+
+    Configurations pointing to the same license servers share one group, so the license
+    servers are queried once for all of their features.
+    """
+    server_groups: typing.Dict[
+        ServerGroupKey, typing.Tuple[typing.List[LicenseServerSchema], typing.List[FeatureInfo]]
+    ] = {}
+
+    for entry in license_configurations:
+        server_group_key = (
+            entry.type,
+            tuple((license_server.host, license_server.port) for license_server in entry.license_servers),
+        )
+        _, features_to_check = server_groups.setdefault(server_group_key, (entry.license_servers, []))
+
+        for feature in entry.features:
+            features_to_check.append((feature.id, f"{feature.product.name}.{feature.name}"))
+
+    return server_groups
+
+
+async def _refresh_report_items(
+    license_server_interface: LicenseServerInterface, features_to_check: typing.List[FeatureInfo]
+) -> typing.List[ReportItemResult]:
+    """
+    Query the license servers for the features and record the successful report items in the cache.
+    """
+    results = await license_server_interface.get_report_items(features_to_check)
+    license_report_cache.store([result for result in results if isinstance(result, LicenseReportItem)])
+    return results
+
+
+def _start_refresh(
+    server_group_key: ServerGroupKey,
+    license_server_interface: LicenseServerInterface,
+    features_to_check: typing.List[FeatureInfo],
+) -> asyncio.Task:
+    """
+    Start querying the license servers of the group, unless a query for the same features is still running.
+    """
+    refresh_key = (server_group_key, tuple(features_to_check))
+    refresh_task = _refresh_tasks.get(refresh_key)
+    if refresh_task is not None and refresh_task.get_loop() is asyncio.get_running_loop():
+        return refresh_task
+
+    refresh_task = asyncio.ensure_future(_refresh_report_items(license_server_interface, features_to_check))
+    _refresh_tasks[refresh_key] = refresh_task
+
+    def _forget_refresh(task: asyncio.Task):
+        if _refresh_tasks.get(refresh_key) is task:
+            del _refresh_tasks[refresh_key]
+
+    refresh_task.add_done_callback(_forget_refresh)
+    return refresh_task
+
+
+async def _wait_for_refresh(
+    refresh_task: asyncio.Task, features_to_check: typing.List[FeatureInfo]
+) -> typing.List[ReportItemResult]:
+    """
+    Wait for the query of the license servers, up to ``LICENSE_REPORT_REFRESH_DEADLINE`` if every feature
+    has a recent enough report in the cache.
+
+    If the deadline passes, the query keeps running in the background and the features are reported
+    as failed, so their cached report is used.
+    """
+    deadline = settings.LICENSE_REPORT_REFRESH_DEADLINE
+    if deadline > 0 and all(license_report_cache.get(feature) for _, feature in features_to_check):
+        done, _ = await asyncio.wait([refresh_task], timeout=deadline)
+        if not done:
+            slow_query_error = TimeoutError(f"The license servers didn't answer within {deadline} seconds")
+            return [slow_query_error] * len(features_to_check)
+
+    return await asyncio.shield(refresh_task)
+
+
+async def report(cluster_snapshot: typing.Optional[ClusterSnapshot] = None) -> typing.List[LicenseReportItem]:
     """
     Get stat counts using a license stat tool.
 
-    This function iterates over the available license_servers and associated
-    features configured via LICENSE_SERVER_FEATURES and generates
-    a report by requesting license information from the license_server_type.
+    This function groups the features configured in the cluster by license server
+    and generates a report by requesting license information from each group of
+    license servers only once.
 
     The return from the license server is used to reconcile license-manager's
     view of what features are available with what actually exists in the
     license server database.
+
+    If the cluster snapshot of the current reconciliation cycle is provided,
+    its configurations and licenses are used instead of querying them again.
     """
     report_items = []
-    get_report_awaitables = []
-    product_features_awaited = []
 
     # Get cluster configuration
-    license_configurations = await get_cluster_configs_from_backend()
+    if cluster_snapshot is not None:
+        license_configurations = list(cluster_snapshot.configurations)
+        local_licenses = list(cluster_snapshot.cluster_product_features)
+    else:
+        license_configurations = await get_cluster_configs_from_backend()
+        local_licenses = await get_all_product_features_from_cluster()
 
-    local_licenses = await get_all_product_features_from_cluster()
     filtered_entries = get_local_license_configurations(license_configurations, local_licenses)
 
     logger.debug("#### Getting reconciliation report ####")
@@ -64,48 +251,51 @@ async def report() -> typing.List[LicenseReportItem]:
     logger.debug("### Licenses in the cluster: ")
     logger.debug(filtered_entries)
 
-    server_type_map = dict(
-        flexlm=FlexLMLicenseServer,
-        rlm=RLMLicenseServer,
-        lsdyna=LSDynaLicenseServer,
-        lmx=LMXLicenseServer,
-        olicense=OLicenseLicenseServer,
-        dsls=DSLSLicenseServer,
-    )
-
-    for entry in filtered_entries:
-        product_features_to_check = []
-        for feature in entry.features:
-            feature_info = (feature.id, f"{feature.product.name}.{feature.name}")
-            product_features_to_check.append(feature_info)
+    # Group the features by license server, so each license server is queried only once
+    server_groups = group_features_by_license_server(filtered_entries)
+
+    get_report_awaitables = []
+    product_features_awaited = []
 
+    for server_group_key, (license_servers, product_features_to_check) in server_groups.items():
+        server_type_name, _ = server_group_key
         logger.debug("### Features to check: ")
         logger.debug(product_features_to_check)
 
-        server_type = server_type_map.get(entry.type)
+        server_type = SERVER_TYPE_MAP.get(server_type_name)
 
         if server_type is None:
             raise LicenseManagerNonSupportedServerTypeError("License server type not supported.")
 
-        license_server_interface = server_type(entry.license_servers)
+        license_server_interface = server_type(license_servers)
 
-        for feature_info_to_check in product_features_to_check:
-            feature_id, product_feature = feature_info_to_check
+        refresh_task = _start_refresh(server_group_key, license_server_interface, product_features_to_check)
+        get_report_awaitables.append(_wait_for_refresh(refresh_task, product_features_to_check))
+        product_features_awaited.extend(product_features_to_check)
 
-            get_report_awaitables.append(
-                license_server_interface.get_report_item(feature_id, product_feature)
-            )
-            product_features_awaited.append(feature_info_to_check)
-
-    results: list[BaseException | LicenseReportItem] = await asyncio.gather(
-        *get_report_awaitables, return_exceptions=True
-    )
+    grouped_results: typing.List[typing.List[ReportItemResult]] = await asyncio.gather(*get_report_awaitables)
+    results = [result for group_results in grouped_results for result in group_results]
 
     for result, feature_info in zip(results, product_features_awaited, strict=True):
         feature_id, product_feature = feature_info
 
-        if isinstance(result, Exception):
-            # If the report for a feature failed, the total will set to 0, preventing jobs from running
+        if isinstance(result, BaseException):
+            # If the report for a feature failed, its last good report is used if it's recent enough
+            cached_item = license_report_cache.get(product_feature)
+            if cached_item is not None:
+                LICENSE_REPORT_ITEMS_TOTAL.labels(status="stale").inc()
+                logger.warning(
+                    f"#### Report for feature {product_feature} failed with: {str(result)}, "
+                    f"using the report from {time.time() - cached_item.reported_at:.0f} seconds ago ####"
+                )
+                # The usage lines are dropped: they could match bookings made after the report was taken
+                report_items.append(
+                    cached_item.item.model_copy(update={"feature_id": feature_id, "uses": []})
+                )
+                continue
+
+            # Otherwise, the total will set to 0, preventing jobs from running
+            LICENSE_REPORT_ITEMS_TOTAL.labels(status="failed").inc()
             logger.error(f"#### Report for feature {product_feature} failed with: {str(result)} ####")
 
             failed_report_item = LicenseReportItem(
@@ -117,7 +307,8 @@ async def report() -> typing.List[LicenseReportItem]:
             )
             report_items.append(failed_report_item)
             continue
-        assert isinstance(result, LicenseReportItem)
+
+        LICENSE_REPORT_ITEMS_TOTAL.labels(status="reported").inc()
         report_items.append(result)
 
     logger.debug("#### Reconciliation items:")
@@ -126,9 +317,11 @@ async def report() -> typing.List[LicenseReportItem]:
     return report_items
 
 
-async def update_features() -> typing.List[LicenseReportItem]:
+async def update_features(
+    cluster_snapshot: typing.Optional[ClusterSnapshot] = None,
+) -> typing.List[LicenseReportItem]:
     """Send the license data collected from the cluster to the backend."""
-    license_report = await report()
+    license_report = await report(cluster_snapshot)
 
     if not license_report:
         logger.critical(
@@ -2,56 +2,44 @@
 Reconciliation functionality live here.
 """
 
-from lm_agent.backend_utils.utils import (
-    get_all_features_bookings_sum,
-    get_cluster_configs_from_backend,
-    get_cluster_jobs_from_backend,
-)
+import asyncio
+import contextlib
+import fcntl
+import json
+import os
+import time
+from typing import IO, AsyncIterator, Dict, List, Optional
+
+from lm_agent.backend_utils.utils import get_all_features_bookings_sum
+from lm_agent.config import settings
 from lm_agent.logs import logger
+from lm_agent.metrics import RECONCILE_PHASE_SECONDS, RESERVATION_TOKENS
+from lm_agent.models import ClusterSnapshot, LicenseReportItem
 from lm_agent.services.clean_jobs_and_bookings import clean_jobs_and_bookings
+from lm_agent.services.cluster_snapshot import get_cluster_snapshot
 from lm_agent.services.license_report import update_features
-from lm_agent.workload_managers.slurm.cmd_utils import (
-    get_all_features_cluster_values,
-    return_formatted_squeue_out,
-    squeue_parser,
-)
 from lm_agent.workload_managers.slurm.reservations import (
     create_or_update_reservation,
-    scontrol_delete_reservation,
-    scontrol_show_reservation,
+    delete_reservation_if_exists,
 )
 
 
-async def reconcile():
-    """Generate the report and reconcile the license feature token usage."""
-    logger.debug("Starting reconciliation")
-
-    # Generate report and update the backend
-    logger.debug("Reconciling licenses in the backend")
-    license_usage_info = await update_features()
-    logger.debug("Backend licenses reconciliated")
-
-    # Get cluster data
-    configurations = await get_cluster_configs_from_backend()
-
-    # Get cluster jobs
-    jobs = await get_cluster_jobs_from_backend()
-
-    # Get feature bookings sum
-    all_features_bookings_sum = await get_all_features_bookings_sum()
+def get_reservation_data(
+    license_usage_info: List[LicenseReportItem],
+    cluster_snapshot: ClusterSnapshot,
+    all_features_bookings_sum: Dict[str, int],
+) -> List[str]:
+    """
+    Calculate how many licenses should be reserved for each license.
 
-    # Get license usage from the cluster
-    all_features_cluster_value = await get_all_features_cluster_values()
-
-    # Get squeue result from cluster
-    squeue_output = squeue_parser(await return_formatted_squeue_out())
-
-    # Clean jobs and bookings
-    await clean_jobs_and_bookings(configurations, jobs, squeue_output, license_usage_info)
+    Returns the list of licenses to reserve in the format <product>.<feature>@<server_type>:<amount>.
+    """
+    configurations = cluster_snapshot.configurations
+    all_features_cluster_value = cluster_snapshot.cluster_license_values
 
     reservation_data = []
+    RESERVATION_TOKENS.clear()
 
-    # Calculate how many licenses should be reserved for each license
     for license_data in license_usage_info:
         # Get license usage from license report
         product_feature = license_data.product_feature
@@ -96,20 +84,168 @@ async def reconcile():
         if reservation_amount > slurm_total:
             reservation_amount = slurm_total
 
+        RESERVATION_TOKENS.labels(product_feature=product_feature).set(reservation_amount)
         if reservation_amount:
             reservation_data.append(f"{product_feature}@{license_server_type}:{reservation_amount}")
 
-    if reservation_data:
-        logger.debug(f"Reservation data: {reservation_data}")
+    return reservation_data
 
-        # Create the reservation or update the existing one
-        await create_or_update_reservation(",".join(reservation_data))
-    else:
-        logger.debug("No reservation needed")
 
-        existing_reservation = await scontrol_show_reservation()
-        if existing_reservation:
-            logger.debug("Deleting existing reservation")
-            await scontrol_delete_reservation()
+async def reconcile():
+    """Generate the report and reconcile the license feature token usage."""
+    logger.debug("Starting reconciliation")
+
+    with RECONCILE_PHASE_SECONDS.labels(phase="total").time():
+        # Get the cluster data from the backend and Slurm once for the whole cycle
+        with RECONCILE_PHASE_SECONDS.labels(phase="cluster_snapshot").time():
+            cluster_snapshot = await get_cluster_snapshot()
+
+        # Generate report and update the backend
+        logger.debug("Reconciling licenses in the backend")
+        with RECONCILE_PHASE_SECONDS.labels(phase="license_report").time():
+            license_usage_info = await update_features(cluster_snapshot)
+        logger.debug("Backend licenses reconciliated")
+
+        # Get feature bookings sum
+        with RECONCILE_PHASE_SECONDS.labels(phase="bookings_sum").time():
+            all_features_bookings_sum = await get_all_features_bookings_sum()
+
+        # Clean jobs and bookings
+        with RECONCILE_PHASE_SECONDS.labels(phase="clean_up").time():
+            await clean_jobs_and_bookings(
+                list(cluster_snapshot.configurations),
+                list(cluster_snapshot.jobs),
+                list(cluster_snapshot.squeue_result),
+                license_usage_info,
+            )
+
+        # Calculate how many licenses should be reserved for each license
+        reservation_data = get_reservation_data(
+            license_usage_info, cluster_snapshot, all_features_bookings_sum
+        )
+
+        with RECONCILE_PHASE_SECONDS.labels(phase="reservation").time():
+            if reservation_data:
+                logger.debug(f"Reservation data: {reservation_data}")
+
+                # Create the reservation or update the existing one
+                await create_or_update_reservation(",".join(reservation_data))
+            else:
+                logger.debug("No reservation needed")
+                await delete_reservation_if_exists()
 
     logger.debug("Reconciliation done")
+
+
+RECONCILE_LOCK_FILE_NAME = "reconcile.lock"
+RECONCILE_RESULT_FILE_NAME = "reconcile.json"
+RECONCILE_LOCK_POLL_INTERVAL = 0.1  # seconds
+RECONCILE_LOCK_DIR_MODE = 0o2770
+RECONCILE_LOCK_FILE_MODE = 0o660
+
+
+def _open_reconcile_lock_file() -> IO:
+    """
+    Open the lock shared by every process that reconciles in this host, creating it if needed.
+
+    The agent and the Prolog/Epilog may run as different users, so the directory and the files
+    created here are writable by the group. The directory keeps its group for the files created in it.
+    A directory that already exists is left as it is.
+    """
+    lock_dir = settings.RECONCILE_LOCK_DIR
+    try:
+        lock_dir.mkdir(parents=True)
+        os.chmod(lock_dir, RECONCILE_LOCK_DIR_MODE)
+    except FileExistsError:
+        pass
+
+    lock_fd = os.open(lock_dir / RECONCILE_LOCK_FILE_NAME, os.O_RDWR | os.O_CREAT, RECONCILE_LOCK_FILE_MODE)
+    try:
+        if os.fstat(lock_fd).st_uid == os.getuid():
+            os.fchmod(lock_fd, RECONCILE_LOCK_FILE_MODE)
+        return os.fdopen(lock_fd, "r+")
+    except BaseException:
+        os.close(lock_fd)
+        raise
+
+
+@contextlib.asynccontextmanager
+async def _reconcile_lock(lock_file: IO) -> AsyncIterator[None]:
+    """
+    Hold the lock shared by every process that reconciles in this host.
+
+    The lock is polled instead of blocking, so the event loop is free while waiting for it.
+    """
+    while True:
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            break
+        except BlockingIOError:
+            await asyncio.sleep(RECONCILE_LOCK_POLL_INTERVAL)
+
+    try:
+        yield
+    finally:
+        fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _read_last_reconcile_time() -> Optional[float]:
+    """
+    Return when the last successful reconciliation finished, or None if it's unknown.
+    """
+    try:
+        result = json.loads((settings.RECONCILE_LOCK_DIR / RECONCILE_RESULT_FILE_NAME).read_text())
+        return float(result["finished_at"])
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+def _write_last_reconcile_time(finished_at: float):
+    """
+    Record when the last successful reconciliation finished, replacing the previous record atomically.
+    """
+    result_path = settings.RECONCILE_LOCK_DIR / RECONCILE_RESULT_FILE_NAME
+    tmp_path = result_path.with_suffix(f".{os.getpid()}.tmp")
+    try:
+        tmp_path.write_text(json.dumps({"finished_at": finished_at}))
+        os.chmod(tmp_path, RECONCILE_LOCK_FILE_MODE)
+        tmp_path.replace(result_path)
+    except OSError as err:
+        logger.warning(f"Couldn't save the reconciliation result to {result_path}: {err}")
+
+
+async def shared_reconcile():
+    """
+    Reconcile, unless another reconciliation can be reused.
+
+    Concurrent calls, even from different processes such as the Prolog/Epilog, are collapsed into a
+    single reconciliation: they wait for the one in flight and reuse it. A call arriving within
+    ``RECONCILE_FRESHNESS_WINDOW`` seconds after a successful reconciliation reuses it too.
+
+    If the lock in ``RECONCILE_LOCK_DIR`` can't be opened, the reconciliation can't be shared,
+    so it always runs.
+    """
+    try:
+        lock_file = _open_reconcile_lock_file()
+    except OSError as err:
+        logger.warning(
+            f"Couldn't open the reconciliation lock in {settings.RECONCILE_LOCK_DIR}: {err}. "
+            "Reconciliation won't be shared."
+        )
+        await reconcile()
+        return
+
+    requested_at = time.time()
+
+    with lock_file:
+        async with _reconcile_lock(lock_file):
+            last_reconcile_time = _read_last_reconcile_time()
+            if last_reconcile_time is not None and (
+                last_reconcile_time >= requested_at
+                or time.time() - last_reconcile_time <= settings.RECONCILE_FRESHNESS_WINDOW
+            ):
+                logger.debug("Reusing the last reconciliation")
+                return
+
+            await reconcile()
+            _write_last_reconcile_time(time.time())
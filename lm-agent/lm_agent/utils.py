@@ -3,55 +3,131 @@ Provide utilities to be used by interfaces.
 """
 
 import asyncio
+import contextlib
+import os
 import shlex
-from typing import List, Optional
+import signal
+from typing import AsyncIterator, Dict, List, Optional
 
 from lm_agent.config import settings
 from lm_agent.exceptions import CommandFailedToExecute
 from lm_agent.logs import logger
 
 
-async def run_command(command_line_parts: List[str], stdin_str: Optional[str] = "") -> str:
+class _ConcurrencyLimits:
     """
-    Run a command using a subprocess shell.
+    Limit how many commands run at the same time, in total and for each tool.
+
+    The semaphores are bound to the event loop running the commands, so they are created again if it changes.
+    """
+
+    def __init__(self):
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._global_semaphore = asyncio.Semaphore(settings.TOOL_MAX_CONCURRENCY)
+        self._tool_semaphores: Dict[str, asyncio.Semaphore] = {}
+
+    @contextlib.asynccontextmanager
+    async def acquire(self, tool: Optional[str]) -> AsyncIterator[None]:
+        """
+        Wait for a slot for the tool, and then for a slot in total.
+
+        The tool slot is acquired first, so a tool at its limit doesn't hold slots needed by other tools.
+        """
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._loop = loop
+            self._global_semaphore = asyncio.Semaphore(settings.TOOL_MAX_CONCURRENCY)
+            self._tool_semaphores = {}
+
+        async with contextlib.AsyncExitStack() as stack:
+            if tool is not None:
+                tool_semaphore = self._tool_semaphores.setdefault(
+                    tool, asyncio.Semaphore(settings.TOOL_MAX_CONCURRENCY_PER_TOOL)
+                )
+                await stack.enter_async_context(tool_semaphore)
+            await stack.enter_async_context(self._global_semaphore)
+            yield
+
+
+_concurrency_limits = _ConcurrencyLimits()
+
+
+def get_tool_timeout(tool: Optional[str]) -> float:
+    """
+    Return the timeout for the tool, falling back to ``TOOL_TIMEOUT``.
+    """
+    if tool is None:
+        return settings.TOOL_TIMEOUT
+    return settings.TOOL_TIMEOUTS.get(tool, settings.TOOL_TIMEOUT)
+
+
+async def _kill_process(proc: asyncio.subprocess.Process):
+    """
+    Kill the process with any child it started, and reap it so it doesn't linger as a zombie.
+    """
+    try:
+        os.killpg(proc.pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+    await proc.wait()
+
+
+async def run_command(
+    command_line_parts: List[str], stdin_str: Optional[str] = "", tool: Optional[str] = None
+) -> str:
+    """
+    Run a command in a subprocess, without a shell.
 
     The command is passed as a list of strings, where each string is a part of the command.
     You can also provide a string to be passed as stdin to the process.
 
+    The ``tool`` identifies the kind of command (a license server type or ``slurm``). It selects
+    the timeout from ``TOOL_TIMEOUTS`` and the concurrency limit the command is subject to.
+    Commands waiting for a slot don't count towards the timeout.
+
     Returns the output as string if the command succeeds.
     Raises CommandFailedToExecute exception if return code is not zero.
     """
 
     command_line = shlex.join(command_line_parts)
     stdin_bytes = stdin_str.encode(settings.ENCODING) if stdin_str else None
+    timeout = get_tool_timeout(tool)
 
-    proc = await asyncio.create_subprocess_shell(
-        command_line,
-        stdin=asyncio.subprocess.PIPE if stdin_bytes else None,
-        stdout=asyncio.subprocess.PIPE,
-        stderr=asyncio.subprocess.STDOUT,
-    )
-
-    try:
-        stdout, _ = await asyncio.wait_for(proc.communicate(stdin_bytes), settings.TOOL_TIMEOUT)
-        output = str(stdout, encoding=settings.ENCODING, errors="replace")
-
-        if proc.returncode != 0:
-            error_message = shlex.join(
-                [
-                    f"Command {command_line} failed!",
-                    f"Error: {output}",
-                    f"Return code: {proc.returncode}",
-                ]
+    async with _concurrency_limits.acquire(tool):
+        try:
+            proc = await asyncio.create_subprocess_exec(
+                *command_line_parts,
+                stdin=asyncio.subprocess.PIPE if stdin_bytes else None,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.STDOUT,
+                start_new_session=True,
             )
-            logger.error(error_message)
+        except OSError as e:
+            logger.error(f"Command {command_line} could not be started: {e}")
+            raise CommandFailedToExecute(f"The command failed to execute: {e}") from e
+
+        try:
+            stdout, _ = await asyncio.wait_for(proc.communicate(stdin_bytes), timeout)
+        except asyncio.TimeoutError as e:
+            logger.error(f"Command {command_line} timed out after {timeout} seconds.")
             raise CommandFailedToExecute(
-                f"The command failed to execute, with return code {proc.returncode}."
-            )
-    except asyncio.TimeoutError as e:
-        logger.error(f"Command {command_line} timed out after {settings.TOOL_TIMEOUT} seconds.")
-        raise CommandFailedToExecute(
-            f"The command failed to execute, timed out after {settings.TOOL_TIMEOUT} seconds."
-        ) from e
+                f"The command failed to execute, timed out after {timeout} seconds."
+            ) from e
+        finally:
+            if proc.returncode is None:
+                await _kill_process(proc)
+
+    output = str(stdout, encoding=settings.ENCODING, errors="replace")
+
+    if proc.returncode != 0:
+        error_message = shlex.join(
+            [
+                f"Command {command_line} failed!",
+                f"Error: {output}",
+                f"Return code: {proc.returncode}",
+            ]
+        )
+        logger.error(error_message)
+        raise CommandFailedToExecute(f"The command failed to execute, with return code {proc.returncode}.")
 
     return output
@@ -6,6 +6,7 @@ import re
 from typing import Dict, List, Optional, Union
 
 from lm_agent.config import settings
+from lm_agent.constants import SLURM_TOOL
 from lm_agent.exceptions import ScontrolRetrievalFailure, SqueueParserUnexpectedInputError
 from lm_agent.logs import log_error, logger
 from lm_agent.models import LicenseBooking
@@ -64,7 +65,7 @@ def get_required_licenses_for_job(job_licenses: str) -> List:
     return required_licenses
 
 
-async def get_all_features_cluster_values() -> Optional[Dict[str, Dict[str, int]]]:
+def parse_all_features_cluster_values(scontrol_output: str) -> Dict[str, Dict[str, int]]:
     """
     Parse the output from `scontrol show lic` and return a dictionary of
     product_feature: {"total": <total>, "used": <used>}.
@@ -80,8 +81,6 @@ async def get_all_features_cluster_values() -> Optional[Dict[str, Dict[str, int]
         r"^\s*Total=(?P<total>\d+) Used=(?P<used>\d+) Free=(?P<free>\d+) Reserved=(?P<reserved>\d+) Remote=(?P<remote>\w+)"  # noqa E501
     )
 
-    scontrol_output = await scontrol_show_lic()
-
     parsed_data: dict = {}
     product_feature_list: list = []
 
@@ -103,6 +102,15 @@ async def get_all_features_cluster_values() -> Optional[Dict[str, Dict[str, int]
     return parsed_data
 
 
+async def get_all_features_cluster_values() -> Optional[Dict[str, Dict[str, int]]]:
+    """
+    Get the total and used values for each product_feature from `scontrol show lic`.
+    """
+    scontrol_output = await scontrol_show_lic()
+
+    return parse_all_features_cluster_values(scontrol_output)
+
+
 async def scontrol_show_lic():
     """
     Get the license usage from scontrol.
@@ -113,7 +121,7 @@ async def scontrol_show_lic():
         "show",
         "lic",
     ]
-    output = await run_command(cmd)
+    output = await run_command(cmd, tool=SLURM_TOOL)
 
     logger.debug("##### scontrol show lic #####")
     return output
@@ -132,7 +140,7 @@ async def get_lead_host(nodelist):
         "hostnames",
         nodelist,
     ]
-    output = await run_command(cmd)
+    output = await run_command(cmd, tool=SLURM_TOOL)
 
     lead_host = output.split("\n")[0]
     ScontrolRetrievalFailure.require_condition(lead_host != "", "Could not get lead host from nodelist")
@@ -140,12 +148,10 @@ async def get_lead_host(nodelist):
     return lead_host
 
 
-async def get_all_product_features_from_cluster() -> List[str]:
+def parse_all_product_features_from_cluster(show_lic_output: str) -> List[str]:
     """
-    Returns a list of all product.feature in the cluster.
+    Parse the output from `scontrol show lic` and return a list of all product.feature in the cluster.
     """
-    show_lic_output = await scontrol_show_lic()
-
     PRODUCT_FEATURE = r"LicenseName=(?P<product>[a-zA-Z0-9-_]+).(?P<feature>[a-zA-Z0-9-_]+)"
     RX_PRODUCT_FEATURE = re.compile(PRODUCT_FEATURE)
 
@@ -162,6 +168,15 @@ async def get_all_product_features_from_cluster() -> List[str]:
     return parsed_features
 
 
+async def get_all_product_features_from_cluster() -> List[str]:
+    """
+    Returns a list of all product.feature in the cluster.
+    """
+    show_lic_output = await scontrol_show_lic()
+
+    return parse_all_product_features_from_cluster(show_lic_output)
+
+
 async def return_formatted_squeue_out() -> str:
     """
     Call squeue via Popen and return the formatted output.
@@ -174,7 +189,7 @@ async def return_formatted_squeue_out() -> str:
         "--format='%A|%M|%T'",
     ]
 
-    return await run_command(cmd)
+    return await run_command(cmd, tool=SLURM_TOOL)
 
 
 def _total_time_in_seconds(time_string: str) -> int:
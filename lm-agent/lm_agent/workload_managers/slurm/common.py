@@ -3,23 +3,30 @@ Common utilities for slurm commands.
 """
 
 import os
+from typing import Mapping, Optional
 
 from lm_agent.logs import logger
 from lm_agent.workload_managers.slurm.cmd_utils import get_lead_host
 
 
-async def get_job_context():
+async def get_job_context(environment: Optional[Mapping[str, str]] = None):
     """
     Get and return variables from the job environment.
+
+    The environment of the current process is used unless another one is provided,
+    such as the environment of the prolog or epilog that called the agent.
     """
+    if environment is None:
+        environment = os.environ
+
     ctxt = dict()
     try:
         ctxt = {
-            "cluster_name": os.environ["SLURM_CLUSTER_NAME"],
-            "job_id": os.environ["SLURM_JOB_ID"],
-            "lead_host": await get_lead_host(os.environ["SLURM_JOB_NODELIST"]),
-            "user_name": os.environ["SLURM_JOB_USER"],
-            "job_licenses": os.environ.get("SLURM_JOB_LICENSES", ""),
+            "cluster_name": environment["SLURM_CLUSTER_NAME"],
+            "job_id": environment["SLURM_JOB_ID"],
+            "lead_host": await get_lead_host(environment["SLURM_JOB_NODELIST"]),
+            "user_name": environment["SLURM_JOB_USER"],
+            "job_licenses": environment.get("SLURM_JOB_LICENSES", ""),
         }
 
     except KeyError as e:
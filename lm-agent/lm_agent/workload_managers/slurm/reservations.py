@@ -2,13 +2,22 @@
 Slurm reservation CRUD module.
 """
 
-from typing import Union
+import json
+import os
+import time
+from typing import Any, Dict, Optional, Union
 
 from lm_agent.config import settings
+from lm_agent.constants import SLURM_TOOL
 from lm_agent.exceptions import CommandFailedToExecute, LicenseManagerReservationFailure
 from lm_agent.logs import logger
+from lm_agent.metrics import RESERVATIONS_TOTAL
 from lm_agent.utils import run_command
 
+RESERVATION_DURATION = "30:00"
+RESERVATION_DURATION_SECONDS = 30 * 60
+RESERVATION_STATE_FILE_NAME = "reservation.json"
+
 
 async def scontrol_create_reservation(licenses: str, duration: str) -> bool:
     """
@@ -33,7 +42,7 @@ async def scontrol_create_reservation(licenses: str, duration: str) -> bool:
 
     logger.debug(f"#### Creating reservation for {licenses} with duration {duration} ####")
     try:
-        await run_command(cmd)
+        await run_command(cmd, tool=SLURM_TOOL)
     except CommandFailedToExecute:
         logger.error(f"#### Failed to create reservation {settings.RESERVATION_IDENTIFIER} ####")
         return False
@@ -57,7 +66,7 @@ async def scontrol_show_reservation() -> Union[str, bool]:
 
     logger.debug(f"#### Getting reservation {settings.RESERVATION_IDENTIFIER} ####")
     try:
-        reservation_output = await run_command(cmd)
+        reservation_output = await run_command(cmd, tool=SLURM_TOOL)
     except CommandFailedToExecute:
         logger.error(f"#### Failed to read reservation {settings.RESERVATION_IDENTIFIER} ####")
         return False
@@ -70,6 +79,9 @@ async def scontrol_update_reservation(licenses: str, duration: str) -> bool:
     """
     Update reservation duration and licenses.
 
+    The reservation is restarted now, since Slurm measures the duration from its start time and
+    only updating the duration wouldn't extend it.
+
     Duration format: [days-]hours:minutes:seconds
     Licenses format: foo.bar@server:123,foo.baz@server:234
 
@@ -80,13 +92,14 @@ async def scontrol_update_reservation(licenses: str, duration: str) -> bool:
         "update",
         "reservation",
         f"ReservationName={settings.RESERVATION_IDENTIFIER}",
+        "starttime=now",
         f"duration={duration}",
         f"licenses={licenses}",
     ]
 
     logger.debug(f"#### Updating reservation {settings.RESERVATION_IDENTIFIER} ####")
     try:
-        await run_command(cmd)
+        await run_command(cmd, tool=SLURM_TOOL)
     except CommandFailedToExecute:
         logger.error(f"#### Failed to update reservation {settings.RESERVATION_IDENTIFIER} ####")
         return False
@@ -109,7 +122,7 @@ async def scontrol_delete_reservation() -> bool:
 
     logger.debug(f"#### Deleting reservation {settings.RESERVATION_IDENTIFIER} ####")
     try:
-        await run_command(cmd)
+        await run_command(cmd, tool=SLURM_TOOL)
     except CommandFailedToExecute:
         logger.error(f"#### Failed to delete reservation {settings.RESERVATION_IDENTIFIER} ####")
         return False
@@ -118,20 +131,161 @@ async def scontrol_delete_reservation() -> bool:
     return True
 
 
+def _normalize_licenses(licenses: str) -> str:
+    """
+    Sort the licenses of the reservation, so the same licenses in a different order are considered equal.
+    """
+    return ",".join(sorted(license for license in licenses.split(",") if license))
+
+
+def _load_applied_reservation() -> Optional[Dict[str, Any]]:
+    """
+    Return the last reservation applied to the cluster, or None if it's unknown.
+
+    The reservation is stored in the cache directory, so it's shared by the agent and the Prolog/Epilog.
+    An empty licenses string means there's no reservation in the cluster.
+    """
+    try:
+        return json.loads((settings.CACHE_DIR / RESERVATION_STATE_FILE_NAME).read_text())
+    except (OSError, ValueError):
+        return None
+
+
+def _write_applied_reservation(applied_reservation: Optional[Dict[str, Any]]):
+    """
+    Replace the record of the reservation applied to the cluster atomically, or remove it if it's None.
+
+    If the cache directory doesn't exist, nothing is recorded.
+    """
+    state_path = settings.CACHE_DIR / RESERVATION_STATE_FILE_NAME
+    if not settings.CACHE_DIR.exists():
+        return
+
+    try:
+        if applied_reservation is None:
+            state_path.unlink(missing_ok=True)
+            return
+
+        tmp_path = state_path.with_suffix(f".{os.getpid()}.tmp")
+        tmp_path.write_text(json.dumps(applied_reservation))
+        tmp_path.replace(state_path)
+    except OSError as err:
+        logger.warning(f"Couldn't save the applied reservation to {state_path}: {err}")
+
+
+def _save_applied_reservation(licenses: Optional[str]):
+    """
+    Record the reservation applied to the cluster, or forget it if the licenses are None.
+
+    The reservation was just started, so it expires after its duration, and it's known to exist.
+    """
+    if licenses is None:
+        _write_applied_reservation(None)
+        return
+
+    now = time.time()
+    _write_applied_reservation(
+        {
+            "licenses": _normalize_licenses(licenses),
+            "expires_at": now + RESERVATION_DURATION_SECONDS,
+            "checked_at": now,
+        }
+    )
+
+
+def _is_reservation_applied(licenses: str) -> bool:
+    """
+    Check if the reservation for the licenses is already applied to the cluster and isn't about to expire.
+    """
+    applied_reservation = _load_applied_reservation()
+    if applied_reservation is None:
+        return False
+
+    if applied_reservation.get("licenses") != _normalize_licenses(licenses):
+        return False
+
+    if not licenses:
+        return True
+
+    return time.time() < applied_reservation.get("expires_at", 0) - settings.RESERVATION_RENEWAL_MARGIN
+
+
+async def _is_applied_reservation_in_cluster() -> bool:
+    """
+    Check if the applied reservation still exists in the cluster, since it could be deleted outside the agent.
+
+    To avoid calling scontrol on every reconciliation, it's checked at most once per renewal margin.
+    """
+    applied_reservation = _load_applied_reservation()
+    if applied_reservation is None:
+        return False
+
+    if time.time() < applied_reservation.get("checked_at", 0) + settings.RESERVATION_RENEWAL_MARGIN:
+        return True
+
+    if not await scontrol_show_reservation():
+        logger.warning("#### Reservation not found in the cluster, applying it again ####")
+        return False
+
+    _write_applied_reservation({**applied_reservation, "checked_at": time.time()})
+    return True
+
+
 async def create_or_update_reservation(reservation_data: str):
     """
     Create the reservation if it doesn't exist, otherwise update it.
     If the reservation cannot be updated, delete it and create a new one.
+
+    Since every scontrol call takes the Slurm controller write lock, nothing is done if the same
+    reservation was already applied, it's not about to expire and it still exists.
     """
+    if _is_reservation_applied(reservation_data) and await _is_applied_reservation_in_cluster():
+        RESERVATIONS_TOTAL.labels(outcome="skipped").inc()
+        logger.debug("#### Reservation didn't change, skipping scontrol ####")
+        return
+
+    RESERVATIONS_TOTAL.labels(outcome="applied").inc()
+
+    # The reservation in the cluster is unknown until scontrol succeeds
+    _save_applied_reservation(None)
+
     reservation = await scontrol_show_reservation()
 
     if reservation:
-        updated = await scontrol_update_reservation(reservation_data, "30:00")
+        updated = await scontrol_update_reservation(reservation_data, RESERVATION_DURATION)
         if not updated:
             deleted = await scontrol_delete_reservation()
             LicenseManagerReservationFailure.require_condition(
                 deleted, "Could not update or delete reservation."
             )
+            _save_applied_reservation("")
+            return
     else:
-        created = await scontrol_create_reservation(reservation_data, "30:00")
+        created = await scontrol_create_reservation(reservation_data, RESERVATION_DURATION)
         LicenseManagerReservationFailure.require_condition(created, "Could not create reservation.")
+
+    _save_applied_reservation(reservation_data)
+
+
+async def delete_reservation_if_exists():
+    """
+    Delete the reservation if it exists.
+
+    Nothing is done if the reservation is already known to be deleted.
+    """
+    if _is_reservation_applied(""):
+        RESERVATIONS_TOTAL.labels(outcome="skipped").inc()
+        logger.debug("#### Reservation already deleted, skipping scontrol ####")
+        return
+
+    RESERVATIONS_TOTAL.labels(outcome="applied").inc()
+
+    existing_reservation = await scontrol_show_reservation()
+    if existing_reservation:
+        logger.debug("Deleting existing reservation")
+        deleted = await scontrol_delete_reservation()
+        if not deleted:
+            _save_applied_reservation(None)
+            return
+
+    _save_applied_reservation("")
@@ -0,0 +1,85 @@
+"""
+Minimal client used by the Prolog/Epilog to run through the agent.
+
+Only the standard library is imported before calling the agent, so the Prolog/Epilog start quickly.
+If the agent can't be reached, the Prolog/Epilog run in the current process instead.
+"""
+
+import json
+import os
+import socket
+import sys
+from typing import Optional
+
+from lm_agent.constants import DEFAULT_RPC_SOCKET_PATH, DEFAULT_RPC_TIMEOUT
+
+# Variables from the job environment sent to the agent to build the job context
+JOB_ENVIRONMENT_VARIABLES = [
+    "SLURM_CLUSTER_NAME",
+    "SLURM_JOB_ID",
+    "SLURM_JOB_NODELIST",
+    "SLURM_JOB_USER",
+    "SLURM_JOB_LICENSES",
+]
+
+
+def call_agent(command: str) -> Optional[int]:
+    """
+    Send the command with the job environment to the agent and return the exit status.
+
+    Return None if the agent is not reachable, so the command can run in the current process.
+    Return 1 if the agent couldn't process the command.
+    """
+    socket_path = os.environ.get("LM_AGENT_RPC_SOCKET_PATH", DEFAULT_RPC_SOCKET_PATH)
+    timeout = float(os.environ.get("LM_AGENT_RPC_TIMEOUT", DEFAULT_RPC_TIMEOUT))
+    request = {
+        "command": command,
+        "environment": {name: os.environ[name] for name in JOB_ENVIRONMENT_VARIABLES if name in os.environ},
+    }
+
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        client.settimeout(timeout)
+
+        try:
+            client.connect(socket_path)
+        except OSError:
+            return None
+
+        try:
+            client.sendall(json.dumps(request).encode() + b"\n")
+            with client.makefile("rb") as response_file:
+                response = json.loads(response_file.readline())
+            return int(response["exit_status"])
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            print(f"Failed to run {command} through the license-manager-agent: {e}", file=sys.stderr)
+            return 1
+
+
+def prolog_main():
+    """
+    Run the PrologSlurmctld through the agent, or in the current process if the agent is not reachable.
+    """
+    exit_status = call_agent("prolog")
+
+    if exit_status is None:
+        from lm_agent.workload_managers.slurm.slurmctld_prolog import main
+
+        main()
+        return
+
+    sys.exit(exit_status)
+
+
+def epilog_main():
+    """
+    Run the EpilogSlurmctld through the agent, or in the current process if the agent is not reachable.
+    """
+    exit_status = call_agent("epilog")
+
+    if exit_status is None:
+        from lm_agent.workload_managers.slurm.slurmctld_epilog import main
+
+        main()
+        return
+
+    sys.exit(exit_status)
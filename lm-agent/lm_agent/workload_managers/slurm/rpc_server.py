@@ -0,0 +1,157 @@
+"""
+Local Unix socket server used by the Prolog/Epilog to run through the agent.
+
+Running the Prolog/Epilog in the agent avoids starting a new interpreter for each job, and reuses the
+backend client connections and the token already acquired by the agent.
+
+Each request is a single line of JSON with the command and the job environment, and each response
+is a single line of JSON with the exit status to be returned by the Prolog/Epilog.
+
+If the Prolog/Epilog disconnect, or the request takes longer than ``RPC_PROCESSING_TIMEOUT``, the request
+is cancelled, and the job is removed if it was a Prolog, since Slurm fails the job in that case.
+"""
+
+import asyncio
+import contextlib
+import os
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from pydantic import ValidationError
+
+from lm_agent.backend_utils.utils import remove_job_by_slurm_job_id
+from lm_agent.config import settings
+from lm_agent.logs import logger
+from lm_agent.models import AgentRPCRequest, AgentRPCResponse
+from lm_agent.workload_managers.slurm.common import get_job_context
+from lm_agent.workload_managers.slurm.slurmctld_epilog import process_epilog
+from lm_agent.workload_managers.slurm.slurmctld_prolog import process_prolog
+
+COMMANDS: Dict[str, Callable[[Dict[str, Any]], Awaitable[int]]] = {
+    "prolog": process_prolog,
+    "epilog": process_epilog,
+}
+
+
+async def remove_job_of_failed_prolog(job_id: str):
+    """
+    Remove the job and the bookings the Prolog may have created before it failed.
+    """
+    try:
+        await remove_job_by_slurm_job_id(job_id)
+    except Exception as e:
+        logger.error(f"Failed to remove job {job_id} after its Prolog failed: {e}")
+
+
+async def process_rpc_request(request: AgentRPCRequest) -> AgentRPCResponse:
+    """
+    Run the command requested by the Prolog/Epilog with the job context from its environment.
+    """
+    job_context = await get_job_context(request.environment)
+
+    try:
+        exit_status = await asyncio.wait_for(
+            COMMANDS[request.command](job_context), timeout=settings.RPC_PROCESSING_TIMEOUT
+        )
+    except (asyncio.TimeoutError, asyncio.CancelledError):
+        if request.command == "prolog":
+            await asyncio.shield(remove_job_of_failed_prolog(job_context["job_id"]))
+        raise
+
+    return AgentRPCResponse(exit_status=exit_status)
+
+
+async def process_rpc_request_while_connected(
+    request: AgentRPCRequest, reader: asyncio.StreamReader
+) -> Optional[AgentRPCResponse]:
+    """
+    Process the request, cancelling it if the Prolog/Epilog disconnect before it's done.
+
+    Return None if the request was cancelled.
+    """
+    processing = asyncio.ensure_future(process_rpc_request(request))
+    # Nothing else is sent after the request, so the read only completes when the connection is closed
+    disconnected = asyncio.ensure_future(reader.read(1))
+
+    try:
+        await asyncio.wait({processing, disconnected}, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        disconnected.cancel()
+
+    if not processing.done():
+        logger.warning(f"The {request.command} disconnected from the RPC server, cancelling its request")
+        processing.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await processing
+        return None
+
+    return processing.result()
+
+
+async def handle_rpc_connection(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    """
+    Read the request from the connection, process it and write the response back.
+
+    Any error while processing the request is reported to the Prolog/Epilog as a failure.
+    """
+    try:
+        request = AgentRPCRequest.model_validate_json(await reader.readline())
+        logger.debug(f"Processing {request.command} request received through the RPC server")
+        response = await process_rpc_request_while_connected(request, reader)
+    except ValidationError as e:
+        logger.error(f"Invalid request received through the RPC server: {e}")
+        response = AgentRPCResponse(exit_status=1)
+    except Exception as e:
+        logger.critical(f"Failed to process request received through the RPC server: {e!r}")
+        response = AgentRPCResponse(exit_status=1)
+
+    if response is None:
+        writer.close()
+        return
+
+    try:
+        writer.write(response.model_dump_json().encode() + b"\n")
+        await writer.drain()
+    except ConnectionError as e:
+        logger.warning(f"Couldn't send the response through the RPC server: {e}")
+    finally:
+        writer.close()
+        with contextlib.suppress(ConnectionError):
+            await writer.wait_closed()
+
+
+async def start_rpc_server() -> Optional[asyncio.AbstractServer]:
+    """
+    Start serving the Prolog/Epilog requests on the Unix socket.
+
+    If the socket can't be created, the server is not started and the Prolog/Epilog will run on their own.
+    """
+    socket_path = settings.RPC_SOCKET_PATH
+
+    try:
+        socket_path.parent.mkdir(parents=True, exist_ok=True)
+        socket_path.unlink(missing_ok=True)
+        # Slurm runs the Prolog/Epilog as the SlurmUser, which should share the group with the agent.
+        # The socket is created with these permissions, so it's never open to other users.
+        previous_umask = os.umask(0o117)
+        try:
+            server = await asyncio.start_unix_server(handle_rpc_connection, path=str(socket_path))
+        finally:
+            os.umask(previous_umask)
+    except OSError as e:
+        logger.warning(
+            f"Couldn't start the RPC server on {socket_path}, Prolog/Epilog will run on their own: {e}"
+        )
+        return None
+
+    logger.info(f"RPC server listening on {socket_path}")
+    return server
+
+
+async def stop_rpc_server(server: asyncio.AbstractServer):
+    """
+    Stop serving the Prolog/Epilog requests and remove the Unix socket.
+    """
+    server.close()
+    await server.wait_closed()
+    settings.RPC_SOCKET_PATH.unlink(missing_ok=True)
+    logger.info("RPC server stopped")
@@ -6,18 +6,20 @@ The EpilogSlurmctld executable.
 import asyncio
 import sys
 
-from lm_agent.backend_utils.utils import remove_job_by_slurm_job_id
+from lm_agent.backend_utils.utils import close_backend_client, remove_job_by_slurm_job_id
 from lm_agent.config import settings
 from lm_agent.logs import init_logging, logger
-from lm_agent.services.reconciliation import reconcile
+from lm_agent.services.reconciliation import shared_reconcile
 from lm_agent.workload_managers.slurm.cmd_utils import get_required_licenses_for_job
 from lm_agent.workload_managers.slurm.common import get_job_context
 
 
-async def epilog():
-    # Initialize the logger
-    init_logging("slurmctld-epilog")
-    job_context = await get_job_context()
+async def process_epilog(job_context) -> int:
+    """
+    Remove the job and its bookings once it's finished.
+
+    Return the exit status of the epilog: 0 if the job was cleaned up, 1 otherwise.
+    """
     job_id = job_context["job_id"]
     job_licenses = job_context["job_licenses"]
 
@@ -25,29 +27,47 @@ async def epilog():
     if settings.USE_RECONCILE_IN_PROLOG_EPILOG:
         # Force a reconciliation before we attempt to remove bookings.
         try:
-            await reconcile()
+            await shared_reconcile()
         except Exception as e:
             logger.critical(f"Failed to call reconcile with {e}")
-            sys.exit(1)
+            return 1
 
     try:
         required_licenses = get_required_licenses_for_job(job_licenses)
     except Exception as e:
         logger.critical(f"Failed to call get_required_licenses_for_job with {e}")
-        sys.exit(1)
+        return 1
 
     if not required_licenses:
         logger.debug(f"No licenses required for job {job_id}, exiting!")
-        sys.exit(0)
+        return 0
+
+    # Attempt to remove the job with its bookings.
+    await remove_job_by_slurm_job_id(job_id)
+    logger.debug(f"Job {job_id} removed successfully")
+    return 0
 
-    if len(required_licenses) > 0:
-        # Attempt to remove the job with its bookings.
-        await remove_job_by_slurm_job_id(job_id)
-        logger.debug(f"Job {job_id} removed successfully")
+
+async def epilog():
+    # Initialize the logger
+    init_logging("slurmctld-epilog")
+    job_context = await get_job_context()
+
+    exit_status = await process_epilog(job_context)
+    if exit_status != 0:
+        sys.exit(exit_status)
+
+
+async def run_epilog():
+    """Run the epilog and release the backend client connections once it's done."""
+    try:
+        await epilog()
+    finally:
+        await close_backend_client()
 
 
 def main():
-    asyncio.run(epilog())
+    asyncio.run(run_epilog())
 
 
 if __name__ == "__main__":
@@ -14,21 +14,25 @@ if the exit status is anything other then 0, e.g. 1.
 import asyncio
 import sys
 
-from lm_agent.backend_utils.utils import get_cluster_configs_from_backend, make_booking_request
+from lm_agent.backend_utils.utils import (
+    close_backend_client,
+    get_cluster_configs_from_backend,
+    make_booking_request,
+)
 from lm_agent.config import settings
 from lm_agent.logs import init_logging, logger
 from lm_agent.models import LicenseBookingRequest
-from lm_agent.services.reconciliation import reconcile
+from lm_agent.services.reconciliation import shared_reconcile
 from lm_agent.workload_managers.slurm.cmd_utils import get_required_licenses_for_job
 from lm_agent.workload_managers.slurm.common import get_job_context
 
 
-async def prolog():
-    """The PrologSlurmctld for the license-manager-agent."""
-    # Initialize the logger
-    init_logging("slurmctld-prolog")
-    # Acqure the job context
-    job_context = await get_job_context()
+async def process_prolog(job_context) -> int:
+    """
+    Book the licenses required by the job, if there are enough licenses available.
+
+    Return the exit status of the prolog: 0 if the job can be scheduled, 1 otherwise.
+    """
     job_id = job_context.get("job_id", "")
     user_name = job_context.get("user_name")
     lead_host = job_context.get("lead_host")
@@ -40,28 +44,26 @@ async def prolog():
         required_licenses = get_required_licenses_for_job(job_licenses)
     except Exception as e:
         logger.critical(f"Failed to call get_required_licenses_for_job with {e}")
-        sys.exit(1)
+        return 1
 
     if not required_licenses:
         logger.debug(f"No licenses required for job {job_id}, exiting!")
-        sys.exit(0)
+        return 0
 
     logger.debug(f"Required licenses for job {job_id}: {required_licenses}")
 
     tracked_licenses = list()
 
     # Create a list of tracked licenses in the form <product>.<feature>
-    if len(required_licenses) > 0:
-        # Create a list of tracked licenses in the form <product>.<feature>
-        try:
-            entries = await get_cluster_configs_from_backend()
-        except Exception as e:
-            logger.critical(f"Failed to call get_config_from_backend with {e}")
-            sys.exit(1)
-
-        for entry in entries:
-            for feature in entry.features:
-                tracked_licenses.append(f"{feature.product.name}.{feature.name}")
+    try:
+        entries = await get_cluster_configs_from_backend()
+    except Exception as e:
+        logger.critical(f"Failed to call get_config_from_backend with {e}")
+        return 1
+
+    for entry in entries:
+        for feature in entry.features:
+            tracked_licenses.append(f"{feature.product.name}.{feature.name}")
 
     # Create a tracked LicenseBookingRequest for licenses that we actually
     # track. These tracked licenses are what we will check feature token
@@ -82,26 +84,43 @@ async def prolog():
         if settings.USE_RECONCILE_IN_PROLOG_EPILOG:
             # Force a reconciliation before we check the feature token availability.
             try:
-                await reconcile()
+                await shared_reconcile()
             except Exception as e:
                 logger.critical(f"Failed to call reconcile with {e}")
-                sys.exit(1)
+                return 1
 
         booking_request = await make_booking_request(tracked_license_booking_request)
         if not booking_request:
             logger.debug(f"Booking request for job {job_id} unsuccessful, not enough licenses.")
-            sys.exit(1)
+            return 1
         logger.debug(
             (
                 f"Booking request for job {job_id} sucessful, licenses booked: "
                 f"{repr(tracked_license_booking_request.bookings)}"
             )
         )
-    sys.exit(0)
+    return 0
+
+
+async def prolog():
+    """The PrologSlurmctld for the license-manager-agent."""
+    # Initialize the logger
+    init_logging("slurmctld-prolog")
+    # Acqure the job context
+    job_context = await get_job_context()
+    sys.exit(await process_prolog(job_context))
+
+
+async def run_prolog():
+    """Run the prolog and release the backend client connections once it's done."""
+    try:
+        await prolog()
+    finally:
+        await close_backend_client()
 
 
 def main():
-    asyncio.run(prolog())
+    asyncio.run(run_prolog())
 
 
 if __name__ == "__main__":
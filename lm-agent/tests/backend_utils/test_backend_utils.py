@@ -1,3 +1,5 @@
+import asyncio
+import json
 import stat
 from datetime import datetime, timezone
 from unittest import mock
@@ -7,18 +9,25 @@ import pytest
 from httpx import Response
 from pytest import mark, raises
 
+from lm_agent.backend_utils import utils
 from lm_agent.backend_utils.utils import (
     TOKEN_FILE_NAME,
+    TokenManager,
     _load_token_from_cache,
     _write_token_to_cache,
     acquire_token,
     check_backend_health,
+    close_backend_client,
     get_all_features_bookings_sum,
+    get_backend_client,
+    get_backend_client_pool_statistics,
     get_cluster_configs_from_backend,
     get_cluster_jobs_from_backend,
     make_booking_request,
     make_feature_update,
+    remove_bookings,
     remove_job_by_slurm_job_id,
+    remove_jobs_by_slurm_job_ids,
     report_cluster_status,
 )
 from lm_agent.config import settings
@@ -159,7 +168,8 @@ def test__load_token_from_cache__returns_none_and_warns_if_cached_token_will_exp
     assert "Cached token is expired" in caplog.text
 
 
-def test_acquire_token__gets_a_token_from_the_cache(mock_cache_dir):
+@mark.asyncio
+async def test_acquire_token__gets_a_token_from_the_cache(mock_cache_dir):
     """
     Verifies that the token is retrieved from the cache if it is found there.
     """
@@ -172,11 +182,12 @@ def test_acquire_token__gets_a_token_from_the_cache(mock_cache_dir):
         algorithm="HS256",
     )
     token_path.write_text(created_token)
-    retrieved_token = acquire_token()
+    retrieved_token = await acquire_token()
     assert retrieved_token == created_token
 
 
-def test_acquire_token__gets_a_token_from_auth_0_if_one_is_not_in_the_cache(respx_mock, mock_cache_dir):
+@mark.asyncio
+async def test_acquire_token__gets_a_token_from_auth_0_if_one_is_not_in_the_cache(respx_mock, mock_cache_dir):
     """
     Verifies that a token is pulled from OIDC if it is not found in the cache.
     Also checks to make sure the token is cached.
@@ -185,7 +196,7 @@ def test_acquire_token__gets_a_token_from_auth_0_if_one_is_not_in_the_cache(resp
     token_path = mock_cache_dir / TOKEN_FILE_NAME
     assert not token_path.exists()
 
-    retrieved_token = acquire_token()
+    retrieved_token = await acquire_token()
     assert retrieved_token == "dummy-token"
 
     assert token_path.read_text() == retrieved_token
@@ -226,10 +237,10 @@ async def test__report_cluster_status__raises_exception_on_non_202(respx_mock):
 @pytest.mark.respx(base_url="http://backend")
 async def test__get_cluster_jobs_from_backend(jobs, respx_mock):
     """Test that get_jobs_from_backend parses and returns the jobs from the cluster."""
-    respx_mock.get("/lm/jobs/by_client_id").mock(
+    respx_mock.get("/lm/jobs/by_client_id/changes").mock(
         return_value=Response(
             status_code=200,
-            json=jobs[:2],
+            json={"cursor": 100, "jobs": jobs[:2], "deleted_jobs": []},
         )
     )
 
@@ -325,15 +336,141 @@ async def test__get_cluster_configs_from_backend(configurations, respx_mock):
     assert configs == expected_configs
 
 
+@mark.asyncio
+@pytest.mark.respx(base_url="http://backend")
+async def test__get_cluster_configs_from_backend__uses_local_copy_if_not_modified(configurations, respx_mock):
+    """
+    Test that get_cluster_configs_from_backend sends the ETag of the last response
+    and returns the local copy if the backend answers that the configurations didn't change.
+    """
+    route = respx_mock.get("/lm/configurations/by_client_id")
+    route.side_effect = [
+        Response(status_code=200, json=configurations, headers={"ETag": '"version-1"'}),
+        Response(status_code=304, headers={"ETag": '"version-1"'}),
+        Response(status_code=200, json=configurations[:1], headers={"ETag": '"version-2"'}),
+    ]
+
+    with mock.patch.object(
+        ConfigurationSchema, "model_validate", wraps=ConfigurationSchema.model_validate
+    ) as validate:
+        first_configs = await get_cluster_configs_from_backend()
+        assert validate.call_count == len(configurations)
+
+        second_configs = await get_cluster_configs_from_backend()
+        assert validate.call_count == len(configurations)
+        assert second_configs == first_configs
+
+        third_configs = await get_cluster_configs_from_backend()
+        assert len(third_configs) == 1
+
+    assert "if-none-match" not in route.calls[0].request.headers
+    assert route.calls[1].request.headers["if-none-match"] == '"version-1"'
+    assert route.calls[2].request.headers["if-none-match"] == '"version-1"'
+
+
+@mark.asyncio
+@pytest.mark.respx(base_url="http://backend")
+async def test__get_cluster_jobs_from_backend__applies_the_changes_since_the_last_request(jobs, respx_mock):
+    """
+    Test that get_cluster_jobs_from_backend requests only the changes since the cursor of the last request,
+    and applies them to the local job index.
+    """
+    changed_job = {**jobs[1], "bookings": jobs[1]["bookings"][:1]}
+    route = respx_mock.get("/lm/jobs/by_client_id/changes")
+    route.side_effect = [
+        Response(status_code=200, json={"cursor": 100, "jobs": jobs[:2], "deleted_jobs": []}),
+        Response(
+            status_code=200,
+            json={
+                "cursor": 105,
+                "jobs": [changed_job, jobs[2]],
+                "deleted_jobs": [{"job_id": jobs[0]["id"], "slurm_job_id": jobs[0]["slurm_job_id"]}],
+            },
+        ),
+    ]
+
+    first_jobs = await get_cluster_jobs_from_backend()
+    assert [job.id for job in first_jobs] == [jobs[0]["id"], jobs[1]["id"]]
+
+    second_jobs = await get_cluster_jobs_from_backend()
+    assert second_jobs == [JobSchema.model_validate(changed_job), JobSchema.model_validate(jobs[2])]
+
+    assert "since" not in route.calls[0].request.url.params
+    assert route.calls[1].request.url.params["since"] == "100"
+
+
+@mark.asyncio
+@pytest.mark.respx(base_url="http://backend")
+async def test__get_cluster_jobs_from_backend__keeps_the_index_if_the_request_fails(jobs, respx_mock):
+    """
+    Test that the local job index and its cursor are kept if the changes can't be requested.
+    """
+    route = respx_mock.get("/lm/jobs/by_client_id/changes")
+    route.side_effect = [
+        Response(status_code=200, json={"cursor": 100, "jobs": jobs[:2], "deleted_jobs": []}),
+        Response(status_code=500),
+        Response(status_code=200, json={"cursor": 105, "jobs": [], "deleted_jobs": []}),
+    ]
+
+    await get_cluster_jobs_from_backend()
+
+    with raises(LicenseManagerBackendConnectionError, match="Could not get job data"):
+        await get_cluster_jobs_from_backend()
+
+    assert len(await get_cluster_jobs_from_backend()) == 2
+    assert route.calls[2].request.url.params["since"] == "100"
+
+
+@mark.asyncio
+@pytest.mark.respx(base_url="http://backend")
+async def test__get_cluster_jobs_from_backend__requests_all_jobs_after_the_full_sync_interval(
+    jobs, respx_mock
+):
+    """
+    Test that the local job index is rebuilt from all jobs once the full sync interval has passed,
+    dropping the jobs whose changes were missed.
+    """
+    route = respx_mock.get("/lm/jobs/by_client_id/changes")
+    route.side_effect = [
+        Response(status_code=200, json={"cursor": 100, "jobs": jobs[:2], "deleted_jobs": []}),
+        Response(status_code=200, json={"cursor": 105, "jobs": jobs[1:2], "deleted_jobs": []}),
+    ]
+
+    await get_cluster_jobs_from_backend()
+
+    with mock.patch.object(settings, "JOB_INDEX_FULL_SYNC_INTERVAL", 0):
+        second_jobs = await get_cluster_jobs_from_backend()
+
+    assert second_jobs == [JobSchema.model_validate(jobs[1])]
+    assert "since" not in route.calls[1].request.url.params
+
+
 @pytest.mark.asyncio
-@mock.patch("lm_agent.backend_utils.utils.get_all_features_from_backend")
-async def test__get_all_features_bookings_sum(get_all_features_mock, parsed_features):
+@pytest.mark.respx(base_url="http://backend")
+async def test__get_all_features_bookings_sum(respx_mock):
     """
-    Test that get_bookings_sum_per_cluster returns the booking sum per cluster for a given product_feature.
+    Test that get_all_features_bookings_sum returns the booking sum in all clusters for each product_feature.
     """
-    get_all_features_mock.return_value = parsed_features
+    route = respx_mock.get("/lm/features/bookings_sum").mock(
+        return_value=Response(status_code=200, json={"abaqus.abaqus": 62, "converge.converge_super": 0})
+    )
+
     bookings_sum = await get_all_features_bookings_sum()
-    assert bookings_sum["abaqus.abaqus"] == 62
+
+    assert bookings_sum == {"abaqus.abaqus": 62, "converge.converge_super": 0}
+    assert route.calls.last.request.url.params["cluster_features_only"] == "true"
+
+
+@pytest.mark.asyncio
+@pytest.mark.respx(base_url="http://backend")
+async def test__get_all_features_bookings_sum__raises_exception_on_non_two_hundred(respx_mock):
+    """
+    Test that get_all_features_bookings_sum raises an exception when the request fails.
+    """
+    respx_mock.get("/lm/features/bookings_sum").mock(return_value=Response(status_code=500))
+
+    with pytest.raises(LicenseManagerBackendConnectionError):
+        await get_all_features_bookings_sum()
 
 
 @pytest.mark.asyncio
@@ -478,3 +615,234 @@ async def test__remove_job_by_slurm_job_id__raises_exception_on_non_two_hundred(
 
     with pytest.raises(LicenseManagerBackendConnectionError):
         await remove_job_by_slurm_job_id(slurm_job_id)
+
+
+@pytest.mark.asyncio
+@pytest.mark.respx(base_url="http://backend")
+async def test__remove_jobs_by_slurm_job_ids__success(respx_mock):
+    """
+    Test that remove_jobs_by_slurm_job_ids removes all the jobs in a single request.
+    """
+    route = respx_mock.delete("/lm/jobs/bulk").mock(
+        return_value=Response(
+            status_code=200,
+            json={"message": "Jobs deleted successfully.", "deleted_slurm_job_ids": ["123", "456"]},
+        )
+    )
+
+    removed_slurm_job_ids = await remove_jobs_by_slurm_job_ids(["123", "456", "789"])
+
+    assert removed_slurm_job_ids == ["123", "456"]
+    assert route.call_count == 1
+    assert json.loads(route.calls.last.request.content) == ["123", "456", "789"]
+
+
+@pytest.mark.asyncio
+@pytest.mark.respx(base_url="http://backend")
+async def test__remove_jobs_by_slurm_job_ids__raises_exception_on_non_two_hundred(respx_mock):
+    """
+    Test that remove_jobs_by_slurm_job_ids raises an exception when the jobs removal fails.
+    """
+    respx_mock.delete("/lm/jobs/bulk").mock(
+        return_value=Response(
+            status_code=500,
+            json={"error": "Internal Server Error"},
+        )
+    )
+
+    with pytest.raises(LicenseManagerBackendConnectionError):
+        await remove_jobs_by_slurm_job_ids(["123", "456"])
+
+
+@pytest.mark.asyncio
+@pytest.mark.respx(base_url="http://backend")
+async def test__remove_bookings__success(respx_mock):
+    """
+    Test that remove_bookings removes all the bookings in a single request.
+    """
+    route = respx_mock.delete("/lm/bookings/bulk").mock(
+        return_value=Response(
+            status_code=200,
+            json={"message": "Bookings deleted successfully.", "deleted_booking_ids": [1, 2]},
+        )
+    )
+
+    removed_booking_ids = await remove_bookings([1, 2, 3])
+
+    assert removed_booking_ids == [1, 2]
+    assert route.call_count == 1
+    assert json.loads(route.calls.last.request.content) == [1, 2, 3]
+
+
+@pytest.mark.asyncio
+@pytest.mark.respx(base_url="http://backend")
+async def test__remove_bookings__raises_exception_on_non_two_hundred(respx_mock):
+    """
+    Test that remove_bookings raises an exception when the bookings removal fails.
+    """
+    respx_mock.delete("/lm/bookings/bulk").mock(return_value=Response(status_code=500))
+
+    with pytest.raises(LicenseManagerBackendConnectionError):
+        await remove_bookings([1, 2])
+
+
+@mark.asyncio
+async def test__get_backend_client__returns_the_shared_client():
+    """
+    Check that the same pooled client is returned until it's closed.
+    """
+    backend_client = get_backend_client()
+    assert get_backend_client() is backend_client
+
+    await close_backend_client()
+    assert backend_client.is_closed
+
+    new_backend_client = get_backend_client()
+    assert new_backend_client is not backend_client
+    await close_backend_client()
+
+
+@mark.asyncio
+@mark.respx(base_url="http://backend")
+async def test__backend_client__reuses_connection_and_reports_pool_statistics(respx_mock):
+    """
+    Check that consecutive requests share the same client and are counted in the pool statistics.
+    """
+    respx_mock.get("/lm/health").mock(return_value=Response(status_code=204))
+
+    assert get_backend_client_pool_statistics() == {}
+
+    await check_backend_health()
+    await check_backend_health()
+
+    pool_statistics = get_backend_client_pool_statistics()
+    assert pool_statistics["requests_sent"] == 2
+    assert pool_statistics["max_connections"] == settings.BACKEND_MAX_CONNECTIONS
+    assert pool_statistics["http2"] is False
+
+    # the OIDC token is acquired only once for the shared client
+    assert respx_mock.calls.call_count == 3
+
+
+@mark.asyncio
+@mark.respx(base_url="http://backend")
+async def test__backend_client__acquires_a_new_token_when_expired(respx_mock, mock_cache_dir):
+    """
+    Check that the shared client acquires a new token once the previous one expires.
+    """
+    respx_mock.get("/lm/health").mock(return_value=Response(status_code=204))
+    one_second_ago = int(datetime.now(tz=timezone.utc).timestamp()) - 1
+    expired_token = jwt.encode(dict(exp=one_second_ago), key="dummy-key", algorithm="HS256")
+
+    utils.token_manager._token = expired_token
+    utils.token_manager._expiration = one_second_ago
+
+    await check_backend_health()
+
+    assert utils.token_manager._token == "dummy-token"
+    assert respx_mock.calls.last.request.headers["authorization"] == "Bearer dummy-token"
+
+
+@mark.asyncio
+async def test__token_manager__refreshes_the_token_in_the_background_before_it_expires(
+    respx_mock, mock_cache_dir
+):
+    """
+    Check that a token about to expire is still used while a new one is acquired in the background.
+    """
+    thirty_seconds_from_now = int(datetime.now(tz=timezone.utc).timestamp()) + 30
+    expiring_token = jwt.encode(dict(exp=thirty_seconds_from_now), key="dummy-key", algorithm="HS256")
+
+    token_manager = TokenManager()
+    token_manager._token = expiring_token
+    token_manager._expiration = thirty_seconds_from_now
+
+    assert await token_manager.get_token() == expiring_token
+    assert token_manager._refresh_task is not None
+
+    await token_manager._refresh_task
+    assert await token_manager.get_token() == "dummy-token"
+    assert token_manager._refresh_task is None
+
+
+@mark.asyncio
+async def test__token_manager__acquires_the_token_only_once_for_concurrent_requests(
+    respx_mock, mock_cache_dir
+):
+    """
+    Check that concurrent requests for a token share a single request to OIDC.
+    """
+    token_manager = TokenManager()
+
+    tokens = await asyncio.gather(*[token_manager.get_token() for _ in range(5)])
+
+    assert tokens == ["dummy-token"] * 5
+    assert respx_mock.calls.call_count == 1
+
+
+@mark.asyncio
+async def test__token_manager__uses_the_token_cached_by_another_process(respx_mock, mock_cache_dir):
+    """
+    Check that the token cached in the file by another process is used before requesting OIDC.
+    """
+    mock_cache_dir.mkdir()
+    one_hour_from_now = int(datetime.now(tz=timezone.utc).timestamp()) + 3600
+    cached_token = jwt.encode(dict(exp=one_hour_from_now), key="dummy-key", algorithm="HS256")
+    (mock_cache_dir / TOKEN_FILE_NAME).write_text(cached_token)
+
+    token_manager = TokenManager()
+
+    assert await token_manager.get_token() == cached_token
+    assert token_manager._expiration == one_hour_from_now
+    assert respx_mock.calls.call_count == 0
+
+
+@mark.asyncio
+@mark.respx(base_url="http://backend")
+async def test__backend_client__acquires_a_new_token_when_rejected(respx_mock, mock_cache_dir):
+    """
+    Check that the request is sent again with a new token if the backend rejects the token.
+    """
+    respx_mock.get("/lm/health").mock(side_effect=[Response(status_code=401), Response(status_code=204)])
+    utils.token_manager._token = "rejected-token"
+
+    await check_backend_health()
+
+    assert utils.token_manager._token == "dummy-token"
+    assert respx_mock.calls.last.request.headers["authorization"] == "Bearer dummy-token"
+
+
+@mark.asyncio
+@mark.respx(base_url="http://backend")
+async def test__backend_client__acquires_a_single_new_token_for_concurrent_rejected_requests(
+    respx_mock, mock_cache_dir
+):
+    """
+    Check that concurrent requests rejected with the same token share a single request to OIDC.
+    """
+    rejected_token = jwt.encode(
+        dict(exp=int(datetime.now(tz=timezone.utc).timestamp()) + 3600), key="dummy-key", algorithm="HS256"
+    )
+    rejected_requests = []
+    all_rejected = asyncio.Event()
+
+    async def health_check(request):
+        if request.headers["authorization"] != f"Bearer {rejected_token}":
+            return Response(status_code=204)
+
+        # Reject the requests only once all of them were sent with the same token
+        rejected_requests.append(request)
+        if len(rejected_requests) == 5:
+            all_rejected.set()
+        await all_rejected.wait()
+        return Response(status_code=401)
+
+    respx_mock.get("/lm/health").mock(side_effect=health_check)
+    utils.token_manager._token = rejected_token
+    utils.token_manager._expiration = None
+
+    await asyncio.gather(*[check_backend_health() for _ in range(5)])
+
+    oidc_calls = [call for call in respx_mock.calls if call.request.url.path != "/lm/health"]
+    assert len(oidc_calls) == 1
+    assert utils.token_manager._token == "dummy-token"
@@ -0,0 +1,15 @@
+"""
+Configuration of pytest for the parser benchmarks.
+"""
+
+from pytest import fixture
+
+
+@fixture
+def update_benchmark_baselines(request) -> bool:
+    return request.config.getoption("--update-benchmark-baselines")
+
+
+@fixture
+def benchmark_tolerance(request) -> float:
+    return request.config.getoption("--benchmark-tolerance")
@@ -0,0 +1,258 @@
+"""
+Generate realistic license server outputs at the scale of a large site.
+
+Each generator returns the output for ``features`` features with ``uses`` usage lines spread
+among them, in the format of the license server binary. The outputs are deterministic,
+so the measurements of different runs are comparable.
+"""
+
+import random
+from typing import Callable, Dict, List
+
+DEFAULT_FEATURES = 2000
+DEFAULT_USES = 20000
+
+
+def _spread_uses(features: int, uses: int, seed: int) -> List[int]:
+    """Spread the usage lines among the features, with most of them in a few popular features."""
+    rng = random.Random(seed)
+    uses_per_feature = [0] * features
+    popular_features = max(1, features // 20)
+    for _ in range(uses):
+        if rng.random() < 0.8:
+            uses_per_feature[rng.randrange(popular_features)] += 1
+        else:
+            uses_per_feature[rng.randrange(features)] += 1
+    return uses_per_feature
+
+
+def _user(index: int) -> str:
+    return f"user{index % 997:03d}"
+
+
+def _host(index: int) -> str:
+    return f"node{index % 4096:04d}.cluster.example.com"
+
+
+def generate_flexlm_output(features: int = DEFAULT_FEATURES, uses: int = DEFAULT_USES) -> str:
+    """Generate the output of ``lmutil lmstat -a``."""
+    lines = [
+        "lmutil - Copyright (c) 1989-2012 Flexera Software LLC. All Rights Reserved.",
+        "Flexible License Manager status on Wed 7/3/2024 14:36",
+        "",
+        "License server status: 27000@licserv.example.com",
+        "    License file(s) on licserv.example.com: /opt/flexlm/license.dat:",
+        "",
+        "licserv.example.com: license server UP (MASTER) v11.16.2",
+        "",
+        "Vendor daemon status (on licserv.example.com):",
+        "",
+        "    vendora: UP v11.16.2",
+        "Feature usage info:",
+        "",
+    ]
+    use_index = 0
+    for feature_index, feature_uses in enumerate(_spread_uses(features, uses, seed=1)):
+        feature = f"FEATURE_{feature_index:05d}"
+        lines += [
+            f"Users of {feature}:  (Total of {feature_uses + 100} licenses issued;  "
+            f"Total of {feature_uses} licenses in use)",
+            "",
+            f'  "{feature}" v62.2, vendor: vendora, expiry: 1-jan-0',
+            "  floating license",
+            "",
+        ]
+        for _ in range(feature_uses):
+            lines.append(
+                f"    {_user(use_index)} {_host(use_index)} /dev/tty (v62.2) "
+                f"(licserv.example.com/27000 {use_index % 9000 + 100}), start Thu 10/29 8:09, 1 license"
+            )
+            use_index += 1
+        lines.append("")
+    return "\n".join(lines)
+
+
+def generate_flexlm_feature_output(uses: int = DEFAULT_USES) -> str:
+    """Generate the output of ``lmutil lmstat -f <feature>`` for a single feature."""
+    lines = [
+        "lmutil - Copyright (c) 1989-2012 Flexera Software LLC. All Rights Reserved.",
+        "Flexible License Manager status on Wed 7/3/2024 14:36",
+        "",
+        f"Users of FEATURE_00000:  (Total of 100000 licenses issued;  Total of {uses} licenses in use)",
+        "",
+        '  "FEATURE_00000" v62.2, vendor: vendora, expiry: 1-jan-0',
+        "  floating license",
+        "",
+    ]
+    for use_index in range(uses):
+        lines.append(
+            f"    {_user(use_index)} {_host(use_index)} /dev/tty (v62.2) "
+            f"(licserv.example.com/27000 {use_index % 9000 + 100}), start Thu 10/29 8:09, 1 license"
+        )
+    return "\n".join(lines)
+
+
+def generate_rlm_output(features: int = DEFAULT_FEATURES, uses: int = DEFAULT_USES) -> str:
+    """Generate the output of ``rlmutil rlmstat -a -p``."""
+    uses_per_feature = _spread_uses(features, uses, seed=2)
+    lines = [
+        "Setting license file path to 5053@licserv.example.com",
+        "rlmutil v12.2",
+        "Copyright (C) 2006-2017, Reprise Software, Inc. All rights reserved.",
+        "",
+        "    csci license pool status on licserv.example.com (port 63133)",
+        "",
+    ]
+    for feature_index, feature_uses in enumerate(uses_per_feature):
+        lines += [
+            f"    feature_{feature_index:05d} v3.0",
+            f"        count: {feature_uses + 100}, # reservations: 0, inuse: {feature_uses}, "
+            "exp: 31-jan-2030",
+            "        obsolete: 0, min_remove: 120, total checkouts: 0",
+        ]
+    lines += [
+        "",
+        "    ------------------------",
+        "",
+        "    csci license usage status on licserv.example.com",
+        "",
+    ]
+    use_index = 0
+    for feature_index, feature_uses in enumerate(uses_per_feature):
+        for _ in range(feature_uses):
+            lines.append(
+                f"    feature_{feature_index:05d} v3.0: {_user(use_index)}@{_host(use_index)} 1/0 "
+                f"at 11/01 09:01  (handle: {use_index:x})"
+            )
+            use_index += 1
+    return "\n".join(lines)
+
+
+def generate_lmx_output(features: int = DEFAULT_FEATURES, uses: int = DEFAULT_USES) -> str:
+    """Generate the output of ``lmxendutil -licstatxml``."""
+    lines = [
+        "LM-X End-user Utility v3.32",
+        "Copyright (C) 2002-2010 X-Formation. All rights reserved.",
+        "",
+        "++++++++++++++++++++++++++++++++++++++++",
+        "LM-X License Server on 6200@licserv.example.com:",
+        "",
+        "Server version: v5.1 Uptime: 3 day(s) 12 hour(s) 0 min(s) 51 sec(s)",
+    ]
+    use_index = 0
+    for feature_index, feature_uses in enumerate(_spread_uses(features, uses, seed=3)):
+        lines += [
+            "----------------------------------------",
+            f"Feature: Feature{feature_index:05d} Version: 21.0 Vendor: ALTAIR",
+            "Start date: 2022-02-17 Expire date: 2030-01-31",
+            "Key type: EXCLUSIVE License sharing: CUSTOM VIRTUAL",
+            "",
+            f"{feature_uses} of {feature_uses + 100} license(s) used{':' if feature_uses else ''}",
+        ]
+        for _ in range(feature_uses):
+            lines += [
+                "",
+                f"1 license(s) used by {_user(use_index)}@{_host(use_index)} [10.0.{use_index % 256}.1]",
+                "Login time: 2022-02-18 09:26   Checkout time: 2022-02-18 09:29",
+                f"Shared on custom string: {_user(use_index)}:{_host(use_index)}",
+            ]
+            use_index += 1
+    return "\n".join(lines)
+
+
+def generate_lsdyna_output(features: int = DEFAULT_FEATURES, uses: int = DEFAULT_USES) -> str:
+    """Generate the output of ``lstc_qrun -R``."""
+    lines = [
+        "Using user specified server 31010@licserv.example.com",
+        "",
+        "LICENSE INFORMATION",
+        "",
+        "PROGRAM          EXPIRATION CPUS  USED   FREE    MAX | QUEUE",
+        "---------------- ----------      ----- ------ ------ | -----",
+    ]
+    use_index = 0
+    for feature_index, feature_uses in enumerate(_spread_uses(features, uses, seed=4)):
+        lines.append(f"PROGRAM_{feature_index:05d}    12/30/2030          -     60    500 |     0")
+        for _ in range(feature_uses):
+            lines.append(f" {_user(use_index)}     {use_index % 90000 + 1000}@{_host(use_index)}  1")
+            use_index += 1
+    lines.append(f"                   LICENSE GROUP   {uses}     60    500 |     0")
+    return "\n".join(lines)
+
+
+def generate_olicense_output(features: int = DEFAULT_FEATURES, uses: int = DEFAULT_USES) -> str:
+    """Generate the output of ``olixtool -l``."""
+    lines = [
+        "olixtool 4.8.0 - OLicense XML Status Application",
+        "Copyright (C) 2007-2013 Optimum GmbH, Karlsruhe, Germany",
+        "",
+        "Server: <10.0.0.1:31212:0> (Proxy: <>)",
+        "",
+        "List of requested licenses:",
+        "",
+    ]
+    use_index = 0
+    for feature_index, feature_uses in enumerate(_spread_uses(features, uses, seed=5)):
+        lines += [
+            "==============================================",
+            "Application:\tcosin",
+            "VersionRange:\t0-20231",
+            "Licenser:\tcosin scientific software",
+            f"License-ID:\tcosin-{feature_index:08x}@cos550218",
+            "Modules:",
+            "  Name; LicenseType; FloatCount; Expiration",
+            "  --------------------------------------------",
+            f"  feature_{feature_index:05d};         \tFreeFloating;\t{feature_uses + 100};"
+            "\t2030-12-31 23:59:59;",
+        ]
+        if feature_uses:
+            lines.append(f"    {feature_uses} FloatsLockedBy:")
+        for _ in range(feature_uses):
+            lines.append(f"      {_user(use_index)}@{_host(use_index)} #1")
+            use_index += 1
+        lines.append("")
+    return "\n".join(lines)
+
+
+def generate_dsls_output(features: int = DEFAULT_FEATURES, uses: int = DEFAULT_USES) -> str:
+    """Generate the output of ``DSLicSrv -admin`` for ``getLicenseUsage -csv``."""
+    lines = [
+        "License Administration Tool Version 6.425.4 Built on May 2, 2023, 6:45:36 PM.",
+        "admin >\tSoftware version: 6.425.4",
+        "    Build date: May 2, 2023, 6:45:36 PM",
+        "    Standalone mode",
+        "    Ready: yes",
+        "    Server name: licserv   Server id: ZSD-123",
+        "Editor,EditorId,Feature,Model,Commercial Type,Max Release Number,Max Release Date,Pricing Structure,"
+        "Max Casual Duration,Expiration Date,Customer ID,Count,Inuse,Tokens,Casual Usage (mn),Host,User,"
+        "Internal ID,Active Process,Client Code Version,Session ID,Granted Since,Last Used At,Granted At,"
+        "Queue Position,",
+    ]
+    feature_prefix = "Dassault Systemes,5E756A80"
+    feature_suffix = "Token,STD,8,2030-01-01 00:59:00,YLC,0,2030-01-01 00:59:00,10001723"
+    use_index = 0
+    for feature_index, feature_uses in enumerate(_spread_uses(features, uses, seed=6)):
+        feature = f"F{feature_index:05d}"
+        count = feature_uses + 100
+        if not feature_uses:
+            lines.append(f"{feature_prefix},{feature},{feature_suffix},{count},0,")
+        for _ in range(feature_uses):
+            lines.append(
+                f"{feature_prefix},{feature},{feature_suffix},{count},{feature_uses},1,,"
+                f"{_host(use_index)} (263.0)/127.0.0.1,{_user(use_index)},{feature},"
+                "/powerflow/pf_sim_comm ( 3148728),6.424,02DBE16,2024-09-17 17:59:34,2024-09-18 15:25:50,"
+                "2024-09-17 17:59:34,"
+            )
+            use_index += 1
+    return "\n".join(lines)
+
+
+OUTPUT_GENERATORS: Dict[str, Callable[[], str]] = {
+    "flexlm.parse_features": generate_flexlm_output,
+    "flexlm.parse": generate_flexlm_feature_output,
+    "rlm.parse": generate_rlm_output,
+    "lmx.parse": generate_lmx_output,
+    "lsdyna.parse": generate_lsdyna_output,
+    "olicense.parse": generate_olicense_output,
+    "dsls.parse": generate_dsls_output,
+}
@@ -0,0 +1,136 @@
+"""
+Benchmark the parsers with license server outputs at the scale of a large site.
+
+Since the throughput (lines parsed per second) depends on the machine, it's measured relative to a
+reference parse of the same output in the same run, which only splits the lines and matches the fields
+of each one. The relative throughput and the peak memory of each parser are compared with the baselines
+stored in ``baselines.json``. The benchmarks fail if a parser is slower or uses more memory than its
+baseline by more than ``--benchmark-tolerance``.
+
+The benchmarks are skipped by the default test run. Run them with::
+
+    uv run pytest tests/benchmarks -m benchmark --no-cov
+
+The baselines should be updated with ``--update-benchmark-baselines`` whenever a parser gets faster.
+"""
+
+import gc
+import json
+import re
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable, Dict
+
+from pytest import fixture, mark
+
+from lm_agent.metrics import get_parser_label
+from lm_agent.parsing import dsls, flexlm, lmx, lsdyna, olicense, rlm
+
+from .outputs import DEFAULT_FEATURES, DEFAULT_USES, OUTPUT_GENERATORS
+
+BASELINES_PATH = Path(__file__).parent / "baselines.json"
+ROUNDS = 5
+
+PARSERS: Dict[str, Callable[[str], dict]] = {
+    get_parser_label(parser): parser
+    for parser in [
+        flexlm.parse_features,
+        flexlm.parse,
+        rlm.parse,
+        lmx.parse,
+        lsdyna.parse,
+        olicense.parse,
+        dsls.parse,
+    ]
+}
+
+
+REFERENCE_RX = re.compile(r"\S+")
+
+
+def reference_parse(server_output: str) -> list:
+    """The least work any parser does: split the output in lines and find the fields of each line."""
+    return [REFERENCE_RX.findall(line) for line in server_output.splitlines()]
+
+
+def count_features_and_uses(parser_name: str, parsed_output: dict):
+    """Count the features and the usage lines in the parsed output, to check the whole output was parsed."""
+    if parser_name == "flexlm.parse":
+        return 1, len(parsed_output["uses"])
+
+    if parser_name == "flexlm.parse_features":
+        blocks = [block for vendor_items in parsed_output.values() for block in vendor_items.values()]
+        return len(blocks), sum(len(block["uses"]) for block in blocks)
+
+    if parser_name == "dsls.parse":
+        return len(parsed_output), sum(len(item.uses) for item in parsed_output.values())
+
+    return len(parsed_output), sum(len(item["uses"]) for item in parsed_output.values())
+
+
+def measure(parser: Callable[[str], dict], server_output: str) -> Dict[str, float]:
+    """Measure the best throughput of the parser among a few rounds, and its peak memory."""
+    line_count = server_output.count("\n") + 1
+
+    best_time = float("inf")
+    for _ in range(ROUNDS):
+        gc.collect()
+        started_at = time.perf_counter()
+        parser(server_output)
+        best_time = min(best_time, time.perf_counter() - started_at)
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        parser(server_output)
+        _, peak_memory = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {"lines_per_second": round(line_count / best_time), "peak_memory_bytes": peak_memory}
+
+
+@fixture(scope="module")
+def baselines() -> Dict[str, Dict[str, float]]:
+    return json.loads(BASELINES_PATH.read_text())
+
+
+@mark.benchmark
+@mark.parametrize("parser_name", list(PARSERS))
+def test_parser_benchmark(parser_name, baselines, update_benchmark_baselines, benchmark_tolerance):
+    """
+    Check that the parser parses the whole output, and that it isn't slower or heavier than its baseline.
+    """
+    parser = PARSERS[parser_name]
+    server_output = OUTPUT_GENERATORS[parser_name]()
+
+    expected_features = 1 if parser_name == "flexlm.parse" else DEFAULT_FEATURES
+    assert count_features_and_uses(parser_name, parser(server_output)) == (expected_features, DEFAULT_USES)
+
+    parser_measurement = measure(parser, server_output)
+    reference_measurement = measure(reference_parse, server_output)
+    measurement = {
+        "relative_throughput": round(
+            parser_measurement["lines_per_second"] / reference_measurement["lines_per_second"], 3
+        ),
+        "peak_memory_bytes": parser_measurement["peak_memory_bytes"],
+    }
+    print(f"{parser_name}: {parser_measurement}, reference: {reference_measurement}")
+
+    if update_benchmark_baselines:
+        baselines[parser_name] = measurement
+        BASELINES_PATH.write_text(json.dumps(dict(sorted(baselines.items())), indent=4) + "\n")
+        return
+
+    baseline = baselines[parser_name]
+    assert measurement["relative_throughput"] >= baseline["relative_throughput"] * (
+        1 - benchmark_tolerance
+    ), (
+        f"{parser_name} parsed {measurement['relative_throughput']} times as many lines/s "
+        f"as the reference parse, the baseline is {baseline['relative_throughput']}"
+    )
+    assert measurement["peak_memory_bytes"] <= baseline["peak_memory_bytes"] * (1 + benchmark_tolerance), (
+        f"{parser_name} used {measurement['peak_memory_bytes']} bytes at peak, "
+        f"the baseline is {baseline['peak_memory_bytes']} bytes"
+    )
@@ -9,6 +9,7 @@ import httpx
 import respx
 from pytest import fixture
 
+from lm_agent.backend_utils.utils import JobIndex, TokenManager
 from lm_agent.config import settings
 from lm_agent.models import (
     BookingSchema,
@@ -20,6 +21,22 @@ from lm_agent.models import (
     LicenseServerType,
     ProductSchema,
 )
+from lm_agent.services.license_report import LicenseReportCache
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        "--update-benchmark-baselines",
+        action="store_true",
+        default=False,
+        help="Store the measurements of the parser benchmarks as the new baselines.",
+    )
+    parser.addoption(
+        "--benchmark-tolerance",
+        type=float,
+        default=0.3,
+        help="Fraction the parser benchmarks may be worse than the baselines before failing.",
+    )
 
 
 @fixture(autouse=True)
@@ -31,6 +48,15 @@ def mock_cache_dir(tmp_path):
         yield _cache_dir
 
 
+@fixture(autouse=True)
+def mock_reconcile_lock_dir(tmp_path):
+    """Mock the directory of the reconciliation lock."""
+    _reconcile_lock_dir = tmp_path / "license-manager-reconcile"
+    assert not _reconcile_lock_dir.exists()
+    with patch("lm_agent.config.settings.RECONCILE_LOCK_DIR", new=_reconcile_lock_dir):
+        yield _reconcile_lock_dir
+
+
 @fixture(autouse=True)
 def mock_log_dir(tmp_path):
     """Mock a log directory."""
@@ -40,6 +66,31 @@ def mock_log_dir(tmp_path):
         yield _log_dir
 
 
+@fixture(autouse=True)
+def reset_backend_client():
+    """Make sure each test gets its own shared backend client, token manager, local copies and job index."""
+    with patch("lm_agent.backend_utils.utils._backend_client", new=None):
+        with patch("lm_agent.backend_utils.utils.token_manager", new=TokenManager()):
+            with patch.dict("lm_agent.backend_utils.utils._local_copies", clear=True):
+                with patch("lm_agent.backend_utils.utils.job_index", new=JobIndex()):
+                    yield
+
+
+@fixture(autouse=True)
+def reset_last_healthy_servers():
+    """Make sure each test starts querying the license servers from the first one."""
+    with patch.dict("lm_agent.server_interfaces.license_server_interface._last_healthy_servers", clear=True):
+        yield
+
+
+@fixture(autouse=True)
+def reset_license_report_cache():
+    """Make sure each test starts without previous license reports or queries in flight."""
+    with patch("lm_agent.services.license_report.license_report_cache", new=LicenseReportCache()):
+        with patch.dict("lm_agent.services.license_report._refresh_tasks", clear=True):
+            yield
+
+
 @fixture
 def license_servers():
     """List of license servers."""
@@ -325,33 +376,6 @@ def features():
     ]
 
 
-@fixture
-def parsed_features():
-    """Some parsed features reponse examples."""
-    return [
-        FeatureSchema(
-            id=1,
-            name="abaqus",
-            product=ProductSchema(id=1, name="abaqus"),
-            config_id=1,
-            reserved=100,
-            total=123,
-            used=12,
-            booked_total=12,
-        ),
-        FeatureSchema(
-            id=2,
-            name="abaqus",
-            product=ProductSchema(id=1, name="abaqus"),
-            config_id=2,
-            reserved=100,
-            total=123,
-            used=12,
-            booked_total=50,
-        ),
-    ]
-
-
 @fixture
 def one_report_item():
     """Report item from a feature."""
@@ -716,6 +740,63 @@ def flexlm_output_5():
     )
 
 
+@fixture
+def flexlm_output_all_features():
+    """Some lmstat -a output with features from multiple vendor daemons to parse."""
+    return dedent(
+        """\
+        lmutil - Copyright (c) 1989-2012 Flexera Software LLC. All Rights Reserved.
+        Flexible License Manager status on Wed 7/3/2024 14:36
+
+        License server status: 2345@127.0.0.1
+            License file(s) on 127.0.0.1: /opt/flexlm/license.dat:
+
+        127.0.0.1: license server UP (MASTER) v11.16.2
+
+        Vendor daemon status (on 127.0.0.1):
+
+            vendora: UP v11.16.2
+            vendorb: UP v11.16.2
+        Feature usage info:
+
+        Users of features served by vendora:
+        Users of TESTFEATURE:  (Total of 1000 licenses issued;  Total of 93 licenses in use)
+
+          "TESTFEATURE" v62.2, vendor: vendora, expiry: 1-jan-0
+          floating license
+
+            sdmfva myserver.example.com /dev/tty (v62.2) (myserver.example.com/24200 12507), start Thu 10/29 8:09, 29 licenses
+            adfdna myserver.example.com /dev/tty (v62.2) (myserver.example.com/24200 12507), start Thu 10/29 8:09, 64 licenses
+
+        Users of OTHERFEATURE:  (Total of 10 licenses issued;  Total of 0 licenses in use)
+
+        Users of NODELOCKED:  (Uncounted, node-locked)
+
+          "NODELOCKED" v1.0, vendor: vendora, expiry: 1-jan-0
+            ghost myserver.example.com /dev/tty (v1.0) (myserver.example.com/24200 12507), start Thu 10/29 8:09, 1 license
+
+        Users of SHARED:  (Total of 5 licenses issued;  Total of 1 license in use)
+
+          "SHARED" v1.0, vendor: vendora, expiry: 1-jan-0
+          floating license
+
+            usera host-a.example.com /dev/tty (v1.0) (myserver.example.com/24200 12507), start Thu 10/29 8:09, 1 license
+
+        Users of IDLE:  (Total of 3 licenses issued;  Total of 0 licenses in use)
+
+        Users of features served by vendorb:
+        Users of SHARED:  (Total of 20 licenses issued;  Total of 2 licenses in use)
+
+          "SHARED" v3.1, vendor: vendorb, expiry: 1-jan-0
+          floating license
+
+            userb host-b.example.com /dev/tty (v3.1) (myserver.example.com/24201 2345), start Thu 10/29 8:09, 2 licenses
+
+        Users of IDLE:  (Total of 4 licenses issued;  Total of 0 licenses in use)
+        """
+    )
+
+
 @fixture
 def flexlm_output_no_licenses():
     """Some lmstat output with no licenses in use to parse."""
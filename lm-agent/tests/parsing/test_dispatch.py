@@ -0,0 +1,55 @@
+"""
+Test the line dispatch shared by the parsers.
+"""
+
+from unittest import mock
+
+from pytest import mark
+
+from lm_agent.parsing.dispatch import LineDispatcher, LineRule, iter_lines
+
+
+@mark.parametrize(
+    "server_output",
+    [
+        "first line\nsecond line\r\n\nlast line",
+        ["first line\nsecond line\r\n\nlast line"],
+        ["first", " line\n", "second line\r", "\n\nlast", " line"],
+        ["first line\n", "second line\r\n", "\n", "last line", ""],
+    ],
+)
+def test_iter_lines(server_output):
+    """
+    Are the lines the same whether the output is a string or split in chunks anywhere?
+    """
+    assert list(iter_lines(server_output)) == ["first line", "second line", "", "last line"]
+
+
+def test_dispatch__uses_the_first_matching_rule():
+    """
+    Is each line parsed by the first rule whose prefix, keyword and line parser match it?
+    """
+    dispatcher = LineDispatcher(
+        LineRule("feature", lambda line: line.split()[-1] if line.endswith("!") else None, prefix="Feature"),
+        LineRule("other_feature", prefix="Feature"),
+        LineRule("usage", str.upper, keyword="@"),
+    )
+
+    assert list(dispatcher.dispatch("Feature a!\nFeature b\n\nuser@host\nnothing to see\n")) == [
+        ("feature", "a!"),
+        ("other_feature", "Feature b"),
+        ("usage", "USER@HOST"),
+    ]
+
+
+def test_dispatch__only_parses_lines_passing_the_cheap_checks():
+    """
+    Are the line parsers only called for the lines with the prefix and keyword of their rule?
+    """
+    parse_line = mock.Mock(return_value="parsed")
+    dispatcher = LineDispatcher(LineRule("usage", parse_line, prefix="  ", keyword="@"))
+
+    parsed = list(dispatcher.dispatch("header@server\n  user@host\n  other line\n"))
+
+    assert parsed == [("usage", "parsed")]
+    parse_line.assert_called_once_with("  user@host")
@@ -5,7 +5,13 @@ Test the FlexLM parser.
 from pytest import mark
 
 from lm_agent.models import LicenseUsesItem
-from lm_agent.parsing.flexlm import parse, parse_feature_line, parse_usage_line
+from lm_agent.parsing.flexlm import (
+    parse,
+    parse_feature_line,
+    parse_features,
+    parse_usage_line,
+    parse_vendor_line,
+)
 
 
 @mark.parametrize(
@@ -68,6 +74,14 @@ def test_parse_feature_line(line, result):
                 booked=29,
             ),
         ),
+        (
+            "    user1 myserver.example.com /dev/tty (v62.2) (myserver.example.com/24200 12507), start Thu 10/29 8:09, 1 license",
+            LicenseUsesItem(
+                username="user1",
+                lead_host="myserver.example.com",
+                booked=1,
+            ),
+        ),
         (
             "    user2 another.server.com /dev/tty feature=feature (v2023.0) (another.server.com/41020 10223), start Mon 3/11 13:16, 100 licenses",
             LicenseUsesItem(
@@ -212,3 +226,84 @@ def test_parse__not_licenses_output(flexlm_output_no_licenses):
         "used": 0,
         "uses": [],
     }
+
+
+@mark.parametrize(
+    "line,result",
+    [
+        ('  "TESTFEATURE" v62.2, vendor: vendora, expiry: 1-jan-0', "vendora"),
+        ('  "ccmppower" v2025.09, vendor: ABC', "abc"),
+        ("  floating license", None),
+        ("", None),
+    ],
+)
+def test_parse_vendor_line(line, result):
+    """
+    Does the regex for the vendor line match the lines in the output?
+    """
+    assert parse_vendor_line(line) == result
+
+
+def test_parse_features__all_features_output(flexlm_output_all_features):
+    """
+    Does the parser return all features, mapped by vendor daemon, for the lmstat -a output?
+
+    Features without counters (e.g. uncounted licenses) should be ignored along with their usage lines.
+    The vendor daemon of the features without usage lines should be taken from the vendor header line.
+    """
+    assert parse_features(flexlm_output_all_features) == {
+        "testfeature": {
+            "vendora": {
+                "total": 1000,
+                "used": 93,
+                "uses": [
+                    LicenseUsesItem(username="sdmfva", lead_host="myserver.example.com", booked=29),
+                    LicenseUsesItem(username="adfdna", lead_host="myserver.example.com", booked=64),
+                ],
+            },
+        },
+        "otherfeature": {"vendora": {"total": 10, "used": 0, "uses": []}},
+        "shared": {
+            "vendora": {
+                "total": 5,
+                "used": 1,
+                "uses": [LicenseUsesItem(username="usera", lead_host="host-a.example.com", booked=1)],
+            },
+            "vendorb": {
+                "total": 20,
+                "used": 2,
+                "uses": [LicenseUsesItem(username="userb", lead_host="host-b.example.com", booked=2)],
+            },
+        },
+        "idle": {
+            "vendora": {"total": 3, "used": 0, "uses": []},
+            "vendorb": {"total": 4, "used": 0, "uses": []},
+        },
+    }
+
+
+def test_parse_features__single_feature_output(flexlm_output_4):
+    """
+    Does the parser also handle the output for a single feature?
+    """
+    parsed_features = parse_features(flexlm_output_4)
+
+    assert list(parsed_features) == ["mscone"]
+    assert parsed_features["mscone"][""]["total"] == 750
+    assert len(parsed_features["mscone"][""]["uses"]) == 6
+
+
+def test_parse_features__bad_output(flexlm_output_bad):
+    """
+    Does the parser return an empty dict for unparseable output?
+    """
+    assert parse_features(flexlm_output_bad) == {}
+
+
+def test_parse_features__output_in_chunks(flexlm_output_all_features):
+    """
+    Does the parser return the same features when the output is read in chunks?
+    """
+    chunks = [flexlm_output_all_features[i : i + 7] for i in range(0, len(flexlm_output_all_features), 7)]
+
+    assert parse_features(chunks) == parse_features(flexlm_output_all_features)
@@ -7,6 +7,7 @@ from unittest import mock
 from pytest import fixture, mark, raises
 
 from lm_agent.config import settings
+from lm_agent.constants import LicenseServerType
 from lm_agent.exceptions import CommandFailedToExecute, LicenseManagerBadServerOutput
 from lm_agent.models import LicenseReportItem
 from lm_agent.server_interfaces.flexlm import FlexLMLicenseServer
@@ -148,3 +149,111 @@ async def test_flexlm_get_report_item_continues_on_exception(
             {"username": "sdmfva", "lead_host": "myserver.example.com", "booked": 37},
         ],
     )
+
+
+def test_get_flexlm_batch_commands_list(flexlm_server: FlexLMLicenseServer):
+    """
+    Do the commands for querying all features in the license server have the correct data?
+    """
+    assert flexlm_server.get_batch_commands_list() == [
+        [
+            f"{settings.LMUTIL_PATH}",
+            "lmstat",
+            "-c",
+            "2345@127.0.0.1",
+            "-a",
+        ]
+    ]
+
+
+@mark.asyncio
+@mock.patch("lm_agent.server_interfaces.flexlm.run_command")
+async def test_flexlm_get_report_items__queries_server_once(
+    run_command_mock: mock.MagicMock,
+    flexlm_server: FlexLMLicenseServer,
+    flexlm_output_all_features: str,
+):
+    """
+    Do the FlexLM server interface generate the report items for all features with a single lmstat call?
+    """
+    run_command_mock.return_value = flexlm_output_all_features
+
+    report_items = await flexlm_server.get_report_items(
+        [
+            (1, "testproduct.testfeature"),
+            (2, "testproduct.otherfeature"),
+            (3, "vendorb.shared"),
+            (4, "vendorb.idle"),
+        ]
+    )
+
+    run_command_mock.assert_awaited_once_with(
+        [f"{settings.LMUTIL_PATH}", "lmstat", "-c", "2345@127.0.0.1", "-a"], tool=LicenseServerType.FLEXLM
+    )
+    assert report_items == [
+        LicenseReportItem(
+            feature_id=1,
+            product_feature="testproduct.testfeature",
+            used=93,
+            total=1000,
+            uses=[
+                {"username": "sdmfva", "lead_host": "myserver.example.com", "booked": 29},
+                {"username": "adfdna", "lead_host": "myserver.example.com", "booked": 64},
+            ],
+        ),
+        LicenseReportItem(
+            feature_id=2, product_feature="testproduct.otherfeature", used=0, total=10, uses=[]
+        ),
+        LicenseReportItem(
+            feature_id=3,
+            product_feature="vendorb.shared",
+            used=2,
+            total=20,
+            uses=[{"username": "userb", "lead_host": "host-b.example.com", "booked": 2}],
+        ),
+        LicenseReportItem(feature_id=4, product_feature="vendorb.idle", used=0, total=4, uses=[]),
+    ]
+
+
+@mark.asyncio
+@mock.patch("lm_agent.server_interfaces.flexlm.FlexLMLicenseServer.get_output_from_server")
+async def test_flexlm_get_report_items__ambiguous_vendor(
+    get_output_from_server_mock: mock.MagicMock,
+    flexlm_server: FlexLMLicenseServer,
+    flexlm_output_all_features: str,
+):
+    """
+    Do the FlexLM server interface fail only the features served by multiple vendor daemons
+    when the product name doesn't identify the vendor daemon?
+    """
+    get_output_from_server_mock.return_value = flexlm_output_all_features
+
+    report_items = await flexlm_server.get_report_items(
+        [(1, "testproduct.shared"), (2, "testproduct.otherfeature")]
+    )
+
+    assert isinstance(report_items[0], LicenseManagerBadServerOutput)
+    assert report_items[1] == LicenseReportItem(
+        feature_id=2, product_feature="testproduct.otherfeature", used=0, total=10, uses=[]
+    )
+
+
+@mark.asyncio
+@mock.patch("lm_agent.server_interfaces.flexlm.settings.FLEXLM_BATCH_QUERY", new=False)
+@mock.patch("lm_agent.server_interfaces.flexlm.FlexLMLicenseServer.get_output_from_server")
+async def test_flexlm_get_report_items__batch_query_disabled(
+    get_output_from_server_mock: mock.MagicMock,
+    flexlm_server: FlexLMLicenseServer,
+    flexlm_output: str,
+):
+    """
+    Do the FlexLM server interface query each feature individually when the batch query is disabled?
+    """
+    get_output_from_server_mock.return_value = flexlm_output
+
+    report_items = await flexlm_server.get_report_items([(1, "testproduct.testfeature")])
+
+    get_output_from_server_mock.assert_awaited_once_with("testproduct.testfeature")
+    assert len(report_items) == 1
+    assert isinstance(report_items[0], LicenseReportItem)
+    assert report_items[0].total == 1000
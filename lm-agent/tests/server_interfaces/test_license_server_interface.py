@@ -0,0 +1,130 @@
+"""
+Test how the license servers of a configuration are queried.
+"""
+
+import asyncio
+from unittest import mock
+
+from pytest import fixture, mark, raises
+
+from lm_agent.config import settings
+from lm_agent.exceptions import CommandFailedToExecute
+from lm_agent.models import LicenseServerSchema
+from lm_agent.server_interfaces.rlm import RLMLicenseServer
+
+
+@fixture
+def rlm_server() -> RLMLicenseServer:
+    return RLMLicenseServer(
+        [
+            LicenseServerSchema(id=1, config_id=1, host="licserv1", port=2345),
+            LicenseServerSchema(id=2, config_id=1, host="licserv2", port=2345),
+            LicenseServerSchema(id=3, config_id=1, host="licserv3", port=2345),
+        ]
+    )
+
+
+def get_host(cmd):
+    """Return the host queried by the rlmutil command."""
+    return cmd[3].split("@")[1]
+
+
+@mark.asyncio
+async def test_query_license_servers__starts_from_the_last_healthy_server(rlm_server: RLMLicenseServer):
+    """
+    Check that the license server that answered last is queried first in the next query.
+    """
+    queried_hosts = []
+
+    async def run(cmd):
+        queried_hosts.append(get_host(cmd))
+        if get_host(cmd) == "licserv1":
+            raise CommandFailedToExecute("licserv1 is down")
+        return f"output from {get_host(cmd)}"
+
+    commands_to_run = rlm_server.get_commands_list()
+    assert await rlm_server.query_license_servers(commands_to_run, run, "RLM") == "output from licserv2"
+    assert await rlm_server.query_license_servers(commands_to_run, run, "RLM") == "output from licserv2"
+
+    assert queried_hosts == ["licserv1", "licserv2", "licserv2"]
+
+
+@mark.asyncio
+async def test_query_license_servers__wraps_around_the_list(rlm_server: RLMLicenseServer):
+    """
+    Check that the servers before the last healthy one are queried if the servers after it fail.
+    """
+    queried_hosts = []
+    down_hosts = {"licserv1", "licserv2"}
+
+    async def run(cmd):
+        queried_hosts.append(get_host(cmd))
+        if get_host(cmd) in down_hosts:
+            return ""
+        return f"output from {get_host(cmd)}"
+
+    commands_to_run = rlm_server.get_commands_list()
+    assert await rlm_server.query_license_servers(commands_to_run, run, "RLM") == "output from licserv3"
+
+    down_hosts = {"licserv3"}
+    queried_hosts.clear()
+    assert await rlm_server.query_license_servers(commands_to_run, run, "RLM") == "output from licserv1"
+
+    assert queried_hosts == ["licserv3", "licserv1"]
+
+
+@mark.asyncio
+async def test_query_license_servers__raises_exception_if_no_server_answers(rlm_server: RLMLicenseServer):
+    """
+    Check that an exception is raised if none of the license servers answers.
+    """
+    run = mock.AsyncMock(side_effect=CommandFailedToExecute("down"))
+
+    with raises(RuntimeError, match="None of the checks for RLM succeeded!"):
+        await rlm_server.query_license_servers(rlm_server.get_commands_list(), run, "RLM")
+
+    assert run.await_count == 3
+
+
+@mark.asyncio
+async def test_query_license_servers__hedges_slow_servers(rlm_server: RLMLicenseServer):
+    """
+    Check that the next license server is queried if the current one is slow, and the slow query is cancelled.
+    """
+    cancelled_hosts = []
+
+    async def run(cmd):
+        try:
+            if get_host(cmd) == "licserv1":
+                await asyncio.sleep(10)
+            return f"output from {get_host(cmd)}"
+        except asyncio.CancelledError:
+            cancelled_hosts.append(get_host(cmd))
+            raise
+
+    with mock.patch.object(settings, "LICENSE_SERVER_HEDGE_DELAY", 0.05):
+        output = await asyncio.wait_for(
+            rlm_server.query_license_servers(rlm_server.get_commands_list(), run, "RLM"), timeout=1
+        )
+
+    assert output == "output from licserv2"
+    assert cancelled_hosts == ["licserv1"]
+
+
+@mark.asyncio
+async def test_query_license_servers__hedging_moves_on_when_a_server_fails(rlm_server: RLMLicenseServer):
+    """
+    Check that a failure doesn't wait for the hedge delay before querying the next license server.
+    """
+
+    async def run(cmd):
+        if get_host(cmd) != "licserv3":
+            raise CommandFailedToExecute(f"{get_host(cmd)} is down")
+        return "output from licserv3"
+
+    with mock.patch.object(settings, "LICENSE_SERVER_HEDGE_DELAY", 10):
+        output = await asyncio.wait_for(
+            rlm_server.query_license_servers(rlm_server.get_commands_list(), run, "RLM"), timeout=1
+        )
+
+    assert output == "output from licserv3"
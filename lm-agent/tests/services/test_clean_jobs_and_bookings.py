@@ -235,7 +235,7 @@ def test__get_usages_mapping(parsed_report_items):
 
 
 @mark.asyncio
-@mock.patch("lm_agent.services.clean_jobs_and_bookings.remove_job_by_slurm_job_id")
+@mock.patch("lm_agent.services.clean_jobs_and_bookings.remove_jobs_by_slurm_job_ids")
 async def test__clean_jobs_without_bookings__removes_job(
     remove_job_mock, one_parsed_job, parsed_job_without_bookings
 ):
@@ -246,12 +246,12 @@ async def test__clean_jobs_without_bookings__removes_job(
 
     remaining_jobs_with_bookings = await clean_jobs_without_bookings(cluster_jobs)
 
-    remove_job_mock.assert_called_once_with(parsed_job_without_bookings.slurm_job_id)
+    remove_job_mock.assert_awaited_once_with([parsed_job_without_bookings.slurm_job_id])
     assert remaining_jobs_with_bookings == [one_parsed_job]
 
 
 @mark.asyncio
-@mock.patch("lm_agent.services.clean_jobs_and_bookings.remove_job_by_slurm_job_id")
+@mock.patch("lm_agent.services.clean_jobs_and_bookings.remove_jobs_by_slurm_job_ids")
 async def test__clean_jobs_without_bookings__no_jobs_to_remove(remove_job_mock, one_parsed_job):
     """
     Test that the function doesn't remove any job when all jobs have bookings.
@@ -265,8 +265,8 @@ async def test__clean_jobs_without_bookings__no_jobs_to_remove(remove_job_mock,
 
 
 @mark.asyncio
-@mock.patch("lm_agent.services.clean_jobs_and_bookings.remove_job_by_slurm_job_id")
-async def test__clean_jobs_no_longer_running__not_running(remove_job_by_slurm_job_id_mock, parsed_jobs):
+@mock.patch("lm_agent.services.clean_jobs_and_bookings.remove_jobs_by_slurm_job_ids")
+async def test__clean_jobs_no_longer_running__not_running(remove_jobs_mock, parsed_jobs):
     """
     Check that the jobs that aren't running are cleaned.
     """
@@ -278,14 +278,13 @@ async def test__clean_jobs_no_longer_running__not_running(remove_job_by_slurm_jo
 
     remaining_jobs_with_bookings = await clean_jobs_no_longer_running(parsed_jobs, squeue_result)
 
-    assert remove_job_by_slurm_job_id_mock.call_count == 2
-    remove_job_by_slurm_job_id_mock.assert_has_calls([mock.call("456"), mock.call("789")])
+    remove_jobs_mock.assert_awaited_once_with(["456", "789"])
     assert remaining_jobs_with_bookings == [parsed_jobs[0]]
 
 
 @mark.asyncio
-@mock.patch("lm_agent.services.clean_jobs_and_bookings.remove_job_by_slurm_job_id")
-async def test__clean_jobs_no_longer_running__not_in_squeue(remove_job_by_slurm_job_id_mock, parsed_jobs):
+@mock.patch("lm_agent.services.clean_jobs_and_bookings.remove_jobs_by_slurm_job_ids")
+async def test__clean_jobs_no_longer_running__not_in_squeue(remove_jobs_mock, parsed_jobs):
     """
     Check that the jobs that aren't in the squeue result are cleaned.
     """
@@ -295,14 +294,13 @@ async def test__clean_jobs_no_longer_running__not_in_squeue(remove_job_by_slurm_
 
     remaining_jobs_with_bookings = await clean_jobs_no_longer_running(parsed_jobs, squeue_result)
 
-    assert remove_job_by_slurm_job_id_mock.call_count == 2
-    remove_job_by_slurm_job_id_mock.assert_has_calls([mock.call("456"), mock.call("789")])
+    remove_jobs_mock.assert_awaited_once_with(["456", "789"])
     assert remaining_jobs_with_bookings == [parsed_jobs[0]]
 
 
 @mark.asyncio
-@mock.patch("lm_agent.services.clean_jobs_and_bookings.remove_job_by_slurm_job_id")
-async def test__clean_jobs_no_longer_running__no_squeue_result(remove_job_by_slurm_job_id_mock, parsed_jobs):
+@mock.patch("lm_agent.services.clean_jobs_and_bookings.remove_jobs_by_slurm_job_ids")
+async def test__clean_jobs_no_longer_running__no_squeue_result(remove_jobs_mock, parsed_jobs):
     """
     Check that all jobs are cleaned if there are no jobs in the squeue result.
     """
@@ -310,15 +308,14 @@ async def test__clean_jobs_no_longer_running__no_squeue_result(remove_job_by_slu
 
     remaining_jobs_with_bookings = await clean_jobs_no_longer_running(parsed_jobs, squeue_result)
 
-    assert remove_job_by_slurm_job_id_mock.call_count == 3
-    remove_job_by_slurm_job_id_mock.assert_has_calls([mock.call("123"), mock.call("456"), mock.call("789")])
+    remove_jobs_mock.assert_awaited_once_with(["123", "456", "789"])
     assert remaining_jobs_with_bookings == []
 
 
 @mark.asyncio
-@mock.patch("lm_agent.services.clean_jobs_and_bookings.remove_job_by_slurm_job_id")
+@mock.patch("lm_agent.services.clean_jobs_and_bookings.remove_jobs_by_slurm_job_ids")
 async def test__clean_jobs_by_grace_time__grace_time_expired(
-    remove_job_by_slurm_job_id_mock,
+    remove_jobs_mock,
     parsed_jobs,
 ):
     """
@@ -337,14 +334,14 @@ async def test__clean_jobs_by_grace_time__grace_time_expired(
 
     remaining_jobs = await clean_jobs_by_grace_time(parsed_jobs, squeue_result, grace_times)
 
-    remove_job_by_slurm_job_id_mock.assert_awaited_once_with(slurm_job_id)
+    remove_jobs_mock.assert_awaited_once_with([slurm_job_id])
     assert len(remaining_jobs) == 2
 
 
 @mark.asyncio
-@mock.patch("lm_agent.services.clean_jobs_and_bookings.remove_job_by_slurm_job_id")
+@mock.patch("lm_agent.services.clean_jobs_and_bookings.remove_jobs_by_slurm_job_ids")
 async def test__clean_jobs_by_grace_time__within_grace_time(
-    remove_job_by_slurm_job_id_mock,
+    remove_jobs_mock,
     parsed_jobs,
 ):
     """
@@ -361,14 +358,14 @@ async def test__clean_jobs_by_grace_time__within_grace_time(
 
     remaining_jobs = await clean_jobs_by_grace_time(parsed_jobs, squeue_result, grace_times)
 
-    remove_job_by_slurm_job_id_mock.assert_not_called()
+    remove_jobs_mock.assert_not_called()
     assert remaining_jobs == parsed_jobs
 
 
 @mark.asyncio
-@mock.patch("lm_agent.services.clean_jobs_and_bookings.remove_job_by_slurm_job_id")
+@mock.patch("lm_agent.services.clean_jobs_and_bookings.remove_jobs_by_slurm_job_ids")
 async def test__clean_jobs_by_grace_time__no_jobs(
-    remove_job_by_slurm_job_id_mock,
+    remove_jobs_mock,
 ):
     """
     Check that the function doesn't do anything when there are no jobs.
@@ -378,12 +375,12 @@ async def test__clean_jobs_by_grace_time__no_jobs(
 
     remaining_jobs = await clean_jobs_by_grace_time([], squeue_result, grace_times)
 
-    remove_job_by_slurm_job_id_mock.assert_not_called()
+    remove_jobs_mock.assert_not_called()
     assert remaining_jobs == []
 
 
 @mark.asyncio
-@mock.patch("lm_agent.services.clean_jobs_and_bookings.remove_booking")
+@mock.patch("lm_agent.services.clean_jobs_and_bookings.remove_bookings")
 async def test__clean_bookings_by_usage__only_one_booking(remove_bookings_mock):
     """
     Test that the bookings can be cleaned by usage when there is only one booking.
@@ -416,11 +413,11 @@ async def test__clean_bookings_by_usage__only_one_booking(remove_bookings_mock):
 
     await clean_bookings_by_usage(cluster_jobs, report_items)
 
-    remove_bookings_mock.assert_called_once_with(1)
+    remove_bookings_mock.assert_awaited_once_with([1])
 
 
 @mark.asyncio
-@mock.patch("lm_agent.services.clean_jobs_and_bookings.remove_booking")
+@mock.patch("lm_agent.services.clean_jobs_and_bookings.remove_bookings")
 async def test__clean_bookings_by_usage__multiple_bookings(remove_bookings_mock):
     cluster_jobs = [
         JobSchema(
@@ -459,11 +456,11 @@ async def test__clean_bookings_by_usage__multiple_bookings(remove_bookings_mock)
 
     await clean_bookings_by_usage(cluster_jobs, report_items)
 
-    remove_bookings_mock.assert_has_calls([mock.call(1), mock.call(2)])
+    remove_bookings_mock.assert_awaited_once_with([1, 2])
 
 
 @mark.asyncio
-@mock.patch("lm_agent.services.clean_jobs_and_bookings.remove_booking")
+@mock.patch("lm_agent.services.clean_jobs_and_bookings.remove_bookings")
 async def test__clean_bookings_by_usage__multiple_jobs(remove_bookings_mock):
     cluster_jobs = [
         JobSchema(
@@ -503,11 +500,11 @@ async def test__clean_bookings_by_usage__multiple_jobs(remove_bookings_mock):
 
     await clean_bookings_by_usage(cluster_jobs, report_items)
 
-    remove_bookings_mock.assert_has_calls([mock.call(1), mock.call(2)])
+    remove_bookings_mock.assert_awaited_once_with([1, 2])
 
 
 @mark.asyncio
-@mock.patch("lm_agent.services.clean_jobs_and_bookings.remove_booking")
+@mock.patch("lm_agent.services.clean_jobs_and_bookings.remove_bookings")
 async def test__clean_bookings_by_usage__multiple_bookings_with_same_information(remove_bookings_mock):
     cluster_jobs = [
         JobSchema(
@@ -547,12 +544,12 @@ async def test__clean_bookings_by_usage__multiple_bookings_with_same_information
 
     await clean_bookings_by_usage(cluster_jobs, report_items)
 
-    remove_bookings_mock.assert_has_calls([mock.call(1), mock.call(2)])
+    remove_bookings_mock.assert_awaited_once_with([1, 2])
 
 
 @mark.asyncio
-@mock.patch("lm_agent.services.clean_jobs_and_bookings.remove_booking")
-async def test__clean_bookings_by_usage__more_bookings_than_usage(remove_booking_mock):
+@mock.patch("lm_agent.services.clean_jobs_and_bookings.remove_bookings")
+async def test__clean_bookings_by_usage__more_bookings_than_usage(remove_bookings_mock):
     cluster_jobs = [
         JobSchema(
             id=1,
@@ -590,12 +587,12 @@ async def test__clean_bookings_by_usage__more_bookings_than_usage(remove_booking
 
     await clean_bookings_by_usage(cluster_jobs, report_items)
 
-    remove_booking_mock.assert_not_called()
+    remove_bookings_mock.assert_not_called()
 
 
 @mark.asyncio
-@mock.patch("lm_agent.services.clean_jobs_and_bookings.remove_booking")
-async def test__clean_bookings_by_usage__more_usages_than_bookings(remove_booking_mock):
+@mock.patch("lm_agent.services.clean_jobs_and_bookings.remove_bookings")
+async def test__clean_bookings_by_usage__more_usages_than_bookings(remove_bookings_mock):
     cluster_jobs = [
         JobSchema(
             id=1,
@@ -624,12 +621,12 @@ async def test__clean_bookings_by_usage__more_usages_than_bookings(remove_bookin
 
     await clean_bookings_by_usage(cluster_jobs, report_items)
 
-    remove_booking_mock.assert_not_called()
+    remove_bookings_mock.assert_not_called()
 
 
 @mark.asyncio
-@mock.patch("lm_agent.services.clean_jobs_and_bookings.remove_booking")
-async def test__clean_bookings_by_usage__no_bookings(remove_booking_mock):
+@mock.patch("lm_agent.services.clean_jobs_and_bookings.remove_bookings")
+async def test__clean_bookings_by_usage__no_bookings(remove_bookings_mock):
     cluster_jobs = [
         JobSchema(
             id=1,
@@ -664,13 +661,13 @@ async def test__clean_bookings_by_usage__no_bookings(remove_booking_mock):
 
     await clean_bookings_by_usage(cluster_jobs, report_items)
 
-    remove_booking_mock.assert_not_called()
+    remove_bookings_mock.assert_not_called()
 
 
 @mark.asyncio
-@mock.patch("lm_agent.services.clean_jobs_and_bookings.remove_job_by_slurm_job_id")
+@mock.patch("lm_agent.services.clean_jobs_and_bookings.remove_jobs_by_slurm_job_ids")
 async def test__clean_jobs_and_bookings__remove_jobs_without_bookings(
-    remove_job_by_slurm_job_id_mock,
+    remove_jobs_mock,
     parsed_configurations,
     parsed_report_items,
     one_parsed_job,
@@ -688,13 +685,13 @@ async def test__clean_jobs_and_bookings__remove_jobs_without_bookings(
 
     await clean_jobs_and_bookings(parsed_configurations, cluster_jobs, squeue_result, parsed_report_items)
 
-    remove_job_by_slurm_job_id_mock.assert_called_once_with("789")
+    remove_jobs_mock.assert_called_once_with(["789"])
 
 
 @mark.asyncio
-@mock.patch("lm_agent.services.clean_jobs_and_bookings.remove_job_by_slurm_job_id")
+@mock.patch("lm_agent.services.clean_jobs_and_bookings.remove_jobs_by_slurm_job_ids")
 async def test__clean_jobs_and_bookings__remove_jobs_no_longer_running(
-    remove_job_by_slurm_job_id_mock, parsed_configurations, parsed_report_items, parsed_jobs
+    remove_jobs_mock, parsed_configurations, parsed_report_items, parsed_jobs
 ):
     squeue_result = [
         {"job_id": 456, "run_time_in_seconds": 15, "state": "RUNNING"},
@@ -703,13 +700,13 @@ async def test__clean_jobs_and_bookings__remove_jobs_no_longer_running(
 
     await clean_jobs_and_bookings(parsed_configurations, parsed_jobs, squeue_result, parsed_report_items)
 
-    remove_job_by_slurm_job_id_mock.assert_called_once_with("123")
+    remove_jobs_mock.assert_called_once_with(["123"])
 
 
 @mark.asyncio
-@mock.patch("lm_agent.services.clean_jobs_and_bookings.remove_job_by_slurm_job_id")
+@mock.patch("lm_agent.services.clean_jobs_and_bookings.remove_jobs_by_slurm_job_ids")
 async def test__clean_jobs_and_bookings__clean_jobs_by_grace_time(
-    remove_job_by_slurm_job_id_mock, parsed_configurations, parsed_report_items, parsed_jobs
+    remove_jobs_mock, parsed_configurations, parsed_report_items, parsed_jobs
 ):
     squeue_result = [
         {"job_id": 123, "run_time_in_seconds": 300, "state": "RUNNING"},
@@ -719,13 +716,13 @@ async def test__clean_jobs_and_bookings__clean_jobs_by_grace_time(
 
     await clean_jobs_and_bookings(parsed_configurations, parsed_jobs, squeue_result, parsed_report_items)
 
-    remove_job_by_slurm_job_id_mock.assert_called_once_with("123")
+    remove_jobs_mock.assert_called_once_with(["123"])
 
 
 @mark.asyncio
-@mock.patch("lm_agent.services.clean_jobs_and_bookings.remove_booking")
+@mock.patch("lm_agent.services.clean_jobs_and_bookings.remove_bookings")
 async def test__clean_jobs_and_bookings__clean_bookings_by_usage(
-    remove_booking_mock, parsed_configurations, parsed_report_items, parsed_jobs
+    remove_bookings_mock, parsed_configurations, parsed_report_items, parsed_jobs
 ):
     squeue_result = [
         {"job_id": 123, "run_time_in_seconds": 15, "state": "RUNNING"},
@@ -735,4 +732,4 @@ async def test__clean_jobs_and_bookings__clean_bookings_by_usage(
 
     await clean_jobs_and_bookings(parsed_configurations, parsed_jobs, squeue_result, parsed_report_items)
 
-    remove_booking_mock.assert_called_once_with(1)
+    remove_bookings_mock.assert_awaited_once_with([1])
@@ -0,0 +1,88 @@
+import asyncio
+from unittest import mock
+
+from pytest import mark
+
+from lm_agent.models import ClusterSnapshot
+from lm_agent.services.cluster_snapshot import get_cluster_snapshot
+
+
+@mark.asyncio
+@mock.patch("lm_agent.services.cluster_snapshot.return_formatted_squeue_out")
+@mock.patch("lm_agent.services.cluster_snapshot.scontrol_show_lic")
+@mock.patch("lm_agent.services.cluster_snapshot.get_cluster_jobs_from_backend")
+@mock.patch("lm_agent.services.cluster_snapshot.get_cluster_configs_from_backend")
+async def test__get_cluster_snapshot__collects_cluster_data_once(
+    get_configs_from_backend_mock: mock.AsyncMock,
+    get_jobs_from_backend_mock: mock.AsyncMock,
+    show_lic_mock: mock.AsyncMock,
+    return_formatted_squeue_out_mock: mock.AsyncMock,
+    parsed_configurations,
+    parsed_jobs,
+    scontrol_show_lic_output_flexlm,
+):
+    """
+    Check that the snapshot is built with a single request for each data source.
+    """
+    get_configs_from_backend_mock.return_value = parsed_configurations
+    get_jobs_from_backend_mock.return_value = parsed_jobs
+    show_lic_mock.return_value = scontrol_show_lic_output_flexlm
+    return_formatted_squeue_out_mock.return_value = "'123|1:00|RUNNING'\n'456|10:00|PENDING'"
+
+    cluster_snapshot = await get_cluster_snapshot()
+
+    get_configs_from_backend_mock.assert_awaited_once()
+    get_jobs_from_backend_mock.assert_awaited_once()
+    show_lic_mock.assert_awaited_once()
+    return_formatted_squeue_out_mock.assert_awaited_once()
+
+    assert cluster_snapshot == ClusterSnapshot(
+        configurations=tuple(parsed_configurations),
+        jobs=tuple(parsed_jobs),
+        cluster_product_features=("testproduct.testfeature",),
+        cluster_license_values={"testproduct.testfeature": {"total": 10, "used": 0}},
+        squeue_result=(
+            {"job_id": 123, "run_time_in_seconds": 60, "state": "RUNNING"},
+            {"job_id": 456, "run_time_in_seconds": 600, "state": "PENDING"},
+        ),
+    )
+
+
+@mark.asyncio
+@mock.patch("lm_agent.services.cluster_snapshot.return_formatted_squeue_out")
+@mock.patch("lm_agent.services.cluster_snapshot.scontrol_show_lic")
+@mock.patch("lm_agent.services.cluster_snapshot.get_cluster_jobs_from_backend")
+@mock.patch("lm_agent.services.cluster_snapshot.get_cluster_configs_from_backend")
+async def test__get_cluster_snapshot__reads_the_queue_after_the_jobs(
+    get_configs_from_backend_mock: mock.AsyncMock,
+    get_jobs_from_backend_mock: mock.AsyncMock,
+    show_lic_mock: mock.AsyncMock,
+    return_formatted_squeue_out_mock: mock.AsyncMock,
+    parsed_configurations,
+    parsed_jobs,
+    scontrol_show_lic_output_flexlm,
+):
+    """
+    Check that the queue is only read once the jobs were read from the backend,
+    so a job booked in between is never seen as not running.
+    """
+    events = []
+
+    async def get_jobs():
+        events.append("jobs requested")
+        await asyncio.sleep(0.01)
+        events.append("jobs read")
+        return parsed_jobs
+
+    async def read_queue():
+        events.append("queue read")
+        return ""
+
+    get_configs_from_backend_mock.return_value = parsed_configurations
+    get_jobs_from_backend_mock.side_effect = get_jobs
+    show_lic_mock.return_value = scontrol_show_lic_output_flexlm
+    return_formatted_squeue_out_mock.side_effect = read_queue
+
+    await get_cluster_snapshot()
+
+    assert events == ["jobs requested", "jobs read", "queue read"]
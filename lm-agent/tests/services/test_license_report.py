@@ -1,10 +1,16 @@
+import asyncio
+import time
+from pathlib import Path
 from unittest import mock
 
+import prometheus_client
 from httpx import Response
 from pytest import mark, raises
 
+from lm_agent.config import settings
 from lm_agent.exceptions import LicenseManagerBackendConnectionError, LicenseManagerEmptyReportError
 from lm_agent.models import (
+    ClusterSnapshot,
     ConfigurationSchema,
     FeatureSchema,
     LicenseReportItem,
@@ -454,13 +460,260 @@ def test_get_local_license_configurations():
     ]
 
 
+@mark.asyncio
+@mock.patch("lm_agent.services.license_report.RLMLicenseServer.get_output_from_server")
+@mock.patch("lm_agent.services.license_report.get_all_product_features_from_cluster")
+@mock.patch("lm_agent.services.license_report.get_cluster_configs_from_backend")
+async def test_report__uses_cluster_snapshot(
+    get_configs_from_backend_mock: mock.MagicMock,
+    get_product_features_mock: mock.MagicMock,
+    get_output_from_server_mock: mock.MagicMock,
+    one_configuration_row_rlm,
+    rlm_output,
+):
+    """
+    Do I use the configurations and licenses from the cluster snapshot instead of querying them again?
+    """
+    get_output_from_server_mock.return_value = rlm_output
+    cluster_snapshot = ClusterSnapshot(
+        configurations=(one_configuration_row_rlm,),
+        cluster_product_features=("converge.converge_super",),
+    )
+
+    reconcile_list = await license_report.report(cluster_snapshot)
+
+    get_configs_from_backend_mock.assert_not_called()
+    get_product_features_mock.assert_not_called()
+    assert [(item.product_feature, item.used, item.total) for item in reconcile_list] == [
+        ("converge.converge_super", 93, 1000)
+    ]
+
+
+def _make_rlm_configuration(config_id: int, feature_name: str, port: int = 1234) -> ConfigurationSchema:
+    return ConfigurationSchema(
+        id=config_id,
+        name=f"Converge {feature_name}",
+        cluster_client_id="dummy",
+        features=[
+            FeatureSchema(
+                id=config_id,
+                name=feature_name,
+                product=ProductSchema(id=1, name="converge"),
+                config_id=config_id,
+                reserved=0,
+                total=1000,
+                used=0,
+                booked_total=0,
+            )
+        ],
+        license_servers=[
+            LicenseServerSchema(id=config_id, config_id=config_id, host="licserv0001", port=port),
+        ],
+        grace_time=60,
+        type=LicenseServerType.RLM,
+    )
+
+
+def test_group_features_by_license_server():
+    """
+    Do configurations pointing to the same license servers share the same group?
+    """
+    configuration_super = _make_rlm_configuration(1, "converge_super")
+    configuration_gui = _make_rlm_configuration(2, "converge_gui")
+    configuration_other_server = _make_rlm_configuration(3, "converge_tecplot", port=4321)
+
+    server_groups = license_report.group_features_by_license_server(
+        [configuration_super, configuration_gui, configuration_other_server]
+    )
+
+    assert server_groups == {
+        (LicenseServerType.RLM, (("licserv0001", 1234),)): (
+            configuration_super.license_servers,
+            [(1, "converge.converge_super"), (2, "converge.converge_gui")],
+        ),
+        (LicenseServerType.RLM, (("licserv0001", 4321),)): (
+            configuration_other_server.license_servers,
+            [(3, "converge.converge_tecplot")],
+        ),
+    }
+
+
+@mark.asyncio
+@mock.patch("lm_agent.services.license_report.RLMLicenseServer.get_output_from_server")
+@mock.patch("lm_agent.workload_managers.slurm.cmd_utils.scontrol_show_lic")
+@mock.patch("lm_agent.services.license_report.get_cluster_configs_from_backend")
+async def test_report__queries_each_license_server_once(
+    get_configs_from_backend_mock: mock.MagicMock,
+    show_lic_mock: mock.MagicMock,
+    get_output_from_server_mock: mock.MagicMock,
+    rlm_output: str,
+):
+    """
+    Do I query the license server only once for all features configured with the same license servers?
+    """
+    get_configs_from_backend_mock.return_value = [
+        _make_rlm_configuration(1, "converge_super"),
+        _make_rlm_configuration(2, "converge_gui"),
+    ]
+    show_lic_mock.return_value = (
+        "LicenseName=converge.converge_super@rlm\nLicenseName=converge.converge_gui@rlm\n"
+    )
+    get_output_from_server_mock.return_value = rlm_output
+
+    reconcile_list = await license_report.report()
+
+    get_output_from_server_mock.assert_awaited_once()
+    assert [(item.product_feature, item.used, item.total) for item in reconcile_list] == [
+        ("converge.converge_super", 93, 1000),
+        ("converge.converge_gui", 0, 45),
+    ]
+
+
+def _make_snapshot(*configurations: ConfigurationSchema) -> ClusterSnapshot:
+    return ClusterSnapshot(
+        configurations=configurations,
+        cluster_product_features=tuple(
+            f"{feature.product.name}.{feature.name}"
+            for configuration in configurations
+            for feature in configuration.features
+        ),
+    )
+
+
+@mark.asyncio
+@mock.patch("lm_agent.services.license_report.RLMLicenseServer.get_output_from_server")
+async def test_report__uses_the_last_good_report_if_the_query_fails(
+    get_output_from_server_mock: mock.MagicMock,
+    rlm_output: str,
+):
+    """
+    Do I use the last good report of a feature when its license server can't be queried?
+    """
+    get_output_from_server_mock.return_value = rlm_output
+    await license_report.report(_make_snapshot(_make_rlm_configuration(1, "converge_super")))
+
+    get_output_from_server_mock.side_effect = RuntimeError("None of the checks for RLM succeeded!")
+    stale_count_before = (
+        prometheus_client.REGISTRY.get_sample_value(
+            "license_manager_agent_license_report_items_total", {"status": "stale"}
+        )
+        or 0
+    )
+    reconcile_list = await license_report.report(_make_snapshot(_make_rlm_configuration(2, "converge_super")))
+
+    assert [(item.feature_id, item.product_feature, item.used, item.total) for item in reconcile_list] == [
+        (2, "converge.converge_super", 93, 1000)
+    ]
+    assert (
+        prometheus_client.REGISTRY.get_sample_value(
+            "license_manager_agent_license_report_items_total", {"status": "stale"}
+        )
+        == stale_count_before + 1
+    )
+
+
+@mark.asyncio
+@mock.patch("lm_agent.services.license_report.RLMLicenseServer.get_output_from_server")
+async def test_report__does_not_use_the_usage_lines_of_the_last_good_report(
+    get_output_from_server_mock: mock.MagicMock,
+    rlm_output: str,
+):
+    """
+    Do I drop the usage lines of the last good report, so they aren't matched against newer bookings?
+    """
+    get_output_from_server_mock.return_value = rlm_output
+    [fresh_item] = await license_report.report(_make_snapshot(_make_rlm_configuration(1, "converge_super")))
+    assert fresh_item.uses != []
+
+    get_output_from_server_mock.side_effect = RuntimeError("None of the checks for RLM succeeded!")
+    [stale_item] = await license_report.report(_make_snapshot(_make_rlm_configuration(1, "converge_super")))
+
+    assert (stale_item.used, stale_item.total, stale_item.uses) == (fresh_item.used, fresh_item.total, [])
+
+
+@mark.asyncio
+@mock.patch("lm_agent.services.license_report.RLMLicenseServer.get_output_from_server")
+async def test_report__does_not_use_a_report_older_than_the_max_staleness(
+    get_output_from_server_mock: mock.MagicMock,
+    rlm_output: str,
+):
+    """
+    Do I report the feature as unavailable when its last good report is too old?
+    """
+    cluster_snapshot = _make_snapshot(_make_rlm_configuration(1, "converge_super"))
+    get_output_from_server_mock.return_value = rlm_output
+    await license_report.report(cluster_snapshot)
+
+    get_output_from_server_mock.side_effect = RuntimeError("None of the checks for RLM succeeded!")
+    with mock.patch("lm_agent.services.license_report.time.time", return_value=time.time() + 301):
+        reconcile_list = await license_report.report(cluster_snapshot)
+
+    assert [(item.product_feature, item.used, item.total) for item in reconcile_list] == [
+        ("converge.converge_super", 0, 0)
+    ]
+
+
+@mark.asyncio
+@mock.patch("lm_agent.services.license_report.RLMLicenseServer.get_output_from_server")
+async def test_report__keeps_the_last_good_report_in_the_cache_dir(
+    get_output_from_server_mock: mock.MagicMock,
+    mock_cache_dir: Path,
+    rlm_output: str,
+):
+    """
+    Do I keep the last good report in the cache directory, so it's available after a restart?
+    """
+    mock_cache_dir.mkdir()
+    get_output_from_server_mock.return_value = rlm_output
+    await license_report.report(_make_snapshot(_make_rlm_configuration(1, "converge_super")))
+
+    cached_item = license_report.LicenseReportCache().get("converge.converge_super")
+
+    assert cached_item is not None
+    assert (cached_item.item.used, cached_item.item.total) == (93, 1000)
+
+
+@mark.asyncio
+async def test_report__does_not_wait_for_slow_license_servers_with_a_recent_report(rlm_output: str):
+    """
+    Do I use the last good report when the license server is slow, and update it when the query finishes?
+    """
+    cluster_snapshot = _make_snapshot(_make_rlm_configuration(1, "converge_super"))
+    with mock.patch(
+        "lm_agent.services.license_report.RLMLicenseServer.get_output_from_server", return_value=rlm_output
+    ):
+        await license_report.report(cluster_snapshot)
+
+    query_finished = asyncio.Event()
+    slow_output = rlm_output.replace("1000", "2000", 1)
+
+    async def _slow_get_output_from_server():
+        await query_finished.wait()
+        return slow_output
+
+    with mock.patch.object(settings, "LICENSE_REPORT_REFRESH_DEADLINE", 0.05):
+        with mock.patch(
+            "lm_agent.services.license_report.RLMLicenseServer.get_output_from_server",
+            side_effect=_slow_get_output_from_server,
+        ) as get_output_from_server_mock:
+            first_list = await license_report.report(cluster_snapshot)
+            second_list = await license_report.report(cluster_snapshot)
+
+            query_finished.set()
+            await asyncio.gather(*license_report._refresh_tasks.values())
+
+    assert get_output_from_server_mock.await_count == 1
+    assert [(item.used, item.total) for item in first_list + second_list] == [(93, 1000), (93, 1000)]
+    assert license_report.license_report_cache.get("converge.converge_super").item.total == 2000
+
+
 @mark.asyncio
 @mock.patch("lm_agent.workload_managers.slurm.cmd_utils.scontrol_show_lic")
 @mock.patch("lm_agent.services.license_report.get_cluster_configs_from_backend")
 @mock.patch("lm_agent.services.license_report.get_local_license_configurations")
-@mock.patch("lm_agent.services.license_report.RLMLicenseServer.get_report_item")
+@mock.patch("lm_agent.services.license_report.RLMLicenseServer.get_output_from_server")
 async def test_license_report_empty_on_exception_raised(
-    get_report_item_mock: mock.MagicMock,
+    get_output_from_server_mock: mock.MagicMock,
     get_local_license_configurations_mock: mock.MagicMock,
     get_cluster_configs_from_backend_mock: mock.MagicMock,
     show_lic_mock: mock.MagicMock,
@@ -495,7 +748,7 @@ async def test_license_report_empty_on_exception_raised(
             type=LicenseServerType.RLM,
         )
     ]
-    get_report_item_mock.side_effect = Exception("Something is wrong with the license server!")
+    get_output_from_server_mock.side_effect = Exception("Something is wrong with the license server!")
 
     assert await license_report.report() == [
         LicenseReportItem(
@@ -512,9 +765,9 @@ async def test_license_report_empty_on_exception_raised(
 @mock.patch("lm_agent.workload_managers.slurm.cmd_utils.scontrol_show_lic")
 @mock.patch("lm_agent.services.license_report.get_cluster_configs_from_backend")
 @mock.patch("lm_agent.services.license_report.get_local_license_configurations")
-@mock.patch("lm_agent.services.license_report.RLMLicenseServer.get_report_item")
+@mock.patch("lm_agent.services.license_report.RLMLicenseServer.get_output_from_server")
 async def test_license_report_empty_on_exception_raised_with_multiple_features(
-    get_report_item_mock: mock.MagicMock,
+    get_output_from_server_mock: mock.MagicMock,
     get_local_license_configurations_mock: mock.MagicMock,
     get_cluster_configs_from_backend_mock: mock.MagicMock,
     show_lic_mock: mock.MagicMock,
@@ -572,7 +825,7 @@ async def test_license_report_empty_on_exception_raised_with_multiple_features(
             type=LicenseServerType.RLM,
         ),
     ]
-    get_report_item_mock.side_effect = Exception("Something is wrong with the license server!")
+    get_output_from_server_mock.side_effect = Exception("Something is wrong with the license server!")
 
     assert await license_report.report() == [
         LicenseReportItem(
@@ -1,27 +1,33 @@
+import asyncio
+import json
+import stat
+import time
 from unittest import mock
 
-from pytest import mark
+import prometheus_client
+from pytest import fixture, mark, raises
 
-from lm_agent.models import LicenseReportItem
-from lm_agent.services.reconciliation import reconcile
+from lm_agent.config import settings
+from lm_agent.models import ClusterSnapshot, LicenseReportItem
+from lm_agent.services.reconciliation import (
+    RECONCILE_LOCK_FILE_NAME,
+    RECONCILE_RESULT_FILE_NAME,
+    get_reservation_data,
+    reconcile,
+    shared_reconcile,
+)
 
 
 @mark.asyncio
-@mock.patch("lm_agent.services.reconciliation.return_formatted_squeue_out")
 @mock.patch("lm_agent.services.reconciliation.create_or_update_reservation")
-@mock.patch("lm_agent.services.reconciliation.get_all_features_cluster_values")
-@mock.patch("lm_agent.services.reconciliation.get_cluster_configs_from_backend")
+@mock.patch("lm_agent.services.reconciliation.get_cluster_snapshot")
 @mock.patch("lm_agent.services.reconciliation.get_all_features_bookings_sum")
-@mock.patch("lm_agent.services.reconciliation.get_cluster_jobs_from_backend")
 @mock.patch("lm_agent.services.reconciliation.update_features")
 async def test__reconcile__success(
     update_features_mock,
-    get_jobs_from_backend_mock,
     get_bookings_sum_mock,
-    get_configs_from_backend_mock,
-    get_all_cluster_values_mock,
+    get_cluster_snapshot_mock,
     create_or_update_reservation_mock,
-    return_formatted_squeue_out_mock,
     parsed_configurations,
 ):
     """
@@ -62,11 +68,157 @@ async def test__reconcile__success(
             uses=[],
         )
     ]
-    get_configs_from_backend_mock.return_value = parsed_configurations
-    get_jobs_from_backend_mock.return_value = []
+    cluster_snapshot = ClusterSnapshot(
+        configurations=tuple(parsed_configurations),
+        cluster_license_values={"abaqus.abaqus": {"total": 1000, "used": 23}},
+    )
+    get_cluster_snapshot_mock.return_value = cluster_snapshot
     get_bookings_sum_mock.return_value = {"abaqus.abaqus": 103}
-    get_all_cluster_values_mock.return_value = {"abaqus.abaqus": {"total": 1000, "used": 23}}
-    return_formatted_squeue_out_mock.return_value = ""
 
     await reconcile()
+    get_cluster_snapshot_mock.assert_awaited_once()
+    update_features_mock.assert_awaited_once_with(cluster_snapshot)
     create_or_update_reservation_mock.assert_called_with("abaqus.abaqus@flexlm:280")
+
+
+def test__get_reservation_data__fully_reserves_failed_reports(parsed_configurations):
+    """
+    Check that a feature whose report failed (total 0) is fully reserved in Slurm.
+    """
+    cluster_snapshot = ClusterSnapshot(
+        configurations=tuple(parsed_configurations),
+        cluster_license_values={"abaqus.abaqus": {"total": 1000, "used": 23}},
+    )
+    license_usage_info = [
+        LicenseReportItem(feature_id=1, product_feature="abaqus.abaqus", total=0, used=0, uses=[])
+    ]
+
+    assert get_reservation_data(license_usage_info, cluster_snapshot, {"abaqus.abaqus": 103}) == [
+        "abaqus.abaqus@flexlm:1000"
+    ]
+    assert (
+        prometheus_client.REGISTRY.get_sample_value(
+            "license_manager_agent_reservation_tokens", {"product_feature": "abaqus.abaqus"}
+        )
+        == 1000
+    )
+
+
+@fixture
+def reconcile_mock():
+    """
+    Mock the reconciliation.
+    """
+
+    async def _reconcile():
+        await asyncio.sleep(0.2)
+
+    with mock.patch("lm_agent.services.reconciliation.reconcile", side_effect=_reconcile) as reconcile_mock:
+        yield reconcile_mock
+
+
+@mark.asyncio
+async def test__shared_reconcile__reuses_recent_reconciliation(reconcile_mock, mock_reconcile_lock_dir):
+    """
+    Check that a reconciliation finished within the freshness window is reused.
+    """
+    await shared_reconcile()
+    await shared_reconcile()
+
+    reconcile_mock.assert_awaited_once()
+    result = json.loads((mock_reconcile_lock_dir / RECONCILE_RESULT_FILE_NAME).read_text())
+    assert result["finished_at"] <= time.time()
+
+
+@mark.asyncio
+async def test__shared_reconcile__reconciles_again_after_freshness_window(reconcile_mock):
+    """
+    Check that a new reconciliation runs once the last one is older than the freshness window.
+    """
+    with mock.patch.object(settings, "RECONCILE_FRESHNESS_WINDOW", 0):
+        await shared_reconcile()
+        await shared_reconcile()
+
+    assert reconcile_mock.await_count == 2
+
+
+@mark.asyncio
+async def test__shared_reconcile__concurrent_calls_wait_for_reconciliation_in_flight(reconcile_mock):
+    """
+    Check that concurrent calls wait for the reconciliation in flight and reuse it,
+    even if the freshness window is disabled.
+    """
+    with mock.patch.object(settings, "RECONCILE_FRESHNESS_WINDOW", 0):
+        await asyncio.gather(*(shared_reconcile() for _ in range(5)))
+
+    reconcile_mock.assert_awaited_once()
+
+
+@mark.asyncio
+async def test__shared_reconcile__failed_reconciliation_is_not_reused(
+    reconcile_mock, mock_reconcile_lock_dir
+):
+    """
+    Check that a failed reconciliation isn't recorded, so the next call reconciles again.
+    """
+    reconcile_mock.side_effect = [RuntimeError("Boom!"), None]
+
+    with raises(RuntimeError, match="Boom!"):
+        await shared_reconcile()
+
+    assert not (mock_reconcile_lock_dir / RECONCILE_RESULT_FILE_NAME).exists()
+
+    await shared_reconcile()
+
+    assert reconcile_mock.await_count == 2
+
+
+@mark.asyncio
+async def test__shared_reconcile__creates_the_lock_writable_by_the_group(
+    reconcile_mock, mock_reconcile_lock_dir
+):
+    """
+    Check that the lock directory and its files are created writable by the group,
+    so the agent and the Prolog/Epilog can share them while running as different users.
+    """
+    await shared_reconcile()
+
+    assert stat.S_IMODE(mock_reconcile_lock_dir.stat().st_mode) == 0o2770
+    assert stat.S_IMODE((mock_reconcile_lock_dir / RECONCILE_LOCK_FILE_NAME).stat().st_mode) == 0o660
+    assert stat.S_IMODE((mock_reconcile_lock_dir / RECONCILE_RESULT_FILE_NAME).stat().st_mode) == 0o660
+
+
+@mark.asyncio
+async def test__shared_reconcile__keeps_the_permissions_of_an_existing_lock_dir(
+    reconcile_mock, mock_reconcile_lock_dir
+):
+    """
+    Check that a lock directory provided by the administrator keeps its permissions.
+    """
+    mock_reconcile_lock_dir.mkdir(mode=0o755)
+
+    await shared_reconcile()
+
+    assert stat.S_IMODE(mock_reconcile_lock_dir.stat().st_mode) == 0o755
+    reconcile_mock.assert_awaited_once()
+
+
+@mark.asyncio
+@mock.patch("lm_agent.services.reconciliation.logger")
+@mock.patch("lm_agent.services.reconciliation.reconcile")
+async def test__shared_reconcile__warns_and_always_reconciles_if_the_lock_cant_be_opened(
+    reconcile_mock, logger_mock, tmp_path
+):
+    """
+    Check that the reconciliation always runs, with a warning, if the lock can't be opened.
+    """
+    not_a_directory = tmp_path / "not-a-directory"
+    not_a_directory.touch()
+
+    with mock.patch.object(settings, "RECONCILE_LOCK_DIR", not_a_directory / "reconcile"):
+        await shared_reconcile()
+        await shared_reconcile()
+
+    assert reconcile_mock.await_count == 2
+    assert logger_mock.warning.call_count == 2
+    assert "Reconciliation won't be shared" in logger_mock.warning.call_args.args[0]
@@ -0,0 +1,131 @@
+"""
+Test the Prometheus metrics of the agent.
+"""
+
+from unittest import mock
+
+import prometheus_client
+from httpx import Response
+from pytest import mark
+
+from lm_agent import metrics
+from lm_agent.backend_utils.utils import get_backend_client, observe_backend_client_pool
+from lm_agent.config import settings
+from lm_agent.exceptions import CommandFailedToExecute
+from lm_agent.models import LicenseServerSchema
+from lm_agent.server_interfaces.rlm import RLMLicenseServer
+
+
+def get_sample_value(name: str, labels: dict) -> float:
+    """Return the value of the sample, or 0 if it wasn't recorded yet."""
+    return prometheus_client.REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+@mark.asyncio
+@mark.respx(base_url="http://backend")
+async def test_backend_requests_are_observed_by_endpoint(respx_mock):
+    """
+    Check that the requests to the backend are timed, with the ids in the path replaced.
+    """
+    respx_mock.get("/lm/features/1234").mock(return_value=Response(status_code=200, json={}))
+    labels = {"method": "GET", "path": "/lm/features/{id}", "status_code": "200"}
+    count_before = get_sample_value("license_manager_agent_backend_request_seconds_count", labels)
+
+    await get_backend_client().get("/lm/features/1234")
+
+    assert get_sample_value("license_manager_agent_backend_request_seconds_count", labels) == count_before + 1
+
+
+@mark.asyncio
+async def test_license_tool_invocations_are_observed_by_server_type_and_host():
+    """
+    Check that each license server binary run is timed, labelled by server type, host and outcome.
+    """
+    rlm_server = RLMLicenseServer(
+        [
+            LicenseServerSchema(id=1, config_id=1, host="metricsserv1", port=2345),
+            LicenseServerSchema(id=2, config_id=1, host="metricsserv2", port=2345),
+        ]
+    )
+    run = mock.AsyncMock(side_effect=[CommandFailedToExecute("down"), "output"])
+
+    await rlm_server.query_license_servers(rlm_server.get_commands_list(), run, "RLM")
+
+    assert (
+        get_sample_value(
+            "license_manager_agent_license_tool_seconds_count",
+            {"server_type": "rlm", "host": "metricsserv1", "outcome": "failure"},
+        )
+        == 1
+    )
+    assert (
+        get_sample_value(
+            "license_manager_agent_license_tool_seconds_count",
+            {"server_type": "rlm", "host": "metricsserv2", "outcome": "success"},
+        )
+        == 1
+    )
+
+
+def test_parse_output_is_observed_by_parser():
+    """
+    Check that the time spent by each parser is recorded.
+    """
+
+    def parse(server_output: str) -> dict:
+        return {"output": server_output}
+
+    labels = {"parser": "test_metrics.parse"}
+    count_before = get_sample_value("license_manager_agent_parse_seconds_count", labels)
+
+    assert RLMLicenseServer.parse_output(parse, "output") == {"output": "output"}
+    assert get_sample_value("license_manager_agent_parse_seconds_count", labels) == count_before + 1
+
+
+def test_observe_backend_client_pool__records_the_connections_by_state():
+    """
+    Check that the idle and active connections of the backend client pool are recorded.
+    """
+    with mock.patch(
+        "lm_agent.backend_utils.utils.get_backend_client_pool_statistics",
+        return_value={"connections": 3, "idle_connections": 2, "active_connections": 1},
+    ):
+        observe_backend_client_pool()
+
+    assert get_sample_value("license_manager_agent_backend_connections", {"state": "idle"}) == 2
+    assert get_sample_value("license_manager_agent_backend_connections", {"state": "active"}) == 1
+
+    with mock.patch("lm_agent.backend_utils.utils.get_backend_client_pool_statistics", return_value={}):
+        observe_backend_client_pool()
+
+    assert get_sample_value("license_manager_agent_backend_connections", {"state": "idle"}) == 0
+
+
+def test_start_metrics_server__does_nothing_if_disabled():
+    """
+    Check that the metrics aren't served if no port is set.
+    """
+    with mock.patch("lm_agent.metrics.prometheus_client.start_http_server") as start_http_server_mock:
+        assert metrics.start_metrics_server() is False
+
+    start_http_server_mock.assert_not_called()
+
+
+def test_start_metrics_server__serves_the_metrics_on_the_configured_port():
+    """
+    Check that the metrics are served on the configured address and port.
+    """
+    with mock.patch.object(settings, "METRICS_PORT", 9123):
+        with mock.patch("lm_agent.metrics.prometheus_client.start_http_server") as start_http_server_mock:
+            assert metrics.start_metrics_server() is True
+
+    start_http_server_mock.assert_called_once_with(9123, addr=settings.METRICS_ADDRESS)
+
+
+def test_start_metrics_server__warns_if_prometheus_client_is_not_installed():
+    """
+    Check that the agent keeps running without metrics if prometheus_client isn't installed.
+    """
+    with mock.patch.object(settings, "METRICS_PORT", 9123):
+        with mock.patch("lm_agent.metrics.prometheus_client", None):
+            assert metrics.start_metrics_server() is False
@@ -0,0 +1,147 @@
+"""
+Test the subprocess executor used to run the license server binaries and the Slurm commands.
+"""
+
+import asyncio
+import os
+import time
+from unittest import mock
+
+from pytest import mark, raises
+
+from lm_agent.config import settings
+from lm_agent.exceptions import CommandFailedToExecute
+from lm_agent.utils import get_tool_timeout, run_command
+
+
+@mark.asyncio
+async def test_run_command__returns_output():
+    """
+    Check that the output of the command is returned, with the arguments passed as is without a shell.
+    """
+    output = await run_command(["echo", "$HOME", "a;b"])
+
+    assert output == "$HOME a;b\n"
+
+
+@mark.asyncio
+async def test_run_command__passes_stdin():
+    """
+    Check that the input is written to the stdin of the command.
+    """
+    output = await run_command(["cat"], stdin_str="connect host 1234")
+
+    assert output == "connect host 1234"
+
+
+@mark.asyncio
+async def test_run_command__raises_exception_on_non_zero_return_code():
+    """
+    Check that a command that fails raises CommandFailedToExecute.
+    """
+    with raises(CommandFailedToExecute, match="return code 1"):
+        await run_command(["false"])
+
+
+@mark.asyncio
+async def test_run_command__raises_exception_if_command_does_not_exist():
+    """
+    Check that a command that can't be started raises CommandFailedToExecute.
+    """
+    with raises(CommandFailedToExecute, match="failed to execute"):
+        await run_command(["/does/not/exist/lmutil"])
+
+
+@mark.asyncio
+async def test_run_command__kills_and_reaps_the_command_on_timeout(tmp_path):
+    """
+    Check that a command that times out is killed, with its children, and reaped.
+    """
+    pid_file = tmp_path / "child.pid"
+    processes = []
+    create_subprocess_exec = asyncio.create_subprocess_exec
+
+    async def _create_subprocess_exec(*args, **kwargs):
+        proc = await create_subprocess_exec(*args, **kwargs)
+        processes.append(proc)
+        return proc
+
+    with mock.patch.object(settings, "TOOL_TIMEOUTS", {"flexlm": 0.2}):
+        with mock.patch("lm_agent.utils.asyncio.create_subprocess_exec", _create_subprocess_exec):
+            with raises(CommandFailedToExecute, match="timed out after 0.2 seconds"):
+                await run_command(["sh", "-c", f"sleep 10 & echo $! > {pid_file}; wait"], tool="flexlm")
+
+    assert processes[0].returncode is not None
+
+    child_pid = int(pid_file.read_text())
+    for _ in range(50):
+        try:
+            os.kill(child_pid, 0)
+        except ProcessLookupError:
+            break
+        await asyncio.sleep(0.05)
+    else:
+        raise AssertionError("The child of the command was not killed")
+
+
+@mark.asyncio
+async def test_run_command__limits_the_commands_running_at_the_same_time():
+    """
+    Check that no more than the limit of commands run at the same time, for each tool and in total.
+    """
+    running = {"flexlm": 0, "rlm": 0, "total": 0}
+    max_running = {"flexlm": 0, "rlm": 0, "total": 0}
+
+    async def _create_subprocess_exec(*args, **kwargs):
+        tool = args[1]
+        for key in (tool, "total"):
+            running[key] += 1
+            max_running[key] = max(max_running[key], running[key])
+
+        proc = mock.MagicMock(returncode=0)
+
+        async def _communicate(_):
+            await asyncio.sleep(0.05)
+            for key in (tool, "total"):
+                running[key] -= 1
+            return (b"", None)
+
+        proc.communicate = _communicate
+        return proc
+
+    with mock.patch.object(settings, "TOOL_MAX_CONCURRENCY", 3):
+        with mock.patch.object(settings, "TOOL_MAX_CONCURRENCY_PER_TOOL", 2):
+            with mock.patch("lm_agent.utils._concurrency_limits._loop", None):
+                with mock.patch("lm_agent.utils.asyncio.create_subprocess_exec", _create_subprocess_exec):
+                    await asyncio.gather(
+                        *(run_command(["echo", tool], tool=tool) for tool in ["flexlm", "rlm"] * 5)
+                    )
+
+    assert max_running == {"flexlm": 2, "rlm": 2, "total": 3}
+
+
+@mark.asyncio
+async def test_run_command__waiting_for_a_slot_does_not_count_towards_the_timeout():
+    """
+    Check that the timeout only applies to the command, not to the time waiting for a slot.
+    """
+    with mock.patch.object(settings, "TOOL_MAX_CONCURRENCY_PER_TOOL", 1):
+        with mock.patch.object(settings, "TOOL_TIMEOUTS", {"rlm": 0.5}):
+            with mock.patch("lm_agent.utils._concurrency_limits._loop", None):
+                start = time.monotonic()
+                outputs = await asyncio.gather(
+                    *(run_command(["sh", "-c", "sleep 0.2; echo done"], tool="rlm") for _ in range(4))
+                )
+
+    assert outputs == ["done\n"] * 4
+    assert time.monotonic() - start >= 0.8
+
+
+def test_get_tool_timeout():
+    """
+    Check that the timeout of the tool overrides the default timeout.
+    """
+    with mock.patch.object(settings, "TOOL_TIMEOUTS", {"slurm": 30}):
+        assert get_tool_timeout("slurm") == 30
+        assert get_tool_timeout("flexlm") == settings.TOOL_TIMEOUT
+        assert get_tool_timeout(None) == settings.TOOL_TIMEOUT
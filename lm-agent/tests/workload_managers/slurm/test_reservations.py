@@ -2,14 +2,20 @@
 Test Slurm reservations.
 """
 
+import json
+import time
 from unittest import mock
 
-from pytest import fixture, mark
+import prometheus_client
+from pytest import fixture, mark, raises
 
 from lm_agent.config import settings
-from lm_agent.exceptions import CommandFailedToExecute
+from lm_agent.exceptions import CommandFailedToExecute, LicenseManagerReservationFailure
 from lm_agent.workload_managers.slurm.reservations import (
+    RESERVATION_DURATION_SECONDS,
+    RESERVATION_STATE_FILE_NAME,
     create_or_update_reservation,
+    delete_reservation_if_exists,
     scontrol_create_reservation,
     scontrol_delete_reservation,
     scontrol_show_reservation,
@@ -88,6 +94,11 @@ async def test__scontrol_update_reservation__success(
     update_reservation = await scontrol_update_reservation(reservation_license_data, reservation_duration)
     assert update_reservation
 
+    # The reservation is restarted, since updating the duration alone doesn't extend it
+    cmd = run_command_mock.await_args.args[0]
+    assert "starttime=now" in cmd
+    assert f"duration={reservation_duration}" in cmd
+
 
 @mark.asyncio
 @mock.patch("lm_agent.workload_managers.slurm.reservations.run_command")
@@ -145,3 +156,187 @@ async def test_create_or_update_reservation(delete_mock, update_mock, show_mock,
     show_mock.return_value = False
     await create_or_update_reservation("reservation_info")
     create_mock.assert_called()
+
+
+@fixture
+def reservation_outcomes():
+    """Provide a function returning how many reservation changes were applied or skipped during the test."""
+
+    def get_counts():
+        return {
+            outcome: prometheus_client.REGISTRY.get_sample_value(
+                "license_manager_agent_reservations_total", {"outcome": outcome}
+            )
+            or 0
+            for outcome in ("applied", "skipped")
+        }
+
+    counts_before = get_counts()
+    return lambda: {outcome: count - counts_before[outcome] for outcome, count in get_counts().items()}
+
+
+@mark.asyncio
+@mock.patch("lm_agent.workload_managers.slurm.reservations.scontrol_create_reservation")
+@mock.patch("lm_agent.workload_managers.slurm.reservations.scontrol_show_reservation")
+@mock.patch("lm_agent.workload_managers.slurm.reservations.scontrol_update_reservation")
+async def test_create_or_update_reservation__skips_scontrol_if_reservation_did_not_change(
+    update_mock, show_mock, create_mock, mock_cache_dir, reservation_outcomes
+):
+    """
+    Test that scontrol is only called when the licenses of the reservation change.
+    """
+    mock_cache_dir.mkdir()
+    show_mock.return_value = False
+
+    await create_or_update_reservation("test.license@licenseserver:10,another.license@server:25")
+    create_mock.assert_awaited_once()
+
+    # Same licenses in a different order
+    await create_or_update_reservation("another.license@server:25,test.license@licenseserver:10")
+    show_mock.assert_awaited_once()
+    update_mock.assert_not_called()
+
+    show_mock.return_value = "reservation_data"
+    await create_or_update_reservation("test.license@licenseserver:12,another.license@server:25")
+    update_mock.assert_awaited_once_with("test.license@licenseserver:12,another.license@server:25", "30:00")
+
+    assert reservation_outcomes() == {"applied": 2, "skipped": 1}
+
+
+@mark.asyncio
+@mock.patch("lm_agent.workload_managers.slurm.reservations.scontrol_create_reservation")
+@mock.patch("lm_agent.workload_managers.slurm.reservations.scontrol_show_reservation")
+@mock.patch("lm_agent.workload_managers.slurm.reservations.scontrol_update_reservation")
+async def test_create_or_update_reservation__renews_reservation_about_to_expire(
+    update_mock, show_mock, create_mock, mock_cache_dir, reservation_outcomes
+):
+    """
+    Test that the reservation is updated when it's about to expire, even if it didn't change.
+    """
+    mock_cache_dir.mkdir()
+    show_mock.return_value = False
+
+    await create_or_update_reservation("test.license@licenseserver:10")
+
+    state_path = mock_cache_dir / RESERVATION_STATE_FILE_NAME
+    state = json.loads(state_path.read_text())
+    state["expires_at"] = time.time() + settings.RESERVATION_RENEWAL_MARGIN - 1
+    state_path.write_text(json.dumps(state))
+
+    show_mock.return_value = "reservation_data"
+    await create_or_update_reservation("test.license@licenseserver:10")
+
+    update_mock.assert_awaited_once()
+    assert reservation_outcomes()["skipped"] == 0
+
+
+@mark.asyncio
+@mock.patch("lm_agent.workload_managers.slurm.reservations.run_command")
+@mock.patch("lm_agent.workload_managers.slurm.reservations.scontrol_create_reservation")
+@mock.patch("lm_agent.workload_managers.slurm.reservations.scontrol_show_reservation")
+async def test_create_or_update_reservation__renewal_after_create_extends_the_reservation(
+    show_mock, create_mock, run_command_mock, mock_cache_dir
+):
+    """
+    Test that renewing a reservation restarts it, and its expiry is recorded from the renewal.
+    """
+    mock_cache_dir.mkdir()
+    show_mock.return_value = False
+
+    await create_or_update_reservation("test.license@licenseserver:10")
+    create_mock.assert_awaited_once()
+
+    show_mock.return_value = "reservation_data"
+    renewed_at = time.time() + RESERVATION_DURATION_SECONDS - settings.RESERVATION_RENEWAL_MARGIN + 1
+    with mock.patch("lm_agent.workload_managers.slurm.reservations.time.time", return_value=renewed_at):
+        await create_or_update_reservation("test.license@licenseserver:10")
+
+    update_cmd = run_command_mock.await_args.args[0]
+    assert "update" in update_cmd
+    assert "starttime=now" in update_cmd
+
+    state = json.loads((mock_cache_dir / RESERVATION_STATE_FILE_NAME).read_text())
+    assert state["expires_at"] == renewed_at + RESERVATION_DURATION_SECONDS
+
+
+@mark.asyncio
+@mock.patch("lm_agent.workload_managers.slurm.reservations.scontrol_create_reservation")
+@mock.patch("lm_agent.workload_managers.slurm.reservations.scontrol_show_reservation")
+async def test_create_or_update_reservation__checks_the_reservation_still_exists(
+    show_mock, create_mock, mock_cache_dir, reservation_outcomes
+):
+    """
+    Test that the reservation is looked up once per renewal margin, and created again if it was deleted.
+    """
+    mock_cache_dir.mkdir()
+    show_mock.return_value = False
+
+    await create_or_update_reservation("test.license@licenseserver:10")
+    create_mock.assert_awaited_once()
+    show_mock.reset_mock()
+
+    # Within the renewal margin, the reservation isn't looked up
+    await create_or_update_reservation("test.license@licenseserver:10")
+    show_mock.assert_not_awaited()
+
+    # After it, the reservation is looked up and skipped if it still exists
+    show_mock.return_value = "reservation_data"
+    checked_at = time.time() + settings.RESERVATION_RENEWAL_MARGIN
+    with mock.patch("lm_agent.workload_managers.slurm.reservations.time.time", return_value=checked_at):
+        await create_or_update_reservation("test.license@licenseserver:10")
+    show_mock.assert_awaited_once()
+    create_mock.assert_awaited_once()
+
+    # Or created again if it was deleted outside the agent
+    show_mock.return_value = False
+    with mock.patch(
+        "lm_agent.workload_managers.slurm.reservations.time.time",
+        return_value=checked_at + settings.RESERVATION_RENEWAL_MARGIN,
+    ):
+        await create_or_update_reservation("test.license@licenseserver:10")
+    assert create_mock.await_count == 2
+    assert reservation_outcomes() == {"applied": 2, "skipped": 2}
+
+
+@mark.asyncio
+@mock.patch("lm_agent.workload_managers.slurm.reservations.scontrol_create_reservation")
+@mock.patch("lm_agent.workload_managers.slurm.reservations.scontrol_show_reservation")
+async def test_create_or_update_reservation__forgets_reservation_if_scontrol_fails(
+    show_mock, create_mock, mock_cache_dir, reservation_outcomes
+):
+    """
+    Test that the reservation is applied again if scontrol failed to apply it.
+    """
+    mock_cache_dir.mkdir()
+    show_mock.return_value = False
+    create_mock.return_value = False
+
+    with raises(LicenseManagerReservationFailure):
+        await create_or_update_reservation("test.license@licenseserver:10")
+
+    assert not (mock_cache_dir / RESERVATION_STATE_FILE_NAME).exists()
+
+    create_mock.return_value = True
+    await create_or_update_reservation("test.license@licenseserver:10")
+
+    assert create_mock.await_count == 2
+
+
+@mark.asyncio
+@mock.patch("lm_agent.workload_managers.slurm.reservations.scontrol_show_reservation")
+@mock.patch("lm_agent.workload_managers.slurm.reservations.scontrol_delete_reservation")
+async def test_delete_reservation_if_exists__skips_scontrol_if_already_deleted(
+    delete_mock, show_mock, mock_cache_dir, reservation_outcomes
+):
+    """
+    Test that scontrol is only called to delete the reservation if it isn't known to be deleted.
+    """
+    mock_cache_dir.mkdir()
+    show_mock.return_value = "reservation_data"
+
+    await delete_reservation_if_exists()
+    await delete_reservation_if_exists()
+
+    show_mock.assert_awaited_once()
+    delete_mock.assert_awaited_once()
+    assert reservation_outcomes() == {"applied": 1, "skipped": 1}
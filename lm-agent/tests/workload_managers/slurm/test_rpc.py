@@ -0,0 +1,234 @@
+"""
+Test the RPC server and client used by the Prolog/Epilog to run through the agent.
+"""
+
+import asyncio
+import stat
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+import pytest
+
+from lm_agent.config import settings
+from lm_agent.workload_managers.slurm.rpc_client import call_agent, epilog_main, prolog_main
+from lm_agent.workload_managers.slurm.rpc_server import COMMANDS, start_rpc_server, stop_rpc_server
+
+
+@pytest.fixture
+def rpc_socket_path(monkeypatch):
+    """
+    Provide a short path for the Unix socket, shared by the server settings and the client environment.
+    """
+    with tempfile.TemporaryDirectory(prefix="lm-") as socket_dir:
+        socket_path = Path(socket_dir) / "agent.sock"
+        monkeypatch.setenv("LM_AGENT_RPC_SOCKET_PATH", str(socket_path))
+        with mock.patch.object(settings, "RPC_SOCKET_PATH", socket_path):
+            yield socket_path
+
+
+@pytest.fixture
+def job_environment(monkeypatch):
+    """
+    Provide the environment set by Slurm for the Prolog/Epilog.
+    """
+    environment = {
+        "SLURM_CLUSTER_NAME": "cluster1",
+        "SLURM_JOB_ID": "1",
+        "SLURM_JOB_NODELIST": "host[1-2]",
+        "SLURM_JOB_USER": "user1",
+        "SLURM_JOB_LICENSES": "test.feature@flexlm:10",
+    }
+    for name, value in environment.items():
+        monkeypatch.setenv(name, value)
+    return environment
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("command", ["prolog", "epilog"])
+@mock.patch("lm_agent.workload_managers.slurm.rpc_server.get_job_context")
+async def test_call_agent__runs_the_command_in_the_agent(
+    get_job_context_mock, command, rpc_socket_path, job_environment
+):
+    """
+    Check that the command is processed by the agent with the job environment of the caller.
+    """
+    job_context = {"job_id": "1", "lead_host": "host1"}
+    get_job_context_mock.return_value = job_context
+    command_mock = mock.AsyncMock(return_value=1)
+
+    server = await start_rpc_server()
+    assert server is not None
+    assert rpc_socket_path.is_socket()
+
+    with mock.patch.dict(COMMANDS, {command: command_mock}):
+        exit_status = await asyncio.to_thread(call_agent, command)
+
+    await stop_rpc_server(server)
+
+    assert exit_status == 1
+    get_job_context_mock.assert_awaited_once_with(job_environment)
+    command_mock.assert_awaited_once_with(job_context)
+    assert not rpc_socket_path.exists()
+
+
+@pytest.mark.asyncio
+async def test_start_rpc_server__creates_the_socket_for_the_owner_and_group_only(rpc_socket_path):
+    """
+    Check that the socket is only accessible by the agent user and its group.
+    """
+    server = await start_rpc_server()
+    mode = stat.S_IMODE(rpc_socket_path.stat().st_mode)
+    await stop_rpc_server(server)
+
+    assert mode & 0o007 == 0
+
+
+@pytest.mark.asyncio
+@mock.patch("lm_agent.workload_managers.slurm.rpc_server.get_job_context")
+async def test_call_agent__returns_failure_if_the_command_fails(get_job_context_mock, rpc_socket_path):
+    """
+    Check that an error while processing the command is reported as a failure.
+    """
+    get_job_context_mock.return_value = {}
+    command_mock = mock.AsyncMock(side_effect=KeyError("job_id"))
+
+    server = await start_rpc_server()
+
+    with mock.patch.dict(COMMANDS, {"epilog": command_mock}):
+        exit_status = await asyncio.to_thread(call_agent, "epilog")
+
+    await stop_rpc_server(server)
+
+    assert exit_status == 1
+
+
+@pytest.mark.asyncio
+async def test_rpc_server__returns_failure_on_invalid_request(rpc_socket_path):
+    """
+    Check that an invalid request is reported as a failure.
+    """
+    server = await start_rpc_server()
+
+    reader, writer = await asyncio.open_unix_connection(str(rpc_socket_path))
+    writer.write(b'{"command": "reconcile"}\n')
+    response = await reader.readline()
+    writer.close()
+
+    await stop_rpc_server(server)
+
+    assert response == b'{"exit_status":1}\n'
+
+
+@pytest.mark.asyncio
+@mock.patch("lm_agent.workload_managers.slurm.rpc_server.remove_job_by_slurm_job_id")
+@mock.patch("lm_agent.workload_managers.slurm.rpc_server.get_job_context")
+async def test_rpc_server__cancels_the_prolog_and_removes_the_job_if_the_client_disconnects(
+    get_job_context_mock, remove_job_mock, rpc_socket_path
+):
+    """
+    Check that the Prolog is cancelled when the client gives up, and the job it may have created is removed.
+    """
+    get_job_context_mock.return_value = {"job_id": "1"}
+    started = asyncio.Event()
+    cancelled = asyncio.Event()
+
+    async def process_prolog(job_context):
+        started.set()
+        try:
+            await asyncio.Event().wait()
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    server = await start_rpc_server()
+
+    with mock.patch.dict(COMMANDS, {"prolog": process_prolog}):
+        _, writer = await asyncio.open_unix_connection(str(rpc_socket_path))
+        writer.write(b'{"command": "prolog", "environment": {}}\n')
+        await asyncio.wait_for(started.wait(), timeout=5)
+        writer.close()
+        await asyncio.wait_for(cancelled.wait(), timeout=5)
+        # Let the handler remove the job after the cancellation
+        for _ in range(10):
+            await asyncio.sleep(0)
+
+    await stop_rpc_server(server)
+
+    remove_job_mock.assert_awaited_once_with("1")
+
+
+@pytest.mark.asyncio
+@mock.patch("lm_agent.workload_managers.slurm.rpc_server.remove_job_by_slurm_job_id")
+@mock.patch("lm_agent.workload_managers.slurm.rpc_server.get_job_context")
+async def test_call_agent__returns_failure_and_removes_the_job_if_the_prolog_times_out(
+    get_job_context_mock, remove_job_mock, rpc_socket_path
+):
+    """
+    Check that the Prolog fails before the client gives up if it takes too long, removing the job.
+    """
+    get_job_context_mock.return_value = {"job_id": "1"}
+
+    async def process_prolog(job_context):
+        await asyncio.sleep(60)
+
+    server = await start_rpc_server()
+
+    with mock.patch.object(settings, "RPC_PROCESSING_TIMEOUT", 0.01):
+        with mock.patch.dict(COMMANDS, {"prolog": process_prolog}):
+            exit_status = await asyncio.to_thread(call_agent, "prolog")
+
+    await stop_rpc_server(server)
+
+    assert exit_status == 1
+    remove_job_mock.assert_awaited_once_with("1")
+
+
+def test_call_agent__returns_none_if_the_agent_is_not_running(rpc_socket_path):
+    """
+    Check that None is returned if there's no agent listening on the socket.
+    """
+    assert call_agent("prolog") is None
+
+
+@pytest.mark.parametrize(
+    "main_function,command,module",
+    [
+        (prolog_main, "prolog", "slurmctld_prolog"),
+        (epilog_main, "epilog", "slurmctld_epilog"),
+    ],
+)
+@mock.patch("lm_agent.workload_managers.slurm.rpc_client.call_agent")
+def test_main__exits_with_the_exit_status_from_the_agent(call_agent_mock, main_function, command, module):
+    """
+    Check that the Prolog/Epilog exit with the exit status returned by the agent.
+    """
+    call_agent_mock.return_value = 1
+
+    with mock.patch(f"lm_agent.workload_managers.slurm.{module}.main") as in_process_main_mock:
+        with pytest.raises(SystemExit) as exc_info:
+            main_function()
+
+    assert exc_info.value.code == 1
+    call_agent_mock.assert_called_once_with(command)
+    in_process_main_mock.assert_not_called()
+
+
+@pytest.mark.parametrize(
+    "main_function,module",
+    [
+        (prolog_main, "slurmctld_prolog"),
+        (epilog_main, "slurmctld_epilog"),
+    ],
+)
+@mock.patch("lm_agent.workload_managers.slurm.rpc_client.call_agent")
+def test_main__runs_in_process_if_the_agent_is_not_reachable(call_agent_mock, main_function, module):
+    """
+    Check that the Prolog/Epilog run in the current process if the agent is not reachable.
+    """
+    call_agent_mock.return_value = None
+
+    with mock.patch(f"lm_agent.workload_managers.slurm.{module}.main") as in_process_main_mock:
+        main_function()
+
+    in_process_main_mock.assert_called_once_with()
@@ -11,7 +11,7 @@ from lm_agent.workload_managers.slurm.slurmctld_epilog import epilog
 
 @pytest.mark.asyncio
 @mock.patch("lm_agent.workload_managers.slurm.slurmctld_epilog.get_job_context")
-@mock.patch("lm_agent.workload_managers.slurm.slurmctld_epilog.reconcile")
+@mock.patch("lm_agent.workload_managers.slurm.slurmctld_epilog.shared_reconcile")
 @mock.patch("lm_agent.workload_managers.slurm.slurmctld_epilog.get_required_licenses_for_job")
 @mock.patch("lm_agent.workload_managers.slurm.slurmctld_epilog.remove_job_by_slurm_job_id")
 async def test_epilog(
@@ -41,7 +41,7 @@ async def test_epilog(
 @pytest.mark.asyncio
 @mock.patch("lm_agent.workload_managers.slurm.slurmctld_epilog.settings")
 @mock.patch("lm_agent.workload_managers.slurm.slurmctld_epilog.get_job_context")
-@mock.patch("lm_agent.workload_managers.slurm.slurmctld_epilog.reconcile")
+@mock.patch("lm_agent.workload_managers.slurm.slurmctld_epilog.shared_reconcile")
 @mock.patch("lm_agent.workload_managers.slurm.slurmctld_epilog.get_required_licenses_for_job")
 @mock.patch("lm_agent.workload_managers.slurm.slurmctld_epilog.remove_job_by_slurm_job_id")
 async def test_epilog_without_triggering_reconcile(
@@ -64,7 +64,7 @@ async def test_main_error_in_get_config_from_backend(
 @mock.patch("lm_agent.workload_managers.slurm.slurmctld_prolog.get_job_context")
 @mock.patch("lm_agent.workload_managers.slurm.slurmctld_prolog.get_required_licenses_for_job")
 @mock.patch("lm_agent.workload_managers.slurm.slurmctld_prolog.get_cluster_configs_from_backend")
-@mock.patch("lm_agent.workload_managers.slurm.slurmctld_prolog.reconcile")
+@mock.patch("lm_agent.workload_managers.slurm.slurmctld_prolog.shared_reconcile")
 async def test_main_error_in_reconcile(
     reconcile_mock,
     get_configs_from_backend_mock,
@@ -112,7 +112,7 @@ async def test_main_error_in_reconcile(
 @mock.patch("lm_agent.workload_managers.slurm.slurmctld_prolog.get_job_context")
 @mock.patch("lm_agent.workload_managers.slurm.slurmctld_prolog.get_required_licenses_for_job")
 @mock.patch("lm_agent.workload_managers.slurm.slurmctld_prolog.get_cluster_configs_from_backend")
-@mock.patch("lm_agent.workload_managers.slurm.slurmctld_prolog.reconcile")
+@mock.patch("lm_agent.workload_managers.slurm.slurmctld_prolog.shared_reconcile")
 @mock.patch("lm_agent.workload_managers.slurm.slurmctld_prolog.make_booking_request")
 async def test_main(
     make_booking_request_mock,
@@ -163,7 +163,7 @@ async def test_main(
 @mock.patch("lm_agent.workload_managers.slurm.slurmctld_prolog.get_job_context")
 @mock.patch("lm_agent.workload_managers.slurm.slurmctld_prolog.get_required_licenses_for_job")
 @mock.patch("lm_agent.workload_managers.slurm.slurmctld_prolog.get_cluster_configs_from_backend")
-@mock.patch("lm_agent.workload_managers.slurm.slurmctld_prolog.reconcile")
+@mock.patch("lm_agent.workload_managers.slurm.slurmctld_prolog.shared_reconcile")
 @mock.patch("lm_agent.workload_managers.slurm.slurmctld_prolog.make_booking_request")
 async def test_main_without_triggering_reconciliation(
     make_booking_request_mock,
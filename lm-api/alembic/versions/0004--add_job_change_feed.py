@@ -0,0 +1,57 @@
+"""Add the job change feed
+
+Revision ID: 3f7c9e2b8d41
+Revises: a1b2c3d4e5f6
+Create Date: 2026-10-17 10:00:00.000000
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "3f7c9e2b8d41"
+down_revision = "a1b2c3d4e5f6"
+branch_labels = None
+depends_on = None
+
+
+CURRENT_CHANGE_XID = sa.text("(pg_current_xact_id()::text::bigint)")
+
+
+def upgrade():
+    """
+    Track the id of the last transaction that changed each job, and keep a tombstone for each deleted job.
+
+    These are used by the job change feed to return only the jobs changed since the last request of the agent.
+    """
+    op.add_column(
+        "jobs",
+        sa.Column("change_xid", sa.BigInteger(), server_default=CURRENT_CHANGE_XID, nullable=False),
+    )
+    op.create_index(op.f("ix_jobs_change_xid"), "jobs", ["change_xid"], unique=False)
+
+    op.create_table(
+        "job_tombstones",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("job_id", sa.Integer(), nullable=False),
+        sa.Column("slurm_job_id", sa.String(), nullable=False),
+        sa.Column("cluster_client_id", sa.String(), nullable=False),
+        sa.Column("change_xid", sa.BigInteger(), server_default=CURRENT_CHANGE_XID, nullable=False),
+        sa.Column("deleted_at", sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        op.f("ix_job_tombstones_cluster_client_id"), "job_tombstones", ["cluster_client_id"], unique=False
+    )
+    op.create_index(op.f("ix_job_tombstones_change_xid"), "job_tombstones", ["change_xid"], unique=False)
+
+
+def downgrade():
+    """
+    Remove the job change feed.
+    """
+    op.drop_index(op.f("ix_job_tombstones_change_xid"), table_name="job_tombstones")
+    op.drop_index(op.f("ix_job_tombstones_cluster_client_id"), table_name="job_tombstones")
+    op.drop_table("job_tombstones")
+    op.drop_index(op.f("ix_jobs_change_xid"), table_name="jobs")
+    op.drop_column("jobs", "change_xid")
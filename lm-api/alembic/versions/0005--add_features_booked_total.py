@@ -0,0 +1,44 @@
+"""Add the booked total of the features
+
+Revision ID: 8b2e4d6f1a93
+Revises: 3f7c9e2b8d41
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "8b2e4d6f1a93"
+down_revision = "3f7c9e2b8d41"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    """
+    Keep the sum of the quantities of the bookings of each feature in the feature itself.
+
+    It's updated along with the bookings, so a booking is admitted by updating a single row,
+    instead of summing all the bookings of the feature.
+    """
+    op.add_column("features", sa.Column("booked_total", sa.Integer(), server_default="0", nullable=False))
+    op.execute(
+        """
+        UPDATE features
+        SET booked_total = bookings_sum.booked_total
+        FROM (
+            SELECT feature_id, SUM(quantity) AS booked_total FROM bookings GROUP BY feature_id
+        ) AS bookings_sum
+        WHERE features.id = bookings_sum.feature_id
+        """
+    )
+    op.create_check_constraint("features_booked_total_check", "features", "booked_total>=0")
+
+
+def downgrade():
+    """
+    Remove the booked total of the features.
+    """
+    op.drop_constraint("features_booked_total_check", "features", type_="check")
+    op.drop_column("features", "booked_total")
@@ -0,0 +1,35 @@
+"""Add indexes for the filters of the list endpoints
+
+Revision ID: 5d1a7c3e9b62
+Revises: 8b2e4d6f1a93
+Create Date: 2026-10-17 14:00:00.000000
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "5d1a7c3e9b62"
+down_revision = "8b2e4d6f1a93"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    """
+    Add indexes on the columns used by the filters of the list endpoints.
+
+    The other filters use columns that are already indexed, and the pages are read in the order
+    of the primary keys.
+    """
+    op.create_index(op.f("ix_jobs_username"), "jobs", ["username"], unique=False)
+    op.create_index(op.f("ix_bookings_created_at"), "bookings", ["created_at"], unique=False)
+    op.create_index(op.f("ix_features_name"), "features", ["name"], unique=False)
+
+
+def downgrade():
+    """
+    Remove the indexes of the list filters.
+    """
+    op.drop_index(op.f("ix_features_name"), table_name="features")
+    op.drop_index(op.f("ix_bookings_created_at"), table_name="bookings")
+    op.drop_index(op.f("ix_jobs_username"), table_name="jobs")
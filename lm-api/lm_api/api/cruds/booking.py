@@ -2,69 +2,111 @@
 Booking CRUD class for SQLAlchemy models.
 """
 
+from typing import List, Union
+
 from fastapi import HTTPException
 from loguru import logger
-from sqlalchemy import func, insert, literal, select
+from sqlalchemy import (
+    ARRAY,
+    CTE,
+    Column,
+    Integer,
+    Select,
+    any_,
+    delete,
+    func,
+    insert,
+    literal,
+    select,
+    update,
+)
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from lm_api.api.cruds.generic import GenericCRUD
 from lm_api.api.models.booking import Booking
 from lm_api.api.models.feature import Feature
+from lm_api.api.models.job import Job, current_change_xid
 from lm_api.api.schemas.booking import BookingCreateSchema
 
 
+def release_booked_licenses(deleted_bookings: CTE) -> CTE:
+    """
+    Build the data-modifying CTE that decreases the booked total of the features of the deleted bookings.
+
+    The deleted bookings must be a CTE returning the feature_id and the quantity of each deleted booking.
+    """
+    released = (
+        select(deleted_bookings.c.feature_id, func.sum(deleted_bookings.c.quantity).label("quantity"))
+        .group_by(deleted_bookings.c.feature_id)
+        .subquery("released_licenses")
+    )
+
+    return (
+        update(Feature)
+        .where(Feature.id == released.c.feature_id)
+        .values(booked_total=Feature.booked_total - released.c.quantity)
+    ).cte("released_features")
+
+
+def delete_bookings_of_features(features: Select) -> Select:
+    """
+    Build the query that deletes the bookings of the features about to be deleted.
+
+    The features must be a select of their ids. The jobs of the deleted bookings are marked as changed in a
+    data-modifying CTE of the same query, so the bookings removed with their features are reported by the
+    job change feed. The booked totals aren't released, since the features are deleted too.
+    """
+    delete_bookings_cte = (
+        delete(Booking).where(Booking.feature_id.in_(features)).returning(Booking.id, Booking.job_id)
+    ).cte("deleted_bookings")
+
+    update_jobs_cte = (
+        update(Job)
+        .where(Job.id.in_(select(delete_bookings_cte.c.job_id)))
+        .values(change_xid=current_change_xid())
+    ).cte("changed_jobs")
+
+    return select(delete_bookings_cte.c.id).add_cte(update_jobs_cte)
+
+
 class BookingCRUD(GenericCRUD):
-    """Booking CRUD module to overload create method, preventing the overbooking issue."""
+    """
+    Booking CRUD module to overload create method, preventing the overbooking issue,
+    and to implement the booking bulk deletion.
+
+    Creating or deleting a booking marks its job as changed, so it's reported by the job change feed.
+    """
 
     async def create(self, db_session: AsyncSession, obj=BookingCreateSchema) -> Booking:
         """
         Create a new booking.
 
-        Use a somewhat complex logic to check if a booking can be made and insert it in one query. In this
-        case, implement the `INSERT columns FROM select_query WHERE EXISTS (SELECT subquery)` SQL paradigm
-        using SQLAlchemy query API. A  booking will only be created if there are enough licenses available
-        to make the booking.
+        A booking will only be created if there are enough licenses available to make the booking, that is,
+        if the licenses already booked, the licenses in use, the licenses reserved and the amount requested
+        are smaller or equal the license total.
 
-        To determine if a booking can be made, we check if the amount of licenses already booked, the licenses
-        in use, the licenses reserved and the amount requested, are smaller or equal the license total.
+        The booked total of the feature is increased with a conditional `UPDATE ... WHERE ... RETURNING` in a
+        data-modifying CTE, and the booking is only inserted if the feature was updated. Since the update
+        locks the row of the feature, concurrent bookings of the same feature are checked one after the other
+        against the latest booked total, without summing the bookings of the feature.
         """
-
-        # CTE used to provide the request values to the insert/select query.
-        vars_cte = select(
-            literal(obj.feature_id).label("feature_id"),
-            literal(obj.job_id).label("job_id"),
-            literal(obj.quantity).label("quantity"),
-        ).cte("vars")
-
-        # Subquery to determine if there are enough licenses to be booked
-        exists_subquery = (
-            select(Feature.id)
-            .select_from(Feature)
-            .join(Booking, Feature.id == Booking.feature_id, isouter=True)
-            .where(Feature.id == obj.feature_id)
-            .group_by(Feature.id)
-            .having(
-                func.sum(func.coalesce(Booking.quantity, 0))
-                + func.max(Feature.used)
-                + func.max(Feature.reserved)
-                + obj.quantity
-                <= func.max(Feature.total)
+        book_feature_cte = (
+            update(Feature)
+            .where(
+                Feature.id == obj.feature_id,
+                Feature.booked_total + Feature.used + Feature.reserved + obj.quantity <= Feature.total,
             )
-        ).exists()
+            .values(booked_total=Feature.booked_total + obj.quantity)
+            .returning(Feature.id)
+        ).cte("booked_feature")
 
-        # Composite query using the CTE and subquery to atomically check-then-set the new booking
         insert_query = (
             insert(Booking)
             .from_select(
                 ["job_id", "feature_id", "quantity"],
-                select(
-                    vars_cte.c.job_id,
-                    vars_cte.c.feature_id,
-                    vars_cte.c.quantity,
-                )
-                .select_from(vars_cte)
-                .where(exists_subquery),
+                select(literal(obj.job_id), book_feature_cte.c.id, literal(obj.quantity)),
             )
+            .add_cte(book_feature_cte)
             .returning(Booking)
         )
 
@@ -78,4 +120,61 @@ class BookingCRUD(GenericCRUD):
         if db_obj is None:
             raise HTTPException(status_code=409, detail="Not enough licenses available.")
 
+        await db_session.execute(
+            update(Job)
+            .where(Job.id == db_obj.job_id)
+            .values(change_xid=current_change_xid())
+            .execution_options(synchronize_session=False)
+        )
+
         return db_obj
+
+    async def bulk_delete(self, db_session: AsyncSession, ids: List[int]) -> List[int]:
+        """
+        Delete the bookings with the given ids in one query.
+
+        The ids are sent as a single array parameter, using the `DELETE ... WHERE id = ANY(:ids) RETURNING id`
+        SQL paradigm, so the query is the same regardless of the amount of bookings to delete.
+        The jobs of the deleted bookings are marked as changed, and the booked total of their features is
+        decreased, in data-modifying CTEs of the same query.
+
+        Returns the ids of the deleted bookings. Ids that don't exist are ignored.
+        """
+        delete_bookings_cte = (
+            delete(Booking)
+            .where(Booking.id == any_(literal(ids, ARRAY(Integer))))
+            .returning(Booking.id, Booking.job_id, Booking.feature_id, Booking.quantity)
+        ).cte("deleted_bookings")
+
+        update_jobs_cte = (
+            update(Job)
+            .where(Job.id.in_(select(delete_bookings_cte.c.job_id)))
+            .values(change_xid=current_change_xid())
+        ).cte("changed_jobs")
+
+        release_features_cte = release_booked_licenses(delete_bookings_cte)
+
+        delete_query = select(delete_bookings_cte.c.id).add_cte(update_jobs_cte, release_features_cte)
+
+        try:
+            result = await db_session.execute(delete_query)
+            deleted_ids = list(result.scalars().all())
+        except Exception as e:
+            logger.error(e)
+            raise HTTPException(
+                status_code=400, detail=f"{self.model.__name__}s could not be deleted."
+            ) from e
+
+        # The deleted objects may still be loaded in the session
+        db_session.expire_all()
+
+        return deleted_ids
+
+    async def delete(self, db_session: AsyncSession, id: Union[Column[int], int]):
+        """
+        Delete a booking from the database.
+        """
+        if not await self.bulk_delete(db_session, [id]):
+            raise HTTPException(status_code=404, detail=f"{self.model.__name__} not found.")
+
+        return {"message": f"{self.model.__name__} deleted successfully."}
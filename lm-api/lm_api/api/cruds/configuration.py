@@ -2,11 +2,14 @@
 Feature CRUD class for SQLAlchemy models.
 """
 
+from typing import Union
+
 from fastapi import HTTPException
 from loguru import logger
-from sqlalchemy import delete
+from sqlalchemy import Column, delete, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from lm_api.api.cruds.booking import delete_bookings_of_features
 from lm_api.api.cruds.generic import GenericCRUD
 from lm_api.api.models.feature import Feature
 from lm_api.api.models.license_server import LicenseServer
@@ -14,27 +17,51 @@ from lm_api.api.schemas.configuration import ConfigurationCompleteUpdateSchema
 
 
 class ConfigurationCRUD(GenericCRUD):
-    """Configuration CRUD module to implement configuration update."""
+    """
+    Configuration CRUD module to implement configuration update.
+
+    The bookings of the deleted features are deleted first, marking their jobs as changed.
+    """
+
+    async def delete(self, db_session: AsyncSession, id: Union[Column[int], int]):
+        """
+        Delete a configuration along with its features, license servers and the bookings of its features.
+        """
+        try:
+            await db_session.execute(
+                delete_bookings_of_features(select(Feature.id).where(Feature.config_id == id))
+            )
+        except Exception as e:
+            logger.error(e)
+            raise HTTPException(status_code=400, detail="Configuration could not be deleted.") from e
+
+        # The deleted bookings may still be loaded in the session
+        db_session.expire_all()
+
+        return await super().delete(db_session=db_session, id=id)
 
     async def delete_features(
         self, db_session: AsyncSession, configuration_id: int, payload: ConfigurationCompleteUpdateSchema
     ):
         """
-        Delete all features that aren't in the payload.
+        Delete all features that aren't in the payload, along with their bookings.
         """
         features_in_payload = [f.id for f in payload.features if f.id is not None] if payload.features else []
-        delete_unused_features_query = (
-            delete(Feature)
+        unused_features = (
+            select(Feature.id)
             .where(~Feature.id.in_(features_in_payload))
             .where(Feature.config_id == configuration_id)
         )
 
         try:
-            await db_session.execute(delete_unused_features_query)
+            await db_session.execute(delete_bookings_of_features(unused_features))
+            await db_session.execute(delete(Feature).where(Feature.id.in_(unused_features)))
         except Exception as e:
             logger.error(e)
             raise HTTPException(status_code=400, detail="Feature could not be deleted.") from e
 
+        db_session.expire_all()
+
     async def delete_license_servers(
         self, db_session: AsyncSession, configuration_id: int, payload: ConfigurationCompleteUpdateSchema
     ):
@@ -2,24 +2,37 @@
 Feature CRUD class for SQLAlchemy models.
 """
 
-from typing import List, Optional, Sequence, Union
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple, Union
 
 from fastapi import HTTPException
 from loguru import logger
-from sqlalchemy import Column, func, select, tuple_
+from sqlalchemy import (
+    ARRAY,
+    Column,
+    ColumnElement,
+    Integer,
+    Select,
+    String,
+    and_,
+    func,
+    literal,
+    select,
+    tuple_,
+    update,
+)
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from lm_api.api.cruds.booking import delete_bookings_of_features
 from lm_api.api.cruds.generic import GenericCRUD
-from lm_api.api.models.booking import Booking
 from lm_api.api.models.configuration import Configuration
 from lm_api.api.models.feature import Feature
 from lm_api.api.models.product import Product
 from lm_api.api.schemas.feature import FeatureSchema, FeatureUpdateByNameSchema
-from lm_api.database import search_clause, sort_clause
+from lm_api.config import settings
 
 
 class FeatureCRUD(GenericCRUD):
-    """Feature CRUD module to implement feature bulk update and lookup."""
+    """Feature CRUD module to implement feature bulk update, lookup, deletion and bookings sum."""
 
     async def read(
         self, db_session: AsyncSession, id: Union[Column[int], int], force_refresh: bool = False
@@ -33,12 +46,9 @@ class FeatureCRUD(GenericCRUD):
                 *(Feature.__table__.c),
                 Product.id.label("product_id"),
                 Product.name.label("product_name"),
-                func.coalesce(func.sum(Booking.quantity), 0).label("booked_total"),
             )
             .join(Product, Feature.product_id == Product.id)
-            .join(Booking, Feature.id == Booking.feature_id, isouter=True)
             .where(Feature.id == id)
-            .group_by(Feature.id, Product.id)
         )
 
         try:
@@ -53,50 +63,120 @@ class FeatureCRUD(GenericCRUD):
 
         return FeatureSchema.from_flat_dict(db_obj._asdict())
 
+    async def delete(self, db_session: AsyncSession, id: Union[Column[int], int]):
+        """
+        Delete a feature along with its bookings.
+
+        The bookings are deleted first, marking their jobs as changed for the job change feed.
+        """
+        try:
+            await db_session.execute(delete_bookings_of_features(select(Feature.id).where(Feature.id == id)))
+        except Exception as e:
+            logger.error(e)
+            raise HTTPException(status_code=400, detail="Feature could not be deleted.") from e
+
+        # The deleted bookings may still be loaded in the session
+        db_session.expire_all()
+
+        return await super().delete(db_session=db_session, id=id)
+
     async def bulk_update(
         self, db_session: AsyncSession, features: List[FeatureUpdateByNameSchema], cluster_client_id: str
-    ):
+    ) -> int:
         """
         Update a list of features in the database. Since features with the same name can exist in different
         clusters, the client_id is used to filter the cluster where the feature is located.
+
+        The features are updated in one set-based `UPDATE features SET total, used FROM (...)` query,
+        joining the requested values, sent as arrays and unnested, with the features of the cluster
+        by their product and feature names. Features whose total and used didn't change are skipped.
+
+        A feature repeated in the list is updated once, unless its counters differ. A feature configured
+        in more than one configuration of the cluster is updated in all of them.
+
+        Nothing is updated if any feature can't be found. Returns the number of features that changed.
         """
-        get_features_query = (
-            select(Feature)
+        counters_by_name: Dict[Tuple[str, str], Tuple[int, int]] = {}
+        for feature in features:
+            counters = (feature.total, feature.used)
+            if (
+                counters_by_name.setdefault((feature.product_name, feature.feature_name), counters)
+                != counters
+            ):
+                raise HTTPException(
+                    status_code=400,
+                    detail=(
+                        f"Feature {feature.product_name}.{feature.feature_name} "
+                        "is repeated with different counters."
+                    ),
+                )
+
+        requested = (
+            func.unnest(
+                literal([product_name for product_name, _ in counters_by_name], ARRAY(String)),
+                literal([feature_name for _, feature_name in counters_by_name], ARRAY(String)),
+                literal([total for total, _ in counters_by_name.values()], ARRAY(Integer)),
+                literal([used for _, used in counters_by_name.values()], ARRAY(Integer)),
+            )
+            .table_valued("product_name", "feature_name", "total", "used")
+            .render_derived(name="requested")
+        )
+
+        matched_features_cte = (
+            select(
+                Feature.id,
+                requested.c.product_name,
+                requested.c.feature_name,
+                requested.c.total,
+                requested.c.used,
+            )
             .join(Product, Feature.product_id == Product.id)
             .join(Configuration, Feature.config_id == Configuration.id)
+            .join(
+                requested,
+                and_(requested.c.product_name == Product.name, requested.c.feature_name == Feature.name),
+            )
+            .where(Configuration.cluster_client_id == cluster_client_id)
+        ).cte("matched_features")
+
+        # The features found are counted by name, as a name can match a feature in each configuration
+        matched_count = select(
+            func.count(
+                tuple_(matched_features_cte.c.product_name, matched_features_cte.c.feature_name).distinct()
+            )
+        ).scalar_subquery()
+
+        update_features_cte = (
+            update(Feature)
             .where(
-                tuple_(
-                    Product.name,
-                    Feature.name,
-                    Configuration.cluster_client_id,
-                ).in_(
-                    [(feature.product_name, feature.feature_name, cluster_client_id) for feature in features]
-                )
+                Feature.id == matched_features_cte.c.id,
+                tuple_(Feature.total, Feature.used).is_distinct_from(
+                    tuple_(matched_features_cte.c.total, matched_features_cte.c.used)
+                ),
+                matched_count == len(counters_by_name),
             )
+            .values(total=matched_features_cte.c.total, used=matched_features_cte.c.used)
+            .returning(Feature.id)
+        ).cte("updated_features")
+
+        update_query = select(
+            matched_count.label("matched_count"),
+            select(func.count()).select_from(update_features_cte).scalar_subquery().label("updated_count"),
         )
 
         try:
-            result = await db_session.execute(get_features_query)
-            db_objs: Sequence[Feature] = result.scalars().all()
+            result = (await db_session.execute(update_query)).one()
         except Exception as e:
             logger.error(e)
-            raise HTTPException(status_code=400, detail="Feature could not be read.") from e
+            raise HTTPException(status_code=400, detail="Feature could not be updated.") from e
 
-        if len(db_objs) != len(features):
+        if result.matched_count != len(counters_by_name):
             raise HTTPException(status_code=404, detail="Feature not found.")
 
-        for db_obj in db_objs:
-            for feature in features:
-                if db_obj.product.name == feature.product_name and db_obj.name == feature.feature_name:
-                    db_obj.total = feature.total
-                    db_obj.used = feature.used
-                    break
+        # The updated objects may still be loaded in the session
+        db_session.expire_all()
 
-        try:
-            await db_session.flush()
-        except Exception as e:
-            logger.error(e)
-            raise HTTPException(status_code=400, detail="Feature could not be updated.") from e
+        return result.updated_count
 
     async def filter_by_product_feature_and_client_id(
         self, db_session: AsyncSession, product_name: str, feature_name: str, client_id: str
@@ -136,29 +216,110 @@ class FeatureCRUD(GenericCRUD):
         search: Optional[str] = None,
         sort_field: Optional[str] = None,
         sort_ascending: bool = True,
+        filter_expressions: Optional[List[ColumnElement[bool]]] = None,
+        limit: Optional[int] = None,
+        after: Optional[str] = None,
     ) -> List[FeatureSchema]:
         """
-        Read all objects.
+        Read all objects, or a page of them if a limit is given.
         Returns a list of objects.
         """
         try:
-            stmt = (
-                select(
-                    *(Feature.__table__.c),
-                    Product.id.label("product_id"),
-                    Product.name.label("product_name"),
-                    func.coalesce(func.sum(Booking.quantity), 0).label("booked_total"),
-                )
-                .join(Product, Feature.product_id == Product.id)
-                .join(Booking, Feature.id == Booking.feature_id, isouter=True)
+            stmt = self.list_statement(
+                self._select_with_product(),
+                search,
+                sort_field,
+                sort_ascending,
+                filter_expressions,
+                limit,
+                after,
             )
-            if search is not None:
-                stmt = stmt.where(search_clause(search, self.model.searchable_fields))
-            stmt = stmt.group_by(Feature.id, Product.id)
-            if sort_field is not None:
-                stmt = stmt.order_by(sort_clause(sort_field, self.model.sortable_fields, sort_ascending))
             query = await db_session.execute(stmt)
             return [FeatureSchema.from_flat_dict(r._asdict()) for r in query.all()]
         except Exception as e:
             logger.error(e)
             raise HTTPException(status_code=400, detail=f"{self.model.__name__}s could not be read.") from e
+
+    async def stream_all(
+        self,
+        db_session: AsyncSession,
+        search: Optional[str] = None,
+        sort_field: Optional[str] = None,
+        sort_ascending: bool = True,
+        filter_expressions: Optional[List[ColumnElement[bool]]] = None,
+        limit: Optional[int] = None,
+        after: Optional[str] = None,
+    ) -> AsyncIterator[FeatureSchema]:
+        """
+        Read the same features as `read_all`, but from a server-side cursor.
+        """
+        try:
+            stmt = self.list_statement(
+                self._select_with_product(),
+                search,
+                sort_field,
+                sort_ascending,
+                filter_expressions,
+                limit,
+                after,
+            )
+            result = await db_session.stream(stmt.execution_options(yield_per=settings.STREAM_BATCH_SIZE))
+        except Exception as e:
+            logger.error(e)
+            raise HTTPException(status_code=400, detail=f"{self.model.__name__}s could not be read.") from e
+
+        return (FeatureSchema.from_flat_dict(r._asdict()) async for r in result)
+
+    def _select_with_product(self) -> Select:
+        """
+        Select the columns of the features along with the id and the name of their product.
+        """
+        return select(
+            *(Feature.__table__.c),
+            Product.id.label("product_id"),
+            Product.name.label("product_name"),
+        ).join(Product, Feature.product_id == Product.id)
+
+    def sort_value(self, db_obj: FeatureSchema, sort_field: str) -> Any:
+        """
+        Return the value of the sort field of a feature, used in the cursor of the next page.
+        """
+        if sort_field == "product_id":
+            return db_obj.product.id
+        return super().sort_value(db_obj, sort_field)
+
+    async def read_bookings_sum(
+        self, db_session: AsyncSession, cluster_client_id: Optional[str] = None
+    ) -> Dict[str, int]:
+        """
+        Sum the booked quantity of each product.feature across all clusters.
+
+        Since the same product.feature can be configured in multiple clusters, the booked totals of all
+        features with the same product and feature names are summed in one query grouped by the names.
+
+        If the cluster_client_id is provided, only the product.features configured in the cluster
+        are returned.
+        """
+        product_feature = (Product.name + "." + Feature.name).label("product_feature")
+
+        stmt = (
+            select(product_feature, func.sum(Feature.booked_total).label("booked_total"))
+            .select_from(Feature)
+            .join(Product, Feature.product_id == Product.id)
+        )
+        if cluster_client_id is not None:
+            cluster_product_features = (
+                select(Product.name, Feature.name)
+                .join(Product, Feature.product_id == Product.id)
+                .join(Configuration, Feature.config_id == Configuration.id)
+                .where(Configuration.cluster_client_id == cluster_client_id)
+            )
+            stmt = stmt.where(tuple_(Product.name, Feature.name).in_(cluster_product_features))
+        stmt = stmt.group_by(Product.name, Feature.name)
+
+        try:
+            query = await db_session.execute(stmt)
+            return {row.product_feature: row.booked_total for row in query.all()}
+        except Exception as e:
+            logger.error(e)
+            raise HTTPException(status_code=400, detail="Bookings sum could not be read.") from e
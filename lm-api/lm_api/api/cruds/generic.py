@@ -4,25 +4,46 @@ Generic CRUD class for SQLAlchemy models.
 
 from __future__ import annotations
 
-from typing import List, Optional, Sequence, Type, Union
+from typing import Any, AsyncIterator, List, Optional, Sequence, Type, Union
 
 from fastapi import HTTPException
 from loguru import logger
 from pydantic import BaseModel
-from sqlalchemy import Column, ColumnElement, and_, select
+from sqlalchemy import Column, ColumnElement, Select, and_, select
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql.base import ExecutableOption
 
 from lm_api.api.models.crud_base import CrudBase
 from lm_api.api.schemas.base import BaseCreateSchema, BaseUpdateSchema
-from lm_api.database import search_clause, sort_clause
+from lm_api.config import settings
+from lm_api.database import encode_cursor, keyset_clause, search_clause, sort_clause
 
 
 class GenericCRUD:
     """Generic CRUD module to interface with database, to be utilized by all models."""
 
-    def __init__(self, model: Type[CrudBase]):
-        """Initializes the CRUD class with the model to be used."""
+    def __init__(self, model: Type[CrudBase], load_options: Sequence[ExecutableOption] = ()):
+        """
+        Initializes the CRUD class with the model to be used.
+
+        The relationships of the models are never loaded implicitly, so the load options must load
+        the relationships needed by the responses built from the objects, e.g. `selectinload(Job.bookings)`
+        to return the jobs with their bookings.
+        """
         self.model = model
+        self.load_options = tuple(load_options)
+
+    def select_by_id(self, id: Union[Column[int], int], refresh: bool = False) -> Select:
+        """
+        Select the object with the given id, loading the relationships requested by the load options.
+
+        If refresh is set, the object and its relationships are read again even if they're already loaded
+        in the session.
+        """
+        stmt = select(self.model).where(self.model.id == id).options(*self.load_options)
+        if refresh:
+            stmt = stmt.execution_options(populate_existing=True)
+        return stmt
 
     async def create(self, db_session: AsyncSession, obj: BaseCreateSchema) -> CrudBase:
         """Creates a new object in the database."""
@@ -35,7 +56,7 @@ class GenericCRUD:
 
         # TODO: Determine if the session actually needs to be flushed here. I think it might not
         await db_session.flush()
-        await db_session.refresh(db_obj)
+        await db_session.execute(self.select_by_id(db_obj.id, refresh=True))
         return db_obj
 
     async def filter(
@@ -46,7 +67,9 @@ class GenericCRUD:
         Returns the list of objects or raise an exception if it does not exist.
         """
         try:
-            query = await db_session.execute(select(self.model).filter(and_(*filter_expressions)))
+            query = await db_session.execute(
+                select(self.model).filter(and_(*filter_expressions)).options(*self.load_options)
+            )
             db_objs = list(query.scalars().all())
         except Exception as e:
             logger.error(e)
@@ -65,7 +88,7 @@ class GenericCRUD:
         Returns the object or raise an exception if it does not exist.
         """
         try:
-            query = await db_session.execute(select(self.model).filter(self.model.id == id))
+            query = await db_session.execute(self.select_by_id(id, refresh=force_refresh))
             db_obj = query.scalars().one_or_none()
         except Exception as e:
             logger.error(e)
@@ -74,9 +97,6 @@ class GenericCRUD:
         if db_obj is None:
             raise HTTPException(status_code=404, detail=f"{self.model.__name__} not found.")
 
-        if force_refresh:
-            await db_session.refresh(db_obj)
-
         return db_obj
 
     async def read_all(
@@ -85,23 +105,117 @@ class GenericCRUD:
         search: Optional[str] = None,
         sort_field: Optional[str] = None,
         sort_ascending: bool = True,
+        filter_expressions: Optional[List[ColumnElement[bool]]] = None,
+        limit: Optional[int] = None,
+        after: Optional[str] = None,
     ) -> Sequence[Union[CrudBase, BaseModel]]:
         """
-        Read all objects.
+        Read all objects, or a page of them if a limit is given.
         Returns a list of objects.
+
+        The pages are read with keyset pagination: the cursor of the next page is returned by `next_cursor`.
         """
         try:
-            stmt = select(self.model)
-            if search is not None:
-                stmt = stmt.where(search_clause(search, self.model.searchable_fields))
-            if sort_field is not None:
-                stmt = stmt.order_by(sort_clause(sort_field, self.model.sortable_fields, sort_ascending))
+            stmt = self.list_statement(
+                select(self.model).options(*self.load_options),
+                search,
+                sort_field,
+                sort_ascending,
+                filter_expressions,
+                limit,
+                after,
+            )
             query = await db_session.scalars(stmt)
             return query.all()
         except Exception as e:
             logger.error(e)
             raise HTTPException(status_code=400, detail=f"{self.model.__name__}s could not be read.") from e
 
+    async def stream_all(
+        self,
+        db_session: AsyncSession,
+        search: Optional[str] = None,
+        sort_field: Optional[str] = None,
+        sort_ascending: bool = True,
+        filter_expressions: Optional[List[ColumnElement[bool]]] = None,
+        limit: Optional[int] = None,
+        after: Optional[str] = None,
+    ) -> AsyncIterator[Union[CrudBase, BaseModel]]:
+        """
+        Read the same objects as `read_all`, but from a server-side cursor.
+
+        The query is executed before returning, so errors are raised here. The rows are then fetched
+        in batches of STREAM_BATCH_SIZE as the objects are iterated over.
+        """
+        try:
+            stmt = self.list_statement(
+                select(self.model).options(*self.load_options),
+                search,
+                sort_field,
+                sort_ascending,
+                filter_expressions,
+                limit,
+                after,
+            )
+            return await db_session.stream_scalars(
+                stmt.execution_options(yield_per=settings.STREAM_BATCH_SIZE)
+            )
+        except Exception as e:
+            logger.error(e)
+            raise HTTPException(status_code=400, detail=f"{self.model.__name__}s could not be read.") from e
+
+    def list_statement(
+        self,
+        stmt: Select,
+        search: Optional[str] = None,
+        sort_field: Optional[str] = None,
+        sort_ascending: bool = True,
+        filter_expressions: Optional[List[ColumnElement[bool]]] = None,
+        limit: Optional[int] = None,
+        after: Optional[str] = None,
+    ) -> Select:
+        """
+        Apply the filters, the search, the sort order and the keyset pagination to a select statement.
+
+        The rows are ordered by the sort field and then by id, so the order is the same for every page.
+        The rows after the cursor are selected by comparing them with the sort values of the last row
+        of the previous page, which uses the indexes instead of skipping the rows of the previous pages.
+        """
+        if filter_expressions:
+            stmt = stmt.where(and_(*filter_expressions))
+        if search is not None:
+            stmt = stmt.where(search_clause(search, self.model.searchable_fields))
+
+        order_columns = [self.model.id]
+        if sort_field is not None:
+            order_columns.insert(0, sort_clause(sort_field, self.model.sortable_fields, True))
+
+        if after is not None:
+            stmt = stmt.where(keyset_clause(after, order_columns, sort_ascending))
+        stmt = stmt.order_by(*[column if sort_ascending else column.desc() for column in order_columns])
+        if limit is not None:
+            stmt = stmt.limit(limit)
+        return stmt
+
+    def next_cursor(
+        self, db_objs: Sequence[Any], sort_field: Optional[str] = None, limit: Optional[int] = None
+    ) -> Optional[str]:
+        """
+        Return the cursor of the page after the given page, or None if it's the last page.
+        """
+        if limit is None or len(db_objs) < limit:
+            return None
+
+        last_obj = db_objs[-1]
+        values = [self.sort_value(last_obj, sort_field)] if sort_field is not None else []
+        return encode_cursor([*values, last_obj.id])
+
+    def sort_value(self, db_obj: Any, sort_field: str) -> Any:
+        """
+        Return the value of the sort field of an object, used in the cursor of the next page.
+        """
+        return getattr(db_obj, sort_field)
+
     async def update(
         self,
         db_session: AsyncSession,
@@ -133,7 +247,7 @@ class GenericCRUD:
 
         try:
             await db_session.flush()
-            await db_session.refresh(db_obj)
+            await db_session.execute(self.select_by_id(id, refresh=True))
         except Exception as e:
             logger.error(e)
             raise HTTPException(status_code=400, detail=f"{self.model.__name__} could not be updated.") from e
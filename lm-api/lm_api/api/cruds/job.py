@@ -0,0 +1,378 @@
+"""
+Job CRUD class for SQLAlchemy models.
+"""
+
+from datetime import timedelta
+from typing import List, Optional, Union
+
+from fastapi import HTTPException
+from loguru import logger
+from sqlalchemy import (
+    ARRAY,
+    Column,
+    ColumnElement,
+    Integer,
+    String,
+    and_,
+    delete,
+    exists,
+    func,
+    insert,
+    literal,
+    select,
+    true,
+    update,
+)
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from lm_api.api.cruds.booking import release_booked_licenses
+from lm_api.api.cruds.generic import GenericCRUD
+from lm_api.api.models.booking import Booking
+from lm_api.api.models.configuration import Configuration
+from lm_api.api.models.feature import Feature
+from lm_api.api.models.job import Job, snapshot_change_xid
+from lm_api.api.models.job_tombstone import JobTombstone
+from lm_api.api.models.product import Product
+from lm_api.api.schemas.booking import BookingSchema
+from lm_api.api.schemas.job import JobBookingCreateSchema, JobCreateSchema, JobSchema
+from lm_api.config import settings
+
+
+class JobCRUD(GenericCRUD):
+    """
+    Job CRUD module to implement the job creation with its bookings, the job bulk deletion
+    and the job change feed.
+
+    Deleting a job leaves a tombstone behind, so the deletion is reported by the job change feed.
+    """
+
+    async def create_with_bookings(
+        self,
+        db_session: AsyncSession,
+        obj: JobCreateSchema,
+        bookings: List[JobBookingCreateSchema],
+        client_id: str,
+    ) -> JobSchema:
+        """
+        Create a job and its bookings in one query, only if every booking can be made.
+
+        The product.feature names of the bookings are resolved among the features of the cluster identified
+        by the client_id. The features are locked, and the licenses left for each feature are computed in the
+        same way as in `BookingCRUD.create`, taking into account all the bookings of the job for that feature.
+        The booked total of the features is increased, and the job and the bookings are inserted, in
+        data-modifying CTEs of the same query, that change nothing if any feature can't be found or doesn't
+        have enough licenses left.
+
+        The ids of the bookings are drawn from their sequence while resolving the features, so the created
+        job is returned without reading it again.
+
+        Raises a 404 if a feature can't be found, and a 409 if a feature doesn't have enough licenses,
+        naming the first feature of the bookings that couldn't be booked.
+        """
+        if not bookings:
+            return await self._create_without_bookings(db_session, obj)
+
+        try:
+            product_feature_names = [booking.product_feature.split(".") for booking in bookings]
+            product_names = [product_name for product_name, _ in product_feature_names]
+            feature_names = [feature_name for _, feature_name in product_feature_names]
+        except ValueError as e:
+            raise HTTPException(
+                status_code=400, detail="The product_feature must be in the format product.feature."
+            ) from e
+
+        requested = (
+            func.unnest(
+                literal(product_names, ARRAY(String)),
+                literal(feature_names, ARRAY(String)),
+                literal([booking.quantity for booking in bookings], ARRAY(Integer)),
+            )
+            .table_valued("product_name", "feature_name", "quantity", with_ordinality="position")
+            .render_derived(name="requested")
+        )
+
+        cluster_features = (
+            select(Feature.id, Product.name.label("product_name"), Feature.name.label("feature_name"))
+            .join(Product, Feature.product_id == Product.id)
+            .join(Configuration, Feature.config_id == Configuration.id)
+            .where(Configuration.cluster_client_id == client_id)
+        ).subquery("cluster_features")
+
+        # Resolve the features of the bookings, drawing the ids of the bookings
+        resolved_cte = (
+            select(
+                requested.c.position,
+                requested.c.quantity,
+                cluster_features.c.id.label("feature_id"),
+                func.nextval(func.pg_get_serial_sequence(Booking.__tablename__, "id")).label("booking_id"),
+            ).select_from(
+                requested.outerjoin(
+                    cluster_features,
+                    and_(
+                        cluster_features.c.product_name == requested.c.product_name,
+                        cluster_features.c.feature_name == requested.c.feature_name,
+                    ),
+                )
+            )
+        ).cte("resolved_bookings")
+
+        # Lock the features in a consistent order, so their latest booked total is used
+        locked_features_cte = (
+            select(Feature.id, Feature.total, Feature.used, Feature.reserved, Feature.booked_total)
+            .where(Feature.id.in_(select(resolved_cte.c.feature_id)))
+            .order_by(Feature.id)
+            .with_for_update()
+        ).cte("locked_features")
+
+        requested_features = (
+            select(resolved_cte.c.feature_id, func.sum(resolved_cte.c.quantity).label("quantity"))
+            .where(resolved_cte.c.feature_id.is_not(None))
+            .group_by(resolved_cte.c.feature_id)
+        ).subquery("requested_features")
+
+        # Compute the licenses left for each feature after all the bookings of the job
+        checked_features_cte = (
+            select(
+                locked_features_cte.c.id,
+                requested_features.c.quantity,
+                (
+                    locked_features_cte.c.total
+                    - locked_features_cte.c.used
+                    - locked_features_cte.c.reserved
+                    - locked_features_cte.c.booked_total
+                    - requested_features.c.quantity
+                ).label("remaining"),
+            ).join(requested_features, requested_features.c.feature_id == locked_features_cte.c.id)
+        ).cte("checked_features")
+
+        can_be_booked = and_(
+            select(func.count()).select_from(resolved_cte).scalar_subquery() == len(bookings),
+            ~exists().where(resolved_cte.c.feature_id.is_(None)),
+            ~exists().where(checked_features_cte.c.remaining < 0),
+        )
+
+        book_features_cte = (
+            update(Feature)
+            .where(Feature.id == checked_features_cte.c.id, can_be_booked)
+            .values(booked_total=Feature.booked_total + checked_features_cte.c.quantity)
+        ).cte("booked_features")
+
+        insert_job_cte = (
+            insert(Job)
+            .from_select(
+                ["slurm_job_id", "cluster_client_id", "username", "lead_host"],
+                select(
+                    literal(obj.slurm_job_id, String),
+                    literal(obj.cluster_client_id, String),
+                    literal(obj.username, String),
+                    literal(obj.lead_host, String),
+                ).where(can_be_booked),
+            )
+            .returning(Job.id)
+        ).cte("new_job")
+
+        insert_bookings_cte = (
+            insert(Booking)
+            .from_select(
+                ["id", "job_id", "feature_id", "quantity"],
+                select(
+                    resolved_cte.c.booking_id,
+                    insert_job_cte.c.id,
+                    resolved_cte.c.feature_id,
+                    resolved_cte.c.quantity,
+                ).select_from(insert_job_cte.join(resolved_cte, true())),
+            )
+            .returning(Booking.id)
+        ).cte("new_bookings")
+
+        create_query = (
+            select(
+                resolved_cte.c.position,
+                resolved_cte.c.quantity,
+                resolved_cte.c.feature_id,
+                checked_features_cte.c.remaining,
+                resolved_cte.c.booking_id,
+                select(insert_job_cte.c.id).scalar_subquery().label("job_id"),
+            )
+            .select_from(
+                resolved_cte.outerjoin(
+                    checked_features_cte, checked_features_cte.c.id == resolved_cte.c.feature_id
+                )
+            )
+            .add_cte(insert_bookings_cte, book_features_cte)
+            .order_by(resolved_cte.c.position)
+        )
+
+        try:
+            rows = (await db_session.execute(create_query)).all()
+        except Exception as e:
+            logger.error(e)
+            raise HTTPException(status_code=400, detail=f"{self.model.__name__} could not be created.") from e
+
+        positions = [row.position for row in rows]
+        for row in rows:
+            product_feature = bookings[row.position - 1].product_feature
+            if positions.count(row.position) > 1:
+                raise HTTPException(status_code=400, detail=f"Feature {product_feature} could not be read.")
+            if row.feature_id is None:
+                raise HTTPException(status_code=404, detail=f"Feature {product_feature} not found.")
+            if row.remaining < 0:
+                raise HTTPException(
+                    status_code=409, detail=f"Not enough licenses available for {product_feature}."
+                )
+
+        job_id = rows[0].job_id
+        return JobSchema(
+            id=job_id,
+            **obj.model_dump(),
+            bookings=[
+                BookingSchema(
+                    id=row.booking_id, job_id=job_id, feature_id=row.feature_id, quantity=row.quantity
+                )
+                for row in rows
+            ],
+        )
+
+    async def _create_without_bookings(self, db_session: AsyncSession, obj: JobCreateSchema) -> JobSchema:
+        """
+        Create a job without bookings in one query.
+        """
+        try:
+            result = await db_session.execute(insert(Job).values(**obj.model_dump()).returning(Job.id))
+            job_id = result.scalar_one()
+        except Exception as e:
+            logger.error(e)
+            raise HTTPException(status_code=400, detail=f"{self.model.__name__} could not be created.") from e
+
+        return JobSchema(id=job_id, **obj.model_dump(), bookings=[])
+
+    async def _delete_with_tombstones(
+        self, db_session: AsyncSession, *filter_expressions: ColumnElement[bool]
+    ) -> List[str]:
+        """
+        Delete the jobs matching the filter expressions and their bookings, leaving a tombstone for each job.
+
+        The bookings and the jobs are deleted, and the booked total of the features of the bookings is
+        decreased, in data-modifying CTEs of the same `INSERT` statement that creates the tombstones.
+        Since the foreign key of the bookings is only checked at the end of the statement, everything is
+        applied atomically without loading the objects in the session.
+
+        The tombstones older than the retention period are purged, so they don't pile up for the clusters
+        whose agents don't read the job change feed.
+
+        Returns the slurm_job_ids of the deleted jobs.
+        """
+        jobs_to_delete = select(Job.id).where(*filter_expressions)
+
+        delete_bookings_cte = (
+            delete(Booking)
+            .where(Booking.job_id.in_(jobs_to_delete))
+            .returning(Booking.id, Booking.feature_id, Booking.quantity)
+        ).cte("deleted_bookings")
+
+        release_features_cte = release_booked_licenses(delete_bookings_cte)
+
+        delete_jobs_cte = (
+            delete(Job)
+            .where(*filter_expressions)
+            .returning(Job.id, Job.slurm_job_id, Job.cluster_client_id)
+            .cte("deleted_jobs")
+        )
+
+        insert_tombstones_query = (
+            insert(JobTombstone)
+            .from_select(
+                ["job_id", "slurm_job_id", "cluster_client_id"],
+                select(
+                    delete_jobs_cte.c.id, delete_jobs_cte.c.slurm_job_id, delete_jobs_cte.c.cluster_client_id
+                ),
+            )
+            .add_cte(delete_bookings_cte, delete_jobs_cte, release_features_cte)
+            .returning(JobTombstone.slurm_job_id)
+        )
+
+        try:
+            result = await db_session.execute(insert_tombstones_query)
+            deleted_slurm_job_ids = list(result.scalars().all())
+
+            await db_session.execute(
+                delete(JobTombstone)
+                .where(
+                    JobTombstone.deleted_at < func.now() - timedelta(seconds=settings.JOB_TOMBSTONE_RETENTION)
+                )
+                .execution_options(synchronize_session=False)
+            )
+        except Exception as e:
+            logger.error(e)
+            raise HTTPException(
+                status_code=400, detail=f"{self.model.__name__}s could not be deleted."
+            ) from e
+
+        # The deleted objects may still be loaded in the session
+        db_session.expire_all()
+
+        return deleted_slurm_job_ids
+
+    async def delete(self, db_session: AsyncSession, id: Union[Column[int], int]):
+        """
+        Delete a job and its bookings from the database, leaving a tombstone for the job.
+        """
+        if not await self._delete_with_tombstones(db_session, Job.id == id):
+            raise HTTPException(status_code=404, detail=f"{self.model.__name__} not found.")
+
+        return {"message": f"{self.model.__name__} deleted successfully."}
+
+    async def bulk_delete_by_slurm_job_ids(
+        self, db_session: AsyncSession, slurm_job_ids: List[str], cluster_client_id: str
+    ) -> List[str]:
+        """
+        Delete the jobs with the given slurm_job_ids in the cluster, and their bookings, in one query.
+
+        Returns the slurm_job_ids of the deleted jobs.
+        """
+        return await self._delete_with_tombstones(
+            db_session,
+            Job.slurm_job_id.in_(slurm_job_ids),
+            Job.cluster_client_id == cluster_client_id,
+        )
+
+    async def read_changes(
+        self, db_session: AsyncSession, cluster_client_id: str, since: Optional[int]
+    ) -> dict:
+        """
+        Return the jobs of the cluster created or changed since the given cursor, with their bookings,
+        and the tombstones of the jobs deleted since then.
+
+        The cursor is the id of the oldest transaction still running when the changes were read, so every
+        change made by a transaction with a smaller id was already committed and is included in the result.
+        Changes made by transactions with a bigger id may be returned again by the next request, but they
+        are never missed, no matter the order in which the transactions are committed.
+
+        If no cursor is given, all the jobs of the cluster are returned.
+
+        Nothing is changed, so a request can be retried with the same cursor. The tombstones are purged when
+        jobs are deleted, once they're older than the retention period.
+        """
+        jobs_query = select(Job).where(Job.cluster_client_id == cluster_client_id).options(*self.load_options)
+        tombstones: List[JobTombstone] = []
+
+        try:
+            # The cursor must be read before the changes, so nothing committed in between is missed
+            cursor = (await db_session.execute(select(snapshot_change_xid()))).scalar_one()
+
+            if since is not None:
+                jobs_query = jobs_query.where(Job.change_xid >= since)
+
+                tombstones_query = select(JobTombstone).where(
+                    JobTombstone.cluster_client_id == cluster_client_id, JobTombstone.change_xid >= since
+                )
+                tombstones = list((await db_session.execute(tombstones_query)).scalars().all())
+
+            jobs = list((await db_session.execute(jobs_query)).scalars().all())
+        except Exception as e:
+            logger.error(e)
+            raise HTTPException(
+                status_code=400, detail=f"{self.model.__name__} changes could not be read."
+            ) from e
+
+        return {"cursor": cursor, "jobs": jobs, "deleted_jobs": tombstones}
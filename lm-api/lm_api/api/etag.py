@@ -0,0 +1,64 @@
+"""
+Conditional GET support for the resources that are polled by the agent.
+
+The ETag is computed from the serialized response, so it changes whenever anything in the
+response changes, and the response body isn't sent if the client already holds that version.
+Fields that change constantly but aren't relevant to the client can be left out of the ETag,
+which is then a weak ETag, as the same one is used for responses that aren't byte-for-byte equal.
+"""
+
+import hashlib
+from typing import Any, Dict, Optional, Type
+
+from fastapi import Response, status
+from pydantic import TypeAdapter
+
+
+def compute_etag(content: bytes) -> str:
+    """Compute a strong ETag for the given response content."""
+    return f'"{hashlib.blake2b(content, digest_size=16).hexdigest()}"'
+
+
+def etag_matches(etag: str, if_none_match: Optional[str]) -> bool:
+    """
+    Check if the ETag matches any of the entity tags in the `If-None-Match` header.
+
+    Weak comparison is used, as specified for `If-None-Match` in RFC 9110.
+    """
+    if not if_none_match:
+        return False
+
+    for entity_tag in if_none_match.split(","):
+        entity_tag = entity_tag.strip()
+        if entity_tag == "*" or entity_tag.removeprefix("W/") == etag.removeprefix("W/"):
+            return True
+
+    return False
+
+
+def conditional_response(
+    data: Any,
+    response_model: Type,
+    if_none_match: Optional[str],
+    etag_exclude: Optional[Dict] = None,
+) -> Response:
+    """
+    Serialize the data with the response model and return it with its ETag.
+
+    The fields in `etag_exclude` (in the format of pydantic's `exclude`) are left out of the ETag,
+    so changes to them alone don't invalidate the client's copy. The ETag is weak in that case.
+
+    If the ETag matches the `If-None-Match` header, return a `304 Not Modified` response instead.
+    """
+    adapter = TypeAdapter(response_model)
+    validated_data = adapter.validate_python(data, from_attributes=True)
+    content = adapter.dump_json(validated_data)
+    if etag_exclude is None:
+        etag = compute_etag(content)
+    else:
+        etag = f"W/{compute_etag(adapter.dump_json(validated_data, exclude=etag_exclude))}"
+
+    if etag_matches(etag, if_none_match):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
+    return Response(content=content, media_type="application/json", headers={"ETag": etag})
@@ -27,10 +27,10 @@ class Booking(CrudBase):
     job_id = mapped_column(Integer, ForeignKey("jobs.id"), nullable=False, index=True)
     feature_id = mapped_column(Integer, ForeignKey("features.id"), nullable=False, index=True)
     quantity = mapped_column(Integer, CheckConstraint("quantity>=0"), nullable=False)
-    created_at = mapped_column(DateTime, default=func.now())
+    created_at = mapped_column(DateTime, default=func.now(), index=True)
 
-    job: Mapped[Job] = relationship(Job, back_populates="bookings", lazy="selectin")
-    feature: Mapped[Feature] = relationship(Feature, back_populates="bookings", lazy="selectin")
+    job: Mapped[Job] = relationship(Job, back_populates="bookings", lazy="raise")
+    feature: Mapped[Feature] = relationship(Feature, back_populates="bookings", lazy="raise")
 
     sortable_fields = [job_id, feature_id]
 
@@ -33,14 +33,14 @@ class Configuration(CrudBase):
     license_servers: Mapped[List[LicenseServer]] = relationship(
         LicenseServer,
         back_populates="configurations",
-        lazy="selectin",
+        lazy="raise",
         cascade="all, delete-orphan",
         uselist=True,
     )
     features: Mapped[List[Feature]] = relationship(
         Feature,
         back_populates="configurations",
-        lazy="selectin",
+        lazy="raise",
         cascade="all, delete-orphan",
         uselist=True,
     )
@@ -25,26 +25,30 @@ class Feature(CrudBase):
     Represents a feature.
     """
 
-    name = mapped_column(String, nullable=False)
+    name = mapped_column(String, nullable=False, index=True)
     product_id = mapped_column(Integer, ForeignKey("products.id"), nullable=False, index=True)
     config_id = mapped_column(Integer, ForeignKey("configs.id"), nullable=False, index=True)
     total = mapped_column(Integer, CheckConstraint("total>=0"), default=0, nullable=False)
     used = mapped_column(Integer, CheckConstraint("used>=0"), default=0, nullable=False)
     reserved = mapped_column(Integer, CheckConstraint("reserved>=0"), nullable=False)
+    # Sum of the quantities of the bookings of the feature, updated along with the bookings
+    booked_total = mapped_column(
+        Integer, CheckConstraint("booked_total>=0"), default=0, server_default="0", nullable=False
+    )
 
-    product = relationship(Product, back_populates="features", lazy="selectin")
+    product = relationship(Product, back_populates="features", lazy="raise")
 
     bookings: Mapped[List[Booking]] = relationship(
         Booking,
         back_populates="feature",
-        lazy="selectin",
+        lazy="raise",
         cascade="all, delete-orphan",
         uselist=True,
     )
     configurations: Mapped[List[Configuration]] = relationship(
         Configuration,
         back_populates="features",
-        lazy="selectin",
+        lazy="raise",
         uselist=True,
     )
 
@@ -59,5 +63,6 @@ class Feature(CrudBase):
             f"config_id={self.config_id}, "
             f"total={self.total}, "
             f"used={self.used}, "
-            f"reserved={self.reserved})"
+            f"reserved={self.reserved}, "
+            f"booked_total={self.booked_total})"
         )
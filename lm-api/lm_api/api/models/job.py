@@ -2,7 +2,7 @@
 
 from typing import TYPE_CHECKING, List
 
-from sqlalchemy import String
+from sqlalchemy import BigInteger, String, Text, cast, func, text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from lm_api.api.models.crud_base import CrudBase
@@ -12,6 +12,23 @@ if TYPE_CHECKING:
 else:
     Booking = "Booking"
 
+# Id of the current transaction, used to track the changes of the jobs for the job change feed
+CURRENT_CHANGE_XID = text("(pg_current_xact_id()::text::bigint)")
+
+
+def current_change_xid():
+    """Build the SQL expression for the id of the current transaction."""
+    return cast(cast(func.pg_current_xact_id(), Text), BigInteger)
+
+
+def snapshot_change_xid():
+    """
+    Build the SQL expression for the oldest transaction still running when the statement started.
+
+    Every transaction with a smaller id is either committed or aborted, so it's used as the job change cursor.
+    """
+    return cast(cast(func.pg_snapshot_xmin(func.pg_current_snapshot()), Text), BigInteger)
+
 
 class Job(CrudBase):
     """
@@ -20,13 +37,15 @@ class Job(CrudBase):
 
     slurm_job_id = mapped_column(String, nullable=False, index=True)
     cluster_client_id = mapped_column(String, nullable=False, index=True)
-    username = mapped_column(String, nullable=False)
+    username = mapped_column(String, nullable=False, index=True)
     lead_host = mapped_column(String, nullable=False)
+    # Id of the last transaction that changed the job or its bookings
+    change_xid = mapped_column(BigInteger, nullable=False, server_default=CURRENT_CHANGE_XID, index=True)
 
     bookings: Mapped[List[Booking]] = relationship(
         Booking,
         back_populates="job",
-        lazy="selectin",
+        lazy="raise",
         cascade="all, delete-orphan",
     )
 
@@ -0,0 +1,31 @@
+"""Database model for the tombstones of deleted Jobs."""
+
+from sqlalchemy import BigInteger, Integer, String, func
+from sqlalchemy.orm import mapped_column
+from sqlalchemy.sql.sqltypes import DateTime
+
+from lm_api.api.models.crud_base import CrudBase
+from lm_api.api.models.job import CURRENT_CHANGE_XID
+
+
+class JobTombstone(CrudBase):
+    """
+    Represents a job deleted from a cluster.
+
+    Tombstones are kept until the cluster's agent has synchronized past them through the job change feed.
+    """
+
+    job_id = mapped_column(Integer, nullable=False)
+    slurm_job_id = mapped_column(String, nullable=False)
+    cluster_client_id = mapped_column(String, nullable=False, index=True)
+    change_xid = mapped_column(BigInteger, nullable=False, server_default=CURRENT_CHANGE_XID, index=True)
+    deleted_at = mapped_column(DateTime, default=func.now())
+
+    def __repr__(self):
+        return (
+            f"JobTombstone(id={self.id}, "
+            f"job_id={self.job_id}, "
+            f"slurm_job_id={self.slurm_job_id}, "
+            f"cluster_client_id={self.cluster_client_id}, "
+            f"change_xid={self.change_xid})"
+        )
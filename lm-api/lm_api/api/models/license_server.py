@@ -26,7 +26,7 @@ class LicenseServer(CrudBase):
     configurations: Mapped[List[Configuration]] = relationship(
         Configuration,
         back_populates="license_servers",
-        lazy="selectin",
+        lazy="raise",
     )
 
     searchable_fields = [host]
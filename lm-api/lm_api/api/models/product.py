@@ -23,7 +23,7 @@ class Product(CrudBase):
     features: Mapped[List[Feature]] = relationship(
         Feature,
         back_populates="product",
-        lazy="selectin",
+        lazy="raise",
         cascade="all, delete-orphan",
     )
 
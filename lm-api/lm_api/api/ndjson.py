@@ -0,0 +1,47 @@
+"""
+Newline-delimited JSON streaming for the list endpoints.
+
+Clients opt in by sending `Accept: application/x-ndjson`. The objects are then serialized one per line
+as they're read from a server-side cursor, so the memory used by the response doesn't depend on the
+number of objects returned.
+"""
+
+from typing import Any, AsyncIterator, Dict, Optional, Type, Union
+
+from fastapi import status
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+# Documents the streamed content of the list endpoints in the OpenAPI schema
+NDJSON_RESPONSES: Dict[Union[int, str], Dict[str, Any]] = {
+    status.HTTP_200_OK: {
+        "description": f"Successful Response, with one object per line for `Accept: {NDJSON_MEDIA_TYPE}`",
+        "content": {NDJSON_MEDIA_TYPE: {}},
+    }
+}
+
+
+def accepts_ndjson(accept: Optional[str]) -> bool:
+    """
+    Check if newline-delimited JSON is one of the media types of the `Accept` header.
+    """
+    if not accept:
+        return False
+
+    return any(
+        media_range.split(";")[0].strip().lower() == NDJSON_MEDIA_TYPE for media_range in accept.split(",")
+    )
+
+
+def ndjson_response(objects: AsyncIterator[Any], schema: Type[BaseModel]) -> StreamingResponse:
+    """
+    Stream the objects validated with the schema, one JSON document per line.
+    """
+
+    async def _lines() -> AsyncIterator[bytes]:
+        async for obj in objects:
+            yield schema.model_validate(obj, from_attributes=True).model_dump_json().encode() + b"\n"
+
+    return StreamingResponse(_lines(), media_type=NDJSON_MEDIA_TYPE)
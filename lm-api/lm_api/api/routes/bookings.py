@@ -1,11 +1,18 @@
+from datetime import datetime, timezone
 from typing import List, Optional
 
-from fastapi import APIRouter, Body, Depends, Query, status
+from fastapi import APIRouter, Body, Depends, Header, Query, Response, status
+from sqlalchemy import select
 
 from lm_api.api.cruds.booking import BookingCRUD
 from lm_api.api.models.booking import Booking
+from lm_api.api.models.feature import Feature
+from lm_api.api.models.job import Job
+from lm_api.api.models.product import Product
+from lm_api.api.ndjson import NDJSON_RESPONSES, accepts_ndjson, ndjson_response
 from lm_api.api.schemas.booking import BookingCreateSchema, BookingSchema
-from lm_api.database import SecureSession, secure_session
+from lm_api.config import settings
+from lm_api.database import NEXT_CURSOR_HEADER, SecureSession, secure_session
 from lm_api.permissions import Permissions
 
 router = APIRouter()
@@ -14,6 +21,13 @@ router = APIRouter()
 crud_booking = BookingCRUD(Booking)
 
 
+def _as_naive_utc(value: datetime) -> datetime:
+    """Convert a datetime to naive UTC, as the creation time of the bookings is stored."""
+    if value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
 @router.post(
     "",
     response_model=BookingSchema,
@@ -31,21 +45,91 @@ async def create_booking(
     "",
     response_model=List[BookingSchema],
     status_code=status.HTTP_200_OK,
+    responses=NDJSON_RESPONSES,
 )
 async def read_all_bookings(
+    response: Response,
     sort_field: Optional[str] = Query(None),
     sort_ascending: bool = Query(True),
+    cluster_client_id: Optional[str] = Query(None, description="Only return the bookings of this cluster."),
+    username: Optional[str] = Query(None, description="Only return the bookings of the jobs of this user."),
+    product: Optional[str] = Query(None, description="Only return the bookings of this product."),
+    feature: Optional[str] = Query(
+        None, description="Only return the bookings of the features with this name."
+    ),
+    created_after: Optional[datetime] = Query(
+        None, description="Only return the bookings created at or after this time."
+    ),
+    created_before: Optional[datetime] = Query(
+        None, description="Only return the bookings created before this time."
+    ),
+    limit: Optional[int] = Query(
+        None,
+        ge=1,
+        le=settings.MAX_PAGE_SIZE,
+        description="The maximum number of bookings in the page. If omitted, all bookings are returned.",
+    ),
+    after: Optional[str] = Query(
+        None, description=f"The cursor returned in the {NEXT_CURSOR_HEADER} header of the previous page."
+    ),
+    accept: Optional[str] = Header(None),
     secure_session: SecureSession = Depends(
         secure_session(Permissions.ADMIN, Permissions.BOOKING_READ, commit=False)
     ),
 ):
-    """Return all bookings."""
-    return await crud_booking.read_all(
+    """
+    Return all bookings, or a page of them if a limit is given.
+
+    The cursor of the next page is returned in the X-Next-Cursor header, unless it's the last page.
+
+    If newline-delimited JSON is requested in the Accept header, the bookings are streamed one per line
+    as they're read from the database, and the cursor of the next page isn't returned.
+    """
+    filter_expressions = []
+    if cluster_client_id is not None or username is not None:
+        jobs = select(Job.id)
+        if cluster_client_id is not None:
+            jobs = jobs.where(Job.cluster_client_id == cluster_client_id)
+        if username is not None:
+            jobs = jobs.where(Job.username == username)
+        filter_expressions.append(Booking.job_id.in_(jobs))
+    if product is not None or feature is not None:
+        features = select(Feature.id).join(Product, Feature.product_id == Product.id)
+        if product is not None:
+            features = features.where(Product.name == product)
+        if feature is not None:
+            features = features.where(Feature.name == feature)
+        filter_expressions.append(Booking.feature_id.in_(features))
+    if created_after is not None:
+        filter_expressions.append(Booking.created_at >= _as_naive_utc(created_after))
+    if created_before is not None:
+        filter_expressions.append(Booking.created_at < _as_naive_utc(created_before))
+
+    if accepts_ndjson(accept):
+        bookings_stream = await crud_booking.stream_all(
+            db_session=secure_session.session,
+            sort_field=sort_field,
+            sort_ascending=sort_ascending,
+            filter_expressions=filter_expressions,
+            limit=limit,
+            after=after,
+        )
+        return ndjson_response(bookings_stream, BookingSchema)
+
+    bookings = await crud_booking.read_all(
         db_session=secure_session.session,
         sort_field=sort_field,
         sort_ascending=sort_ascending,
+        filter_expressions=filter_expressions,
+        limit=limit,
+        after=after,
     )
 
+    next_cursor = crud_booking.next_cursor(bookings, sort_field, limit)
+    if next_cursor is not None:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return bookings
+
 
 @router.get(
     "/{booking_id}",
@@ -62,6 +146,24 @@ async def read_booking(
     return await crud_booking.read(db_session=secure_session.session, id=booking_id)
 
 
+@router.delete(
+    "/bulk",
+    status_code=status.HTTP_200_OK,
+)
+async def bulk_delete_bookings(
+    booking_ids: List[int] = Body(..., description="Ids of the bookings to be deleted"),
+    secure_session: SecureSession = Depends(secure_session(Permissions.ADMIN, Permissions.BOOKING_DELETE)),
+):
+    """
+    Delete a list of bookings from the database.
+
+    Ids that don't exist are ignored. Return the ids of the deleted bookings.
+    """
+    deleted_booking_ids = await crud_booking.bulk_delete(db_session=secure_session.session, ids=booking_ids)
+
+    return {"message": "Bookings deleted successfully.", "deleted_booking_ids": deleted_booking_ids}
+
+
 @router.delete(
     "/{booking_id}",
     status_code=status.HTTP_200_OK,
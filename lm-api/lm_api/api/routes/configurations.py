@@ -1,14 +1,17 @@
 from typing import List, Optional
 
-from fastapi import APIRouter, Body, Depends, HTTPException, Query, status
+from fastapi import APIRouter, Body, Depends, Header, HTTPException, Query, Response, status
+from sqlalchemy.orm import selectinload
 
 from lm_api.api.cruds.configuration import ConfigurationCRUD
 from lm_api.api.cruds.feature import FeatureCRUD
 from lm_api.api.cruds.generic import GenericCRUD
+from lm_api.api.etag import conditional_response
 from lm_api.api.models.configuration import Configuration
 from lm_api.api.models.feature import Feature
 from lm_api.api.models.license_server import LicenseServer
 from lm_api.api.models.product import Product
+from lm_api.api.ndjson import NDJSON_RESPONSES, accepts_ndjson, ndjson_response
 from lm_api.api.schemas.configuration import (
     ConfigurationCompleteCreateSchema,
     ConfigurationCompleteUpdateSchema,
@@ -18,13 +21,21 @@ from lm_api.api.schemas.configuration import (
 )
 from lm_api.api.schemas.feature import FeatureCreateSchema, FeatureUpdateSchema
 from lm_api.api.schemas.license_server import LicenseServerCreateSchema, LicenseServerUpdateSchema
-from lm_api.database import SecureSession, secure_session
+from lm_api.config import settings
+from lm_api.database import NEXT_CURSOR_HEADER, SecureSession, secure_session
 from lm_api.permissions import Permissions
 
 router = APIRouter()
 
 
-crud_configuration = ConfigurationCRUD(Configuration)
+# The configurations are returned with their license servers and their features, with the product of each
+crud_configuration = ConfigurationCRUD(
+    Configuration,
+    load_options=[
+        selectinload(Configuration.features).joinedload(Feature.product),
+        selectinload(Configuration.license_servers),
+    ],
+)
 crud_product = GenericCRUD(Product)
 crud_feature = FeatureCRUD(Feature)
 crud_license_server = GenericCRUD(LicenseServer)
@@ -90,30 +101,81 @@ async def create_configuration(
     "",
     response_model=List[ConfigurationSchema],
     status_code=status.HTTP_200_OK,
+    responses=NDJSON_RESPONSES,
 )
 async def read_all_configurations(
+    response: Response,
     search: Optional[str] = Query(None),
     sort_field: Optional[str] = Query(None),
     sort_ascending: bool = Query(True),
+    cluster_client_id: Optional[str] = Query(
+        None, description="Only return the configurations of this cluster."
+    ),
+    limit: Optional[int] = Query(
+        None,
+        ge=1,
+        le=settings.MAX_PAGE_SIZE,
+        description=(
+            "The maximum number of configurations in the page. If omitted, all configurations are returned."
+        ),
+    ),
+    after: Optional[str] = Query(
+        None, description=f"The cursor returned in the {NEXT_CURSOR_HEADER} header of the previous page."
+    ),
+    accept: Optional[str] = Header(None),
     secure_session: SecureSession = Depends(
         secure_session(Permissions.ADMIN, Permissions.CONFIG_READ, commit=False)
     ),
 ):
-    """Return all configurations with the associated license servers and features."""
-    return await crud_configuration.read_all(
+    """
+    Return all configurations with the associated license servers and features,
+    or a page of them if a limit is given.
+
+    The cursor of the next page is returned in the X-Next-Cursor header, unless it's the last page.
+
+    If newline-delimited JSON is requested in the Accept header, the configurations are streamed one per line
+    as they're read from the database, and the cursor of the next page isn't returned.
+    """
+    filter_expressions = []
+    if cluster_client_id is not None:
+        filter_expressions.append(Configuration.cluster_client_id == cluster_client_id)
+
+    if accepts_ndjson(accept):
+        configurations_stream = await crud_configuration.stream_all(
+            db_session=secure_session.session,
+            search=search,
+            sort_field=sort_field,
+            sort_ascending=sort_ascending,
+            filter_expressions=filter_expressions,
+            limit=limit,
+            after=after,
+        )
+        return ndjson_response(configurations_stream, ConfigurationSchema)
+
+    configurations = await crud_configuration.read_all(
         db_session=secure_session.session,
         search=search,
         sort_field=sort_field,
         sort_ascending=sort_ascending,
+        filter_expressions=filter_expressions,
+        limit=limit,
+        after=after,
     )
 
+    next_cursor = crud_configuration.next_cursor(configurations, sort_field, limit)
+    if next_cursor is not None:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return configurations
+
 
 @router.get(
     "/by_client_id",
     response_model=List[ConfigurationSchema],
     status_code=status.HTTP_200_OK,
+    responses={status.HTTP_304_NOT_MODIFIED: {"description": "The client already holds the current version"}},
 )
 async def read_configurations_by_client_id(
+    if_none_match: Optional[str] = Header(None),
     secure_session: SecureSession = Depends(
         secure_session(Permissions.ADMIN, Permissions.CONFIG_READ, commit=False)
     ),
@@ -127,9 +189,17 @@ async def read_configurations_by_client_id(
             detail=("Couldn't find a valid client_id in the access token."),
         )
 
-    return await crud_configuration.filter(
+    configurations = await crud_configuration.filter(
         db_session=secure_session.session, filter_expressions=[Configuration.cluster_client_id == client_id]
     )
+    # The usage counters are updated on every license report, but the agent only uses the structure
+    # of the configurations, so they're left out of the (weak) ETag to let the agent keep its copy
+    return conditional_response(
+        configurations,
+        List[ConfigurationSchema],
+        if_none_match,
+        etag_exclude={"__all__": {"features": {"__all__": {"total", "used", "booked_total"}}}},
+    )
 
 
 @router.get(
@@ -1,21 +1,28 @@
-from typing import List, Optional
+from typing import Dict, List, Optional
 
-from fastapi import APIRouter, Body, Depends, HTTPException, Query, status
+from fastapi import APIRouter, Body, Depends, Header, HTTPException, Query, Response, status
+from sqlalchemy import select
+from sqlalchemy.orm import joinedload
 
 from lm_api.api.cruds.feature import FeatureCRUD
+from lm_api.api.models.configuration import Configuration
 from lm_api.api.models.feature import Feature
+from lm_api.api.models.product import Product
+from lm_api.api.ndjson import NDJSON_RESPONSES, accepts_ndjson, ndjson_response
 from lm_api.api.schemas.feature import (
     FeatureCreateSchema,
     FeatureSchema,
     FeatureUpdateByNameSchema,
     FeatureUpdateSchema,
 )
-from lm_api.database import SecureSession, secure_session
+from lm_api.config import settings
+from lm_api.database import NEXT_CURSOR_HEADER, SecureSession, secure_session
 from lm_api.permissions import Permissions
 
 router = APIRouter()
 
-crud_feature = FeatureCRUD(Feature)
+# The features are returned with their product
+crud_feature = FeatureCRUD(Feature, load_options=[joinedload(Feature.product)])
 
 
 @router.post(
@@ -35,21 +42,105 @@ async def create_feature(
     "",
     response_model=List[FeatureSchema],
     status_code=status.HTTP_200_OK,
+    responses=NDJSON_RESPONSES,
 )
 async def read_all_features(
+    response: Response,
     search: Optional[str] = Query(None),
     sort_field: Optional[str] = Query(None),
     sort_ascending: bool = Query(True),
+    cluster_client_id: Optional[str] = Query(None, description="Only return the features of this cluster."),
+    product: Optional[str] = Query(None, description="Only return the features of this product."),
+    feature: Optional[str] = Query(None, description="Only return the features with this name."),
+    limit: Optional[int] = Query(
+        None,
+        ge=1,
+        le=settings.MAX_PAGE_SIZE,
+        description="The maximum number of features in the page. If omitted, all features are returned.",
+    ),
+    after: Optional[str] = Query(
+        None, description=f"The cursor returned in the {NEXT_CURSOR_HEADER} header of the previous page."
+    ),
+    accept: Optional[str] = Header(None),
     secure_session: SecureSession = Depends(
         secure_session(Permissions.ADMIN, Permissions.FEATURE_READ, commit=False)
     ),
 ):
-    """Return all features with associated bookings."""
-    return await crud_feature.read_all(
+    """
+    Return all features with their booked totals, or a page of them if a limit is given.
+
+    The cursor of the next page is returned in the X-Next-Cursor header, unless it's the last page.
+
+    If newline-delimited JSON is requested in the Accept header, the features are streamed one per line
+    as they're read from the database, and the cursor of the next page isn't returned.
+    """
+    filter_expressions = []
+    if cluster_client_id is not None:
+        configurations = select(Configuration.id).where(Configuration.cluster_client_id == cluster_client_id)
+        filter_expressions.append(Feature.config_id.in_(configurations))
+    if product is not None:
+        filter_expressions.append(Product.name == product)
+    if feature is not None:
+        filter_expressions.append(Feature.name == feature)
+
+    if accepts_ndjson(accept):
+        features_stream = await crud_feature.stream_all(
+            db_session=secure_session.session,
+            search=search,
+            sort_field=sort_field,
+            sort_ascending=sort_ascending,
+            filter_expressions=filter_expressions,
+            limit=limit,
+            after=after,
+        )
+        return ndjson_response(features_stream, FeatureSchema)
+
+    features = await crud_feature.read_all(
         db_session=secure_session.session,
         search=search,
         sort_field=sort_field,
         sort_ascending=sort_ascending,
+        filter_expressions=filter_expressions,
+        limit=limit,
+        after=after,
+    )
+
+    next_cursor = crud_feature.next_cursor(features, sort_field, limit)
+    if next_cursor is not None:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return features
+
+
+@router.get(
+    "/bookings_sum",
+    response_model=Dict[str, int],
+    status_code=status.HTTP_200_OK,
+)
+async def read_bookings_sum(
+    cluster_features_only: bool = Query(False),
+    secure_session: SecureSession = Depends(
+        secure_session(Permissions.ADMIN, Permissions.FEATURE_READ, commit=False)
+    ),
+):
+    """
+    Return the sum of the booked licenses of each product.feature in all clusters.
+
+    If cluster_features_only is set, only the product.features configured in the cluster
+    identified by the client_id in the token are returned.
+    """
+    client_id = None
+
+    if cluster_features_only:
+        client_id = secure_session.identity_payload.client_id
+
+        if not client_id:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=("Couldn't find a valid client_id in the access token."),
+            )
+
+    return await crud_feature.read_bookings_sum(
+        db_session=secure_session.session, cluster_client_id=client_id
     )
 
 
@@ -80,6 +171,8 @@ async def bulk_update_feature(
     Update a list of features in the database using the name of each feature.
     Since the name is not unique across clusters, the client_id
     in the token is used to identify the cluster.
+
+    Return the number of features whose counters changed.
     """
     client_id = secure_session.identity_payload.client_id
 
@@ -89,13 +182,13 @@ async def bulk_update_feature(
             detail=("Couldn't find a valid client_id in the access token."),
         )
 
-    await crud_feature.bulk_update(
+    updated_count = await crud_feature.bulk_update(
         db_session=secure_session.session,
         features=features,
         cluster_client_id=client_id,
     )
 
-    return {"message": "Features updated successfully."}
+    return {"message": "Features updated successfully.", "updated_count": updated_count}
 
 
 @router.put(
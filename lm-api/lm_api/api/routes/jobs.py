@@ -1,24 +1,27 @@
 from typing import List, Optional
 
-from fastapi import APIRouter, Body, Depends, HTTPException, Query, status
+from fastapi import APIRouter, Body, Depends, Header, HTTPException, Query, Response, status
+from sqlalchemy.orm import selectinload
 
-from lm_api.api.cruds.booking import BookingCRUD
-from lm_api.api.cruds.feature import FeatureCRUD
-from lm_api.api.cruds.generic import GenericCRUD
-from lm_api.api.models.booking import Booking
-from lm_api.api.models.feature import Feature
+from lm_api.api.cruds.job import JobCRUD
+from lm_api.api.etag import conditional_response
 from lm_api.api.models.job import Job
-from lm_api.api.schemas.booking import BookingCreateSchema
-from lm_api.api.schemas.job import JobCreateSchema, JobSchema, JobWithBookingCreateSchema
-from lm_api.database import SecureSession, secure_session
+from lm_api.api.ndjson import NDJSON_RESPONSES, accepts_ndjson, ndjson_response
+from lm_api.api.schemas.job import (
+    JobChangesSchema,
+    JobCreateSchema,
+    JobSchema,
+    JobWithBookingCreateSchema,
+)
+from lm_api.config import settings
+from lm_api.database import NEXT_CURSOR_HEADER, SecureSession, secure_session
 from lm_api.permissions import Permissions
 
 router = APIRouter()
 
 
-crud_job = GenericCRUD(Job)
-crud_booking = BookingCRUD(Booking)
-crud_feature = FeatureCRUD(Feature)
+# The jobs are returned with their bookings
+crud_job = JobCRUD(Job, load_options=[selectinload(Job.bookings)])
 
 
 @router.post(
@@ -30,7 +33,12 @@ async def create_job(
     job: JobWithBookingCreateSchema = Body(..., description="Job to be created"),
     secure_session: SecureSession = Depends(secure_session(Permissions.ADMIN, Permissions.JOB_CREATE)),
 ):
-    """Create a new job."""
+    """
+    Create a new job with its bookings.
+
+    The job is only created if all its bookings can be made. Otherwise, the feature that couldn't be
+    booked is reported.
+    """
     client_id = secure_session.identity_payload.client_id
 
     if not client_id:
@@ -42,44 +50,22 @@ async def create_job(
     if job.cluster_client_id is None:
         job.cluster_client_id = client_id
 
-    job_created = await crud_job.create(
-        db_session=secure_session.session, obj=JobCreateSchema(**job.dict(exclude={"bookings"}))
+    return await crud_job.create_with_bookings(
+        db_session=secure_session.session,
+        obj=JobCreateSchema(**job.model_dump(exclude={"bookings"})),
+        bookings=job.bookings,
+        client_id=client_id,
     )
 
-    if job.bookings:
-        try:
-            for booking in job.bookings:
-                product, feature = booking.product_feature.split(".")
-                feature_obj: Feature = await crud_feature.filter_by_product_feature_and_client_id(
-                    db_session=secure_session.session,
-                    product_name=product,
-                    feature_name=feature,
-                    client_id=client_id,
-                )
-                if not feature:
-                    raise HTTPException(
-                        status_code=status.HTTP_400_BAD_REQUEST,
-                        detail=("Couldn't find the feature to book."),
-                    )
-                obj = {
-                    "job_id": job_created.id,
-                    "feature_id": feature_obj.id,
-                    "quantity": booking.quantity,
-                }
-                await crud_booking.create(db_session=secure_session.session, obj=BookingCreateSchema(**obj))
-        except HTTPException:
-            await crud_job.delete(db_session=secure_session.session, id=job_created.id)
-            raise
-
-    return await crud_job.read(db_session=secure_session.session, id=job_created.id, force_refresh=True)
-
 
 @router.get(
     "/by_client_id",
     response_model=List[JobSchema],
     status_code=status.HTTP_200_OK,
+    responses={status.HTTP_304_NOT_MODIFIED: {"description": "The client already holds the current version"}},
 )
 async def read_jobs_by_client_id(
+    if_none_match: Optional[str] = Header(None),
     secure_session: SecureSession = Depends(
         secure_session(Permissions.ADMIN, Permissions.JOB_READ, commit=False)
     ),
@@ -93,32 +79,112 @@ async def read_jobs_by_client_id(
             detail=("Couldn't find a valid client_id in the access token."),
         )
 
-    return await crud_job.filter(
+    jobs = await crud_job.filter(
         db_session=secure_session.session, filter_expressions=[Job.cluster_client_id == client_id]
     )
+    return conditional_response(jobs, List[JobSchema], if_none_match)
+
+
+@router.get(
+    "/by_client_id/changes",
+    response_model=JobChangesSchema,
+    status_code=status.HTTP_200_OK,
+)
+async def read_job_changes_by_client_id(
+    since: Optional[int] = Query(
+        None,
+        ge=0,
+        description="The cursor returned by the previous request. If omitted, all jobs are returned.",
+    ),
+    secure_session: SecureSession = Depends(
+        secure_session(Permissions.ADMIN, Permissions.JOB_READ, commit=False)
+    ),
+):
+    """
+    Return the jobs created or changed and the jobs deleted since the given cursor,
+    for the OIDC client_id retrieved from the request.
+    """
+    client_id = secure_session.identity_payload.client_id
+
+    if not client_id:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=("Couldn't find a valid client_id in the access token."),
+        )
+
+    return await crud_job.read_changes(
+        db_session=secure_session.session, cluster_client_id=client_id, since=since
+    )
 
 
 @router.get(
     "",
     response_model=List[JobSchema],
     status_code=status.HTTP_200_OK,
+    responses=NDJSON_RESPONSES,
 )
 async def read_all_jobs(
+    response: Response,
     search: Optional[str] = Query(None),
     sort_field: Optional[str] = Query(None),
     sort_ascending: bool = Query(True),
+    cluster_client_id: Optional[str] = Query(None, description="Only return the jobs of this cluster."),
+    username: Optional[str] = Query(None, description="Only return the jobs of this user."),
+    limit: Optional[int] = Query(
+        None,
+        ge=1,
+        le=settings.MAX_PAGE_SIZE,
+        description="The maximum number of jobs in the page. If omitted, all jobs are returned.",
+    ),
+    after: Optional[str] = Query(
+        None, description=f"The cursor returned in the {NEXT_CURSOR_HEADER} header of the previous page."
+    ),
+    accept: Optional[str] = Header(None),
     secure_session: SecureSession = Depends(
         secure_session(Permissions.ADMIN, Permissions.JOB_READ, commit=False)
     ),
 ):
-    """Return all jobs."""
-    return await crud_job.read_all(
+    """
+    Return all jobs, or a page of them if a limit is given.
+
+    The cursor of the next page is returned in the X-Next-Cursor header, unless it's the last page.
+
+    If newline-delimited JSON is requested in the Accept header, the jobs are streamed one per line
+    as they're read from the database, and the cursor of the next page isn't returned.
+    """
+    filter_expressions = []
+    if cluster_client_id is not None:
+        filter_expressions.append(Job.cluster_client_id == cluster_client_id)
+    if username is not None:
+        filter_expressions.append(Job.username == username)
+
+    if accepts_ndjson(accept):
+        jobs_stream = await crud_job.stream_all(
+            db_session=secure_session.session,
+            search=search,
+            sort_field=sort_field,
+            sort_ascending=sort_ascending,
+            filter_expressions=filter_expressions,
+            limit=limit,
+            after=after,
+        )
+        return ndjson_response(jobs_stream, JobSchema)
+
+    jobs = await crud_job.read_all(
         db_session=secure_session.session,
         search=search,
         sort_field=sort_field,
         sort_ascending=sort_ascending,
+        filter_expressions=filter_expressions,
+        limit=limit,
+        after=after,
     )
 
+    next_cursor = crud_job.next_cursor(jobs, sort_field, limit)
+    if next_cursor is not None:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return jobs
+
 
 @router.get(
     "/{job_id}",
@@ -135,6 +201,38 @@ async def read_job(
     return await crud_job.read(db_session=secure_session.session, id=job_id, force_refresh=True)
 
 
+@router.delete(
+    "/bulk",
+    status_code=status.HTTP_200_OK,
+)
+async def bulk_delete_jobs_by_slurm_id(
+    slurm_job_ids: List[str] = Body(..., description="Slurm job ids of the jobs to be deleted"),
+    secure_session: SecureSession = Depends(secure_session(Permissions.ADMIN, Permissions.JOB_DELETE)),
+):
+    """
+    Delete a list of jobs from the database and associated bookings.
+
+    Uses the slurm_job_ids and the cluster client_id to filter the jobs.
+
+    Slurm job ids that don't exist in this cluster are ignored. Return the slurm job ids of the deleted jobs.
+    """
+    client_id = secure_session.identity_payload.client_id
+
+    if not client_id:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=("Couldn't find a valid client_id in the access token."),
+        )
+
+    deleted_slurm_job_ids = await crud_job.bulk_delete_by_slurm_job_ids(
+        db_session=secure_session.session,
+        slurm_job_ids=slurm_job_ids,
+        cluster_client_id=client_id,
+    )
+
+    return {"message": "Jobs deleted successfully.", "deleted_slurm_job_ids": deleted_slurm_job_ids}
+
+
 @router.delete(
     "/{job_id}",
     status_code=status.HTTP_200_OK,
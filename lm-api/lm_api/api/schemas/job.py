@@ -104,3 +104,34 @@ class JobSchema(BaseModel):
         None, title="Bookings", description="The bookings of the job."
     )
     model_config = ConfigDict(from_attributes=True)
+
+
+class JobTombstoneSchema(BaseModel):
+    """
+    Represents a job deleted from a cluster.
+    """
+
+    job_id: int = Field(..., title="Job ID", description="The ID of the deleted job.")
+    slurm_job_id: str = Field(
+        ..., title="Slurm job ID", description="The ID of the deleted job in the cluster."
+    )
+    model_config = ConfigDict(from_attributes=True)
+
+
+class JobChangesSchema(BaseModel):
+    """
+    Represents the changes of the jobs in a cluster since a given cursor.
+    """
+
+    cursor: int = Field(
+        ..., title="Cursor", description="The cursor to be used to request the next changes of the jobs."
+    )
+    jobs: List[JobSchema] = Field(
+        ...,
+        title="Jobs",
+        description="The jobs created or changed since the cursor, with all their bookings.",
+    )
+    deleted_jobs: List[JobTombstoneSchema] = Field(
+        ..., title="Deleted jobs", description="The jobs deleted since the cursor."
+    )
+    model_config = ConfigDict(from_attributes=True)
@@ -64,6 +64,16 @@ class Settings(BaseSettings):
     ARMASEC_ADMIN_MATCH_VALUE: Optional[str] = None
     ARMASEC_USE_HTTPS: bool = Field(True)
 
+    # Maximum number of rows in a page of the list endpoints
+    MAX_PAGE_SIZE: int = 1000
+
+    # Number of rows fetched at a time from the database when a list endpoint is streamed
+    STREAM_BATCH_SIZE: int = 500
+
+    # Tombstones of the deleted jobs are kept for the job change feed for this long, and purged when
+    # other jobs are deleted. Agents that didn't synchronize within it catch up with a full sync.
+    JOB_TOMBSTONE_RETENTION: int = 86400  # seconds
+
     # Metrics settings
     METRICS_UPDATE_INTERVAL: int = 30  # seconds
 
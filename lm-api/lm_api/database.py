@@ -2,13 +2,15 @@
 Persistent data storage for the API.
 """
 
+import base64
+import json
 import typing
 from dataclasses import dataclass
 
 from fastapi import Depends
 from fastapi.exceptions import HTTPException
 from loguru import logger
-from sqlalchemy import Engine, create_engine, or_
+from sqlalchemy import Engine, create_engine, literal, or_, tuple_
 from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
 from sqlalchemy.orm import Mapped, MappedColumn, Session, sessionmaker
 from sqlalchemy.sql.expression import ColumnElement, UnaryExpression
@@ -241,3 +243,42 @@ def sort_clause(
     if not sort_ascending:
         sort_column = sort_column.desc()
     return sort_column
+
+
+# Response header with the cursor of the next page of the list endpoints
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(values: typing.Sequence[typing.Any]) -> str:
+    """
+    Encode the sort values of the last row of a page into an opaque cursor for the next page.
+    """
+    return base64.urlsafe_b64encode(json.dumps(list(values)).encode()).decode()
+
+
+def keyset_clause(
+    cursor: str,
+    order_columns: typing.Sequence[MappedColumn[typing.Any]],
+    sort_ascending: bool,
+) -> ColumnElement[bool]:
+    """
+    Create a keyset clause that selects the rows after the cursor, for rows ordered by the order columns.
+    """
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        if not isinstance(values, list) or len(values) != len(order_columns):
+            raise ValueError(f"Expected {len(order_columns)} values in the cursor")
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor. Use the cursor returned with the previous page and the same sort order.",
+        ) from e
+
+    keys = tuple_(*order_columns)
+    after = tuple_(
+        *[
+            literal(value, column.__clause_element__().type)
+            for value, column in zip(values, order_columns, strict=True)
+        ]
+    )
+    return keys > after if sort_ascending else keys < after
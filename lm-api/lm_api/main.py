@@ -16,7 +16,7 @@ from sentry_sdk.integrations.asgi import SentryAsgiMiddleware
 from lm_api import __version__
 from lm_api.api import api
 from lm_api.config import settings
-from lm_api.database import engine_factory
+from lm_api.database import NEXT_CURSOR_HEADER, engine_factory
 
 subapp = FastAPI(
     title="License Manager API",
@@ -39,6 +39,7 @@ subapp.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER],
 )
 
 subapp.include_router(api)
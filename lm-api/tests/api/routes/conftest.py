@@ -131,7 +131,7 @@ async def create_features(insert_objects, update_object, create_one_configuratio
         },
     ]
 
-    inserted_features = await insert_objects(features_to_add, Feature)
+    inserted_features = await insert_objects(features_to_add, Feature, subquery_relation=Feature.product)
     return inserted_features
 
 
@@ -151,7 +151,7 @@ async def create_one_feature(insert_objects, update_object, create_one_configura
         },
     ]
 
-    inserted_feature = await insert_objects(feature_to_add, Feature)
+    inserted_feature = await insert_objects(feature_to_add, Feature, subquery_relation=Feature.product)
     return inserted_feature
 
 
@@ -180,7 +180,7 @@ async def create_features_with_same_name(insert_objects, create_configurations,
         },
     ]
 
-    inserted_features = await insert_objects(features_to_add, Feature)
+    inserted_features = await insert_objects(features_to_add, Feature, subquery_relation=Feature.product)
     return inserted_features
 
 
@@ -221,7 +221,7 @@ async def create_one_job(insert_objects):
 
 
 @fixture
-async def create_bookings(insert_objects, create_jobs, create_features):
+async def create_bookings(insert_objects, update_object, create_jobs, create_features):
     job1_id = create_jobs[0].id
     job2_id = create_jobs[1].id
     feature1_id = create_features[0].id
@@ -241,11 +241,16 @@ async def create_bookings(insert_objects, create_jobs, create_features):
     ]
 
     inserted_bookings = await insert_objects(bookings_to_add, Booking)
+
+    # The booked total of the features is updated by the API along with the bookings
+    await update_object([("booked_total", 150)], feature1_id, Feature)
+    await update_object([("booked_total", 250)], feature2_id, Feature)
+
     return inserted_bookings
 
 
 @fixture
-async def create_one_booking(insert_objects, create_one_job, create_one_feature):
+async def create_one_booking(insert_objects, update_object, create_one_job, create_one_feature):
     job_id = create_one_job[0].id
     feature_id = create_one_feature[0].id
     booking_to_add = [
@@ -257,6 +262,10 @@ async def create_one_booking(insert_objects, create_one_job, create_one_feature)
     ]
 
     inserted_booking = await insert_objects(booking_to_add, Booking)
+
+    # The booked total of the feature is updated by the API along with the bookings
+    await update_object([("booked_total", 150)], feature_id, Feature)
+
     return inserted_booking
 
 
@@ -1,8 +1,11 @@
+import json
+
 from httpx import AsyncClient
 from pytest import mark
 from sqlalchemy import select
 
 from lm_api.api.models.booking import Booking
+from lm_api.api.models.feature import Feature
 from lm_api.permissions import Permissions
 
 
@@ -45,6 +48,9 @@ async def test_add_booking__success(
     assert fetched.feature_id == data["feature_id"]
     assert fetched.quantity == data["quantity"]
 
+    fetched_feature = await read_object(select(Feature).where(Feature.id == feature_id))
+    assert fetched_feature.booked_total == data["quantity"]
+
 
 @mark.parametrize(
     "permission",
@@ -106,6 +112,39 @@ async def test_add_booking__fail_with_overbooking_when_reserved(
     assert response.status_code == 409
 
 
+@mark.parametrize(
+    "quantity, status_code",
+    [
+        (500, 201),
+        (501, 409),
+    ],
+)
+@mark.asyncio
+async def test_add_booking__counts_the_existing_bookings(
+    quantity,
+    status_code,
+    backend_client: AsyncClient,
+    inject_security_header,
+    read_object,
+    create_one_booking,
+):
+    feature_id = create_one_booking[0].feature_id
+
+    data = {
+        "job_id": create_one_booking[0].job_id,
+        "feature_id": feature_id,
+        "quantity": quantity,
+    }
+
+    inject_security_header("owner1@test.com", Permissions.BOOKING_CREATE)
+    response = await backend_client.post("/lm/bookings", json=data)
+
+    assert response.status_code == status_code
+
+    fetched_feature = await read_object(select(Feature).where(Feature.id == feature_id))
+    assert fetched_feature.booked_total == (150 + quantity if status_code == 201 else 150)
+
+
 @mark.parametrize(
     "permission",
     [
@@ -164,6 +203,88 @@ async def test_get_all_bookings__with_sort(
     assert response_bookings[1]["quantity"] == create_bookings[0].quantity
 
 
+@mark.asyncio
+async def test_get_all_bookings__streams_ndjson(
+    backend_client: AsyncClient,
+    inject_security_header,
+    create_bookings,
+):
+    inject_security_header("owner1@test.com", Permissions.BOOKING_READ)
+    response = await backend_client.get("/lm/bookings", headers={"Accept": "application/x-ndjson"})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert "X-Next-Cursor" not in response.headers
+
+    streamed_bookings = [json.loads(line) for line in response.text.splitlines()]
+    assert streamed_bookings == (await backend_client.get("/lm/bookings")).json()
+
+
+@mark.asyncio
+async def test_get_all_bookings__with_pagination(
+    backend_client: AsyncClient,
+    inject_security_header,
+    create_bookings,
+):
+    inject_security_header("owner1@test.com", Permissions.BOOKING_READ)
+    response = await backend_client.get("/lm/bookings?limit=1")
+
+    assert response.status_code == 200
+    assert [booking["id"] for booking in response.json()] == [create_bookings[0].id]
+
+    response = await backend_client.get(f"/lm/bookings?limit=1&after={response.headers['X-Next-Cursor']}")
+
+    assert response.status_code == 200
+    assert [booking["id"] for booking in response.json()] == [create_bookings[1].id]
+
+
+@mark.asyncio
+async def test_get_all_bookings__with_filters(
+    backend_client: AsyncClient,
+    inject_security_header,
+    create_bookings,
+    create_jobs,
+    create_features,
+):
+    inject_security_header("owner1@test.com", Permissions.BOOKING_READ)
+    response = await backend_client.get(
+        "/lm/bookings",
+        params={"cluster_client_id": "dummy", "username": create_jobs[1].username},
+    )
+
+    assert response.status_code == 200
+    assert [booking["id"] for booking in response.json()] == [create_bookings[1].id]
+
+    response = await backend_client.get(
+        "/lm/bookings",
+        params={"product": create_features[0].product.name, "feature": create_features[0].name},
+    )
+
+    assert response.status_code == 200
+    assert [booking["id"] for booking in response.json()] == [create_bookings[0].id]
+
+
+@mark.asyncio
+async def test_get_all_bookings__with_created_at_range(
+    backend_client: AsyncClient,
+    inject_security_header,
+    create_bookings,
+):
+    inject_security_header("owner1@test.com", Permissions.BOOKING_READ)
+    response = await backend_client.get(
+        "/lm/bookings",
+        params={"created_after": "2000-01-01T00:00:00Z", "created_before": "2100-01-01T00:00:00Z"},
+    )
+
+    assert response.status_code == 200
+    assert len(response.json()) == 2
+
+    response = await backend_client.get("/lm/bookings", params={"created_after": "2100-01-01T00:00:00Z"})
+
+    assert response.status_code == 200
+    assert response.json() == []
+
+
 @mark.parametrize(
     "permission",
     [
@@ -243,6 +364,61 @@ async def test_delete_booking__success(
     assert fetch_booking is None
 
 
+@mark.parametrize(
+    "permission",
+    [
+        Permissions.BOOKING_DELETE,
+        Permissions.ADMIN,
+    ],
+)
+@mark.asyncio
+async def test_bulk_delete_bookings__success(
+    permission,
+    backend_client: AsyncClient,
+    inject_security_header,
+    create_bookings,
+    read_objects,
+):
+    booking_ids = [booking.id for booking in create_bookings]
+
+    inject_security_header("owner1@test.com", permission)
+    response = await backend_client.request("DELETE", "/lm/bookings/bulk", json=[*booking_ids, 999999999])
+
+    assert response.status_code == 200
+    assert sorted(response.json()["deleted_booking_ids"]) == sorted(booking_ids)
+
+    fetch_bookings = await read_objects(select(Booking))
+    assert fetch_bookings == []
+
+
+@mark.parametrize(
+    "permission",
+    [
+        Permissions.BOOKING_DELETE,
+        Permissions.ADMIN,
+    ],
+)
+@mark.asyncio
+async def test_bulk_delete_bookings__only_deletes_the_given_bookings(
+    permission,
+    backend_client: AsyncClient,
+    inject_security_header,
+    create_bookings,
+    read_objects,
+):
+    inject_security_header("owner1@test.com", permission)
+    response = await backend_client.request("DELETE", "/lm/bookings/bulk", json=[create_bookings[0].id])
+
+    assert response.status_code == 200
+    assert response.json()["deleted_booking_ids"] == [create_bookings[0].id]
+
+    fetch_bookings = await read_objects(select(Booking))
+    assert [booking.id for booking in fetch_bookings] == [create_bookings[1].id]
+
+    fetch_features = await read_objects(select(Feature).order_by(Feature.id))
+    assert [feature.booked_total for feature in fetch_features] == [0, 250]
+
+
 @mark.parametrize(
     "id, permission",
     [
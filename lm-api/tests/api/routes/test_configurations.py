@@ -1,11 +1,14 @@
+import json
 from unittest import mock
 
 from fastapi import HTTPException
 from httpx import AsyncClient
 from pytest import mark
 from sqlalchemy import select
+from sqlalchemy.orm import selectinload
 
 from lm_api.api.models.configuration import Configuration
+from lm_api.api.models.feature import Feature
 from lm_api.permissions import Permissions
 
 
@@ -235,7 +238,11 @@ async def test_add_configuration__with__features(
     response = await backend_client.post("/lm/configurations", json=data)
     assert response.status_code == 201
 
-    stmt = select(Configuration).where(Configuration.name == "Abaqus")
+    stmt = (
+        select(Configuration)
+        .options(selectinload(Configuration.features).joinedload(Feature.product))
+        .where(Configuration.name == "Abaqus")
+    )
     fetched = await read_object(stmt)
 
     assert fetched.name == "Abaqus"
@@ -363,7 +370,11 @@ async def test_add_configuration__with__license_servers(
     response = await backend_client.post("/lm/configurations", json=data)
     assert response.status_code == 201
 
-    stmt = select(Configuration).where(Configuration.name == "Abaqus")
+    stmt = (
+        select(Configuration)
+        .options(selectinload(Configuration.license_servers))
+        .where(Configuration.name == "Abaqus")
+    )
     fetched = await read_object(stmt)
 
     assert fetched.name == "Abaqus"
@@ -464,7 +475,14 @@ async def test_add_configuration__with__features_and_license_servers(
     response = await backend_client.post("/lm/configurations", json=data)
     assert response.status_code == 201
 
-    stmt = select(Configuration).where(Configuration.name == "Abaqus")
+    stmt = (
+        select(Configuration)
+        .options(
+            selectinload(Configuration.features).joinedload(Feature.product),
+            selectinload(Configuration.license_servers),
+        )
+        .where(Configuration.name == "Abaqus")
+    )
     fetched = await read_object(stmt)
 
     assert fetched.name == "Abaqus"
@@ -571,6 +589,27 @@ async def test_get_all_configurations__success(
     assert response_configurations[1]["type"] == create_configurations[1].type
 
 
+@mark.asyncio
+async def test_get_all_configurations__loads_relationships_in_fixed_queries(
+    backend_client: AsyncClient,
+    inject_security_header,
+    create_features,
+    create_license_servers,
+    count_queries,
+):
+    inject_security_header("owner1@test.com", Permissions.CONFIG_READ)
+    with count_queries() as statements:
+        response = await backend_client.get("/lm/configurations")
+
+    assert response.status_code == 200
+
+    response_configuration = response.json()[0]
+    assert len(response_configuration["features"]) == len(create_features)
+    assert response_configuration["features"][0]["product"]["name"] == create_features[0].product.name
+    assert len(response_configuration["license_servers"]) == len(create_license_servers)
+    assert len(statements) == 3
+
+
 @mark.parametrize(
     "permission",
     [
@@ -628,6 +667,50 @@ async def test_get_all_configurations__with_sort(
     assert response_configurations[1]["type"] == create_configurations[0].type
 
 
+@mark.asyncio
+async def test_get_all_configurations__streams_ndjson(
+    backend_client: AsyncClient,
+    inject_security_header,
+    create_features,
+    create_license_servers,
+):
+    inject_security_header("owner1@test.com", Permissions.CONFIG_READ)
+    response = await backend_client.get("/lm/configurations", headers={"Accept": "application/x-ndjson"})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert "X-Next-Cursor" not in response.headers
+
+    streamed_configurations = [json.loads(line) for line in response.text.splitlines()]
+    assert streamed_configurations == (await backend_client.get("/lm/configurations")).json()
+
+
+@mark.asyncio
+async def test_get_all_configurations__with_filters_and_pagination(
+    backend_client: AsyncClient,
+    inject_security_header,
+    create_configurations,
+):
+    inject_security_header("owner1@test.com", Permissions.CONFIG_READ)
+    response = await backend_client.get("/lm/configurations?cluster_client_id=dummy&limit=1")
+
+    assert response.status_code == 200
+    assert [configuration["id"] for configuration in response.json()] == [create_configurations[0].id]
+
+    next_cursor = response.headers["X-Next-Cursor"]
+    response = await backend_client.get(
+        f"/lm/configurations?cluster_client_id=dummy&limit=1&after={next_cursor}"
+    )
+
+    assert response.status_code == 200
+    assert [configuration["id"] for configuration in response.json()] == [create_configurations[1].id]
+
+    response = await backend_client.get("/lm/configurations?cluster_client_id=other-cluster")
+
+    assert response.status_code == 200
+    assert response.json() == []
+
+
 @mark.parametrize(
     "permission",
     [
@@ -747,7 +830,11 @@ async def test_update_configuration__with_feature_creation__success(
 
     assert response.status_code == 200
 
-    stmt = select(Configuration).where(Configuration.id == id)
+    stmt = (
+        select(Configuration)
+        .options(selectinload(Configuration.features).joinedload(Feature.product))
+        .where(Configuration.id == id)
+    )
     fetch_configuration = await read_object(stmt)
 
     assert fetch_configuration.name == new_configuration["name"]
@@ -792,7 +879,11 @@ async def test_update_configuration__with_feature_update__success(
 
     assert response.status_code == 200
 
-    stmt = select(Configuration).where(Configuration.id == id)
+    stmt = (
+        select(Configuration)
+        .options(selectinload(Configuration.features).joinedload(Feature.product))
+        .where(Configuration.id == id)
+    )
     fetch_configuration = await read_object(stmt)
 
     assert fetch_configuration.name == new_configuration["name"]
@@ -830,7 +921,7 @@ async def test_update_configuration__with_all_feature_deletion__success(
 
     assert response.status_code == 200
 
-    stmt = select(Configuration).where(Configuration.id == id)
+    stmt = select(Configuration).options(selectinload(Configuration.features)).where(Configuration.id == id)
     fetch_configuration = await read_object(stmt)
 
     assert fetch_configuration.name == new_configuration["name"]
@@ -866,7 +957,11 @@ async def test_update_configuration__with_one_feature_deletion__success(
 
     assert response.status_code == 200
 
-    stmt = select(Configuration).where(Configuration.id == id)
+    stmt = (
+        select(Configuration)
+        .options(selectinload(Configuration.features).joinedload(Feature.product))
+        .where(Configuration.id == id)
+    )
     fetch_configuration = await read_object(stmt)
 
     assert fetch_configuration.name == new_configuration["name"]
@@ -907,7 +1002,11 @@ async def test_update_configuration__with_license_server_creation__success(
 
     assert response.status_code == 200
 
-    stmt = select(Configuration).where(Configuration.id == id)
+    stmt = (
+        select(Configuration)
+        .options(selectinload(Configuration.license_servers))
+        .where(Configuration.id == id)
+    )
     fetch_configuration = await read_object(stmt)
 
     assert fetch_configuration.name == new_configuration["name"]
@@ -950,7 +1049,11 @@ async def test_update_configuration__with_license_server_update__success(
 
     assert response.status_code == 200
 
-    stmt = select(Configuration).where(Configuration.id == id)
+    stmt = (
+        select(Configuration)
+        .options(selectinload(Configuration.license_servers))
+        .where(Configuration.id == id)
+    )
     fetch_configuration = await read_object(stmt)
 
     assert fetch_configuration.name == new_configuration["name"]
@@ -988,7 +1091,11 @@ async def test_update_configuration__with_all_license_server_deletion__success(
 
     assert response.status_code == 200
 
-    stmt = select(Configuration).where(Configuration.id == id)
+    stmt = (
+        select(Configuration)
+        .options(selectinload(Configuration.license_servers))
+        .where(Configuration.id == id)
+    )
     fetch_configuration = await read_object(stmt)
 
     assert fetch_configuration.name == new_configuration["name"]
@@ -1030,7 +1137,11 @@ async def test_update_configuration__with_one_license_server_deletion__success(
 
     assert response.status_code == 200
 
-    stmt = select(Configuration).where(Configuration.id == id)
+    stmt = (
+        select(Configuration)
+        .options(selectinload(Configuration.license_servers))
+        .where(Configuration.id == id)
+    )
     fetch_configuration = await read_object(stmt)
     assert fetch_configuration.name == new_configuration["name"]
     assert len(fetch_configuration.license_servers) == 1
@@ -1183,6 +1294,88 @@ async def test_get_configurations_by_client_id__success(
     assert response_configurations[0]["type"] == create_one_configuration[0].type
 
 
+@mark.parametrize(
+    "permission",
+    [
+        Permissions.CONFIG_READ,
+        Permissions.ADMIN,
+    ],
+)
+@mark.asyncio
+async def test_get_configurations_by_client_id__not_modified(
+    permission,
+    backend_client: AsyncClient,
+    inject_security_header,
+    create_one_configuration,
+    update_object,
+):
+    id = create_one_configuration[0].id
+    cluster_client_id = create_one_configuration[0].cluster_client_id
+
+    inject_security_header("owner@test1.com", permission, client_id=cluster_client_id)
+    response = await backend_client.get("/lm/configurations/by_client_id")
+
+    assert response.status_code == 200
+    etag = response.headers["ETag"]
+
+    response = await backend_client.get("/lm/configurations/by_client_id", headers={"If-None-Match": etag})
+
+    assert response.status_code == 304
+    assert response.headers["ETag"] == etag
+    assert response.content == b""
+
+    await update_object({"grace_time": 1000}.items(), id, Configuration)
+    response = await backend_client.get("/lm/configurations/by_client_id", headers={"If-None-Match": etag})
+
+    assert response.status_code == 200
+    assert response.json()[0]["grace_time"] == 1000
+    assert response.headers["ETag"] != etag
+
+
+@mark.asyncio
+async def test_get_configurations_by_client_id__not_modified_by_usage_updates(
+    backend_client: AsyncClient,
+    inject_security_header,
+    create_features,
+):
+    cluster_client_id = "dummy"
+
+    inject_security_header("owner@test1.com", Permissions.ADMIN, client_id=cluster_client_id)
+    response = await backend_client.get("/lm/configurations/by_client_id")
+
+    assert response.status_code == 200
+    etag = response.headers["ETag"]
+    # The same ETag is used for responses with different counters, so it must be weak
+    assert etag.startswith('W/"')
+
+    response = await backend_client.put(
+        "/lm/features/bulk",
+        json=[
+            {
+                "product_name": feature.product.name,
+                "feature_name": feature.name,
+                "total": 5000,
+                "used": 42,
+            }
+            for feature in create_features
+        ],
+    )
+
+    assert response.status_code == 200
+    assert response.json()["updated_count"] == 2
+
+    response = await backend_client.get("/lm/configurations/by_client_id", headers={"If-None-Match": etag})
+
+    assert response.status_code == 304
+    assert response.headers["ETag"] == etag
+
+    response = await backend_client.get("/lm/configurations/by_client_id")
+
+    assert response.status_code == 200
+    assert {feature["used"] for feature in response.json()[0]["features"]} == {42}
+    assert response.headers["ETag"] == etag
+
+
 @mark.parametrize(
     "permission",
     [
@@ -1,8 +1,14 @@
+import json
+
 from httpx import AsyncClient
 from pytest import mark
 from sqlalchemy import select
+from sqlalchemy.orm import joinedload
 
+from lm_api.api.models.booking import Booking
+from lm_api.api.models.configuration import Configuration
 from lm_api.api.models.feature import Feature
+from lm_api.api.models.job import Job
 from lm_api.permissions import Permissions
 
 
@@ -68,6 +74,24 @@ async def test_get_all_features__success(
         assert computed["reserved"] == expected.reserved
 
 
+@mark.asyncio
+async def test_get_all_features__reads_products_in_the_same_query(
+    backend_client: AsyncClient,
+    inject_security_header,
+    create_features,
+    count_queries,
+):
+    inject_security_header("owner1@test.com", Permissions.FEATURE_READ)
+    with count_queries() as statements:
+        response = await backend_client.get("/lm/features")
+
+    assert response.status_code == 200
+    assert {feature["product"]["name"] for feature in response.json()} == {
+        feature.product.name for feature in create_features
+    }
+    assert len(statements) == 1
+
+
 @mark.parametrize(
     "permission",
     [
@@ -149,6 +173,190 @@ async def test_get_all_features__with_sort(
     assert response_features[1]["reserved"] == create_features[0].reserved
 
 
+@mark.asyncio
+async def test_get_all_features__streams_ndjson(
+    backend_client: AsyncClient,
+    inject_security_header,
+    create_features,
+):
+    inject_security_header("owner1@test.com", Permissions.FEATURE_READ)
+    response = await backend_client.get("/lm/features", headers={"Accept": "application/x-ndjson"})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert "X-Next-Cursor" not in response.headers
+
+    streamed_features = [json.loads(line) for line in response.text.splitlines()]
+    assert streamed_features == (await backend_client.get("/lm/features")).json()
+
+
+@mark.asyncio
+async def test_get_all_features__with_pagination(
+    backend_client: AsyncClient,
+    inject_security_header,
+    create_features,
+):
+    inject_security_header("owner1@test.com", Permissions.FEATURE_READ)
+    response = await backend_client.get("/lm/features?sort_field=product_id&limit=1")
+
+    assert response.status_code == 200
+    assert [feature["id"] for feature in response.json()] == [create_features[0].id]
+
+    next_cursor = response.headers["X-Next-Cursor"]
+    response = await backend_client.get(f"/lm/features?sort_field=product_id&limit=1&after={next_cursor}")
+
+    assert response.status_code == 200
+    assert [feature["id"] for feature in response.json()] == [create_features[1].id]
+
+
+@mark.asyncio
+async def test_get_all_features__with_filters(
+    backend_client: AsyncClient,
+    inject_security_header,
+    create_features,
+):
+    inject_security_header("owner1@test.com", Permissions.FEATURE_READ)
+    response = await backend_client.get(
+        "/lm/features",
+        params={
+            "cluster_client_id": "dummy",
+            "product": create_features[1].product.name,
+            "feature": create_features[1].name,
+        },
+    )
+
+    assert response.status_code == 200
+    assert [feature["id"] for feature in response.json()] == [create_features[1].id]
+
+    response = await backend_client.get("/lm/features", params={"cluster_client_id": "other-cluster"})
+
+    assert response.status_code == 200
+    assert response.json() == []
+
+
+@mark.parametrize(
+    "permission",
+    [
+        Permissions.FEATURE_READ,
+        Permissions.ADMIN,
+    ],
+)
+@mark.asyncio
+async def test_get_bookings_sum__success(
+    permission,
+    backend_client: AsyncClient,
+    inject_security_header,
+    create_bookings,
+):
+    inject_security_header("owner1@test.com", permission)
+
+    response = await backend_client.get("/lm/features/bookings_sum")
+
+    assert response.status_code == 200
+    assert response.json() == {"Abaqus.abaqus": 150, "Abaqus.converge_super": 250}
+
+
+@mark.parametrize(
+    "permission",
+    [
+        Permissions.FEATURE_READ,
+        Permissions.ADMIN,
+    ],
+)
+@mark.asyncio
+async def test_get_bookings_sum__sums_bookings_across_clusters(
+    permission,
+    backend_client: AsyncClient,
+    inject_security_header,
+    insert_objects,
+    create_bookings,
+    create_one_product,
+):
+    other_configuration = await insert_objects(
+        [{"name": "Abaqus", "cluster_client_id": "other-cluster", "grace_time": 60, "type": "flexlm"}],
+        Configuration,
+    )
+    other_feature = await insert_objects(
+        [
+            {
+                "name": "abaqus",
+                "product_id": create_one_product[0].id,
+                "config_id": other_configuration[-1].id,
+                "reserved": 0,
+                "total": 100,
+                "used": 0,
+                "booked_total": 10,
+            }
+        ],
+        Feature,
+    )
+    other_job = await insert_objects(
+        [
+            {
+                "slurm_job_id": "123",
+                "cluster_client_id": "other-cluster",
+                "username": "user",
+                "lead_host": "host",
+            }
+        ],
+        Job,
+    )
+    await insert_objects(
+        [{"job_id": other_job[-1].id, "feature_id": other_feature[-1].id, "quantity": 10}],
+        Booking,
+    )
+
+    inject_security_header("owner1@test.com", permission, client_id="other-cluster")
+
+    response = await backend_client.get("/lm/features/bookings_sum?cluster_features_only=true")
+
+    assert response.status_code == 200
+    assert response.json() == {"Abaqus.abaqus": 160}
+
+
+@mark.parametrize(
+    "permission",
+    [
+        Permissions.FEATURE_READ,
+        Permissions.ADMIN,
+    ],
+)
+@mark.asyncio
+async def test_get_bookings_sum__includes_features_without_bookings(
+    permission,
+    backend_client: AsyncClient,
+    inject_security_header,
+    create_features,
+):
+    inject_security_header("owner1@test.com", permission, client_id="dummy")
+
+    response = await backend_client.get("/lm/features/bookings_sum?cluster_features_only=true")
+
+    assert response.status_code == 200
+    assert response.json() == {"Abaqus.abaqus": 0, "Abaqus.converge_super": 0}
+
+
+@mark.parametrize(
+    "permission",
+    [
+        Permissions.FEATURE_READ,
+        Permissions.ADMIN,
+    ],
+)
+@mark.asyncio
+async def test_get_bookings_sum__fail_with_bad_client_id(
+    permission,
+    backend_client: AsyncClient,
+    inject_security_header,
+    create_features,
+):
+    inject_security_header("owner1@test.com", permission)
+
+    response = await backend_client.get("/lm/features/bookings_sum?cluster_features_only=true")
+
+    assert response.status_code == 400
+
+
 @mark.parametrize(
     "permission",
     [
@@ -316,9 +524,15 @@ async def test_bulk_update_feature__success(
     response = await backend_client.put("/lm/features/bulk", json=data_to_update)
 
     assert response.status_code == 200
-
-    stmt = select(Feature).where(
-        Feature.name == data_to_update[0]["feature_name"], Feature.product_id == create_features[0].product_id
+    assert response.json()["updated_count"] == 2
+
+    stmt = (
+        select(Feature)
+        .options(joinedload(Feature.product))
+        .where(
+            Feature.name == data_to_update[0]["feature_name"],
+            Feature.product_id == create_features[0].product_id,
+        )
     )
     fetch_feature = await read_object(stmt)
 
@@ -327,8 +541,13 @@ async def test_bulk_update_feature__success(
     assert fetch_feature.total == data_to_update[0]["total"]
     assert fetch_feature.used == data_to_update[0]["used"]
 
-    stmt = select(Feature).where(
-        Feature.name == data_to_update[1]["feature_name"], Feature.product_id == create_features[1].product_id
+    stmt = (
+        select(Feature)
+        .options(joinedload(Feature.product))
+        .where(
+            Feature.name == data_to_update[1]["feature_name"],
+            Feature.product_id == create_features[1].product_id,
+        )
     )
     fetch_feature = await read_object(stmt)
 
@@ -374,9 +593,13 @@ async def test_bulk_update_feature__features_with_same_name(
 
     assert response.status_code == 200
 
-    stmt = select(Feature).where(
-        Feature.name == data_to_update[0]["feature_name"],
-        Feature.product_id == create_features_with_same_name[0].product_id,
+    stmt = (
+        select(Feature)
+        .options(joinedload(Feature.product))
+        .where(
+            Feature.name == data_to_update[0]["feature_name"],
+            Feature.product_id == create_features_with_same_name[0].product_id,
+        )
     )
     fetch_feature = await read_object(stmt)
 
@@ -385,9 +608,13 @@ async def test_bulk_update_feature__features_with_same_name(
     assert fetch_feature.total == data_to_update[0]["total"]
     assert fetch_feature.used == data_to_update[0]["used"]
 
-    stmt = select(Feature).where(
-        Feature.name == data_to_update[1]["feature_name"],
-        Feature.product_id == create_features_with_same_name[1].product_id,
+    stmt = (
+        select(Feature)
+        .options(joinedload(Feature.product))
+        .where(
+            Feature.name == data_to_update[1]["feature_name"],
+            Feature.product_id == create_features_with_same_name[1].product_id,
+        )
     )
     fetch_feature = await read_object(stmt)
 
@@ -397,6 +624,181 @@ async def test_bulk_update_feature__features_with_same_name(
     assert fetch_feature.used == data_to_update[1]["used"]
 
 
+@mark.asyncio
+async def test_bulk_update_feature__skips_unchanged_features(
+    backend_client: AsyncClient,
+    inject_security_header,
+    create_features,
+    read_object,
+):
+    data_to_update = [
+        {
+            "product_name": create_features[0].product.name,
+            "feature_name": create_features[0].name,
+            "total": create_features[0].total,
+            "used": create_features[0].used,
+        },
+        {
+            "product_name": create_features[1].product.name,
+            "feature_name": create_features[1].name,
+            "total": 2345,
+            "used": 456,
+        },
+    ]
+
+    inject_security_header("owner1@test.com", Permissions.FEATURE_UPDATE, client_id="dummy")
+    response = await backend_client.put("/lm/features/bulk", json=data_to_update)
+
+    assert response.status_code == 200
+    assert response.json()["updated_count"] == 1
+
+    stmt = select(Feature).where(Feature.id == create_features[1].id)
+    fetch_feature = await read_object(stmt)
+
+    assert fetch_feature.total == data_to_update[1]["total"]
+    assert fetch_feature.used == data_to_update[1]["used"]
+
+
+@mark.asyncio
+async def test_bulk_update_feature__updates_a_repeated_feature_once(
+    backend_client: AsyncClient,
+    inject_security_header,
+    create_features,
+    read_object,
+):
+    feature_data = {
+        "product_name": create_features[0].product.name,
+        "feature_name": create_features[0].name,
+        "total": 9876,
+        "used": 1234,
+    }
+
+    inject_security_header("owner1@test.com", Permissions.FEATURE_UPDATE, client_id="dummy")
+    response = await backend_client.put("/lm/features/bulk", json=[feature_data, feature_data])
+
+    assert response.status_code == 200
+    assert response.json()["updated_count"] == 1
+
+    stmt = select(Feature).where(Feature.id == create_features[0].id)
+    fetch_feature = await read_object(stmt)
+
+    assert fetch_feature.total == feature_data["total"]
+    assert fetch_feature.used == feature_data["used"]
+
+
+@mark.asyncio
+async def test_bulk_update_feature__fail_with_repeated_feature_with_different_counters(
+    backend_client: AsyncClient,
+    inject_security_header,
+    create_features,
+    read_object,
+):
+    data_to_update = [
+        {
+            "product_name": create_features[0].product.name,
+            "feature_name": create_features[0].name,
+            "total": 9876,
+            "used": 1234,
+        },
+        {
+            "product_name": create_features[0].product.name,
+            "feature_name": create_features[0].name,
+            "total": 2345,
+            "used": 456,
+        },
+    ]
+    original_total = create_features[0].total
+
+    inject_security_header("owner1@test.com", Permissions.FEATURE_UPDATE, client_id="dummy")
+    response = await backend_client.put("/lm/features/bulk", json=data_to_update)
+
+    assert response.status_code == 400
+
+    stmt = select(Feature).where(Feature.id == create_features[0].id)
+    fetch_feature = await read_object(stmt)
+
+    assert fetch_feature.total == original_total
+
+
+@mark.asyncio
+async def test_bulk_update_feature__updates_a_feature_in_every_configuration_of_the_cluster(
+    backend_client: AsyncClient,
+    inject_security_header,
+    insert_objects,
+    create_configurations,
+    create_one_product,
+    read_objects,
+):
+    features = await insert_objects(
+        [
+            {
+                "name": "abaqus",
+                "product_id": create_one_product[0].id,
+                "config_id": configuration.id,
+                "reserved": 0,
+                "total": 1000,
+                "used": 250,
+            }
+            for configuration in create_configurations
+        ],
+        Feature,
+        subquery_relation=Feature.product,
+    )
+    data_to_update = [
+        {
+            "product_name": create_one_product[0].name,
+            "feature_name": "abaqus",
+            "total": 9876,
+            "used": 1234,
+        },
+    ]
+
+    inject_security_header("owner1@test.com", Permissions.FEATURE_UPDATE, client_id="dummy")
+    response = await backend_client.put("/lm/features/bulk", json=data_to_update)
+
+    assert response.status_code == 200
+    assert response.json()["updated_count"] == 2
+
+    stmt = select(Feature).where(Feature.id.in_([feature.id for feature in features]))
+    fetch_features = await read_objects(stmt)
+
+    assert [(feature.total, feature.used) for feature in fetch_features] == [(9876, 1234), (9876, 1234)]
+
+
+@mark.asyncio
+async def test_bulk_update_feature__fail_with_feature_not_found(
+    backend_client: AsyncClient,
+    inject_security_header,
+    create_features,
+    read_object,
+):
+    data_to_update = [
+        {
+            "product_name": create_features[0].product.name,
+            "feature_name": create_features[0].name,
+            "total": 9876,
+            "used": 1234,
+        },
+        {
+            "product_name": create_features[1].product.name,
+            "feature_name": "not_a_feature",
+            "total": 2345,
+            "used": 456,
+        },
+    ]
+    original_total = create_features[0].total
+
+    inject_security_header("owner1@test.com", Permissions.FEATURE_UPDATE, client_id="dummy")
+    response = await backend_client.put("/lm/features/bulk", json=data_to_update)
+
+    assert response.status_code == 404
+
+    stmt = select(Feature).where(Feature.id == create_features[0].id)
+    fetch_feature = await read_object(stmt)
+
+    assert fetch_feature.total == original_total
+
+
 @mark.parametrize(
     "permission",
     [
@@ -1,8 +1,16 @@
+import json
+from datetime import datetime, timedelta
+
 from httpx import AsyncClient
 from pytest import mark
 from sqlalchemy import select
+from sqlalchemy.orm import selectinload
 
+from lm_api.api.models.booking import Booking
+from lm_api.api.models.feature import Feature
 from lm_api.api.models.job import Job
+from lm_api.api.models.job_tombstone import JobTombstone
+from lm_api.config import settings
 from lm_api.permissions import Permissions
 
 
@@ -32,7 +40,7 @@ async def test_add_job__success(
     response = await backend_client.post("/lm/jobs", json=data)
     assert response.status_code == 201
 
-    stmt = select(Job).where(Job.slurm_job_id == data["slurm_job_id"])
+    stmt = select(Job).options(selectinload(Job.bookings)).where(Job.slurm_job_id == data["slurm_job_id"])
     fetched = await read_object(stmt)
 
     assert fetched.slurm_job_id == data["slurm_job_id"]
@@ -97,7 +105,7 @@ async def test_add_job__with_bookings(
     response = await backend_client.post("/lm/jobs", json=data)
     assert response.status_code == 201
 
-    stmt = select(Job).where(Job.slurm_job_id == data["slurm_job_id"])
+    stmt = select(Job).options(selectinload(Job.bookings)).where(Job.slurm_job_id == data["slurm_job_id"])
     fetched = await read_object(stmt)
 
     assert fetched.slurm_job_id == data["slurm_job_id"]
@@ -107,6 +115,9 @@ async def test_add_job__with_bookings(
     assert fetched.bookings[0].feature_id == create_one_feature[0].id
     assert fetched.bookings[0].quantity == data["bookings"][0]["quantity"]
 
+    fetched_feature = await read_object(select(Feature).where(Feature.id == create_one_feature[0].id))
+    assert fetched_feature.booked_total == data["bookings"][0]["quantity"]
+
 
 @mark.parametrize(
     "permission",
@@ -137,6 +148,7 @@ async def test_add_job__with_bookings__fail_with_overbooking(
     inject_security_header("owner1@test.com", permission, client_id=client_id)
     response = await backend_client.post("/lm/jobs", json=data)
     assert response.status_code == 409
+    assert response.json()["detail"] == f"Not enough licenses available for {product_name}.{feature_name}."
 
     stmt = select(Job).where(Job.slurm_job_id == data["slurm_job_id"])
     fetched = await read_object(stmt)
@@ -144,6 +156,94 @@ async def test_add_job__with_bookings__fail_with_overbooking(
     assert fetched is None
 
 
+@mark.asyncio
+async def test_add_job__with_bookings__fail_if_one_feature_is_short(
+    backend_client: AsyncClient,
+    inject_security_header,
+    read_object,
+    read_objects,
+    create_features,
+):
+    product_name = create_features[0].product.name
+
+    data = {
+        "slurm_job_id": "123",
+        "username": "user",
+        "lead_host": "test-host",
+        "bookings": [
+            {"product_feature": f"{product_name}.{create_features[0].name}", "quantity": 50},
+            {"product_feature": f"{product_name}.{create_features[1].name}", "quantity": 751},
+        ],
+    }
+
+    inject_security_header("owner1@test.com", Permissions.JOB_CREATE, client_id="dummy")
+    response = await backend_client.post("/lm/jobs", json=data)
+    assert response.status_code == 409
+    assert (
+        response.json()["detail"]
+        == f"Not enough licenses available for {product_name}.{create_features[1].name}."
+    )
+
+    assert await read_object(select(Job).where(Job.slurm_job_id == data["slurm_job_id"])) is None
+    assert await read_object(select(Booking)) is None
+
+    fetched_features = await read_objects(select(Feature))
+    assert [feature.booked_total for feature in fetched_features] == [0, 0]
+
+
+@mark.asyncio
+async def test_add_job__with_bookings__fail_if_bookings_of_the_same_feature_exceed_it(
+    backend_client: AsyncClient,
+    inject_security_header,
+    read_object,
+    create_one_feature,
+):
+    product_feature = f"{create_one_feature[0].product.name}.{create_one_feature[0].name}"
+
+    data = {
+        "slurm_job_id": "123",
+        "username": "user",
+        "lead_host": "test-host",
+        "bookings": [
+            {"product_feature": product_feature, "quantity": 400},
+            {"product_feature": product_feature, "quantity": 251},
+        ],
+    }
+
+    inject_security_header("owner1@test.com", Permissions.JOB_CREATE, client_id="dummy")
+    response = await backend_client.post("/lm/jobs", json=data)
+    assert response.status_code == 409
+
+    assert await read_object(select(Job).where(Job.slurm_job_id == data["slurm_job_id"])) is None
+
+
+@mark.asyncio
+async def test_add_job__with_bookings__fail_with_unknown_feature(
+    backend_client: AsyncClient,
+    inject_security_header,
+    read_object,
+    create_one_feature,
+):
+    product_name = create_one_feature[0].product.name
+
+    data = {
+        "slurm_job_id": "123",
+        "username": "user",
+        "lead_host": "test-host",
+        "bookings": [
+            {"product_feature": f"{product_name}.{create_one_feature[0].name}", "quantity": 50},
+            {"product_feature": f"{product_name}.unknown", "quantity": 1},
+        ],
+    }
+
+    inject_security_header("owner1@test.com", Permissions.JOB_CREATE, client_id="dummy")
+    response = await backend_client.post("/lm/jobs", json=data)
+    assert response.status_code == 404
+    assert response.json()["detail"] == f"Feature {product_name}.unknown not found."
+
+    assert await read_object(select(Job).where(Job.slurm_job_id == data["slurm_job_id"])) is None
+
+
 @mark.parametrize(
     "permission",
     [
@@ -232,6 +332,115 @@ async def test_get_all_jobs__with_sort(
     assert response_jobs[1]["lead_host"] == create_jobs[0].lead_host
 
 
+@mark.asyncio
+async def test_get_all_jobs__streams_ndjson(
+    backend_client: AsyncClient,
+    inject_security_header,
+    create_bookings,
+):
+    inject_security_header("owner1@test.com", Permissions.JOB_READ)
+    response = await backend_client.get("/lm/jobs", headers={"Accept": "application/x-ndjson"})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert "X-Next-Cursor" not in response.headers
+
+    streamed_jobs = [json.loads(line) for line in response.text.splitlines()]
+    assert streamed_jobs == (await backend_client.get("/lm/jobs")).json()
+
+
+@mark.asyncio
+async def test_get_all_jobs__with_pagination(
+    backend_client: AsyncClient,
+    inject_security_header,
+    create_jobs,
+):
+    inject_security_header("owner1@test.com", Permissions.JOB_READ)
+    response = await backend_client.get("/lm/jobs?sort_field=slurm_job_id&sort_ascending=false&limit=1")
+
+    assert response.status_code == 200
+    assert [job["slurm_job_id"] for job in response.json()] == [create_jobs[1].slurm_job_id]
+
+    next_cursor = response.headers["X-Next-Cursor"]
+    response = await backend_client.get(
+        f"/lm/jobs?sort_field=slurm_job_id&sort_ascending=false&limit=1&after={next_cursor}"
+    )
+
+    assert response.status_code == 200
+    assert [job["slurm_job_id"] for job in response.json()] == [create_jobs[0].slurm_job_id]
+
+    next_cursor = response.headers["X-Next-Cursor"]
+    response = await backend_client.get(
+        f"/lm/jobs?sort_field=slurm_job_id&sort_ascending=false&limit=1&after={next_cursor}"
+    )
+
+    assert response.status_code == 200
+    assert response.json() == []
+    assert "X-Next-Cursor" not in response.headers
+
+
+@mark.asyncio
+async def test_get_all_jobs__last_page_has_no_cursor(
+    backend_client: AsyncClient,
+    inject_security_header,
+    create_jobs,
+):
+    inject_security_header("owner1@test.com", Permissions.JOB_READ)
+    response = await backend_client.get("/lm/jobs?limit=10")
+
+    assert response.status_code == 200
+    assert len(response.json()) == 2
+    assert "X-Next-Cursor" not in response.headers
+
+
+@mark.asyncio
+async def test_get_all_jobs__fail_with_invalid_cursor(
+    backend_client: AsyncClient,
+    inject_security_header,
+    create_jobs,
+):
+    inject_security_header("owner1@test.com", Permissions.JOB_READ)
+    response = await backend_client.get("/lm/jobs?limit=1&after=not-a-cursor")
+
+    assert response.status_code == 400
+
+
+@mark.asyncio
+async def test_get_all_jobs__loads_bookings_in_one_query(
+    backend_client: AsyncClient,
+    inject_security_header,
+    create_bookings,
+    count_queries,
+):
+    inject_security_header("owner1@test.com", Permissions.JOB_READ)
+    with count_queries() as statements:
+        response = await backend_client.get("/lm/jobs")
+
+    assert response.status_code == 200
+    assert sum(len(job["bookings"]) for job in response.json()) == len(create_bookings)
+    assert len(statements) == 2
+
+
+@mark.asyncio
+async def test_get_all_jobs__with_filters(
+    backend_client: AsyncClient,
+    inject_security_header,
+    create_jobs,
+):
+    inject_security_header("owner1@test.com", Permissions.JOB_READ)
+    response = await backend_client.get(
+        f"/lm/jobs?cluster_client_id=dummy&username={create_jobs[1].username}"
+    )
+
+    assert response.status_code == 200
+    assert [job["id"] for job in response.json()] == [create_jobs[1].id]
+
+    response = await backend_client.get("/lm/jobs?cluster_client_id=other-cluster")
+
+    assert response.status_code == 200
+    assert response.json() == []
+
+
 @mark.parametrize(
     "permission",
     [
@@ -260,6 +469,197 @@ async def test_get_job__success(
     assert response_job["lead_host"] == create_one_job[0].lead_host
 
 
+@mark.parametrize(
+    "permission",
+    [
+        Permissions.JOB_READ,
+        Permissions.ADMIN,
+    ],
+)
+@mark.asyncio
+async def test_get_jobs_by_client_id__not_modified(
+    permission,
+    backend_client: AsyncClient,
+    inject_security_header,
+    create_jobs,
+    insert_objects,
+):
+    inject_security_header("owner1@test.com", permission, client_id="dummy")
+    response = await backend_client.get("/lm/jobs/by_client_id")
+
+    assert response.status_code == 200
+    assert len(response.json()) == len(create_jobs)
+    etag = response.headers["ETag"]
+
+    response = await backend_client.get("/lm/jobs/by_client_id", headers={"If-None-Match": etag})
+
+    assert response.status_code == 304
+    assert response.headers["ETag"] == etag
+    assert response.content == b""
+
+    await insert_objects(
+        [
+            {
+                "slurm_job_id": "345",
+                "cluster_client_id": "dummy",
+                "username": "user3",
+                "lead_host": "test-host3",
+            }
+        ],
+        Job,
+    )
+    response = await backend_client.get("/lm/jobs/by_client_id", headers={"If-None-Match": etag})
+
+    assert response.status_code == 200
+    assert len(response.json()) == len(create_jobs) + 1
+    assert response.headers["ETag"] != etag
+
+
+@mark.asyncio
+async def test_get_job_changes_by_client_id__full_sync_without_cursor(
+    backend_client: AsyncClient,
+    inject_security_header,
+    create_jobs,
+):
+    inject_security_header("owner1@test.com", Permissions.JOB_READ, client_id="dummy")
+    response = await backend_client.get("/lm/jobs/by_client_id/changes")
+
+    assert response.status_code == 200
+
+    response_changes = response.json()
+    assert isinstance(response_changes["cursor"], int)
+    assert sorted(job["slurm_job_id"] for job in response_changes["jobs"]) == ["123", "234"]
+    assert response_changes["deleted_jobs"] == []
+
+
+@mark.asyncio
+async def test_get_job_changes_by_client_id__reports_deleted_jobs(
+    backend_client: AsyncClient,
+    inject_security_header,
+    create_jobs,
+):
+    inject_security_header("owner1@test.com", Permissions.JOB_READ, client_id="dummy")
+    response = await backend_client.get("/lm/jobs/by_client_id/changes")
+    cursor = response.json()["cursor"]
+
+    inject_security_header("owner1@test.com", Permissions.JOB_DELETE, client_id="dummy")
+    response = await backend_client.request("DELETE", "/lm/jobs/bulk", json=["123"])
+    assert response.status_code == 200
+
+    inject_security_header("owner1@test.com", Permissions.JOB_READ, client_id="dummy")
+    response = await backend_client.get("/lm/jobs/by_client_id/changes", params={"since": cursor})
+
+    assert response.status_code == 200
+
+    response_changes = response.json()
+    assert response_changes["cursor"] >= cursor
+    assert [job["slurm_job_id"] for job in response_changes["jobs"]] == ["234"]
+    assert response_changes["deleted_jobs"] == [{"job_id": create_jobs[0].id, "slurm_job_id": "123"}]
+
+
+@mark.parametrize(
+    "delete_path,delete_permission",
+    [
+        ("/lm/features/{feature_id}", Permissions.FEATURE_DELETE),
+        ("/lm/configurations/{config_id}", Permissions.CONFIG_DELETE),
+    ],
+)
+@mark.asyncio
+async def test_get_job_changes_by_client_id__reports_bookings_deleted_with_their_feature(
+    delete_path,
+    delete_permission,
+    backend_client: AsyncClient,
+    inject_security_header,
+    create_bookings,
+    create_features,
+    create_jobs,
+    update_object,
+):
+    # Mark the jobs as synchronized by an older cursor
+    for job in create_jobs:
+        await update_object([("change_xid", 0)], job.id, Job)
+
+    inject_security_header("owner1@test.com", Permissions.JOB_READ, client_id="dummy")
+    response = await backend_client.get("/lm/jobs/by_client_id/changes", params={"since": 1})
+    assert response.json()["jobs"] == []
+
+    inject_security_header("owner1@test.com", delete_permission, client_id="dummy")
+    response = await backend_client.delete(
+        delete_path.format(feature_id=create_features[0].id, config_id=create_features[0].config_id)
+    )
+    assert response.status_code == 200
+
+    inject_security_header("owner1@test.com", Permissions.JOB_READ, client_id="dummy")
+    response = await backend_client.get("/lm/jobs/by_client_id/changes", params={"since": 1})
+
+    assert response.status_code == 200
+
+    changed_jobs = {job["slurm_job_id"]: job for job in response.json()["jobs"]}
+    assert "123" in changed_jobs
+    assert all(
+        booking["feature_id"] != create_features[0].id
+        for job in changed_jobs.values()
+        for booking in job["bookings"]
+    )
+
+
+@mark.asyncio
+async def test_get_job_changes_by_client_id__keeps_the_tombstones(
+    backend_client: AsyncClient,
+    inject_security_header,
+    create_jobs,
+    read_objects,
+):
+    inject_security_header("owner1@test.com", Permissions.JOB_DELETE, client_id="dummy")
+    response = await backend_client.request("DELETE", "/lm/jobs/bulk", json=["123", "234"])
+    assert response.status_code == 200
+
+    inject_security_header("owner1@test.com", Permissions.JOB_READ, client_id="dummy")
+
+    # Every change in the test transaction is older than this cursor
+    response = await backend_client.get("/lm/jobs/by_client_id/changes", params={"since": 2**62})
+
+    assert response.status_code == 200
+    assert response.json()["jobs"] == []
+    assert response.json()["deleted_jobs"] == []
+
+    # A request retried with an older cursor still gets the deleted jobs
+    response = await backend_client.get("/lm/jobs/by_client_id/changes", params={"since": 0})
+
+    assert len(response.json()["deleted_jobs"]) == 2
+
+    tombstones = await read_objects(select(JobTombstone))
+    assert len(tombstones) == 2
+
+
+@mark.asyncio
+async def test_delete_jobs__purges_the_tombstones_older_than_the_retention(
+    backend_client: AsyncClient,
+    inject_security_header,
+    insert_objects,
+    create_jobs,
+    read_objects,
+):
+    await insert_objects(
+        [
+            {
+                "job_id": 999,
+                "slurm_job_id": "999",
+                "cluster_client_id": "other-cluster",
+                "deleted_at": datetime.now() - timedelta(seconds=settings.JOB_TOMBSTONE_RETENTION + 86400),
+            }
+        ],
+        JobTombstone,
+    )
+
+    inject_security_header("owner1@test.com", Permissions.JOB_DELETE, client_id="dummy")
+    response = await backend_client.request("DELETE", "/lm/jobs/bulk", json=["123"])
+    assert response.status_code == 200
+
+    tombstones = await read_objects(select(JobTombstone))
+    assert [tombstone.slurm_job_id for tombstone in tombstones] == ["123"]
+
+
 @mark.parametrize(
     "id,permission",
     [
@@ -391,6 +791,82 @@ async def test_delete_job_by_slurm_id__fail_with_bad_parameter(
     assert response.status_code == 404
 
 
+@mark.parametrize(
+    "permission",
+    [
+        Permissions.JOB_DELETE,
+        Permissions.ADMIN,
+    ],
+)
+@mark.asyncio
+async def test_bulk_delete_jobs_by_slurm_id__success(
+    permission,
+    backend_client: AsyncClient,
+    inject_security_header,
+    create_bookings,
+    read_objects,
+):
+    inject_security_header("owner1@test.com", permission, client_id="dummy")
+    response = await backend_client.request("DELETE", "/lm/jobs/bulk", json=["123", "234", "999"])
+
+    assert response.status_code == 200
+    assert sorted(response.json()["deleted_slurm_job_ids"]) == ["123", "234"]
+
+    fetch_jobs = await read_objects(select(Job))
+    assert fetch_jobs == []
+
+    fetch_bookings = await read_objects(select(Booking))
+    assert fetch_bookings == []
+
+    fetch_features = await read_objects(select(Feature))
+    assert [feature.booked_total for feature in fetch_features] == [0, 0]
+
+
+@mark.parametrize(
+    "permission",
+    [
+        Permissions.JOB_DELETE,
+        Permissions.ADMIN,
+    ],
+)
+@mark.asyncio
+async def test_bulk_delete_jobs_by_slurm_id__only_deletes_jobs_in_the_cluster(
+    permission,
+    backend_client: AsyncClient,
+    inject_security_header,
+    create_jobs,
+    read_objects,
+):
+    inject_security_header("owner1@test.com", permission, client_id="other-cluster")
+    response = await backend_client.request("DELETE", "/lm/jobs/bulk", json=["123", "234"])
+
+    assert response.status_code == 200
+    assert response.json()["deleted_slurm_job_ids"] == []
+
+    fetch_jobs = await read_objects(select(Job))
+    assert len(fetch_jobs) == 2
+
+
+@mark.parametrize(
+    "permission",
+    [
+        Permissions.JOB_DELETE,
+        Permissions.ADMIN,
+    ],
+)
+@mark.asyncio
+async def test_bulk_delete_jobs_by_slurm_id__fail_with_bad_client_id(
+    permission,
+    backend_client: AsyncClient,
+    inject_security_header,
+    create_jobs,
+):
+    inject_security_header("owner1@test.com", permission)
+    response = await backend_client.request("DELETE", "/lm/jobs/bulk", json=["123", "234"])
+
+    assert response.status_code == 400
+
+
 @mark.parametrize(
     "permission",
     [
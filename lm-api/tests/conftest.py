@@ -182,10 +182,9 @@ def read_objects(synth_session: AsyncSession):
     async def _helper(
         stmt,
     ):
+        # Reload the objects already in the session, along with the relationships in the statement
+        stmt = stmt.execution_options(populate_existing=True)
         fetched = (await synth_session.execute(stmt)).scalars().all()
-
-        # Necessary to lazy load relationships for joined models
-        await asyncio.gather(synth_session.refresh(obj) for obj in fetched if obj is not None)
         return fetched
 
     return _helper
@@ -201,16 +200,38 @@ def read_object(synth_session: AsyncSession):
     async def _helper(
         stmt,
     ):
+        # Reload the object already in the session, along with the relationships in the statement
+        stmt = stmt.execution_options(populate_existing=True)
         fetched = (await synth_session.execute(stmt)).scalars().one_or_none()
-
-        # Necessary to lazy load relationships for joined models
-        if fetched is not None:
-            await synth_session.refresh(fetched)
         return fetched
 
     return _helper
 
 
+@fixture
+def count_queries(synth_engine):
+    """
+    A fixture that provides a context manager collecting the SELECT statements sent to the database
+    while it is open.
+    """
+
+    @contextlib.contextmanager
+    def _helper():
+        statements: typing.List[str] = []
+
+        def _collect(connection, cursor, statement, parameters, context, executemany):
+            if statement.lstrip().upper().startswith(("SELECT", "WITH")):
+                statements.append(statement)
+
+        sqlalchemy.event.listen(synth_engine.sync_engine, "before_cursor_execute", _collect)
+        try:
+            yield statements
+        finally:
+            sqlalchemy.event.remove(synth_engine.sync_engine, "before_cursor_execute", _collect)
+
+    return _helper
+
+
 @fixture(autouse=True)
 def enforce_mocked_oidc_provider(mock_openid_server):
     """
@@ -87,3 +87,46 @@ def test_sort_clause__raises_exception_for_invalid_sort_field():
             sort_ascending=False,
         )
     assert "Invalid sorting column requested: foo" in exc_info.value.detail
+
+
+def test_keyset_clause__produces_valid_query():
+    """
+    Does the ``keyset_clause()`` function select the rows after the cursor in the sort order?
+    """
+    cursor = database.encode_cursor(["foo", 3])
+
+    query = select(Product).where(
+        database.keyset_clause(
+            cursor=cursor,
+            order_columns=[Product.name, Product.id],
+            sort_ascending=False,
+        )
+    )
+
+    rendered_query = database.render_sql(query)
+    columns = Product.__table__.columns.keys()
+    columns_str = ",".join(["products." + c for c in columns])
+    assert query_stripper(rendered_query) == query_stripper(
+        f"""
+        select {columns_str}
+        from products
+        where
+            (products.name, products.id) < ('foo', 3)
+        """
+    )
+
+
+def test_keyset_clause__raises_exception_for_invalid_cursor():
+    """
+    Does the ``keyset_clause()`` function raise an exception if the cursor can't be decoded
+    or doesn't match the sort order?
+    """
+    for cursor in ["foo", database.encode_cursor([3])]:
+        with raises(HTTPException) as exc_info:
+            database.keyset_clause(
+                cursor=cursor,
+                order_columns=[Product.name, Product.id],
+                sort_ascending=True,
+            )
+        assert exc_info.value.status_code == 400
+        assert "Invalid cursor" in exc_info.value.detail
@@ -4,6 +4,12 @@ Constants that may be used throughout the CLI modules.
 
 from enum import Enum
 
+# Media type of the list endpoints streamed with one result per line
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+# Maximum number of results the list endpoints of the API return at once when a limit is given
+MAX_LIST_LIMIT = 1000
+
 
 class SortOrder(str, Enum):
     """
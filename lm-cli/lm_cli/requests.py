@@ -2,20 +2,26 @@
 Utilities for making requests against the License Manager API.
 """
 
-from typing import Any, Dict, Optional, Type, TypeVar, Union
+import json
+from typing import Any, Dict, Generator, Optional, Type, TypeVar, Union
 
 import httpx
 import pydantic
 from loguru import logger
 
-from lm_cli.constants import SortOrder
+from lm_cli.constants import NDJSON_MEDIA_TYPE, SortOrder
 from lm_cli.exceptions import Abort
 from lm_cli.text_tools import dedent, unwrap
 
 
-def parse_query_params(search: Optional[str], sort_order: Optional[SortOrder], sort_field: Optional[str]):
+def parse_query_params(
+    search: Optional[str],
+    sort_order: Optional[SortOrder],
+    sort_field: Optional[str],
+    limit: Optional[int] = None,
+):
     """
-    Parse the search, sort order and sort field params to use as query params.
+    Parse the search, sort order, sort field and limit params to use as query params.
     """
     params: Dict[str, Any] = dict()
 
@@ -25,6 +31,8 @@ def parse_query_params(search: Optional[str], sort_order: Optional[SortOrder], s
         params["sort_ascending"] = sort_order is SortOrder.ASCENDING
     if sort_field is not None:
         params["sort_field"] = sort_field
+    if limit is not None:
+        params["limit"] = limit
 
     return params
 
@@ -122,6 +130,110 @@ def make_request(
     if request_model is not None:
         _deserialize_request_model(request_model, request_kwargs, abort_message, abort_subject)
 
+    response = _send_request(
+        client, url_path, method, expected_status, abort_message, abort_subject, support, request_kwargs
+    )
+
+    if expect_response is False:
+        return response.status_code
+
+    data = _extract_data(response, abort_message, abort_subject, support)
+
+    if response_model_cls is None:
+        return data
+
+    logger.debug("Validating response data with ResponseModel.")
+    try:
+        return response_model_cls(**data)
+    except pydantic.ValidationError as err:
+        raise Abort(
+            unwrap(
+                f"""
+                {abort_message}:
+                Unexpected data in response.
+                """
+            ),
+            subject=abort_subject,
+            support=support,
+            log_message=f"Unexpected format in response data: {data}.",
+            original_error=err,
+        ) from err
+
+
+def make_streamed_request(
+    client: httpx.Client,
+    url_path: str,
+    *,
+    abort_message: str = "There was an error communicating with the API",
+    abort_subject: str = "REQUEST FAILED",
+    support: bool = True,
+    params: Optional[Dict[str, Any]] = None,
+) -> Generator[Dict, None, None]:
+    """
+    Lazily iterate over the results of a list endpoint of the License Manager API.
+
+    The results are requested as newline-delimited JSON and parsed one at a time as they're received,
+    so the whole list is never held in memory. The response is closed once the iteration stops, even if
+    not all the results were consumed.
+
+    :param: client:         The Httpx client to use for the request.
+    :param: url_path:       The path to add to the base url of the client where the request should be sent.
+    :param: abort_message:  The message to show the user if there is a problem and the app must be aborted.
+    :param: abort_subject:  The subject to use in Abort output to the user.
+    :param: support:        If true, add a message to the output instructing the user to seek help.
+    :param: params:         The query params to send with the request, e.g. the search and sort params.
+    """
+    request_kwargs = dict(params=params, headers={"Accept": NDJSON_MEDIA_TYPE})
+    response = _send_request(
+        client, url_path, "GET", 200, abort_message, abort_subject, support, request_kwargs, stream=True
+    )
+
+    try:
+        if not response.headers.get("Content-Type", "").startswith(NDJSON_MEDIA_TYPE):
+            # The API didn't stream the results, so they're all in a single JSON list
+            response.read()
+            yield from _extract_data(response, abort_message, abort_subject, support)
+            return
+
+        for line in response.iter_lines():
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError as err:
+                raise Abort(
+                    unwrap(
+                        f"""
+                        {abort_message}:
+                        Unexpected data in response.
+                        """
+                    ),
+                    subject=abort_subject,
+                    support=support,
+                    log_message=f"Failed unpacking json line: {line}.",
+                    original_error=err,
+                ) from err
+    finally:
+        response.close()
+
+
+def _send_request(
+    client: httpx.Client,
+    url_path: str,
+    method: str,
+    expected_status: Optional[int],
+    abort_message: str,
+    abort_subject: str,
+    support: bool,
+    request_kwargs: Dict[str, Any],
+    stream: bool = False,
+) -> httpx.Response:
+    """
+    Send a request against the License Manager API and check the status of the response.
+
+    If stream is set, the body of a successful response isn't read, and the response must be closed
+    by the caller.
+    """
     logger.debug(f"Making request to url_path={url_path}")
     request = client.build_request(method, url_path, **request_kwargs)
 
@@ -140,7 +252,7 @@ def make_request(
     )
 
     try:
-        response = client.send(request)
+        response = client.send(request, stream=stream)
     except httpx.RequestError as err:
         raise Abort(
             unwrap(
@@ -156,6 +268,8 @@ def make_request(
         ) from err
 
     if expected_status is not None and response.status_code != expected_status:
+        response.read()
+        response.close()
         try:
             error_message_text = response.json()["detail"]
         except Exception:
@@ -172,9 +286,13 @@ def make_request(
             log_message=f"Got an error code for request: {response.status_code}: {response.text}.",
         )
 
-    if expect_response is False:
-        return response.status_code
+    return response
+
 
+def _extract_data(response: httpx.Response, abort_message: str, abort_subject: str, support: bool) -> Any:
+    """
+    Extract the JSON data from the response of the License Manager API.
+    """
     try:
         data = response.json()
     except Exception as err:
@@ -191,23 +309,4 @@ def make_request(
             original_error=err,
         ) from err
     logger.debug(f"Extracted data from response: {data}.")
-
-    if response_model_cls is None:
-        return data
-
-    logger.debug("Validating response data with ResponseModel.")
-    try:
-        return response_model_cls(**data)
-    except pydantic.ValidationError as err:
-        raise Abort(
-            unwrap(
-                f"""
-                {abort_message}:
-                Unexpected data in response.
-                """
-            ),
-            subject=abort_subject,
-            support=support,
-            log_message=f"Unexpected format in response data: {data}.",
-            original_error=err,
-        ) from err
+    return data
@@ -2,14 +2,16 @@
 A ``typer`` app that can interact with Configurations data in a cruddy manner.
 """
 
-from typing import Dict, List, Optional, cast
+from contextlib import closing
+from itertools import islice
+from typing import Dict, Optional, cast
 
 import typer
 
-from lm_cli.constants import LicenseServerType, SortOrder
+from lm_cli.constants import MAX_LIST_LIMIT, LicenseServerType, SortOrder
 from lm_cli.exceptions import handle_abort
 from lm_cli.render import StyleMapper, render_list_results, render_single_result, terminal_message
-from lm_cli.requests import make_request, parse_query_params
+from lm_cli.requests import make_request, make_streamed_request, parse_query_params
 from lm_cli.schemas import ConfigurationCreateSchema, LicenseManagerContext
 
 style_mapper = StyleMapper(
@@ -58,6 +60,9 @@ def list_all(
     search: Optional[str] = typer.Option(None, help="Apply a search term to results."),
     sort_order: SortOrder = typer.Option(SortOrder.UNSORTED, help="Specify sort order."),
     sort_field: Optional[str] = typer.Option(None, help="The field by which results should be sorted."),
+    limit: Optional[int] = typer.Option(
+        None, min=1, max=MAX_LIST_LIMIT, help="The maximum number of results to show."
+    ),
 ):
     """
     Show configuration information.
@@ -68,20 +73,19 @@ def list_all(
     assert lm_ctx is not None
     assert lm_ctx.client is not None
 
-    params = parse_query_params(search=search, sort_order=sort_order, sort_field=sort_field)
+    params = parse_query_params(search=search, sort_order=sort_order, sort_field=sort_field, limit=limit)
 
-    data = cast(
-        List,
-        make_request(
+    # The response is closed as soon as the results up to the limit are read
+    with closing(
+        make_streamed_request(
             lm_ctx.client,
             "/lm/configurations",
-            "GET",
-            expected_status=200,
             abort_message="Couldn't retrieve configuration list from API",
             support=True,
             params=params,
-        ),
-    )
+        )
+    ) as results:
+        data = list(islice(results, limit))
 
     formatted_data = format_data(data)
 
@@ -1,3 +1,5 @@
+import json
+
 import httpx
 
 from lm_cli.subapps.jobs import list_all, style_mapper
@@ -30,3 +32,40 @@ def test_list_all__makes_request_and_renders_results(
         title="Jobs List",
         style_mapper=style_mapper,
     )
+
+
+def test_list_all__stops_reading_once_the_limit_is_reached(
+    respx_mock,
+    make_test_app,
+    dummy_job_data,
+    dummy_job_data_for_printing,
+    dummy_domain,
+    cli_runner,
+    mocker,
+):
+    """
+    Test if the list all command only shows the results up to the limit from the streamed jobs.
+    """
+    # Each job is sent in its own chunk, so the stream isn't exhausted when the limit is reached
+    jobs_route = respx_mock.get(f"{dummy_domain}/lm/jobs").mock(
+        return_value=httpx.Response(
+            httpx.codes.OK,
+            content=iter([f"{json.dumps(job)}\n".encode() for job in dummy_job_data]),
+            headers={"Content-Type": "application/x-ndjson"},
+        ),
+    )
+    test_app = make_test_app("list-all", list_all)
+    close_spy = mocker.spy(httpx.Response, "close")
+    # The response must be closed once the results are read, before they're rendered
+    mocked_render = mocker.patch(
+        "lm_cli.subapps.jobs.render_list_results",
+        side_effect=lambda *args, **kwargs: close_spy.assert_called(),
+    )
+    result = cli_runner.invoke(test_app, ["list-all", "--limit", "1"])
+    assert result.exit_code == 0, f"list-all failed: {result.stdout}"
+    assert jobs_route.calls.last.request.url.params["limit"] == "1"
+    mocked_render.assert_called_once_with(
+        dummy_job_data_for_printing[:1],
+        title="Jobs List",
+        style_mapper=style_mapper,
+    )
@@ -7,7 +7,12 @@ import pytest
 
 from lm_cli.constants import SortOrder
 from lm_cli.exceptions import Abort
-from lm_cli.requests import _deserialize_request_model, make_request, parse_query_params
+from lm_cli.requests import (
+    _deserialize_request_model,
+    make_request,
+    make_streamed_request,
+    parse_query_params,
+)
 
 DEFAULT_DOMAIN = "https://dummy-domain.com"
 
@@ -345,6 +350,83 @@ def test_make_request__uses_request_model_instance_for_request_body_if_passed(re
     assert dummy_route.calls.last.request.headers["Content-Type"] == "application/json"
 
 
+def test_make_streamed_request__parses_each_line(respx_mock, dummy_client):
+    """
+    Validate that the ``make_streamed_request()`` function requests newline-delimited JSON and parses
+    each line of the response.
+    """
+    client = dummy_client()
+    req_path = "/fake-path"
+
+    dummy_route = respx_mock.get(f"{DEFAULT_DOMAIN}{req_path}").mock(
+        return_value=httpx.Response(
+            httpx.codes.OK,
+            content=b'{"id": 1}\n{"id": 2}\n\n{"id": 3}\n',
+            headers={"Content-Type": "application/x-ndjson"},
+        ),
+    )
+
+    results = make_streamed_request(client, req_path, params=dict(search="foo"))
+
+    assert dummy_route.call_count == 0
+    assert list(results) == [dict(id=1), dict(id=2), dict(id=3)]
+    assert dummy_route.calls.last.request.headers["Accept"] == "application/x-ndjson"
+    assert dict(dummy_route.calls.last.request.url.params) == dict(search="foo")
+
+
+def test_make_streamed_request__falls_back_to_a_json_list(respx_mock, dummy_client):
+    """
+    Validate that the ``make_streamed_request()`` function also handles a response with all the results
+    in a single JSON list, as returned by versions of the API that don't stream them.
+    """
+    client = dummy_client()
+    req_path = "/fake-path"
+
+    respx_mock.get(f"{DEFAULT_DOMAIN}{req_path}").mock(
+        return_value=httpx.Response(httpx.codes.OK, json=[dict(id=1), dict(id=2)]),
+    )
+
+    assert list(make_streamed_request(client, req_path)) == [dict(id=1), dict(id=2)]
+
+
+def test_make_streamed_request__raises_Abort_for_an_invalid_line(respx_mock, dummy_client):
+    """
+    Validate that the ``make_streamed_request()`` function raises an Abort if a line isn't valid JSON.
+    """
+    client = dummy_client()
+    req_path = "/fake-path"
+
+    respx_mock.get(f"{DEFAULT_DOMAIN}{req_path}").mock(
+        return_value=httpx.Response(
+            httpx.codes.OK,
+            content=b'{"id": 1}\n{"id":\n',
+            headers={"Content-Type": "application/x-ndjson"},
+        ),
+    )
+
+    results = make_streamed_request(client, req_path, abort_message="There was a big problem")
+
+    assert next(results) == dict(id=1)
+    with pytest.raises(Abort, match="There was a big problem: Unexpected data in response"):
+        next(results)
+
+
+def test_make_streamed_request__raises_Abort_when_the_request_fails(respx_mock, dummy_client):
+    """
+    Validate that the ``make_streamed_request()`` function raises an Abort with the error message of a
+    failed request.
+    """
+    client = dummy_client()
+    req_path = "/fake-path"
+
+    respx_mock.get(f"{DEFAULT_DOMAIN}{req_path}").mock(
+        return_value=httpx.Response(httpx.codes.BAD_REQUEST, json=dict(detail="Invalid cursor.")),
+    )
+
+    with pytest.raises(Abort, match="There was a big problem: Received an error response.*Invalid cursor"):
+        list(make_streamed_request(client, req_path, abort_message="There was a big problem"))
+
+
 def test_parse_query_params__returns_correct_dict():
     """
     Validate that the ``parse_query_params()`` function produces a dict with the query params to be sent
@@ -367,3 +449,7 @@ def test_parse_query_params__returns_correct_dict():
         "sort_ascending": False,
         "sort_field": sort_field,
     }
+
+    assert parse_query_params(search=None, sort_order=SortOrder.UNSORTED, sort_field=None, limit=10) == {
+        "limit": 10,
+    }